@@ -0,0 +1,131 @@
+-- ============================================================================
+-- Batched Connection Jobs
+-- ============================================================================
+-- migrate:no-transaction
+-- migrate:depends-on Billix/Features/BillSwap/Database/bill_connection_schema.sql
+--
+-- reset_monthly_connection_counts() rewrote every row of profiles, including
+-- the ones already at 0, and expire_pending_terms() expired all overdue terms
+-- in one UPDATE. Both are now batch functions that touch at most p_batch_size
+-- rows after a keyset cursor, walking a partial index of the rows they can
+-- change:
+--
+--   reset_monthly_connection_counts_batch(after_id)    -> (touched, last_id)
+--   expire_pending_terms_batch(after_at, after_id)     -> (touched, last_at, last_id)
+--
+-- The expiry batch skips rows locked by other sessions (the next 5-minute
+-- run picks them up); the monthly reset waits for them instead.
+--
+-- Pass the returned cursor back in and stop when last_id is NULL;
+-- maintenance_jobs.py runs them with a commit per batch. The old functions
+-- loop over the batches inside a single call for existing cron jobs.
+--
+-- Runs without a transaction so the indexes build CONCURRENTLY. If a build
+-- fails, drop the INVALID index it leaves behind before re-running.
+-- ============================================================================
+
+-- ============================================================================
+-- 1. INDEXES
+-- ============================================================================
+
+-- Only profiles that used a connection this month; most rows never enter it
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_profiles_monthly_connections
+    ON profiles(id) WHERE monthly_connection_count IS DISTINCT FROM 0;
+
+-- Adds id as a tie-breaker for the cursor; replaces idx_connection_terms_expires
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_connection_terms_proposed_expires
+    ON connection_terms(expires_at, id) WHERE status = 'proposed';
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_connection_terms_expires;
+
+-- ============================================================================
+-- 2. BATCH FUNCTIONS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION reset_monthly_connection_counts_batch(
+    p_after_id UUID DEFAULT NULL,
+    p_batch_size INTEGER DEFAULT 1000
+)
+RETURNS TABLE(touched INTEGER, last_id UUID) AS $$
+    WITH batch AS (
+        SELECT id
+        FROM profiles
+        WHERE monthly_connection_count IS DISTINCT FROM 0
+        AND id > COALESCE(p_after_id, '00000000-0000-0000-0000-000000000000')
+        ORDER BY id
+        LIMIT p_batch_size
+        -- Wait for row locks: a skipped row would keep last month's count until
+        -- next month, since the cursor moves past it
+        FOR UPDATE
+    ),
+    updated AS (
+        UPDATE profiles p
+        SET monthly_connection_count = 0
+        FROM batch
+        WHERE p.id = batch.id
+        RETURNING p.id
+    )
+    SELECT COUNT(*)::INTEGER, (ARRAY_AGG(id ORDER BY id DESC))[1]
+    FROM updated;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION expire_pending_terms_batch(
+    p_after_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL,
+    p_batch_size INTEGER DEFAULT 500
+)
+RETURNS TABLE(touched INTEGER, last_at TIMESTAMPTZ, last_id UUID) AS $$
+    WITH batch AS (
+        SELECT id
+        FROM connection_terms
+        WHERE status = 'proposed'
+        AND expires_at < NOW()
+        AND (expires_at, id) > (COALESCE(p_after_at, '-infinity'), COALESCE(p_after_id, '00000000-0000-0000-0000-000000000000'))
+        ORDER BY expires_at, id
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    updated AS (
+        UPDATE connection_terms t
+        SET status = 'expired'
+        FROM batch
+        WHERE t.id = batch.id
+        RETURNING t.expires_at, t.id
+    )
+    SELECT
+        COUNT(*)::INTEGER,
+        (ARRAY_AGG(expires_at ORDER BY expires_at DESC, id DESC))[1],
+        (ARRAY_AGG(id ORDER BY expires_at DESC, id DESC))[1]
+    FROM updated;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+-- ============================================================================
+-- 3. EXISTING ENTRY POINTS
+-- ============================================================================
+
+-- Function to reset monthly connection counts (run via cron)
+CREATE OR REPLACE FUNCTION reset_monthly_connection_counts()
+RETURNS void AS $$
+DECLARE
+    after_id UUID;
+BEGIN
+    LOOP
+        SELECT last_id INTO after_id FROM reset_monthly_connection_counts_batch(after_id);
+        EXIT WHEN after_id IS NULL;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Function to expire old terms
+CREATE OR REPLACE FUNCTION expire_pending_terms()
+RETURNS void AS $$
+DECLARE
+    after_at TIMESTAMPTZ;
+    after_id UUID;
+BEGIN
+    LOOP
+        SELECT last_at, last_id INTO after_at, after_id FROM expire_pending_terms_batch(after_at, after_id);
+        EXIT WHEN after_id IS NULL;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
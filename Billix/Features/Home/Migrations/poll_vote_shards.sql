@@ -0,0 +1,184 @@
+-- Sharded Poll Vote Counters
+-- Created: 2026-10-18
+-- migrate:depends-on Billix/Features/Home/Migrations/homepage_features.sql
+--
+-- update_poll_vote_count used to run
+--   UPDATE community_polls SET vote_count_a = vote_count_a + 1
+-- for every vote. There is one poll per day, so every vote in the country
+-- queued on the same row lock until the previous voter's transaction committed.
+--
+-- Votes (and views) now go to one of 16 counter rows per poll, picked by the
+-- database backend serving the request, so concurrent voters almost never touch
+-- the same row. Readers sum the shards:
+--   get_todays_poll()          today's poll with live counts
+--   get_poll_results(poll_id)  one poll with live counts (after voting)
+-- rollup_poll_votes() copies the totals back into community_polls.vote_count_a /
+-- vote_count_b / view_count for clients that read the table directly; run it
+-- every minute (pg_cron or the job scheduler).
+
+-- ============================================
+-- PART 1: SHARD TABLE
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS poll_vote_shards (
+  poll_id UUID NOT NULL REFERENCES community_polls(id) ON DELETE CASCADE,
+  shard SMALLINT NOT NULL,
+  votes_a BIGINT NOT NULL DEFAULT 0,
+  votes_b BIGINT NOT NULL DEFAULT 0,
+  views BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (poll_id, shard)
+) WITH (fillfactor = 50);  -- room for HOT updates, counters are updated in place
+
+ALTER TABLE poll_vote_shards ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "poll_vote_shards_select_all" ON poll_vote_shards
+  FOR SELECT USING (true);
+
+-- Number of counter rows per poll; more shards = less contention, slightly slower reads
+CREATE OR REPLACE FUNCTION poll_vote_shard_count()
+RETURNS INTEGER AS $$
+  SELECT 16
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================
+-- PART 2: WRITE PATH
+-- ============================================
+
+-- One backend serves one request at a time, so sharding by backend keeps
+-- concurrent transactions on different rows. SECURITY DEFINER so the counters
+-- update under RLS (voters have no UPDATE policy on community_polls).
+CREATE OR REPLACE FUNCTION update_poll_vote_count()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO poll_vote_shards (poll_id, shard, votes_a, votes_b)
+    VALUES (
+      NEW.poll_id,
+      pg_backend_pid() % poll_vote_shard_count(),
+      CASE WHEN NEW.selected_option = 'a' THEN 1 ELSE 0 END,
+      CASE WHEN NEW.selected_option = 'a' THEN 0 ELSE 1 END
+    )
+    ON CONFLICT (poll_id, shard) DO UPDATE SET
+      votes_a = poll_vote_shards.votes_a + EXCLUDED.votes_a,
+      votes_b = poll_vote_shards.votes_b + EXCLUDED.votes_b;
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Views hit the same hot row on every display
+CREATE OR REPLACE FUNCTION increment_poll_view(p_poll_id UUID)
+RETURNS void AS $$
+BEGIN
+  INSERT INTO poll_vote_shards (poll_id, shard, views)
+  VALUES (p_poll_id, pg_backend_pid() % poll_vote_shard_count(), 1)
+  ON CONFLICT (poll_id, shard) DO UPDATE SET
+    views = poll_vote_shards.views + 1;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- ============================================
+-- PART 3: READ PATH
+-- ============================================
+
+-- A poll row with vote and view counts summed over its shards
+CREATE OR REPLACE FUNCTION get_poll_results(p_poll_id UUID)
+RETURNS SETOF community_polls AS $$
+DECLARE
+  poll community_polls%ROWTYPE;
+BEGIN
+  SELECT * INTO poll FROM community_polls WHERE id = p_poll_id;
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  SELECT
+    COALESCE(SUM(s.votes_a), poll.vote_count_a),
+    COALESCE(SUM(s.votes_b), poll.vote_count_b),
+    COALESCE(SUM(s.views), poll.view_count)
+  INTO poll.vote_count_a, poll.vote_count_b, poll.view_count
+  FROM poll_vote_shards s
+  WHERE s.poll_id = poll.id;
+
+  RETURN NEXT poll;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION get_todays_poll()
+RETURNS SETOF community_polls AS $$
+BEGIN
+  RETURN QUERY
+  SELECT r.*
+  FROM community_polls p
+  CROSS JOIN LATERAL get_poll_results(p.id) r
+  WHERE p.active_date = CURRENT_DATE
+  LIMIT 1;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- ============================================
+-- PART 4: ROLLUP
+-- ============================================
+
+-- Copy shard totals into community_polls. Only polls whose totals changed are
+-- updated, so a run takes one short row lock per active poll.
+CREATE OR REPLACE FUNCTION rollup_poll_votes()
+RETURNS INTEGER AS $$
+DECLARE
+  updated INTEGER;
+BEGIN
+  UPDATE community_polls p
+  SET
+    vote_count_a = t.votes_a,
+    vote_count_b = t.votes_b,
+    view_count = t.views
+  FROM (
+    SELECT poll_id, SUM(votes_a)::INTEGER AS votes_a, SUM(votes_b)::INTEGER AS votes_b, SUM(views)::INTEGER AS views
+    FROM poll_vote_shards
+    GROUP BY poll_id
+  ) t
+  WHERE p.id = t.poll_id
+  AND (p.vote_count_a, p.vote_count_b, p.view_count) IS DISTINCT FROM (t.votes_a, t.votes_b, t.views);
+
+  GET DIAGNOSTICS updated = ROW_COUNT;
+  RETURN updated;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- ============================================
+-- PART 5: SWITCH OVER
+-- ============================================
+
+-- Votes must not be inserted between the recount and the new trigger, or the
+-- old trigger counts them and the shards never see them. The lock (which the
+-- trigger swap needs anyway) is held for the recount only: a scan of
+-- poll_responses, about 0.5 s per 1M responses. With the lock_timeout a long
+-- transaction on poll_responses fails the migration, which migrate.py
+-- retries, instead of queueing every vote behind it.
+SET LOCAL lock_timeout = '5s';
+LOCK TABLE poll_responses IN SHARE ROW EXCLUSIVE MODE;
+
+-- Seed shard 0 with the existing totals (votes recounted from the responses
+-- themselves); the scheduled rollup_poll_votes() copies them into community_polls
+INSERT INTO poll_vote_shards (poll_id, shard, votes_a, votes_b, views)
+SELECT
+  p.id,
+  0,
+  COUNT(r.id) FILTER (WHERE r.selected_option = 'a'),
+  COUNT(r.id) FILTER (WHERE r.selected_option = 'b'),
+  COALESCE(p.view_count, 0)
+FROM community_polls p
+LEFT JOIN poll_responses r ON r.poll_id = p.id
+GROUP BY p.id, p.view_count
+ON CONFLICT (poll_id, shard) DO NOTHING;
+
+-- Same trigger as before, now calling the sharded function
+DROP TRIGGER IF EXISTS trigger_poll_vote_count ON poll_responses;
+CREATE TRIGGER trigger_poll_vote_count
+AFTER INSERT ON poll_responses
+FOR EACH ROW
+EXECUTE FUNCTION update_poll_vote_count();
+
+-- The Supabase polls migration installs a second per-row counter on the same
+-- columns; drop it so votes are neither double counted nor serialized again
+DROP TRIGGER IF EXISTS trigger_update_poll_vote_counts ON poll_responses;
@@ -0,0 +1,202 @@
+-- Sequence-Based Referral Codes
+-- Created: 2026-10-18
+-- migrate:depends-on Billix/Features/Home/Migrations/homepage_features.sql
+--
+-- auto_generate_referral_code() drew random 8-character codes and probed
+-- user_profiles until it found a free one, giving up after 10 attempts. Every
+-- signup paid for the probes, and the chance of a retry grew with the user base.
+--
+-- A code is now the next value of referral_code_seq, run through a keyed
+-- 4-round Feistel permutation of the 40-bit code space (32^8 = 2^40) and
+-- written in the same 32-character alphabet. A permutation never maps two
+-- numbers to the same code, so a signup costs one nextval(), one probe of a
+-- small table and a few integer operations, and never retries. The keys are
+-- random per database, so consecutive codes do not look consecutive; this is
+-- obscurity, not cryptography (the keys are visible in the function bodies).
+--
+-- Codes issued by the old generator stay valid. Each one is the image of a
+-- single sequence number; those numbers go into referral_code_skips, and the
+-- generator steps over them. That table never grows after this migration.
+--
+-- Signups keep using the old trigger until this migration commits. The skips
+-- for existing codes are computed without a lock (about 32 s for 1M users);
+-- only a final catch-up for rows written since then runs under a SHARE ROW
+-- EXCLUSIVE lock on user_profiles, blocking signups and profile updates. The
+-- lock is held for one scan of the table (about 0.1 s per 1M users) plus
+-- about 30 us per row written during the backfill: well under a second at
+-- normal signup rates (1.5 s with 40k signups racing a 20 s backfill in a
+-- load test). The lock is requested with a 5 s lock_timeout, so waiting for it
+-- never stalls signups for longer; migrate.py retries the migration.
+
+-- Oldest transaction that may still write user_profiles unseen by the backfill:
+-- every row it or a later transaction writes has an xmin at least this new
+SELECT set_config('billix.referral_catch_up_xmin',
+                  (pg_snapshot_xmin(pg_current_snapshot())::TEXT::BIGINT % 4294967296)::TEXT, true);
+
+-- ============================================
+-- PART 1: STATE
+-- ============================================
+
+-- 2^32 signups; sequence numbers above that are not needed and their legacy
+-- preimages are not recorded. CACHE lets each connection hand out numbers
+-- without taking the sequence lock on every signup; the gaps it leaves when a
+-- connection closes only waste numbers, never reuse them.
+CREATE SEQUENCE IF NOT EXISTS referral_code_seq MINVALUE 1 MAXVALUE 4294967295 CACHE 32;
+
+CREATE TABLE IF NOT EXISTS referral_code_keys (
+  round SMALLINT PRIMARY KEY CHECK (round BETWEEN 1 AND 4),
+  key INTEGER NOT NULL
+);
+
+INSERT INTO referral_code_keys (round, key)
+SELECT r, floor(random() * 1048576)::INTEGER
+FROM generate_series(1, 4) r
+ON CONFLICT (round) DO NOTHING;
+
+-- Sequence numbers whose code was already handed out by the random generator
+CREATE TABLE IF NOT EXISTS referral_code_skips (
+  seq BIGINT PRIMARY KEY
+);
+
+-- Internal: no policies, so only the SECURITY DEFINER functions read them
+ALTER TABLE referral_code_keys ENABLE ROW LEVEL SECURITY;
+ALTER TABLE referral_code_skips ENABLE ROW LEVEL SECURITY;
+
+-- ============================================
+-- PART 2: CODE FUNCTIONS
+-- ============================================
+
+-- 40-bit value -> 8 characters, 5 bits each, most significant first
+CREATE OR REPLACE FUNCTION referral_code_encode(p_value BIGINT)
+RETURNS TEXT AS $$
+  SELECT substr('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', ((p_value >> 35) & 31)::INTEGER + 1, 1)
+      || substr('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', ((p_value >> 30) & 31)::INTEGER + 1, 1)
+      || substr('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', ((p_value >> 25) & 31)::INTEGER + 1, 1)
+      || substr('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', ((p_value >> 20) & 31)::INTEGER + 1, 1)
+      || substr('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', ((p_value >> 15) & 31)::INTEGER + 1, 1)
+      || substr('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', ((p_value >> 10) & 31)::INTEGER + 1, 1)
+      || substr('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', ((p_value >> 5) & 31)::INTEGER + 1, 1)
+      || substr('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', (p_value & 31)::INTEGER + 1, 1)
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- 8 characters -> 40-bit value; NULL for anything that is not 8 characters of the alphabet
+CREATE OR REPLACE FUNCTION referral_code_decode(p_code TEXT)
+RETURNS BIGINT AS $$
+  SELECT CASE WHEN length(p_code) = 8 AND bool_and(d > 0)
+              THEN SUM((d - 1)::BIGINT << (5 * (8 - i)))::BIGINT END
+  FROM (
+    SELECT i, strpos('ABCDEFGHJKLMNPQRSTUVWXYZ23456789', substr(p_code, i, 1)) AS d
+    FROM generate_series(1, 8) i
+  ) c
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- ============================================
+-- PART 3: PERMUTATION AND GENERATOR
+-- ============================================
+
+-- Balanced Feistel network on two 20-bit halves. The keys are written into
+-- the function bodies as literals: reading referral_code_keys and calling a
+-- separate permute function on every signup cost more than the random probe
+-- this replaces. Re-run this block if the keys are ever changed.
+DO $do$
+DECLARE
+  k INTEGER[];
+  -- One round: <half> := <half> XOR F(<other half>, key)
+  round_sql TEXT := '%1$s := %1$s # (((((%2$s # %3$s) + 1) * 2654435761) >> 12) & 1048575);';
+  forward TEXT;
+  inverse TEXT;
+BEGIN
+  SELECT array_agg(key ORDER BY round) INTO k FROM referral_code_keys;
+
+  forward := format(round_sql, 'l', 'r', k[1]) || format(round_sql, 'r', 'l', k[2])
+          || format(round_sql, 'l', 'r', k[3]) || format(round_sql, 'r', 'l', k[4]);
+  inverse := format(round_sql, 'r', 'l', k[4]) || format(round_sql, 'l', 'r', k[3])
+          || format(round_sql, 'r', 'l', k[2]) || format(round_sql, 'l', 'r', k[1]);
+
+  -- p_inverse undoes the permutation (used to map legacy codes to sequence numbers)
+  EXECUTE format($f$
+    CREATE OR REPLACE FUNCTION referral_code_permute(p_value BIGINT, p_inverse BOOLEAN DEFAULT false)
+    RETURNS BIGINT AS $$
+    DECLARE
+      l BIGINT := p_value >> 20;
+      r BIGINT := p_value & 1048575;
+    BEGIN
+      IF NOT p_inverse THEN
+        %s
+      ELSE
+        %s
+      END IF;
+      RETURN (l << 20) | r;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE STRICT
+  $f$, forward, inverse);
+
+  -- Function to generate unique referral codes
+  EXECUTE format($f$
+    CREATE OR REPLACE FUNCTION generate_referral_code()
+    RETURNS TEXT AS $$
+    DECLARE
+      n BIGINT := nextval('referral_code_seq');
+      l BIGINT;
+      r BIGINT;
+    BEGIN
+      -- Only true for the few numbers whose code a legacy user already has
+      WHILE EXISTS (SELECT 1 FROM referral_code_skips WHERE seq = n) LOOP
+        n := nextval('referral_code_seq');
+      END LOOP;
+
+      l := n >> 20;
+      r := n & 1048575;
+      %s
+      RETURN referral_code_encode((l << 20) | r);
+    END;
+    $$ LANGUAGE plpgsql VOLATILE SECURITY DEFINER SET search_path = public
+  $f$, forward);
+END;
+$do$;
+
+-- Trigger to auto-generate referral code on user creation
+CREATE OR REPLACE FUNCTION auto_generate_referral_code()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NEW.referral_code IS NULL THEN
+    NEW.referral_code := generate_referral_code();
+  END IF;
+
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- PART 4: LEGACY CODES
+-- ============================================
+
+-- Every code issued so far, without blocking signups
+INSERT INTO referral_code_skips (seq)
+SELECT seq
+FROM (
+  SELECT referral_code_permute(referral_code_decode(referral_code), true) AS seq
+  FROM user_profiles
+  WHERE referral_code IS NOT NULL
+) legacy
+WHERE seq BETWEEN 1 AND 4294967295
+ON CONFLICT (seq) DO NOTHING;
+
+-- Catch-up: wait for in-flight writers, keep the old trigger from issuing more
+-- codes until commit, and add the rows inserted or updated since the cutoff
+-- (age(xmin) is smallest for the newest rows; frozen rows have the largest).
+-- Behind a long transaction on user_profiles the lock would queue every signup
+-- until it ends; give up after 5 s instead and let migrate.py retry.
+SET LOCAL lock_timeout = '5s';
+LOCK TABLE user_profiles IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO referral_code_skips (seq)
+SELECT seq
+FROM (
+  SELECT referral_code_permute(referral_code_decode(referral_code), true) AS seq
+  FROM user_profiles
+  WHERE referral_code IS NOT NULL
+  AND age(xmin) <= age(current_setting('billix.referral_catch_up_xmin')::xid)
+) recent
+WHERE seq BETWEEN 1 AND 4294967295
+ON CONFLICT (seq) DO NOTHING;
@@ -0,0 +1,346 @@
+-- Incremental Regional Signals
+-- Created: 2026-10-18
+-- migrate:depends-on Billix/Features/Home/Migrations/homepage_features.sql
+--
+-- refresh_regional_signals() used to GROUP BY all of marketplace_deals on every
+-- call and upsert every (zip_prefix, category), with avg_change_percent and
+-- trend_direction left as placeholders.
+--
+-- Now:
+--   regional_deal_months      running count/sum per group and month, kept up to
+--                             date by statement-level triggers on marketplace_deals
+--   regional_signal_changes   groups whose months changed since the last refresh
+--   refresh_regional_signals  recomputes only those groups from their month rows,
+--                             comparing the average amount of the last 3 months
+--                             (including the current one) with the 3 months before
+--
+-- When the calendar month rolls over every group's window moves, so the first
+-- refresh of a month recomputes all groups. Months are UTC; deals without
+-- created_at are not counted.
+--
+-- The existing deals are counted after this migration, in keyset batches by
+-- id with a commit each (backfill_regional_deal_months_batch, run by
+-- maintenance_jobs.py), instead of one scan under a table lock that blocks
+-- every deal write. regional_deal_backfill holds the cursor: the triggers
+-- only count changes to deals at or below it, the batches count the rest as
+-- they reach them, and refresh_regional_signals() waits until the backfill is
+-- done. Deal writes take a shared advisory lock and a batch an exclusive one,
+-- so a write either commits before a batch counts its range or sees the
+-- batch's new cursor. Advisory locks queue, so a steady stream of writes
+-- cannot starve a batch; writes wait for at most one batch (about 100 ms for
+-- 5,000 deals). rebuild_regional_deal_months() resets the cursor to recount
+-- everything if the months ever drift.
+
+-- ============================================
+-- PART 1: TABLES
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS regional_deal_months (
+  zip_prefix TEXT NOT NULL,
+  category TEXT NOT NULL,
+  month DATE NOT NULL,
+  deal_count BIGINT NOT NULL DEFAULT 0,
+  amount_count BIGINT NOT NULL DEFAULT 0,  -- deals with a monthly_amount
+  amount_sum NUMERIC NOT NULL DEFAULT 0,
+  PRIMARY KEY (zip_prefix, category, month)
+);
+
+CREATE SEQUENCE IF NOT EXISTS regional_signal_changes_seq;
+
+-- change_id moves on every change, so a refresh only clears the entries it saw
+CREATE TABLE IF NOT EXISTS regional_signal_changes (
+  zip_prefix TEXT NOT NULL,
+  category TEXT NOT NULL,
+  change_id BIGINT NOT NULL DEFAULT nextval('regional_signal_changes_seq'),
+  PRIMARY KEY (zip_prefix, category)
+);
+
+CREATE TABLE IF NOT EXISTS regional_signal_refresh_state (
+  id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+  window_month DATE NOT NULL
+);
+
+-- Deals with id <= after_id (every deal once done) are counted in regional_deal_months
+CREATE TABLE IF NOT EXISTS regional_deal_backfill (
+  id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+  after_id UUID,
+  done BOOLEAN NOT NULL DEFAULT false
+);
+
+INSERT INTO regional_deal_backfill (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+-- Internal bookkeeping: RLS with no policies keeps them out of the API
+ALTER TABLE regional_deal_months ENABLE ROW LEVEL SECURITY;
+ALTER TABLE regional_signal_changes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE regional_signal_refresh_state ENABLE ROW LEVEL SECURITY;
+ALTER TABLE regional_deal_backfill ENABLE ROW LEVEL SECURITY;
+
+-- ============================================
+-- PART 2: CHANGE TRACKING
+-- ============================================
+
+-- One upsert per statement, however many deals it touched. The same function
+-- serves all three triggers; only the transition tables differ.
+CREATE OR REPLACE FUNCTION track_regional_deal_changes()
+RETURNS TRIGGER AS $$
+DECLARE
+  changed_rows TEXT;
+  backfilled_to UUID;
+  backfill_done BOOLEAN;
+BEGIN
+  -- Deals past the backfill cursor are counted by the backfill when it gets there
+  PERFORM pg_advisory_xact_lock_shared(hashtext('regional_deal_backfill'));
+  SELECT after_id, done INTO backfilled_to, backfill_done FROM regional_deal_backfill;
+
+  changed_rows := CASE TG_OP
+    WHEN 'INSERT' THEN
+      'SELECT 1 AS sign, id, zip_prefix, category, created_at, monthly_amount FROM new_deals'
+    WHEN 'DELETE' THEN
+      'SELECT -1 AS sign, id, zip_prefix, category, created_at, monthly_amount FROM old_deals'
+    ELSE
+      'SELECT 1 AS sign, id, zip_prefix, category, created_at, monthly_amount FROM new_deals
+       UNION ALL
+       SELECT -1, id, zip_prefix, category, created_at, monthly_amount FROM old_deals'
+  END;
+
+  EXECUTE format($sql$
+    WITH delta AS (
+      SELECT
+        zip_prefix,
+        category,
+        date_trunc('month', created_at AT TIME ZONE 'UTC')::DATE AS month,
+        SUM(sign) AS deals,
+        SUM(sign) FILTER (WHERE monthly_amount IS NOT NULL) AS amounts,
+        COALESCE(SUM(sign * monthly_amount), 0) AS amount
+      FROM (%s) changed
+      WHERE created_at IS NOT NULL
+      AND ($1 OR id <= $2)
+      GROUP BY 1, 2, 3
+      -- Updates that leave these columns alone cancel out
+      HAVING SUM(sign) <> 0 OR COALESCE(SUM(sign * monthly_amount), 0) <> 0
+        OR COALESCE(SUM(sign) FILTER (WHERE monthly_amount IS NOT NULL), 0) <> 0
+    ),
+    touched AS (
+      INSERT INTO regional_deal_months AS m (zip_prefix, category, month, deal_count, amount_count, amount_sum)
+      SELECT zip_prefix, category, month, deals, COALESCE(amounts, 0), amount
+      FROM delta
+      ORDER BY zip_prefix, category, month
+      ON CONFLICT (zip_prefix, category, month) DO UPDATE SET
+        deal_count = m.deal_count + EXCLUDED.deal_count,
+        amount_count = m.amount_count + EXCLUDED.amount_count,
+        amount_sum = m.amount_sum + EXCLUDED.amount_sum
+      RETURNING zip_prefix, category
+    )
+    INSERT INTO regional_signal_changes (zip_prefix, category)
+    SELECT DISTINCT zip_prefix, category
+    FROM touched
+    ORDER BY zip_prefix, category
+    ON CONFLICT (zip_prefix, category) DO UPDATE SET
+      change_id = EXCLUDED.change_id
+  $sql$, changed_rows) USING backfill_done, backfilled_to;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS trigger_regional_deals_insert ON marketplace_deals;
+CREATE TRIGGER trigger_regional_deals_insert
+AFTER INSERT ON marketplace_deals
+REFERENCING NEW TABLE AS new_deals
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_regional_deal_changes();
+
+DROP TRIGGER IF EXISTS trigger_regional_deals_update ON marketplace_deals;
+CREATE TRIGGER trigger_regional_deals_update
+AFTER UPDATE ON marketplace_deals
+REFERENCING OLD TABLE AS old_deals NEW TABLE AS new_deals
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_regional_deal_changes();
+
+DROP TRIGGER IF EXISTS trigger_regional_deals_delete ON marketplace_deals;
+CREATE TRIGGER trigger_regional_deals_delete
+AFTER DELETE ON marketplace_deals
+REFERENCING OLD TABLE AS old_deals
+FOR EACH STATEMENT
+EXECUTE FUNCTION track_regional_deal_changes();
+
+-- Count the next p_batch_size deals after the stored cursor into their months.
+-- Returns last_id NULL once every deal is counted.
+CREATE OR REPLACE FUNCTION backfill_regional_deal_months_batch(p_batch_size INTEGER DEFAULT 5000)
+RETURNS TABLE(touched INTEGER, last_id UUID) AS $$
+DECLARE
+  after UUID;
+  finished BOOLEAN;
+  batch_last UUID;
+  batch_count INTEGER;
+BEGIN
+  -- Waits for deal writes that read the old cursor; later ones wait for this batch
+  PERFORM pg_advisory_xact_lock(hashtext('regional_deal_backfill'));
+  SELECT after_id, done INTO after, finished FROM regional_deal_backfill;
+  IF finished THEN
+    RETURN QUERY SELECT 0, NULL::UUID;
+    RETURN;
+  END IF;
+  -- The nil UUID is below every generated id; a plain range keeps the index scan
+  after := COALESCE(after, '00000000-0000-0000-0000-000000000000');
+
+  SELECT b.id, b.position INTO batch_last, batch_count
+  FROM (
+    SELECT d.id, row_number() OVER (ORDER BY d.id)::INTEGER AS position
+    FROM marketplace_deals d
+    WHERE d.id > after
+    ORDER BY d.id
+    LIMIT p_batch_size
+  ) b
+  ORDER BY b.position DESC
+  LIMIT 1;
+
+  IF batch_last IS NULL THEN
+    UPDATE regional_deal_backfill SET done = true;
+    RETURN QUERY SELECT 0, NULL::UUID;
+    RETURN;
+  END IF;
+
+  WITH touched_months AS (
+    INSERT INTO regional_deal_months AS m (zip_prefix, category, month, deal_count, amount_count, amount_sum)
+    SELECT
+      d.zip_prefix,
+      d.category,
+      date_trunc('month', d.created_at AT TIME ZONE 'UTC')::DATE,
+      COUNT(*),
+      COUNT(d.monthly_amount),
+      COALESCE(SUM(d.monthly_amount), 0)
+    FROM marketplace_deals d
+    WHERE d.id > after AND d.id <= batch_last
+    AND d.created_at IS NOT NULL
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (zip_prefix, category, month) DO UPDATE SET
+      deal_count = m.deal_count + EXCLUDED.deal_count,
+      amount_count = m.amount_count + EXCLUDED.amount_count,
+      amount_sum = m.amount_sum + EXCLUDED.amount_sum
+    RETURNING m.zip_prefix, m.category
+  )
+  INSERT INTO regional_signal_changes (zip_prefix, category)
+  SELECT DISTINCT t.zip_prefix, t.category
+  FROM touched_months t
+  ORDER BY 1, 2
+  ON CONFLICT (zip_prefix, category) DO UPDATE SET
+    change_id = EXCLUDED.change_id;
+
+  UPDATE regional_deal_backfill SET after_id = batch_last;
+  RETURN QUERY SELECT batch_count, batch_last;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Start a recount of every month from marketplace_deals; run the
+-- backfill_regional_deal_months job (maintenance_jobs.py) afterwards
+CREATE OR REPLACE FUNCTION rebuild_regional_deal_months()
+RETURNS void AS $$
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('regional_deal_backfill'));
+  DELETE FROM regional_deal_months;
+  UPDATE regional_deal_backfill SET after_id = NULL, done = false;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- ============================================
+-- PART 3: REFRESH
+-- ============================================
+
+CREATE OR REPLACE FUNCTION refresh_regional_signals()
+RETURNS void AS $$
+DECLARE
+  window_start DATE := date_trunc('month', NOW() AT TIME ZONE 'UTC')::DATE;
+  last_window DATE;
+BEGIN
+  -- Skip if a refresh is already running; whatever it misses stays queued for the next one
+  IF NOT pg_try_advisory_xact_lock(hashtext('refresh_regional_signals')) THEN
+    RETURN;
+  END IF;
+
+  -- Partial months would publish partial signals; the changes stay queued
+  IF NOT (SELECT done FROM regional_deal_backfill) THEN
+    RETURN;
+  END IF;
+
+  -- New month: the 3-month windows moved for every group
+  SELECT window_month INTO last_window FROM regional_signal_refresh_state;
+  IF last_window IS DISTINCT FROM window_start THEN
+    INSERT INTO regional_signal_changes (zip_prefix, category)
+    SELECT DISTINCT zip_prefix, category
+    FROM regional_deal_months
+    ON CONFLICT (zip_prefix, category) DO NOTHING;
+
+    INSERT INTO regional_signal_refresh_state (id, window_month)
+    VALUES (true, window_start)
+    ON CONFLICT (id) DO UPDATE SET window_month = EXCLUDED.window_month;
+  END IF;
+
+  WITH claimed AS (
+    SELECT zip_prefix, category, change_id
+    FROM regional_signal_changes
+  ),
+  totals AS (
+    SELECT
+      m.zip_prefix,
+      m.category,
+      SUM(m.deal_count)::INTEGER AS sample_size,
+      SUM(m.amount_sum) FILTER (WHERE m.month >= window_start - INTERVAL '2 months')
+        / NULLIF(SUM(m.amount_count) FILTER (WHERE m.month >= window_start - INTERVAL '2 months'), 0) AS recent_avg,
+      SUM(m.amount_sum) FILTER (WHERE m.month >= window_start - INTERVAL '5 months'
+                                  AND m.month < window_start - INTERVAL '2 months')
+        / NULLIF(SUM(m.amount_count) FILTER (WHERE m.month >= window_start - INTERVAL '5 months'
+                                               AND m.month < window_start - INTERVAL '2 months'), 0) AS prior_avg
+    FROM regional_deal_months m
+    JOIN claimed c ON c.zip_prefix = m.zip_prefix AND c.category = m.category
+    GROUP BY m.zip_prefix, m.category
+  ),
+  signals AS (
+    SELECT
+      zip_prefix,
+      category,
+      sample_size,
+      CASE WHEN sample_size >= 50 THEN 80 WHEN sample_size >= 20 THEN 60 ELSE 40 END AS confidence,
+      ROUND(LEAST(GREATEST((recent_avg - prior_avg) / NULLIF(prior_avg, 0) * 100, -999.99), 999.99), 2) AS change
+    FROM totals
+  ),
+  upserted AS (
+    INSERT INTO regional_utility_signals (
+      zip_prefix, category, signal_type, confidence_level,
+      sample_size, avg_change_percent, trend_direction, insight_text
+    )
+    SELECT
+      zip_prefix,
+      category,
+      calculate_signal_type(sample_size, change, confidence),
+      confidence,
+      sample_size,
+      change,
+      CASE WHEN change IS NULL THEN 'unknown' WHEN change > 1 THEN 'up' WHEN change < -1 THEN 'down' ELSE 'flat' END,
+      'Regional utility data aggregated from community uploads'
+    FROM signals
+    -- Signals only exist for the categories the check-up screen shows
+    WHERE category IN ('energy', 'gas', 'water', 'internet', 'mobile')
+    ON CONFLICT (zip_prefix, category) DO UPDATE SET
+      signal_type = EXCLUDED.signal_type,
+      confidence_level = EXCLUDED.confidence_level,
+      sample_size = EXCLUDED.sample_size,
+      avg_change_percent = EXCLUDED.avg_change_percent,
+      trend_direction = EXCLUDED.trend_direction,
+      last_updated = NOW()
+  )
+  -- Entries changed again after they were read keep their new change_id and stay queued.
+  -- Rows are locked in key order, as the triggers upsert them, so the two cannot deadlock.
+  DELETE FROM regional_signal_changes d
+  USING (
+    SELECT q.zip_prefix, q.category
+    FROM regional_signal_changes q
+    JOIN claimed c ON c.zip_prefix = q.zip_prefix AND c.category = q.category AND c.change_id = q.change_id
+    ORDER BY q.zip_prefix, q.category
+    FOR UPDATE OF q
+  ) done
+  WHERE d.zip_prefix = done.zip_prefix
+  AND d.category = done.category;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,165 @@
+-- Batched Assist Expiry
+-- Created: 2026-10-18
+-- migrate:no-transaction
+-- migrate:depends-on Billix/Features/TrustLadder/Migrations/assist_tables.sql
+--
+-- expire_old_assist_requests() ran three unbounded UPDATEs, and the 72-hour
+-- matched/fee_pending sweep had no index on matched_at. Each sweep is now a
+-- batch function that expires at most p_batch_size rows after a keyset cursor,
+-- walking a partial index that only holds the rows the sweep can match:
+--
+--   expire_active_assist_requests_batch   active requests older than 7 days
+--   expire_pending_assist_offers_batch    pending offers older than 48 hours
+--   fail_unpaid_assist_matches_batch      matched/fee_pending for 72 hours
+--
+-- Each returns (touched, last_at, last_id); pass last_at/last_id back in for
+-- the next batch and stop when last_id is NULL. maintenance_jobs.py does this
+-- with a commit per batch, so row locks and WAL stay bounded. Rows locked by
+-- someone else are skipped and picked up by the next run.
+--
+-- Runs without a transaction so the indexes build CONCURRENTLY. If a build
+-- fails, drop the INVALID index it leaves behind before re-running.
+
+-- ============================================
+-- PART 1: SWEEP INDEXES
+-- ============================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_assist_requests_active_created
+    ON assist_requests(created_at, id) WHERE status = 'active';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_assist_requests_unpaid_matched
+    ON assist_requests(matched_at, id) WHERE status IN ('matched', 'fee_pending');
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_assist_offers_pending_created
+    ON assist_offers(created_at, id) WHERE status = 'pending';
+
+-- Same predicate as idx_assist_requests_active_created, which also serves its queries
+DROP INDEX CONCURRENTLY IF EXISTS idx_assist_requests_active;
+
+-- ============================================
+-- PART 2: BATCH FUNCTIONS
+-- ============================================
+
+CREATE OR REPLACE FUNCTION expire_active_assist_requests_batch(
+    p_after_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL,
+    p_batch_size INTEGER DEFAULT 500
+)
+RETURNS TABLE(touched INTEGER, last_at TIMESTAMPTZ, last_id UUID) AS $$
+    WITH batch AS (
+        SELECT id
+        FROM assist_requests
+        WHERE status = 'active'
+        AND created_at < NOW() - INTERVAL '7 days'
+        AND (created_at, id) > (COALESCE(p_after_at, '-infinity'), COALESCE(p_after_id, '00000000-0000-0000-0000-000000000000'))
+        ORDER BY created_at, id
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    updated AS (
+        UPDATE assist_requests r
+        SET status = 'expired', updated_at = NOW()
+        FROM batch
+        WHERE r.id = batch.id
+        RETURNING r.created_at, r.id
+    )
+    SELECT
+        COUNT(*)::INTEGER,
+        (ARRAY_AGG(created_at ORDER BY created_at DESC, id DESC))[1],
+        (ARRAY_AGG(id ORDER BY created_at DESC, id DESC))[1]
+    FROM updated;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION expire_pending_assist_offers_batch(
+    p_after_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL,
+    p_batch_size INTEGER DEFAULT 500
+)
+RETURNS TABLE(touched INTEGER, last_at TIMESTAMPTZ, last_id UUID) AS $$
+    WITH batch AS (
+        SELECT id
+        FROM assist_offers
+        WHERE status = 'pending'
+        AND created_at < NOW() - INTERVAL '48 hours'
+        AND (created_at, id) > (COALESCE(p_after_at, '-infinity'), COALESCE(p_after_id, '00000000-0000-0000-0000-000000000000'))
+        ORDER BY created_at, id
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    updated AS (
+        UPDATE assist_offers o
+        SET status = 'expired', updated_at = NOW()
+        FROM batch
+        WHERE o.id = batch.id
+        RETURNING o.created_at, o.id
+    )
+    SELECT
+        COUNT(*)::INTEGER,
+        (ARRAY_AGG(created_at ORDER BY created_at DESC, id DESC))[1],
+        (ARRAY_AGG(id ORDER BY created_at DESC, id DESC))[1]
+    FROM updated;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+-- Mark as ghost if fee not paid within 72 hours of match
+CREATE OR REPLACE FUNCTION fail_unpaid_assist_matches_batch(
+    p_after_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL,
+    p_batch_size INTEGER DEFAULT 500
+)
+RETURNS TABLE(touched INTEGER, last_at TIMESTAMPTZ, last_id UUID) AS $$
+    WITH batch AS (
+        SELECT id
+        FROM assist_requests
+        WHERE status IN ('matched', 'fee_pending')
+        AND matched_at < NOW() - INTERVAL '72 hours'
+        AND (matched_at, id) > (COALESCE(p_after_at, '-infinity'), COALESCE(p_after_id, '00000000-0000-0000-0000-000000000000'))
+        ORDER BY matched_at, id
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    updated AS (
+        UPDATE assist_requests r
+        SET status = 'failed', updated_at = NOW()
+        FROM batch
+        WHERE r.id = batch.id
+        RETURNING r.matched_at, r.id
+    )
+    SELECT
+        COUNT(*)::INTEGER,
+        (ARRAY_AGG(matched_at ORDER BY matched_at DESC, id DESC))[1],
+        (ARRAY_AGG(id ORDER BY matched_at DESC, id DESC))[1]
+    FROM updated;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+-- ============================================
+-- PART 3: EXISTING ENTRY POINT
+-- ============================================
+
+-- Kept for pg_cron and other callers: the same sweeps, batch by batch. A
+-- function cannot commit, so everything is still one transaction here; prefer
+-- maintenance_jobs.py, which commits after each batch.
+CREATE OR REPLACE FUNCTION expire_old_assist_requests()
+RETURNS void AS $$
+DECLARE
+    after_at TIMESTAMPTZ;
+    after_id UUID;
+BEGIN
+    LOOP
+        SELECT last_at, last_id INTO after_at, after_id
+        FROM expire_active_assist_requests_batch(after_at, after_id);
+        EXIT WHEN after_id IS NULL;
+    END LOOP;
+
+    LOOP
+        SELECT last_at, last_id INTO after_at, after_id
+        FROM expire_pending_assist_offers_batch(after_at, after_id);
+        EXIT WHEN after_id IS NULL;
+    END LOOP;
+
+    LOOP
+        SELECT last_at, last_id INTO after_at, after_id
+        FROM fail_unpaid_assist_matches_batch(after_at, after_id);
+        EXIT WHEN after_id IS NULL;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
@@ -0,0 +1,136 @@
+-- Statement-Level Repayment Totals
+-- Created: 2026-10-18
+-- migrate:depends-on Billix/Features/TrustLadder/Migrations/assist_tables.sql
+--
+-- assist_repayment_total_trigger ran FOR EACH ROW: every repayment written
+-- re-summed all repayments of its request and updated the request, so an
+-- import of N repayments did N parent updates (and N row locks on the same
+-- request when one request has many repayments). The re-sum also used the
+-- writer's snapshot, so two concurrent repayments on one request could each
+-- overwrite the other's contribution.
+--
+-- The totals are now kept by statement-level triggers with transition tables.
+-- Each INSERT / UPDATE / DELETE statement on assist_repayments aggregates the
+-- rows it changed per request and runs a single UPDATE that applies the net
+-- change in verified amount to each affected request:
+--
+--   total_repaid = total_repaid + (verified amount added - verified amount removed)
+--
+-- Adding a delta is re-evaluated against the latest row version when a
+-- concurrent writer got there first, so no contribution is lost. The
+-- requests are locked in id order before the UPDATE, so two statements
+-- touching the same requests wait for each other instead of deadlocking.
+-- last_repayment_at is set as before: on INSERT and UPDATE, not on DELETE.
+
+-- Keep repayments from being written while the totals are resynced. Give up
+-- after 5 s rather than queue every repayment write behind a long transaction;
+-- migrate.py retries the migration.
+SET LOCAL lock_timeout = '5s';
+LOCK TABLE assist_repayments IN SHARE ROW EXCLUSIVE MODE;
+
+-- ============================================
+-- PART 1: RESYNC
+-- ============================================
+
+-- Deltas are only correct on top of correct totals; repayments deleted under
+-- the old trigger were never subtracted
+UPDATE assist_requests r
+SET total_repaid = s.total
+FROM (
+    SELECT x.id, COALESCE(SUM(p.amount) FILTER (WHERE p.verified), 0) AS total
+    FROM assist_requests x
+    LEFT JOIN assist_repayments p ON p.assist_request_id = x.id
+    GROUP BY x.id
+) s
+WHERE r.id = s.id AND r.total_repaid IS DISTINCT FROM s.total;
+
+-- ============================================
+-- PART 2: STATEMENT TRIGGERS
+-- ============================================
+
+CREATE OR REPLACE FUNCTION update_assist_repayment_totals()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Each branch only reads the transition tables its trigger declares.
+    -- NO KEY UPDATE is the lock the UPDATE takes; it does not conflict with
+    -- the KEY SHARE locks the repayments' foreign key checks hold.
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM assist_requests
+        WHERE id IN (SELECT assist_request_id FROM new_repayments)
+        ORDER BY id
+        FOR NO KEY UPDATE;
+
+        UPDATE assist_requests r
+        SET total_repaid = COALESCE(r.total_repaid, 0) + d.delta,
+            last_repayment_at = NOW()
+        FROM (
+            SELECT assist_request_id, COALESCE(SUM(amount) FILTER (WHERE verified), 0) AS delta
+            FROM new_repayments
+            GROUP BY assist_request_id
+        ) d
+        WHERE r.id = d.assist_request_id;
+
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM 1 FROM assist_requests
+        WHERE id IN (SELECT assist_request_id FROM new_repayments
+                     UNION
+                     SELECT assist_request_id FROM old_repayments)
+        ORDER BY id
+        FOR NO KEY UPDATE;
+
+        UPDATE assist_requests r
+        SET total_repaid = COALESCE(r.total_repaid, 0) + d.delta,
+            last_repayment_at = NOW()
+        FROM (
+            SELECT assist_request_id, COALESCE(SUM(amount) FILTER (WHERE verified), 0) AS delta
+            FROM (
+                SELECT assist_request_id, amount, verified FROM new_repayments
+                UNION ALL
+                SELECT assist_request_id, -amount, verified FROM old_repayments
+            ) changes
+            GROUP BY assist_request_id
+        ) d
+        WHERE r.id = d.assist_request_id;
+
+    ELSE
+        PERFORM 1 FROM assist_requests
+        WHERE id IN (SELECT assist_request_id FROM old_repayments WHERE verified)
+        ORDER BY id
+        FOR NO KEY UPDATE;
+
+        UPDATE assist_requests r
+        SET total_repaid = COALESCE(r.total_repaid, 0) - d.removed
+        FROM (
+            SELECT assist_request_id, SUM(amount) AS removed
+            FROM old_repayments
+            WHERE verified
+            GROUP BY assist_request_id
+        ) d
+        WHERE r.id = d.assist_request_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS assist_repayment_total_trigger ON assist_repayments;
+DROP FUNCTION IF EXISTS update_assist_repayment_total();
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS assist_repayment_totals_insert ON assist_repayments;
+CREATE TRIGGER assist_repayment_totals_insert
+    AFTER INSERT ON assist_repayments
+    REFERENCING NEW TABLE AS new_repayments
+    FOR EACH STATEMENT EXECUTE FUNCTION update_assist_repayment_totals();
+
+DROP TRIGGER IF EXISTS assist_repayment_totals_update ON assist_repayments;
+CREATE TRIGGER assist_repayment_totals_update
+    AFTER UPDATE ON assist_repayments
+    REFERENCING OLD TABLE AS old_repayments NEW TABLE AS new_repayments
+    FOR EACH STATEMENT EXECUTE FUNCTION update_assist_repayment_totals();
+
+DROP TRIGGER IF EXISTS assist_repayment_totals_delete ON assist_repayments;
+CREATE TRIGGER assist_repayment_totals_delete
+    AFTER DELETE ON assist_repayments
+    REFERENCING OLD TABLE AS old_repayments
+    FOR EACH STATEMENT EXECUTE FUNCTION update_assist_repayment_totals();
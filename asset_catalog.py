@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Helpers for walking Billix/Assets.xcassets and reading/writing Contents.json
+the way Xcode formats it.
+"""
+
+import json
+import os
+import tempfile
+
+DEFAULT_CATALOG = "Billix/Assets.xcassets"
+
+# Asset set folder extensions that live inside an .xcassets catalog
+ASSET_SET_EXTENSIONS = (".imageset", ".appiconset", ".colorset", ".dataset", ".symbolset")
+
+
+def iter_asset_sets(catalog=DEFAULT_CATALOG, extensions=ASSET_SET_EXTENSIONS):
+    """
+    Yield (name, set_path) for every asset set in the catalog, sorted by path
+
+    Args:
+        catalog: Path to the .xcassets folder
+        extensions: Asset set folder extensions to include
+    """
+    found = []
+    for root, dirs, _files in os.walk(catalog):
+        dirs.sort()
+        for d in list(dirs):
+            if d.endswith(extensions):
+                found.append((os.path.splitext(d)[0], os.path.join(root, d)))
+                # Asset sets never nest other sets
+                dirs.remove(d)
+    return iter(sorted(found, key=lambda item: item[1]))
+
+
+def iter_catalog_images(catalog=DEFAULT_CATALOG, extensions=(".png",)):
+    """Yield the path of every image file inside the catalog's asset sets"""
+    for _name, set_path in iter_asset_sets(catalog):
+        for filename in sorted(os.listdir(set_path)):
+            if filename.lower().endswith(extensions):
+                yield os.path.join(set_path, filename)
+
+
+def load_contents(set_path):
+    """Load an asset set's Contents.json (empty dict if missing)"""
+    path = os.path.join(set_path, "Contents.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def dump_contents(contents):
+    """Serialize Contents.json exactly like Xcode does (sorted keys, " : ")"""
+    return json.dumps(contents, indent=2, sort_keys=True, separators=(",", " : ")) + "\n"
+
+
+def write_contents(set_path, contents):
+    """Atomically replace an asset set's Contents.json"""
+    write_file_atomic(os.path.join(set_path, "Contents.json"), dump_contents(contents).encode("utf-8"))
+
+
+def write_file_atomic(path, data):
+    """Write bytes to path via a temp file in the same folder and os.replace"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        else:
+            # mkstemp creates 0600; give new files the usual umask-derived mode
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def format_bytes(size):
+    """Human readable byte count (e.g. 3.8 MB)"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            if unit == "B":
+                return f"{size} {unit}"
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
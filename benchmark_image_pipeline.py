@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Benchmark and golden-output regression suite for remove_white_background.
+
+Every processing mode is run over a fixed corpus of catalog images plus
+deterministic synthetic images up to 8192x8192. Each run happens in a fresh
+process so wall time and peak RSS are not polluted by earlier runs. The output
+is hashed over its decoded RGBA pixels (band by band, so hashing does not
+inflate memory) and compared against benchmarks/image_pipeline_golden.json.
+All modes must produce the same pixels for the same input, so the golden file
+is keyed by input only. Each entry also records the pixel hash of the input it
+was made from: the corpus files are live catalog images that
+generate_scale_variants.py or optimize_png_assets.py --lossy may rewrite, and
+a changed input is reported and skipped rather than counted as a regression
+(--update-golden re-records it).
+
+Usage:
+    python3 benchmark_image_pipeline.py                       # full run
+    python3 benchmark_image_pipeline.py --max-size 2048       # skip the big synthetics
+    python3 benchmark_image_pipeline.py --modes tiled --repeat 3
+    python3 benchmark_image_pipeline.py --update-golden       # accept current outputs
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import PIL
+from PIL import Image, ImageChops
+
+from png_utils import PNGBandReader, PNGError
+from remove_white_background import remove_white_background, remove_white_background_tiled
+
+GOLDEN_PATH = "benchmarks/image_pipeline_golden.json"
+DEFAULT_REPORT = "image_pipeline_report.json"
+SYNTHETIC_CACHE = os.path.join(tempfile.gettempdir(), "billix-image-bench")
+
+# Processing modes under test. New modes only need an entry here taking
+# (input_path, output_path, threshold).
+MODES = {
+    "threshold": remove_white_background,
+    "tiled": remove_white_background_tiled,
+}
+
+# Fixed corpus from the asset catalog: large RGB, large RGBA, mid and small RGBA
+CORPUS = [
+    "Billix/Assets.xcassets/LightBulbMoney.imageset/LightBulbMoney.png",
+    "Billix/Assets.xcassets/pig_loading.imageset/pig_loading.png",
+    "Billix/Assets.xcassets/billix_logo.imageset/billix_logo.png",
+    "Billix/Assets.xcassets/HoloPiggy.imageset/HoloPiggy.png",
+    "Billix/Assets.xcassets/VaultEmpty.imageset/VaultEmpty.png",
+]
+
+SYNTHETIC_SIZES = (1024, 2048, 4096, 8192)
+
+
+def synthetic_image(size):
+    """
+    Deterministic RGB test image: colored radial blobs on a white background,
+    so roughly half the pixels hit the white threshold
+    """
+    path = os.path.join(SYNTHETIC_CACHE, f"synthetic_{size}.png")
+    if os.path.exists(path):
+        return path
+    os.makedirs(SYNTHETIC_CACHE, exist_ok=True)
+
+    radial = Image.radial_gradient("L").resize((size, size), Image.Resampling.BILINEAR)
+    linear = Image.linear_gradient("L").resize((size, size), Image.Resampling.BILINEAR)
+    r = ImageChops.screen(radial, linear)
+    g = ImageChops.screen(radial, linear.transpose(Image.Transpose.ROTATE_90))
+    b = radial.point(lambda v: min(255, v * 2))
+    Image.merge("RGB", (r, g, b)).save(path, "PNG", compress_level=1)
+    return path
+
+
+def pixel_hash(path):
+    """sha256 of the decoded RGBA pixels (plus size), independent of PNG encoding"""
+    digest = hashlib.sha256()
+    try:
+        with PNGBandReader(path, band_height=128) as reader:
+            digest.update(f"{reader.width}x{reader.height}".encode())
+            for band in reader.iter_bands():
+                digest.update(band.convert("RGBA").tobytes())
+    except PNGError:
+        with Image.open(path) as img:
+            digest.update(f"{img.width}x{img.height}".encode())
+            digest.update(img.convert("RGBA").tobytes())
+    return digest.hexdigest()
+
+
+def _run_case(mode, input_path, output_path, threshold, queue):
+    """Child process body: run one mode once and report time and peak RSS"""
+    import contextlib
+    import io
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        if mode is not None:
+            MODES[mode](input_path, output_path, threshold)
+        elapsed = time.perf_counter() - start
+    queue.put((elapsed, peak_rss_kb()))
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process in KB
+
+    On Linux ru_maxrss survives exec, so a spawned child would report its
+    parent's peak; VmHWM belongs to the current address space only.
+    """
+    import resource
+
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def run_isolated(mode, input_path, output_path, threshold):
+    """Run a case in a fresh spawned process and return (seconds, peak_rss_mb)"""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(mode, input_path, output_path, threshold, queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f"{mode} failed on {input_path} (exit code {proc.exitcode})")
+    elapsed, peak_kb = queue.get()
+    return elapsed, peak_kb / 1024.0
+
+
+def load_golden(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark remove_white_background modes")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=sorted(MODES))
+    parser.add_argument("--max-size", type=int, default=max(SYNTHETIC_SIZES), help="Largest synthetic size")
+    parser.add_argument("--no-corpus", action="store_true", help="Only run synthetic images")
+    parser.add_argument("--threshold", type=int, default=240)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case (best time is kept)")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden hash file")
+    parser.add_argument("--update-golden", action="store_true", help="Record current outputs as golden")
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="JSON report path")
+    args = parser.parse_args()
+
+    inputs = []
+    if not args.no_corpus:
+        inputs.extend((os.path.basename(p), p) for p in CORPUS if os.path.exists(p))
+    for size in SYNTHETIC_SIZES:
+        if size <= args.max_size:
+            inputs.append((f"synthetic_{size}", synthetic_image(size)))
+
+    golden = load_golden(args.golden)
+    _, baseline_rss = run_isolated(None, "", "", args.threshold)
+    print(f"Interpreter baseline RSS: {baseline_rss:.1f} MB")
+
+    results = []
+    failures = 0
+    changed_inputs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, input_path in inputs:
+            with Image.open(input_path) as img:
+                width, height = img.size
+            input_hash = pixel_hash(input_path)
+            recorded = golden.get(name, {}).get("input")
+            if recorded is not None and recorded != input_hash:
+                changed_inputs.append(name)
+                if not args.update_golden:
+                    print(f"~ {name}: input pixels changed since the golden was recorded; skipped")
+                    continue
+                golden[name] = {}
+            for mode in args.modes:
+                output_path = os.path.join(tmp, f"{mode}-{name}.png")
+                runs = [run_isolated(mode, input_path, output_path, args.threshold) for _ in range(args.repeat)]
+                wall = min(r[0] for r in runs)
+                peak = max(r[1] for r in runs)
+                digest = pixel_hash(output_path)
+                os.remove(output_path)
+
+                expected = golden.get(name, {}).get(str(args.threshold))
+                if expected is None:
+                    status = "new"
+                elif expected == digest:
+                    status = "match"
+                else:
+                    status = "MISMATCH"
+                    failures += 1
+
+                results.append({
+                    "mode": mode,
+                    "input": name,
+                    "width": width,
+                    "height": height,
+                    "wall_seconds": round(wall, 4),
+                    "megapixels_per_second": round(width * height / 1e6 / wall, 3) if wall else None,
+                    "peak_rss_mb": round(peak, 1),
+                    "output_sha256": digest,
+                    "golden": status,
+                })
+                mark = "✓" if status == "match" else ("+" if status == "new" else "✗")
+                print(f"{mark} {mode:<10} {name:<28} {width}x{height:<6} "
+                      f"{wall:8.2f}s {peak:8.1f} MB  {status}")
+
+            # Every mode must agree on the same input
+            digests = {r["output_sha256"] for r in results if r["input"] == name}
+            if len(digests) > 1:
+                failures += 1
+                print(f"✗ modes disagree on {name}")
+            elif args.update_golden:
+                entry = golden.setdefault(name, {})
+                entry["input"] = input_hash
+                entry[str(args.threshold)] = digests.pop()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "threshold": args.threshold,
+            "baseline_rss_mb": round(baseline_rss, 1),
+        },
+        "results": results,
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"\n✓ Wrote {args.report}")
+
+    if args.update_golden:
+        os.makedirs(os.path.dirname(args.golden) or ".", exist_ok=True)
+        with open(args.golden, "w") as f:
+            json.dump(golden, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✓ Updated {args.golden}")
+
+    if changed_inputs and not args.update_golden:
+        print(f"~ {len(changed_inputs)} input(s) changed and were skipped: {', '.join(changed_inputs)}"
+              f" (re-record with --update-golden)")
+    if failures:
+        print(f"✗ {failures} golden mismatches")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Load test for poll vote counting: per-row counter trigger vs sharded counters.
+
+Builds two databases on a local Postgres (a temporary cluster by default):
+
+  trigger   the migrations without poll_vote_shards.sql, so every vote runs
+            UPDATE community_polls SET vote_count_x = vote_count_x + 1
+  sharded   all migrations, so votes go to the per-backend counter shards
+
+then fires --votes inserts into poll_responses for today's poll from
+--workers concurrent connections, one transaction per vote as PostgREST does.
+While the votes run, pg_stat_activity is sampled to count backends waiting on
+a lock. Afterwards the counts returned by get_todays_poll() are checked
+against the number of inserted responses.
+
+Usage:
+    python3 benchmark_poll_votes.py
+    python3 benchmark_poll_votes.py --workers 64 --votes 20000
+    python3 benchmark_poll_votes.py --as-user          # go through RLS and auth.uid() too
+    python3 benchmark_poll_votes.py --dsn "$BILLIX_TEST_DSN" --report poll_votes.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+
+import sql_migrations
+from migrate import apply_migration, ensure_ledger
+from pg_harness import grant_api_roles, import_psycopg2, install_stubs, open_database, set_request_user
+
+SHARDS_MIGRATION = "Billix/Features/Home/Migrations/poll_vote_shards.sql"
+VARIANTS = ("trigger", "sharded")
+
+
+def variant_migrations(variant):
+    """Migrations for a variant: the trigger baseline leaves out the shards file and anything built on it"""
+    migrations = sql_migrations.discover()
+    if variant == "sharded":
+        return sql_migrations.order(migrations)
+    return sql_migrations.without(migrations, {SHARDS_MIGRATION})
+
+
+def prepare_database(psycopg2, admin_dsn, variant, votes):
+    """
+    Create bench_<variant>, apply its migrations and create one auth user per vote
+
+    Returns:
+        (dsn, poll_id, user_ids)
+    """
+    name = f"bench_{variant}"
+    admin = psycopg2.connect(admin_dsn)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {name}")
+        cur.execute(f"CREATE DATABASE {name}")
+    admin.close()
+
+    dsn = psycopg2.extensions.make_dsn(admin_dsn, dbname=name)
+    conn = psycopg2.connect(dsn)
+    install_stubs(conn)
+    ensure_ledger(conn)
+    for migration in variant_migrations(variant):
+        apply_migration(conn, migration)
+    grant_api_roles(conn)
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM community_polls WHERE active_date = CURRENT_DATE")
+        poll_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO auth.users (id) SELECT gen_random_uuid() FROM generate_series(1, %s) RETURNING id",
+                    (votes,))
+        user_ids = [row[0] for row in cur.fetchall()]
+        cur.execute("INSERT INTO user_profiles (user_id) SELECT id FROM auth.users")
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    return dsn, poll_id, user_ids
+
+
+def vote_worker(psycopg2, dsn, poll_id, user_ids, as_user, barrier, latencies, errors):
+    conn = psycopg2.connect(dsn)
+    barrier.wait()
+    with conn.cursor() as cur:
+        for index, user_id in enumerate(user_ids):
+            option = "a" if index % 3 else "b"
+            started = time.perf_counter()
+            try:
+                if as_user:
+                    set_request_user(cur, user_id)
+                cur.execute("INSERT INTO poll_responses (poll_id, user_id, selected_option) VALUES (%s, %s, %s)",
+                            (str(poll_id), str(user_id), option))
+                conn.commit()
+            except psycopg2.Error as e:
+                conn.rollback()
+                errors.append(str(e).strip())
+                continue
+            latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def lock_monitor(psycopg2, dsn, stop, samples, interval=0.005):
+    """Sample how many backends of this database are waiting on a heavyweight lock"""
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        while not stop.is_set():
+            cur.execute("SELECT COUNT(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND wait_event_type = 'Lock'")
+            samples.append(cur.fetchone()[0])
+            time.sleep(interval)
+    conn.close()
+
+
+def run_variant(psycopg2, admin_dsn, variant, args):
+    dsn, poll_id, user_ids = prepare_database(psycopg2, admin_dsn, variant, args.votes)
+
+    latencies = []
+    errors = []
+    samples = []
+    barrier = threading.Barrier(args.workers + 1)
+    workers = [
+        threading.Thread(target=vote_worker, args=(psycopg2, dsn, poll_id, user_ids[i::args.workers], args.as_user,
+                                                   barrier, latencies, errors))
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    stop = threading.Event()
+    monitor = threading.Thread(target=lock_monitor, args=(psycopg2, dsn, stop, samples))
+    monitor.start()
+
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    monitor.join()
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM poll_responses WHERE poll_id = %s", (str(poll_id),))
+        inserted = cur.fetchone()[0]
+        cur.execute("SELECT vote_count_a + vote_count_b FROM get_todays_poll()")
+        counted = cur.fetchone()[0]
+        rolled_up = None
+        if variant == "sharded":
+            cur.execute("SELECT rollup_poll_votes()")
+            cur.execute("SELECT vote_count_a + vote_count_b FROM community_polls WHERE id = %s", (str(poll_id),))
+            rolled_up = cur.fetchone()[0]
+    conn.commit()
+    conn.close()
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else None
+
+    return {
+        "variant": variant,
+        "workers": args.workers,
+        "votes": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(elapsed, 3),
+        "votes_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(0.50), 2) if latencies else None,
+            "p95": round(percentile(0.95), 2) if latencies else None,
+            "p99": round(percentile(0.99), 2) if latencies else None,
+        },
+        "lock_waiters_mean": round(statistics.mean(samples), 2) if samples else 0.0,
+        "lock_waiters_max": max(samples) if samples else 0,
+        "lock_wait_share": round(statistics.mean(samples) / args.workers, 3) if samples else 0.0,
+        "inserted": inserted,
+        "counted": counted,
+        "rolled_up": rolled_up,
+        "counts_match": counted == inserted and rolled_up in (None, inserted),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare poll vote counting under concurrent inserts")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent connections")
+    parser.add_argument("--votes", type=int, default=5000, help="Total votes (one user each)")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--as-user", action="store_true", help="Insert as the authenticated role with RLS")
+    parser.add_argument("--dsn", help="Existing server to create the bench databases on")
+    parser.add_argument("--report", help="Write results as JSON")
+    args = parser.parse_args()
+
+    psycopg2 = import_psycopg2()
+    settings = {"max_connections": str(args.workers + 20), "shared_buffers": "128MB"}
+    results = []
+    with open_database(args.dsn, settings=settings) as database:
+        for variant in args.variants:
+            print(f"Running {variant}: {args.votes} votes from {args.workers} connections...")
+            result = run_variant(psycopg2, database.dsn, variant, args)
+            results.append(result)
+            mark = "✓" if result["counts_match"] and not result["errors"] else "✗"
+            print(f"{mark} {variant:<8} {result['votes_per_second']:>9} votes/s  "
+                  f"p50 {result['latency_ms']['p50']} ms  p99 {result['latency_ms']['p99']} ms  "
+                  f"lock waiters avg {result['lock_waiters_mean']} (max {result['lock_waiters_max']})")
+            if not result["counts_match"]:
+                rolled_up = "" if result["rolled_up"] is None else f", rolled up {result['rolled_up']}"
+                print(f"    counted {result['counted']} of {result['inserted']} votes{rolled_up}")
+            if result["errors"]:
+                print(f"    {result['errors']} failed inserts, first: {result['first_error']}")
+
+    by_variant = {r["variant"]: r for r in results}
+    if "trigger" in by_variant and "sharded" in by_variant:
+        speedup = by_variant["sharded"]["votes_per_second"] / by_variant["trigger"]["votes_per_second"]
+        print(f"\n✓ Sharded counters: {speedup:.2f}x throughput, lock waiters "
+              f"{by_variant['trigger']['lock_waiters_mean']} -> {by_variant['sharded']['lock_waiters_mean']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+            f.write("\n")
+        print(f"✓ Wrote {args.report}")
+    return 0 if all(r["counts_match"] and not r["errors"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
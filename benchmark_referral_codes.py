@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Load test for referral code generation at signup: random + probe vs sequence permutation.
+
+Builds two databases on a local Postgres (a temporary cluster by default):
+
+  random    the migrations without referral_code_sequence.sql, so every new
+            user_profiles row draws random codes and probes for collisions
+  feistel   the same, then referral_code_sequence.sql applied on top, so codes
+            come from nextval() through a keyed permutation
+
+Both first get --existing users whose codes come from the old random
+generator, the way a production database would look when the migration runs
+(its legacy-code backfill is timed). Then --signups new profiles are inserted
+from --workers concurrent connections, one transaction per signup as
+PostgREST does, and the insert latency percentiles are compared. Afterwards
+every new profile must have a code, and in the feistel database every new
+code must map back to an issued sequence number.
+
+Usage:
+    python3 benchmark_referral_codes.py                       # 1M existing users
+    python3 benchmark_referral_codes.py --existing 5000000 --signups 50000 --workers 32
+    python3 benchmark_referral_codes.py --dsn "$BILLIX_TEST_DSN" --report referral_codes.json
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+import sql_migrations
+from migrate import apply_migration, ensure_ledger
+from pg_harness import grant_api_roles, import_psycopg2, install_stubs, open_database
+
+CODES_MIGRATION = "Billix/Features/Home/Migrations/referral_code_sequence.sql"
+VARIANTS = ("random", "feistel")
+CODE_SPACE = 32 ** 8
+
+LEGACY_USERS_SQL = """
+INSERT INTO auth.users (id) SELECT gen_random_uuid() FROM generate_series(1, %(existing)s);
+INSERT INTO user_profiles (user_id, referral_code)
+SELECT id, generate_referral_code() FROM auth.users
+ON CONFLICT (referral_code) DO NOTHING;
+"""
+
+
+def prepare_database(psycopg2, admin_dsn, variant, existing, signups):
+    """
+    Create bench_<variant> with --existing legacy users and the auth rows for the signups
+
+    Returns:
+        (dsn, signup user ids, migration ms or None, legacy skips or None)
+    """
+    name = f"bench_{variant}"
+    admin = psycopg2.connect(admin_dsn)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {name}")
+        cur.execute(f"CREATE DATABASE {name}")
+    admin.close()
+
+    dsn = psycopg2.extensions.make_dsn(admin_dsn, dbname=name)
+    conn = psycopg2.connect(dsn)
+    install_stubs(conn)
+    ensure_ledger(conn)
+    migrations = sql_migrations.discover()
+    for migration in sql_migrations.without(migrations, {CODES_MIGRATION}):
+        apply_migration(conn, migration)
+    with conn.cursor() as cur:
+        cur.execute(LEGACY_USERS_SQL, {"existing": existing})
+    conn.commit()
+
+    migration_ms = skips = None
+    if variant == "feistel":
+        codes = next(m for m in migrations if m.name == CODES_MIGRATION)
+        migration_ms = apply_migration(conn, codes)
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM referral_code_skips")
+            skips = cur.fetchone()[0]
+        conn.commit()
+    grant_api_roles(conn)
+
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO auth.users (id) SELECT gen_random_uuid() FROM generate_series(1, %s) RETURNING id",
+                    (signups,))
+        user_ids = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("VACUUM ANALYZE")
+    conn.close()
+    return dsn, user_ids, migration_ms, skips
+
+
+def signup_worker(psycopg2, dsn, user_ids, barrier, latencies, errors):
+    conn = psycopg2.connect(dsn)
+    barrier.wait()
+    with conn.cursor() as cur:
+        for user_id in user_ids:
+            started = time.perf_counter()
+            try:
+                cur.execute("INSERT INTO user_profiles (user_id) VALUES (%s)", (str(user_id),))
+                conn.commit()
+            except psycopg2.Error as e:
+                conn.rollback()
+                errors.append(str(e).strip())
+                continue
+            latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def verify(psycopg2, dsn, variant, user_ids):
+    """(new profiles, new profiles without a code, feistel codes that do not invert to an issued number)"""
+    conn = psycopg2.connect(dsn)
+    ids = [str(user_id) for user_id in user_ids]
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*), COUNT(*) FILTER (WHERE referral_code IS NULL) FROM user_profiles "
+                    "WHERE user_id = ANY(%s::UUID[])", (ids,))
+        created, missing = cur.fetchone()
+        stray = None
+        if variant == "feistel":
+            cur.execute("""
+                SELECT COUNT(*) FROM user_profiles
+                WHERE user_id = ANY(%s::UUID[])
+                AND referral_code_permute(referral_code_decode(referral_code), true)
+                    NOT BETWEEN 1 AND (SELECT last_value FROM referral_code_seq)
+            """, (ids,))
+            stray = cur.fetchone()[0]
+    conn.rollback()
+    conn.close()
+    return created, missing, stray
+
+
+def run_variant(psycopg2, admin_dsn, variant, args):
+    dsn, user_ids, migration_ms, skips = prepare_database(psycopg2, admin_dsn, variant, args.existing, args.signups)
+
+    latencies = []
+    errors = []
+    barrier = threading.Barrier(args.workers + 1)
+    workers = [
+        threading.Thread(target=signup_worker,
+                         args=(psycopg2, dsn, user_ids[i::args.workers], barrier, latencies, errors))
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    created, missing, stray = verify(psycopg2, dsn, variant, user_ids)
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    return {
+        "variant": variant,
+        "existing": args.existing,
+        "workers": args.workers,
+        "signups": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(elapsed, 3),
+        "signups_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+        "migration_ms": round(migration_ms, 1) if migration_ms is not None else None,
+        "legacy_skips": skips,
+        "created": created,
+        "missing_codes": missing,
+        "stray_codes": stray,
+        "ok": not errors and created == len(user_ids) and not missing and not stray,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare referral code generation under concurrent signups")
+    parser.add_argument("--existing", type=int, default=1_000_000, help="Users that already have a code")
+    parser.add_argument("--signups", type=int, default=20_000, help="New profiles to insert")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent connections")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--dsn", help="Existing server to create the bench databases on")
+    parser.add_argument("--report", help="Write results as JSON")
+    args = parser.parse_args()
+
+    psycopg2 = import_psycopg2()
+    settings = {"max_connections": str(args.workers + 20), "shared_buffers": "256MB"}
+    results = []
+    with open_database(args.dsn, settings=settings) as database:
+        for variant in args.variants:
+            print(f"Running {variant}: {args.existing:,} existing users, {args.signups:,} signups "
+                  f"from {args.workers} connections...")
+            result = run_variant(psycopg2, database.dsn, variant, args)
+            results.append(result)
+            mark = "✓" if result["ok"] else "✗"
+            print(f"{mark} {variant:<8} {result['signups_per_second']:>9} signups/s  "
+                  f"p50 {result['latency_ms']['p50']} ms  p95 {result['latency_ms']['p95']} ms  "
+                  f"p99 {result['latency_ms']['p99']} ms")
+            if result["migration_ms"] is not None:
+                print(f"    migration {result['migration_ms'] / 1000:.1f}s, "
+                      f"{result['legacy_skips']:,} legacy codes land on reachable sequence numbers")
+            if result["errors"]:
+                print(f"    {result['errors']} failed signups, first: {result['first_error']}")
+            if result["missing_codes"] or result["stray_codes"]:
+                print(f"    {result['missing_codes']} profiles without a code, "
+                      f"{result['stray_codes']} codes outside the issued sequence")
+
+    used = args.existing / CODE_SPACE
+    print(f"\n  code space used: {used:.6%}; a random draw collides with probability {used:.2e}")
+    by_variant = {r["variant"]: r for r in results}
+    if "random" in by_variant and "feistel" in by_variant:
+        before, after = by_variant["random"]["latency_ms"], by_variant["feistel"]["latency_ms"]
+        print(f"✓ Signup latency p50 {before['p50']} -> {after['p50']} ms, p99 {before['p99']} -> {after['p99']} ms")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+            f.write("\n")
+        print(f"✓ Wrote {args.report}")
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
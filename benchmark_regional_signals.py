@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark refresh_regional_signals(): full GROUP BY vs incremental month buckets.
+
+On a local Postgres (a temporary cluster by default) this
+  1. applies the migrations without regional_signal_buckets.sql,
+  2. generates --deals synthetic marketplace_deals over the last year,
+  3. times the original refresh (a GROUP BY over every deal),
+  4. applies regional_signal_buckets.sql, runs the batched backfill job and
+     the first full refresh,
+  5. inserts --changes new deals, updates and deletes a few, and times the
+     incremental refresh that only recomputes the groups they touched,
+  6. checks every signal against a direct recomputation from marketplace_deals.
+
+Insert timings before and after show what the statement-level triggers cost.
+
+Usage:
+    python3 benchmark_regional_signals.py                     # 1M deals
+    python3 benchmark_regional_signals.py --deals 5000000 --changes 10000
+    python3 benchmark_regional_signals.py --dsn "$BILLIX_TEST_DSN" --report regional_signals.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import sql_migrations
+from maintenance_jobs import run_job
+from migrate import apply_migration, ensure_ledger
+from pg_harness import import_psycopg2, install_stubs, open_database
+
+BUCKETS_MIGRATION = "Billix/Features/Home/Migrations/regional_signal_buckets.sql"
+
+# Prices drift by zip prefix so trends go up in some regions and down in others
+GENERATE_DEALS_SQL = """
+INSERT INTO marketplace_deals (zip_prefix, category, monthly_amount, created_at)
+SELECT
+    lpad(zip::TEXT, 3, '0'),
+    (ARRAY['energy', 'gas', 'water', 'internet', 'mobile'])[1 + (random() * 4)::INTEGER],
+    round(((40 + random() * 160) * (1 + ((zip %% 11) - 5) * 0.004 * (12 - age_days / 30.0)))::NUMERIC, 2),
+    NOW() - age_days * INTERVAL '1 day'
+FROM (
+    SELECT 100 + (random() * 899)::INTEGER AS zip, random() * %(days)s AS age_days
+    FROM generate_series(1, %(count)s)
+) g
+"""
+
+VERIFY_SQL = """
+WITH bounds AS (
+    SELECT date_trunc('month', NOW() AT TIME ZONE 'UTC') AS start
+),
+deals AS (
+    SELECT d.zip_prefix, d.category, d.monthly_amount,
+           d.created_at AT TIME ZONE 'UTC' >= b.start - INTERVAL '2 months' AS recent,
+           d.created_at AT TIME ZONE 'UTC' >= b.start - INTERVAL '5 months'
+             AND d.created_at AT TIME ZONE 'UTC' < b.start - INTERVAL '2 months' AS prior
+    FROM marketplace_deals d, bounds b
+    WHERE d.created_at IS NOT NULL
+),
+expected AS (
+    SELECT zip_prefix, category, COUNT(*)::INTEGER AS sample_size,
+           ROUND(LEAST(GREATEST(
+               (AVG(monthly_amount) FILTER (WHERE recent) - AVG(monthly_amount) FILTER (WHERE prior))
+               / NULLIF(AVG(monthly_amount) FILTER (WHERE prior), 0) * 100, -999.99), 999.99), 2) AS change
+    FROM deals
+    GROUP BY zip_prefix, category
+)
+SELECT COUNT(*),
+       COUNT(*) FILTER (WHERE s.zip_prefix IS NULL
+                        OR s.sample_size <> e.sample_size
+                        OR (s.avg_change_percent IS NULL) <> (e.change IS NULL)
+                        OR ABS(s.avg_change_percent - e.change) > 0.01)
+FROM expected e
+LEFT JOIN regional_utility_signals s ON s.zip_prefix = e.zip_prefix AND s.category = e.category
+"""
+
+
+def timed(conn, sql, params=None):
+    """Run one statement in its own transaction, returning milliseconds"""
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+    conn.commit()
+    return (time.perf_counter() - started) * 1000
+
+
+def time_refresh(conn, repeat):
+    return statistics.median(timed(conn, "SELECT refresh_regional_signals()") for _ in range(repeat))
+
+
+def time_inserts(conn, changes, single):
+    """Insert a batch of deals in one statement, then some one row at a time"""
+    batch_ms = timed(conn, GENERATE_DEALS_SQL, {"count": changes, "days": 30})
+    single_ms = [timed(conn, GENERATE_DEALS_SQL, {"count": 1, "days": 30}) for _ in range(single)]
+    return batch_ms, statistics.median(single_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full vs incremental regional signal refresh")
+    parser.add_argument("--deals", type=int, default=1_000_000, help="Synthetic deals to generate")
+    parser.add_argument("--changes", type=int, default=1000, help="Deals inserted between refreshes")
+    parser.add_argument("--single", type=int, default=200, help="Single-row inserts to time")
+    parser.add_argument("--backfill-batch", type=int, default=5000, help="Deals per backfill batch")
+    parser.add_argument("--repeat", type=int, default=3, help="Refresh runs per measurement (median)")
+    parser.add_argument("--seed", type=float, default=0.34, help="setseed() value for the generator")
+    parser.add_argument("--dsn", help="Existing database (default: $BILLIX_TEST_DSN or a temporary cluster)")
+    parser.add_argument("--report", help="Write results as JSON")
+    args = parser.parse_args()
+
+    import_psycopg2()
+    migrations = sql_migrations.discover()
+    baseline = sql_migrations.without(migrations, {BUCKETS_MIGRATION})
+    buckets = next(m for m in migrations if m.name == BUCKETS_MIGRATION)
+    results = {"deals": args.deals, "changes": args.changes}
+
+    with open_database(args.dsn, settings={"shared_buffers": "256MB", "work_mem": "64MB"}) as database:
+        conn = database.connect()
+        install_stubs(conn)
+        ensure_ledger(conn)
+        for migration in baseline:
+            apply_migration(conn, migration)
+
+        print(f"Generating {args.deals:,} deals...")
+        conn.cursor().execute("SELECT setseed(%s)", (args.seed,))
+        generate_ms = timed(conn, GENERATE_DEALS_SQL, {"count": args.deals, "days": 365})
+        conn.autocommit = True
+        conn.cursor().execute("VACUUM ANALYZE marketplace_deals")
+        conn.autocommit = False
+        print(f"✓ Generated in {generate_ms / 1000:.1f}s")
+
+        results["full_refresh_ms"] = time_refresh(conn, args.repeat)
+        print(f"  full refresh (GROUP BY every deal):     {results['full_refresh_ms']:>9.1f} ms")
+        batch_ms, single_ms = time_inserts(conn, args.changes, args.single)
+        results["insert_before"] = {"batch_ms": batch_ms, "single_median_ms": single_ms}
+
+        results["migration_ms"] = apply_migration(conn, buckets)
+        print(f"  migration:                              {results['migration_ms']:>9.1f} ms")
+        backfill = run_job(conn, "backfill_regional_deal_months", args.backfill_batch)
+        results["backfill_ms"] = backfill["ms"]
+        results["backfill_max_batch_ms"] = backfill["max_batch_ms"]
+        print(f"  backfill ({backfill['batches']} batches, slowest {backfill['max_batch_ms']:.1f} ms):"
+              f" {results['backfill_ms']:>9.1f} ms")
+        results["first_refresh_ms"] = timed(conn, "SELECT refresh_regional_signals()")
+        print(f"  first full refresh:                     {results['first_refresh_ms']:>9.1f} ms")
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*), COUNT(DISTINCT (zip_prefix, category)) FROM regional_deal_months")
+            month_rows, groups = cur.fetchone()
+        conn.commit()
+        print(f"  {month_rows:,} month rows for {groups:,} groups")
+
+        results["idle_refresh_ms"] = time_refresh(conn, args.repeat)
+        print(f"  refresh with nothing changed:           {results['idle_refresh_ms']:>9.1f} ms")
+
+        batch_ms, single_ms = time_inserts(conn, args.changes, args.single)
+        results["insert_after"] = {"batch_ms": batch_ms, "single_median_ms": single_ms}
+        timed(conn, "UPDATE marketplace_deals SET monthly_amount = monthly_amount * 1.1 "
+                    "WHERE id IN (SELECT id FROM marketplace_deals LIMIT 100)")
+        timed(conn, "DELETE FROM marketplace_deals WHERE id IN (SELECT id FROM marketplace_deals LIMIT 100)")
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM regional_signal_changes")
+            changed_groups = cur.fetchone()[0]
+        conn.commit()
+        results["changed_groups"] = changed_groups
+        results["incremental_refresh_ms"] = timed(conn, "SELECT refresh_regional_signals()")
+        print(f"  incremental refresh:                    {results['incremental_refresh_ms']:>9.1f} ms "
+              f"({changed_groups:,} changed groups)")
+
+        with conn.cursor() as cur:
+            cur.execute(VERIFY_SQL)
+            checked, mismatched = cur.fetchone()
+        conn.commit()
+        conn.close()
+        results["verified_groups"] = checked
+        results["mismatched_groups"] = mismatched
+
+    before = results["insert_before"]
+    after = results["insert_after"]
+    print(f"\n  insert {args.changes:,} deals in one statement: {before['batch_ms']:.1f} ms -> {after['batch_ms']:.1f} ms")
+    print(f"  insert one deal (median):              {before['single_median_ms']:.2f} ms -> "
+          f"{after['single_median_ms']:.2f} ms")
+    speedup = results["full_refresh_ms"] / results["incremental_refresh_ms"]
+    print(f"✓ Incremental refresh {speedup:.0f}x faster than the full GROUP BY at {args.deals:,} deals")
+    if mismatched:
+        print(f"✗ {mismatched} of {checked} groups differ from a direct recomputation")
+    else:
+        print(f"✓ All {checked:,} groups match a direct recomputation")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"✓ Wrote {args.report}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
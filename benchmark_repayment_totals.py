@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Import benchmark and correctness check for assist repayment totals.
+
+Builds two databases on a local Postgres (a temporary cluster by default):
+
+  row        the migrations without assist_repayment_totals.sql, so every
+             repayment row re-sums its request and updates it
+  statement  all migrations, so each statement applies one aggregated UPDATE
+             per affected request (transition tables)
+
+Both get --requests assist requests, then --repayments repayments are
+COPYed in --batch row batches from --workers concurrent connections, with
+--hot-share of the rows going to 1% of the requests. Batch latency, deadlock
+retries and the number of assist_requests row updates are compared, and
+afterwards every total_repaid is checked against a fresh SUM of its verified
+repayments.
+
+Then a fixed sequence of multi-row statements (inserts, verifying, amount
+changes, moving repayments between requests, deletes, a cascading request
+delete, a rolled-back insert) runs against each database. The totals are
+resynced before each step and checked after it. The statement triggers must
+keep every total exact; the row trigger's known gaps (deletes, moved
+repayments) are shown with ~.
+
+Usage:
+    python3 benchmark_repayment_totals.py
+    python3 benchmark_repayment_totals.py --repayments 200000 --batch 10000 --workers 8
+    python3 benchmark_repayment_totals.py --check-only
+    python3 benchmark_repayment_totals.py --dsn "$BILLIX_TEST_DSN" --report repayment_totals.json
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import threading
+import time
+
+import sql_migrations
+from migrate import apply_migration, ensure_ledger
+from pg_harness import install_stubs, import_psycopg2, open_database
+
+TOTALS_MIGRATION = "Billix/Features/TrustLadder/Migrations/assist_repayment_totals.sql"
+VARIANTS = ("row", "statement")
+
+SETUP_SQL = """
+INSERT INTO auth.users (id) SELECT gen_random_uuid() FROM generate_series(1, %(requests)s);
+INSERT INTO assist_requests (requester_id, status, bill_category, bill_provider, bill_amount,
+                             bill_due_date, amount_requested)
+SELECT id, 'repaying', 'electric', 'Bench Power', 500, CURRENT_DATE + 30, 250
+FROM auth.users;
+"""
+
+# Requests whose total_repaid differs from the verified repayments
+DRIFT_SQL = """
+SELECT COUNT(*)
+FROM assist_requests r
+LEFT JOIN (
+    SELECT assist_request_id, SUM(amount) FILTER (WHERE verified) AS total
+    FROM assist_repayments
+    GROUP BY assist_request_id
+) p ON p.assist_request_id = r.id
+WHERE r.total_repaid IS DISTINCT FROM COALESCE(p.total, 0)
+"""
+
+# Puts every total back to its true value, so each check step only shows its own drift
+RESYNC_SQL = """
+UPDATE assist_requests r
+SET total_repaid = s.total
+FROM (
+    SELECT x.id, COALESCE(SUM(p.amount) FILTER (WHERE p.verified), 0) AS total
+    FROM assist_requests x
+    LEFT JOIN assist_repayments p ON p.assist_request_id = x.id
+    GROUP BY x.id
+) s
+WHERE r.id = s.id AND r.total_repaid IS DISTINCT FROM s.total
+"""
+
+# (name, statements) run in order, each step in its own transaction; "ROLLBACK" ends it without committing.
+# Requests are picked by position in id order so both databases see the same shape of change.
+NTH_REQUESTS = "SELECT id FROM assist_requests ORDER BY id OFFSET {offset} LIMIT {limit}"
+CHECK_STEPS = [
+    ("insert across requests", [f"""
+        INSERT INTO assist_repayments (assist_request_id, payer_id, amount, verified)
+        SELECT r.id, r.requester_id, 10 + n, n % 2 = 0
+        FROM assist_requests r, generate_series(1, 3) n
+        WHERE r.id IN ({NTH_REQUESTS.format(offset=0, limit=50)})
+    """]),
+    ("insert with NULL verified", [f"""
+        INSERT INTO assist_repayments (assist_request_id, payer_id, amount, verified)
+        SELECT id, requester_id, 7.25, NULL FROM assist_requests
+        WHERE id IN ({NTH_REQUESTS.format(offset=40, limit=20)})
+    """]),
+    ("verify pending", [f"""
+        UPDATE assist_repayments SET verified = true, verified_at = NOW()
+        WHERE verified IS NOT TRUE AND assist_request_id IN ({NTH_REQUESTS.format(offset=0, limit=55)})
+    """]),
+    ("change amounts", [f"""
+        UPDATE assist_repayments SET amount = amount + 0.5
+        WHERE assist_request_id IN ({NTH_REQUESTS.format(offset=10, limit=30)})
+    """]),
+    ("move to other requests", [f"""
+        UPDATE assist_repayments p SET assist_request_id = t.id
+        FROM ({NTH_REQUESTS.format(offset=100, limit=1)}) t
+        WHERE p.assist_request_id IN ({NTH_REQUESTS.format(offset=20, limit=10)})
+    """]),
+    ("unverify", [f"""
+        UPDATE assist_repayments SET verified = false, verified_at = NULL
+        WHERE amount > 11 AND assist_request_id IN ({NTH_REQUESTS.format(offset=30, limit=20)})
+    """]),
+    ("touch notes only", [f"""
+        UPDATE assist_repayments SET notes = 'checked'
+        WHERE assist_request_id IN ({NTH_REQUESTS.format(offset=0, limit=100)})
+    """]),
+    ("delete repayments", [f"""
+        DELETE FROM assist_repayments
+        WHERE amount < 12 AND assist_request_id IN ({NTH_REQUESTS.format(offset=0, limit=45)})
+    """]),
+    ("cascade from deleted request", [f"""
+        DELETE FROM assist_requests WHERE id IN ({NTH_REQUESTS.format(offset=45, limit=3)})
+    """]),
+    ("rolled back insert", [f"""
+        INSERT INTO assist_repayments (assist_request_id, payer_id, amount, verified)
+        SELECT id, requester_id, 99, true FROM assist_requests
+        WHERE id IN ({NTH_REQUESTS.format(offset=0, limit=10)})
+    """, "ROLLBACK"]),
+]
+
+
+def variant_migrations(variant):
+    """Migrations for a variant: the row baseline leaves out the statement trigger file"""
+    migrations = sql_migrations.discover()
+    if variant == "statement":
+        return sql_migrations.order(migrations)
+    return sql_migrations.without(migrations, {TOTALS_MIGRATION})
+
+
+def prepare_database(psycopg2, admin_dsn, variant, requests):
+    """
+    Create bench_<variant>, apply its migrations and create the requests
+
+    Returns:
+        (dsn, request ids, requester ids) in matching order
+    """
+    name = f"bench_{variant}"
+    admin = psycopg2.connect(admin_dsn)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {name}")
+        cur.execute(f"CREATE DATABASE {name}")
+    admin.close()
+
+    dsn = psycopg2.extensions.make_dsn(admin_dsn, dbname=name)
+    conn = psycopg2.connect(dsn)
+    install_stubs(conn)
+    ensure_ledger(conn)
+    for migration in variant_migrations(variant):
+        apply_migration(conn, migration)
+    with conn.cursor() as cur:
+        cur.execute(SETUP_SQL, {"requests": requests})
+        cur.execute("SELECT id, requester_id FROM assist_requests ORDER BY id")
+        rows = cur.fetchall()
+    conn.commit()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("VACUUM ANALYZE")
+    conn.close()
+    return dsn, [row[0] for row in rows], [row[1] for row in rows]
+
+
+def repayment_batches(seed, rows, batch, request_ids, payer_ids, hot_share):
+    """Yield COPY payloads of repayments; hot_share of them go to the first 1% of the requests"""
+    rng = random.Random(seed)
+    hot = max(1, len(request_ids) // 100)
+    for start in range(0, rows, batch):
+        lines = []
+        for _ in range(min(batch, rows - start)):
+            index = rng.randrange(hot) if rng.random() < hot_share else rng.randrange(len(request_ids))
+            verified = "t" if rng.random() < 0.7 else "f"
+            lines.append(f"{request_ids[index]}\t{payer_ids[index]}\t{rng.randint(100, 5000) / 100:.2f}\t{verified}\n")
+        yield "".join(lines)
+
+
+def import_worker(psycopg2, dsn, batches, barrier, latencies, retries, errors):
+    conn = psycopg2.connect(dsn)
+    barrier.wait()
+    with conn.cursor() as cur:
+        for payload in batches:
+            while True:
+                started = time.perf_counter()
+                try:
+                    cur.copy_expert("COPY assist_repayments (assist_request_id, payer_id, amount, verified) FROM STDIN",
+                                    io.StringIO(payload))
+                    conn.commit()
+                except psycopg2.errors.DeadlockDetected:
+                    conn.rollback()
+                    retries.append(1)
+                    continue
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    errors.append(str(e).strip())
+                    break
+                latencies.append(time.perf_counter() - started)
+                break
+    conn.close()
+
+
+def request_updates(psycopg2, dsn):
+    """Rows updated in assist_requests so far, from the cumulative statistics"""
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_stat_clear_snapshot()")
+        cur.execute("SELECT n_tup_upd FROM pg_stat_user_tables WHERE relid = 'assist_requests'::regclass")
+        updates = cur.fetchone()[0]
+    conn.close()
+    return updates
+
+
+def run_import(psycopg2, dsn, request_ids, payer_ids, args):
+    updates_before = request_updates(psycopg2, dsn)
+    latencies = []
+    retries = []
+    errors = []
+    barrier = threading.Barrier(args.workers + 1)
+    share = -(-args.repayments // args.workers)
+    workers = [
+        threading.Thread(target=import_worker, args=(
+            psycopg2, dsn,
+            list(repayment_batches(args.seed + i, max(0, min(share, args.repayments - i * share)), args.batch,
+                                   request_ids, payer_ids, args.hot_share)),
+            barrier, latencies, retries, errors))
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    # Backends flush their statistics when they exit; give the last ones a moment
+    time.sleep(1.5)
+    updates = request_updates(psycopg2, dsn) - updates_before
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM assist_repayments")
+        imported = cur.fetchone()[0]
+        cur.execute(DRIFT_SQL)
+        drift = cur.fetchone()[0]
+    conn.rollback()
+    conn.close()
+
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+
+    return {
+        "imported": imported,
+        "batches": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "deadlock_retries": len(retries),
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(imported / elapsed, 1) if elapsed else None,
+        "batch_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+        "request_updates": updates,
+        "drifted_requests": drift,
+    }
+
+
+def run_checks(psycopg2, dsn):
+    """Run CHECK_STEPS in order; returns [(step name, drifted requests after it)]"""
+    conn = psycopg2.connect(dsn)
+    results = []
+    with conn.cursor() as cur:
+        for name, statements in CHECK_STEPS:
+            cur.execute(RESYNC_SQL)
+            conn.commit()
+            for statement in statements:
+                if statement == "ROLLBACK":
+                    conn.rollback()
+                else:
+                    cur.execute(statement)
+            conn.commit()
+            cur.execute(DRIFT_SQL)
+            results.append((name, cur.fetchone()[0]))
+            conn.rollback()
+    conn.close()
+    return results
+
+
+def run_variant(psycopg2, admin_dsn, variant, args):
+    dsn, request_ids, payer_ids = prepare_database(psycopg2, admin_dsn, variant, args.requests)
+    result = {"variant": variant, "requests": args.requests, "workers": args.workers, "batch": args.batch}
+    if not args.check_only:
+        result["import"] = run_import(psycopg2, dsn, request_ids, payer_ids, args)
+    result["checks"] = [{"step": name, "drifted_requests": drift} for name, drift in run_checks(psycopg2, dsn)]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and statement-level repayment total triggers")
+    parser.add_argument("--requests", type=int, default=2000, help="Assist requests to spread repayments over")
+    parser.add_argument("--repayments", type=int, default=50_000, help="Repayments to import")
+    parser.add_argument("--batch", type=int, default=5000, help="Rows per COPY batch (one transaction each)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent import connections")
+    parser.add_argument("--hot-share", type=float, default=0.5, help="Share of repayments on the hottest 1%% of requests")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--check-only", action="store_true", help="Skip the import, only run the correctness steps")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--dsn", help="Existing server to create the bench databases on")
+    parser.add_argument("--report", help="Write results as JSON")
+    args = parser.parse_args()
+
+    psycopg2 = import_psycopg2()
+    settings = {"max_connections": str(args.workers + 20), "shared_buffers": "256MB"}
+    results = []
+    failed = False
+    with open_database(args.dsn, settings=settings) as database:
+        for variant in args.variants:
+            if args.check_only:
+                print(f"Checking {variant}...")
+            else:
+                print(f"Running {variant}: {args.repayments:,} repayments over {args.requests:,} requests, "
+                      f"{args.batch:,}-row batches from {args.workers} connections...")
+            result = run_variant(psycopg2, database.dsn, variant, args)
+            results.append(result)
+            # The statement triggers must be exact; the row trigger is shown for comparison
+            miss = "✗" if variant == "statement" else "~"
+
+            imported = result.get("import")
+            if imported:
+                exact = not imported["drifted_requests"] and not imported["errors"]
+                failed |= variant == "statement" and not exact
+                print(f"{'✓' if exact else miss} {variant:<9} {imported['rows_per_second']:>10} rows/s  "
+                      f"batch p50 {imported['batch_ms']['p50']} ms  p99 {imported['batch_ms']['p99']} ms  "
+                      f"{imported['request_updates']:,} request updates  "
+                      f"{imported['deadlock_retries']} deadlock retries")
+                if imported["drifted_requests"]:
+                    print(f"    {imported['drifted_requests']} requests with a wrong total_repaid after the import")
+                if imported["errors"]:
+                    print(f"    {imported['errors']} failed batches, first: {imported['first_error']}")
+
+            for check in result["checks"]:
+                exact = not check["drifted_requests"]
+                failed |= variant == "statement" and not exact
+                detail = "" if exact else f": {check['drifted_requests']} requests with a wrong total"
+                print(f"  {'✓' if exact else miss} {check['step']}{detail}")
+
+    by_variant = {r["variant"]: r for r in results}
+    if not args.check_only and "row" in by_variant and "statement" in by_variant:
+        before, after = by_variant["row"]["import"], by_variant["statement"]["import"]
+        print(f"\n✓ Statement triggers: {after['rows_per_second'] / before['rows_per_second']:.2f}x import throughput, "
+              f"request updates {before['request_updates']:,} -> {after['request_updates']:,}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+            f.write("\n")
+        print(f"✓ Wrote {args.report}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
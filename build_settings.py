@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Hoist build settings out of project.pbxproj into .xcconfig files, and answer
+"what is SETTING for target X in configuration Y" from a cached index.
+
+Every target and the project itself carry one buildSettings dictionary per
+configuration, and Debug and Release mostly repeat each other: the Billix
+target's two dictionaries are identical. hoist moves, per target (and for the
+project), the settings whose value is the same in every configuration into
+Configurations/<Target>.xcconfig and points each configuration's
+baseConfigurationReference at it. Only the per-configuration differences stay
+inline. Settings every target shares in all configurations go one level
+further, into Configurations/Targets.xcconfig, which each target's file
+includes.
+
+Xcode layers settings as project .xcconfig < project < target .xcconfig <
+target, so a setting that moves out of a dictionary into that owner's
+.xcconfig keeps its value; hoist checks that by resolving every target and
+configuration before and after and writes nothing if any value differs.
+Values containing // stay inline (.xcconfig treats // as a comment). Owners
+that already have a baseConfigurationReference are left alone.
+
+query resolves settings the same way (pbxproj.Project.setting_layers) and
+keeps the result, with the level each value came from, in
+build/build-settings.json. The index is reused as long as project.pbxproj and
+the .xcconfig files it read have the same size and mtime, so a query does not
+parse the project again.
+
+Usage:
+    python3 build_settings.py hoist                     # show what would move
+    python3 build_settings.py hoist --write
+    python3 build_settings.py query Billix SWIFT_VERSION --configuration Release
+    python3 build_settings.py query Billix 'INFOPLIST_KEY_*' --sources
+    python3 build_settings.py query BillixTests         # every setting
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+
+import pbxproj
+from asset_catalog import write_file_atomic
+
+CONFIG_DIR = "Configurations"
+SHARED_NAME = "Targets"
+INDEX_PATH = "build/build-settings.json"
+INDEX_VERSION = 1
+
+
+def xcconfig_value(value):
+    """A pbxproj setting value as an .xcconfig value"""
+    if isinstance(value, list):
+        return " ".join(f'"{item}"' if " " in item else item for item in value)
+    return value
+
+
+def normalized(settings):
+    """Settings with lists written the way .xcconfig writes them, for comparing"""
+    return {key: " ".join(xcconfig_value(value).split()) for key, value in settings.items()}
+
+
+def owners(project):
+    """(owner ID, name, configuration IDs) for the project and every target"""
+    root_id = project.root["rootObject"]
+    result = []
+    for owner_id in [root_id] + list(project.project_object().get("targets", [])):
+        owner = project.objects[owner_id]
+        configs = project.objects.get(owner.get("buildConfigurationList"), {}).get("buildConfigurations", [])
+        name = "Project" if owner_id == root_id else owner.get("name", owner_id)
+        result.append((owner_id, name, list(configs)))
+    return result
+
+
+def common_settings(project, config_ids):
+    """Settings with the same value in every one of the configurations"""
+    dicts = [project.objects[config_id].get("buildSettings", {}) for config_id in config_ids]
+    if len(dicts) < 2:
+        return {}
+    return {key: value for key, value in dicts[0].items()
+            if "//" not in str(value) and all(key in d and d[key] == value for d in dicts[1:])}
+
+
+def xcconfig_text(description, settings, includes=()):
+    lines = [f"// {description}", "// Per-configuration values stay in project.pbxproj.", ""]
+    lines += [f'#include "{name}"' for name in includes]
+    if includes:
+        lines.append("")
+    lines += [f"{key} = {xcconfig_value(settings[key])}" for key in sorted(settings)]
+    return "\n".join(lines) + "\n"
+
+
+def resolved_everywhere(project, project_dir):
+    """(target name, configuration) -> normalized resolved settings, for every target"""
+    result = {}
+    for target_id in project.project_object().get("targets", []):
+        name = project.objects[target_id].get("name", target_id)
+        list_id = project.objects[target_id].get("buildConfigurationList")
+        for config_id in project.objects.get(list_id, {}).get("buildConfigurations", []):
+            configuration = project.objects[config_id].get("name")
+            result[(name, configuration)] = normalized(project.build_settings(target_id, configuration, project_dir))
+    return result
+
+
+def config_group(project):
+    """The Configurations group under the main group, created if missing"""
+    paths = project.resolve_paths()
+    for group_id, group in project.objects_of("PBXGroup"):
+        if group.get("path") and paths.get(group_id) == CONFIG_DIR:
+            return group_id
+    main_group = project.project_object()["mainGroup"]
+    group_id = pbxproj.Commented(project.new_id(f"group:{CONFIG_DIR}"), CONFIG_DIR)
+    project.objects[group_id] = {"isa": "PBXGroup", "children": [], "path": CONFIG_DIR, "sourceTree": "<group>"}
+    project.objects[main_group]["children"].append(group_id)
+    return group_id
+
+
+def add_xcconfig(project, group_id, filename):
+    """A file reference for Configurations/<filename> in the group"""
+    ref_id = pbxproj.Commented(project.new_id(f"{CONFIG_DIR}/{filename}"), filename)
+    project.objects[ref_id] = {"isa": "PBXFileReference", "lastKnownFileType": "text.xcconfig",
+                               "path": filename, "sourceTree": "<group>"}
+    project.objects[group_id]["children"].append(ref_id)
+    return ref_id
+
+
+def hoist(project_path, project_dir, write):
+    """
+    Move settings shared by all configurations into .xcconfig files
+
+    Returns:
+        Exit code
+    """
+    project = pbxproj.load(project_path)
+    before = resolved_everywhere(project, project_dir)
+    plan = []
+    for owner_id, name, config_ids in owners(project):
+        if any(project.objects[c].get("baseConfigurationReference") for c in config_ids):
+            print(f"~ {name}: already based on an .xcconfig, skipped")
+            continue
+        common = common_settings(project, config_ids)
+        if common:
+            plan.append((owner_id, name, config_ids, common))
+
+    # What every target hoists, with the same value, goes into the shared file
+    target_plans = [item for item in plan if item[0] != project.root["rootObject"]]
+    shared = {}
+    if len(target_plans) > 1 and len(target_plans) == len(project.project_object().get("targets", [])):
+        first = target_plans[0][3]
+        shared = {key: value for key, value in first.items()
+                  if all(other.get(key) == value for _o, _n, _c, other in target_plans[1:])}
+
+    if not plan:
+        print("✓ Nothing to hoist")
+        return 0
+    files = {}
+    if shared:
+        files[f"{SHARED_NAME}.xcconfig"] = xcconfig_text("Build settings every target uses in every configuration.",
+                                                         shared)
+    for owner_id, name, config_ids, common in plan:
+        is_target = owner_id != project.root["rootObject"]
+        own = {key: value for key, value in common.items() if not (is_target and key in shared)}
+        includes = [f"{SHARED_NAME}.xcconfig"] if is_target and shared else []
+        who = f"the {name} target" if is_target else "the project"
+        files[f"{name}.xcconfig"] = xcconfig_text(f"Build settings {who} uses in every configuration.", own, includes)
+        inline = sum(len(project.objects[c].get("buildSettings", {})) - len(common) for c in config_ids)
+        print(f"✓ {name}: {len(common)} setting(s) shared by {len(config_ids)} configurations"
+              f" -> {CONFIG_DIR}/{name}.xcconfig, {inline} left inline")
+    if shared:
+        print(f"✓ {len(shared)} of them are the same for every target -> {CONFIG_DIR}/{SHARED_NAME}.xcconfig")
+
+    existing = [name for name in files if os.path.exists(os.path.join(project_dir, CONFIG_DIR, name))]
+    if existing:
+        print(f"✗ {', '.join(existing)} already exist in {CONFIG_DIR}/; nothing was changed")
+        return 1
+    if not write:
+        print("~ Dry run; pass --write to create the files and update the project")
+        return 0
+
+    group_id = config_group(project)
+    refs = {filename: add_xcconfig(project, group_id, filename) for filename in files}
+    for _owner_id, name, config_ids, common in plan:
+        for config_id in config_ids:
+            config = project.objects[config_id]
+            config["baseConfigurationReference"] = refs[f"{name}.xcconfig"]
+            config["buildSettings"] = {key: value for key, value in config.get("buildSettings", {}).items()
+                                       if key not in common}
+
+    os.makedirs(os.path.join(project_dir, CONFIG_DIR), exist_ok=True)
+    written = []
+    for filename, text in files.items():
+        path = os.path.join(project_dir, CONFIG_DIR, filename)
+        write_file_atomic(path, text.encode("utf-8"))
+        written.append(path)
+    after = resolved_everywhere(project, project_dir)
+    if after != before:
+        for path in written:
+            os.remove(path)
+        for key in sorted(before):
+            changed = {s for s in set(before[key]) | set(after.get(key, {}))
+                       if before[key].get(s) != after.get(key, {}).get(s)}
+            for setting in sorted(changed):
+                print(f"✗ {key[0]} {key[1]}: {setting} would change")
+        print("✗ Resolved settings would change; nothing was written")
+        return 1
+    pbxproj.save(project, project_path)
+    print(f"✓ Updated {project_path}; resolved settings are unchanged for every target and configuration")
+    return 0
+
+
+def index_signature(paths):
+    """(size, mtime) of every input, to tell whether the index is still current"""
+    signature = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature[path] = [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            signature[path] = None
+    return signature
+
+
+def build_index(project_path, project_dir):
+    """
+    Resolve every target and configuration, recording which level set each value
+
+    Returns:
+        Index dictionary as stored in INDEX_PATH
+    """
+    project = pbxproj.load(project_path)
+    targets = {}
+    inputs = {os.path.abspath(project_path)}
+    for target_id in project.project_object().get("targets", []):
+        name = project.objects[target_id].get("name", target_id)
+        list_id = project.objects[target_id].get("buildConfigurationList")
+        for config_id in project.objects.get(list_id, {}).get("buildConfigurations", []):
+            configuration = project.objects[config_id].get("name")
+            sources = {}
+            for label, layer in project.setting_layers(target_id, configuration, project_dir):
+                if label.endswith(".xcconfig"):
+                    inputs.update(xcconfig_inputs(os.path.join(project_dir, label)))
+                sources.update(dict.fromkeys(layer, label))
+            settings = project.build_settings(target_id, configuration, project_dir)
+            targets.setdefault(name, {})[configuration] = {key: (value, sources[key]) for key, value in settings.items()}
+    return {"version": INDEX_VERSION, "inputs": index_signature(sorted(inputs)), "targets": targets}
+
+
+def xcconfig_inputs(path):
+    """An .xcconfig file and every file it includes"""
+    found = [os.path.abspath(path)]
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            include = pbxproj.XCCONFIG_INCLUDE.fullmatch(line.split("//", 1)[0].strip())
+            if include:
+                included = os.path.join(os.path.dirname(path), include.group(2))
+                if os.path.exists(included):
+                    found.extend(xcconfig_inputs(included))
+    return found
+
+
+def load_index(project_path, project_dir, index_path):
+    """The cached index if its inputs are unchanged, otherwise a freshly built (and saved) one"""
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if (index.get("version") == INDEX_VERSION and os.path.abspath(project_path) in index["inputs"]
+                and index_signature(index["inputs"]) == index["inputs"]):
+            return index, True
+    except (OSError, ValueError, KeyError):
+        pass
+    index = build_index(project_path, project_dir)
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    write_file_atomic(index_path, json.dumps(index, indent=1).encode("utf-8"))
+    return index, False
+
+
+def query(args, project_dir):
+    index, cached = load_index(args.project, project_dir, args.index)
+    targets = index["targets"]
+    if args.target not in targets:
+        print(f"✗ No target {args.target!r} (targets: {', '.join(sorted(targets))})")
+        return 1
+    configurations = targets[args.target]
+    if args.configuration not in configurations:
+        print(f"✗ {args.target} has no {args.configuration!r} configuration"
+              f" ({', '.join(sorted(configurations))})")
+        return 1
+    resolved = configurations[args.configuration]
+    patterns = args.settings or ["*"]
+    matched = sorted(key for key in resolved if any(fnmatch.fnmatchcase(key, p) for p in patterns))
+    missing = [p for p in patterns if not any(ch in p for ch in "*?[") and p not in resolved]
+    for key in matched:
+        value, source = resolved[key]
+        line = f"{key} = {xcconfig_value(value)}"
+        print(f"{line}    // {source}" if args.sources else line)
+    for pattern in missing:
+        print(f"~ {pattern} is not set for {args.target} {args.configuration}")
+    if args.verbose:
+        print(f"  ({'cached index' if cached else 'index rebuilt'}: {args.index})")
+    return 1 if missing and not matched else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hoist build settings into .xcconfig files and query resolved settings")
+    parser.add_argument("command", choices=("hoist", "query"))
+    parser.add_argument("target", nargs="?", help="query: target name")
+    parser.add_argument("settings", nargs="*", help="query: setting names or glob patterns (default: all)")
+    parser.add_argument("--project", default=pbxproj.PROJECT_PATH, help="project.pbxproj to read")
+    parser.add_argument("--configuration", default="Debug", help="query: configuration (default: Debug)")
+    parser.add_argument("--sources", action="store_true", help="query: show the level each value comes from")
+    parser.add_argument("--index", default=INDEX_PATH, help="query: where to keep the resolved-settings index")
+    parser.add_argument("--write", action="store_true", help="hoist: create the files and update the project")
+    parser.add_argument("--verbose", action="store_true", help="query: say whether the index was reused")
+    args = parser.parse_args()
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(args.project)))
+    if args.command == "query":
+        if not args.target:
+            parser.error("query needs a target")
+        return query(args, project_dir)
+
+    return hoist(args.project, project_dir, args.write)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Check Billix/Assets.xcassets against its Contents.json files without decoding
+a single image.
+
+Every PNG's width, height and color type come from its IHDR chunk (the first
+33 bytes of the file, png_utils.read_png_header), read in parallel threads,
+so the whole catalog is checked in a few milliseconds instead of decoding
+30 MB of pixels. Per asset set:
+
+  ✗ Contents.json missing or not valid JSON
+  ✗ a referenced file that is not on disk, or a .png that is not a PNG
+  ✗ imagesets: the @1x/@2x/@3x images of one slot disagree on the point size
+  ✗ AppIcon: an empty slot, a size that is not size × scale pixels, or an
+    alpha channel on an iOS icon (App Store Connect rejects those)
+  ~ files in the set folder that Contents.json does not reference (Xcode
+    ignores them but they still sit in the repository)
+  ~ @2x/@3x pixel sizes that are not a multiple of the scale
+  ~ images wider than --max-points points at their scale (a 1x slot holding
+    full-resolution art, which costs width × height × 4 bytes once decoded)
+
+Usage:
+    python3 check_asset_catalog.py
+    python3 check_asset_catalog.py --catalog "Billix/Preview Content/Preview Assets.xcassets"
+    python3 check_asset_catalog.py --max-points 600
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asset_catalog import DEFAULT_CATALOG, format_bytes, iter_asset_sets
+from png_utils import PNGError, read_png_header
+
+IMAGE_SET_EXTENSIONS = (".imageset", ".appiconset")
+
+# The widest screen in points (12.9" iPad Pro); nothing needs more at 1x
+DEFAULT_MAX_POINTS = 1024
+
+# PNG color types with an alpha channel
+ALPHA_COLOR_TYPES = frozenset({4, 6})
+
+# Keys that tell the images of one set apart, apart from scale
+SLOT_KEYS = ("idiom", "subtype", "platform", "size", "appearances", "display-gamut", "language-direction",
+             "width-class", "height-class", "memory", "graphics-feature-set")
+
+IOS_ICON_IDIOMS = frozenset({"iphone", "ipad", "ios-marketing", "car", "watch", "watch-marketing"})
+
+
+def read_header(path):
+    """IHDR of one file, or the error reading it"""
+    try:
+        return read_png_header(path)
+    except (OSError, PNGError) as e:
+        return e
+
+
+def slot_key(image):
+    return json.dumps({key: image.get(key) for key in SLOT_KEYS if key in image}, sort_keys=True)
+
+
+def slot_label(image, scale=True):
+    parts = [image.get("idiom", "universal")]
+    if image.get("platform"):
+        parts.append(image["platform"])
+    if image.get("size"):
+        parts.append(image["size"])
+    for appearance in image.get("appearances", []):
+        parts.append(f"{appearance.get('appearance')}={appearance.get('value')}")
+    return " ".join(parts) + (f" @{image.get('scale', '1x')}" if scale else "")
+
+
+def scale_of(image):
+    return float(image.get("scale", "1x").rstrip("x"))
+
+
+def load_set(set_path):
+    """
+    Contents.json and the files next to it
+
+    Returns:
+        (contents dict or error string, sorted file names other than Contents.json)
+    """
+    files = sorted(f for f in os.listdir(set_path) if f != "Contents.json" and not f.startswith("."))
+    try:
+        with open(os.path.join(set_path, "Contents.json"), "r") as f:
+            return json.load(f), files
+    except FileNotFoundError:
+        return "Contents.json is missing", files
+    except ValueError as e:
+        return f"Contents.json is not valid JSON ({e})", files
+
+
+def check_image_slots(images, headers, set_path, max_points):
+    """Scale consistency and oversize checks for an imageset; returns (errors, warnings)"""
+    errors, warnings = [], []
+    slots = {}
+    for image in images:
+        header = headers.get(os.path.join(set_path, image.get("filename", "")))
+        if isinstance(header, dict):
+            slots.setdefault(slot_key(image), []).append((image, header))
+    for entries in slots.values():
+        points = {}
+        for image, header in entries:
+            scale = scale_of(image)
+            width, height = header["width"], header["height"]
+            points[f"{image['filename']} @{image.get('scale', '1x')}"] = (width / scale, height / scale)
+            if scale > 1 and (width % scale or height % scale):
+                warnings.append(f"{image['filename']} is {width}×{height}, not a multiple of {scale:g}"
+                                f" for @{image['scale']}")
+            if width / scale > max_points:
+                warnings.append(f"{image['filename']} is {width / scale:.0f} pt wide at {slot_label(image)}"
+                                f" ({width}×{height}, {format_bytes(width * height * 4)} decoded)")
+        widths = [size[0] for size in points.values()]
+        heights = [size[1] for size in points.values()]
+        if max(widths) - min(widths) > 1 or max(heights) - min(heights) > 1:
+            sizes = ", ".join(f"{name} {w:g}×{h:g} pt" for name, (w, h) in sorted(points.items()))
+            errors.append(f"scales of {slot_label(entries[0][0], scale=False)} disagree: {sizes}")
+    return errors, warnings
+
+
+def check_icon_slots(images, headers, set_path):
+    """Completeness, pixel size and alpha checks for an app icon set; returns errors"""
+    errors = []
+    for image in images:
+        filename = image.get("filename")
+        if not filename:
+            errors.append(f"slot {slot_label(image)} has no image")
+            continue
+        header = headers.get(os.path.join(set_path, filename))
+        if not isinstance(header, dict):
+            continue
+        if image.get("size"):
+            width, height = (float(n) for n in image["size"].split("x"))
+            scale = scale_of(image)
+            expected = (round(width * scale), round(height * scale))
+            if (header["width"], header["height"]) != expected:
+                errors.append(f"{filename} is {header['width']}×{header['height']},"
+                              f" slot {slot_label(image)} needs {expected[0]}×{expected[1]}")
+        ios = image.get("platform") == "ios" or image.get("idiom") in IOS_ICON_IDIOMS
+        if ios and header["color_type"] in ALPHA_COLOR_TYPES:
+            errors.append(f"{filename} has an alpha channel; iOS icons must be opaque")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check asset catalog files and image sizes from PNG headers only")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Asset catalog to check")
+    parser.add_argument("--jobs", type=int, default=16, help="Threads reading PNG headers")
+    parser.add_argument("--max-points", type=int, default=DEFAULT_MAX_POINTS,
+                        help=f"Warn about images wider than this many points (default: {DEFAULT_MAX_POINTS})")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    sets = []
+    for name, set_path in iter_asset_sets(args.catalog, IMAGE_SET_EXTENSIONS):
+        contents, files = load_set(set_path)
+        sets.append((name, set_path, contents, files))
+    pngs = sorted({os.path.join(set_path, f) for _n, set_path, _c, files in sets for f in files
+                   if f.lower().endswith(".png")})
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        headers = dict(zip(pngs, pool.map(read_header, pngs)))
+
+    error_count = warning_count = 0
+    for name, set_path, contents, files in sets:
+        errors, warnings = [], []
+        if isinstance(contents, str):
+            errors.append(contents)
+            images = []
+        else:
+            images = contents.get("images", [])
+        referenced = {image["filename"] for image in images if image.get("filename")}
+        for filename in sorted(referenced):
+            path = os.path.join(set_path, filename)
+            if filename not in files:
+                errors.append(f"{filename} is referenced but missing")
+            elif isinstance(headers.get(path), Exception):
+                errors.append(f"{filename} is not a readable PNG ({headers[path]})")
+        for filename in files:
+            if filename not in referenced and not isinstance(contents, str):
+                size = os.path.getsize(os.path.join(set_path, filename))
+                warnings.append(f"{filename} is not referenced by Contents.json ({format_bytes(size)})")
+        if set_path.endswith(".appiconset"):
+            errors += check_icon_slots(images, headers, set_path)
+        else:
+            slot_errors, slot_warnings = check_image_slots(images, headers, set_path, args.max_points)
+            errors += slot_errors
+            warnings += slot_warnings
+
+        if errors or warnings:
+            print(f"{'✗' if errors else '~'} {os.path.basename(set_path)}")
+            for message in errors:
+                print(f"    ✗ {message}")
+            for message in warnings:
+                print(f"    ~ {message}")
+        error_count += len(errors)
+        warning_count += len(warnings)
+
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"\n{'✗' if error_count else '✓'} Checked {len(sets)} sets and {len(pngs)} PNG headers in {elapsed:.0f} ms:"
+          f" {error_count} error(s), {warning_count} warning(s)")
+    return 1 if error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Replace PBXGroup subtrees that mirror a folder on disk with
+file-system-synchronized groups (Xcode 16, objectVersion 77).
+
+Most of project.pbxproj is a PBXGroup / PBXFileReference / PBXBuildFile
+triple for every file under Billix/, and that is what every add_* and
+remove_* script edits. A PBXFileSystemSynchronizedRootGroup replaces a whole
+subtree with one object: Xcode lists the folder's contents itself and builds
+every file in it for the targets the group is attached to, Swift files in
+Sources and everything else in Resources. Files a target must not build go in
+a PBXFileSystemSynchronizedBuildFileExceptionSet.
+
+A group is converted only when the result builds exactly what it builds now:
+
+  - it and every group below it is a folder (<group>-relative path, no
+    renaming), and each child is a file or folder directly inside it
+  - no file reference or group in it is referenced from anywhere else
+    (another group, a build setting object, the project's product group)
+  - each file is built in the phase Xcode would pick for its type, with no
+    per-file settings
+
+Files on disk that the group does not list, and listed files a target does
+not build, become membership exceptions for that target. The topmost group
+that qualifies is converted; where a group does not qualify its subgroups are
+tried, and the reasons are reported.
+
+Usage:
+    python3 convert_to_synced_groups.py                        # report what would be converted
+    python3 convert_to_synced_groups.py --under Billix/Features --write
+    python3 convert_to_synced_groups.py --verbose              # why each group was left alone
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pbxproj
+
+SYNCED_OBJECT_VERSION = "77"
+
+# Extensions Xcode puts in the Sources phase of a synchronized group; every
+# other file goes to Resources
+SOURCE_EXTENSIONS = frozenset({".swift", ".m", ".mm", ".c", ".cc", ".cpp", ".metal", ".intentdefinition"})
+
+# Never listed by Xcode, never an exception
+IGNORED_FILES = frozenset({".DS_Store"})
+
+
+def expected_phase(path):
+    """The build phase isa Xcode gives a file in a synchronized group"""
+    if os.path.splitext(path)[1].lower() in SOURCE_EXTENSIONS:
+        return "PBXSourcesBuildPhase"
+    return "PBXResourcesBuildPhase"
+
+
+def disk_entries(directory):
+    """(files, subfolders) directly inside a folder, hidden entries skipped"""
+    files, folders = [], []
+    for entry in sorted(os.listdir(directory)):
+        if entry.startswith(".") or entry in IGNORED_FILES:
+            continue
+        full = os.path.join(directory, entry)
+        # Bundles such as .xcassets are files to Xcode
+        if os.path.isdir(full) and not os.path.splitext(entry)[1]:
+            folders.append(entry)
+        else:
+            files.append(entry)
+    return files, folders
+
+
+def disk_files(directory, prefix=""):
+    """Every file below a folder as paths relative to it"""
+    files, folders = disk_entries(directory)
+    found = [prefix + f for f in files]
+    for folder in folders:
+        found.extend(disk_files(os.path.join(directory, folder), f"{prefix}{folder}/"))
+    return found
+
+
+class Analysis:
+    """Project-wide lookups shared by every group check"""
+
+    def __init__(self, project, project_dir):
+        self.project = project
+        self.project_dir = project_dir
+        self.paths = project.resolve_paths()
+        self.memberships = project.memberships()
+        self.parents = project.parents()
+        self.file_refs_by_path = {}
+        for object_id, _obj in project.objects_of("PBXFileReference"):
+            if self.paths.get(object_id) is not None:
+                self.file_refs_by_path.setdefault(self.paths[object_id], set()).add(object_id)
+        self.referrers = {}
+        for object_id, obj in project.objects.items():
+            for value in pbxproj.references(obj):
+                if value in project.objects and value != object_id:
+                    self.referrers.setdefault(value, set()).add(object_id)
+
+    def disk_path(self, object_id):
+        path = self.paths.get(object_id)
+        return None if path is None else os.path.join(self.project_dir, path)
+
+    def check(self, group_id, prefix=""):
+        """
+        Check whether a group subtree can become a synchronized group
+
+        Returns:
+            (list of reasons it cannot, {relative path: file reference ID},
+             [relative paths on disk the subtree does not list], [every object ID in the subtree])
+        """
+        objects = self.project.objects
+        group = objects[group_id]
+        label = prefix.rstrip("/") or group.get("path") or group.get("name") or group_id
+        reasons = []
+        files, unlisted, subtree = {}, [], [group_id]
+
+        if group.get("isa") != "PBXGroup":
+            return [f"{label}: is a {group.get('isa')}"], files, unlisted, subtree
+        if group.get("sourceTree") != "<group>" or not group.get("path") or "/" in group["path"]:
+            return [f"{label}: group is not a single folder relative to its parent"], files, unlisted, subtree
+        if group.get("name", group["path"]) != group["path"]:
+            return [f"{label}: group is named {group['name']!r}, not after its folder"], files, unlisted, subtree
+        if not prefix and self.referrers.get(group_id, set()) - {self.parents.get(group_id)}:
+            return [f"{label}: group is referenced from outside its parent"], files, unlisted, subtree
+        directory = self.disk_path(group_id)
+        if not directory or not os.path.isdir(directory):
+            return [f"{label}: folder {self.paths.get(group_id)} does not exist"], files, unlisted, subtree
+
+        on_disk_files, on_disk_folders = disk_entries(directory)
+        listed = set()
+        for child_id in group.get("children", []):
+            child = objects.get(child_id)
+            if child is None:
+                reasons.append(f"{label}: lists missing object {child_id}")
+                continue
+            name = child.get("path", "")
+            if child.get("sourceTree") != "<group>" or "/" in name or child.get("name", name) != name:
+                reasons.append(f"{label}: {child.get('name') or name} is not a plain file or folder inside it")
+                continue
+            if name in listed:
+                reasons.append(f"{label}: lists {name} twice")
+                continue
+            listed.add(name)
+            if self.referrers.get(child_id, set()) - {group_id} - {b for _t, _p, b in self.memberships.get(child_id, [])}:
+                reasons.append(f"{label}: {name} is referenced from outside the group")
+            if child.get("isa") == "PBXGroup":
+                child_reasons, child_files, child_unlisted, child_subtree = self.check(child_id, f"{prefix}{name}/")
+                reasons.extend(child_reasons)
+                files.update(child_files)
+                unlisted.extend(child_unlisted)
+                subtree.extend(child_subtree)
+            elif child.get("isa") == "PBXFileReference":
+                if name not in on_disk_files:
+                    reasons.append(f"{label}: {name} is not on disk")
+                    continue
+                reasons.extend(self.check_builds(f"{prefix}{name}", child_id))
+                files[prefix + name] = child_id
+                subtree.append(child_id)
+            else:
+                reasons.append(f"{label}: {name} is a {child.get('isa')}")
+
+        # A file the group does not list must not be in the project some other way
+        folder = self.paths[group_id]
+        for name in on_disk_files + on_disk_folders:
+            if name in listed:
+                continue
+            if name in on_disk_files:
+                names = [name]
+            else:
+                names = disk_files(os.path.join(directory, name), f"{name}/")
+            for relative in names:
+                if os.path.normpath(os.path.join(folder, relative)) in self.file_refs_by_path:
+                    reasons.append(f"{label}: {relative} is in the project under another group")
+                unlisted.append(prefix + relative)
+        return reasons, files, unlisted, subtree
+
+    def check_builds(self, path, file_ref):
+        reasons = []
+        objects = self.project.objects
+        for target_id, phase_id, build_file_id in self.memberships.get(file_ref, []):
+            phase = objects[phase_id].get("isa")
+            if phase != expected_phase(path):
+                reasons.append(f"{path}: built in {phase}, Xcode would use {expected_phase(path)}")
+            if set(objects[build_file_id]) - {"isa", "fileRef"}:
+                reasons.append(f"{path}: has per-file build settings")
+        return reasons
+
+
+def find_convertible(analysis, start, under=None, verbose=False):
+    """
+    Walk down from a group and collect the topmost subtrees that qualify
+
+    Returns:
+        List of (group ID, files, unlisted, subtree)
+    """
+    found = []
+    seen = set()
+    folders = set()
+    objects = analysis.project.objects
+
+    def visit(group_id):
+        # A group listed twice by its parent is still visited once
+        if group_id in seen:
+            return
+        seen.add(group_id)
+        path = analysis.paths.get(group_id) or ""
+        inside = under is None or path == under or path.startswith(under + "/")
+        leads_there = under is None or under.startswith(path + "/") or path == "."
+        if inside and group_id != start:
+            if any(path == f or path.startswith(f + "/") for f in folders):
+                if verbose:
+                    print(f"  ~ {path}: another group already mirrors this folder")
+                return
+            reasons, files, unlisted, subtree = analysis.check(group_id)
+            if not reasons:
+                folders.add(path)
+                found.append((group_id, files, unlisted, subtree))
+                return
+            if verbose:
+                print(f"  ~ {path}: {reasons[0]}" + (f" (+{len(reasons) - 1} more)" if len(reasons) > 1 else ""))
+        elif not leads_there:
+            return
+        for child_id in objects[group_id].get("children", []):
+            if objects.get(child_id, {}).get("isa") == "PBXGroup":
+                visit(child_id)
+
+    visit(start)
+    return found
+
+
+def convert(analysis, group_id, files, unlisted, subtree):
+    """
+    Replace one group subtree with a synchronized root group of the same ID
+
+    Returns:
+        Number of objects removed (net)
+    """
+    project = analysis.project
+    objects = project.objects
+    group = objects[group_id]
+    folder = group["path"]
+
+    # Targets that build anything in the folder get the group attached
+    targets = {}
+    build_files = set()
+    for path, file_ref in files.items():
+        for target_id, phase_id, build_file_id in analysis.memberships.get(file_ref, []):
+            targets.setdefault(target_id, set()).add(path)
+            build_files.add((phase_id, build_file_id))
+
+    every_file = sorted(set(files) | set(unlisted))
+    exception_ids = []
+    for target_id in sorted(targets):
+        excluded = [path for path in every_file if path not in targets[target_id]]
+        if not excluded:
+            continue
+        target_name = objects[target_id].get("name", target_id)
+        comment = f'Exceptions for "{folder}" folder in "{target_name}" target'
+        exception_id = pbxproj.Commented(project.new_id(f"exceptions:{group_id}:{target_id}"), comment)
+        objects[exception_id] = {
+            "isa": "PBXFileSystemSynchronizedBuildFileExceptionSet",
+            "membershipExceptions": excluded,
+            "target": pbxproj.Commented(target_id, target_name),
+        }
+        exception_ids.append(exception_id)
+
+    before = len(objects)
+    for phase_id, build_file_id in build_files:
+        phase_files = objects[phase_id]["files"]
+        phase_files[:] = [f for f in phase_files if f != build_file_id]
+        objects.pop(build_file_id, None)
+    for object_id in subtree:
+        objects.pop(object_id, None)
+
+    synced_id = pbxproj.Commented(str(group_id), folder)
+    synced = {"isa": "PBXFileSystemSynchronizedRootGroup", "path": folder, "sourceTree": "<group>"}
+    if exception_ids:
+        synced["exceptions"] = exception_ids
+    objects[synced_id] = synced
+
+    for target_id in targets:
+        target = objects[target_id]
+        target.setdefault("fileSystemSynchronizedGroups", []).append(pbxproj.Commented(str(group_id), folder))
+    return before - len(objects)
+
+
+def built_files(project, project_dir):
+    """
+    What each target builds, explicit build files and synchronized folders alike
+
+    Returns:
+        dict target name -> set of (build phase isa, path relative to the project directory)
+    """
+    objects = project.objects
+    paths = project.resolve_paths()
+    built = {}
+    for target_id, target in project.objects_of("PBXNativeTarget"):
+        files = built.setdefault(target.get("name", target_id), set())
+        for phase_id in target.get("buildPhases", []):
+            phase = objects[phase_id]
+            for build_file_id in phase.get("files", []):
+                file_ref = objects[build_file_id].get("fileRef")
+                if file_ref is not None:
+                    files.add((phase["isa"], paths.get(file_ref) or file_ref))
+        for group_id in target.get("fileSystemSynchronizedGroups", []):
+            excluded = set()
+            for exception_id in objects[group_id].get("exceptions", []):
+                exception = objects[exception_id]
+                if exception.get("target") == target_id:
+                    excluded.update(exception.get("membershipExceptions", []))
+            folder = paths[group_id]
+            for relative in disk_files(os.path.join(project_dir, folder)):
+                if relative not in excluded:
+                    files.add((expected_phase(relative), os.path.normpath(os.path.join(folder, relative))))
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert folder-mirroring groups to synchronized groups")
+    parser.add_argument("--project", default=pbxproj.PROJECT_PATH, help="project.pbxproj to convert")
+    parser.add_argument("--under", help="Only convert groups at or below this folder (e.g. Billix/Features)")
+    parser.add_argument("--write", action="store_true", help="Save the converted project (default: report only)")
+    parser.add_argument("--verbose", action="store_true", help="Show why groups were left alone")
+    args = parser.parse_args()
+
+    with open(args.project, "r", encoding="utf-8") as f:
+        before_text = f.read()
+    started = time.perf_counter()
+    project = pbxproj.loads(before_text)
+    before_parse = time.perf_counter() - started
+    before_objects = len(project.objects)
+    before_text = pbxproj.dumps(project)
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(args.project)))
+    built_before = built_files(project, project_dir)
+    analysis = Analysis(project, project_dir)
+    under = os.path.normpath(args.under) if args.under else None
+    main_group = project.project_object()["mainGroup"]
+    found = find_convertible(analysis, main_group, under, args.verbose)
+    if not found:
+        print("~ No group mirrors its folder exactly; --verbose shows why")
+        return 0
+
+    for group_id, files, unlisted, subtree in found:
+        folder = analysis.paths[group_id]
+        convert(analysis, group_id, files, unlisted, subtree)
+        note = f", {len(unlisted)} unlisted file(s) excluded" if unlisted else ""
+        print(f"✓ {folder}: {len(files)} files, {len(subtree) - len(files)} groups{note}")
+
+    root = project.project_object()
+    project.root["objectVersion"] = SYNCED_OBJECT_VERSION
+    root.pop("compatibilityVersion", None)
+    root["preferredProjectObjectVersion"] = SYNCED_OBJECT_VERSION
+
+    after_text = pbxproj.dumps(project)
+    started = time.perf_counter()
+    pbxproj.loads(after_text)
+    after_parse = time.perf_counter() - started
+
+    def shrink(before, after):
+        return f"{before:,} -> {after:,} ({1 - after / before:.0%} smaller)"
+
+    print(f"\n  objects: {shrink(before_objects, len(project.objects))}")
+    print(f"  lines:   {shrink(before_text.count(chr(10)), after_text.count(chr(10)))}")
+    print(f"  bytes:   {shrink(len(before_text.encode()), len(after_text.encode()))}")
+    print(f"  parse:   {before_parse * 1000:.0f} -> {after_parse * 1000:.0f} ms")
+
+    dangling = pbxproj.dangling_references(project)
+    for object_id, key, missing in dangling:
+        print(f"✗ {object_id}.{key} names missing object {missing}")
+    built_after = built_files(project, project_dir)
+    for target in sorted(built_before):
+        lost = built_before[target] - built_after.get(target, set())
+        gained = built_after.get(target, set()) - built_before[target]
+        for phase, path in sorted(lost):
+            print(f"✗ {target} would no longer build {path} ({phase})")
+        for phase, path in sorted(gained):
+            print(f"✗ {target} would also build {path} ({phase})")
+    if dangling or built_after != built_before:
+        return 1
+    print(f"✓ Every target builds the same {sum(len(files) for files in built_after.values()):,} files as before")
+    if args.write:
+        pbxproj.save(project, args.project)
+        print(f"✓ Wrote {args.project} (requires Xcode 16 or later)")
+    else:
+        print("~ Report only; --write saves the converted project")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
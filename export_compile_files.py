@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Export the exact files each target compiles, for Swift tooling that runs
+outside Xcode (SwiftLint, swift-format, sourcekit-lsp on Linux CI).
+
+Globbing Billix/ picks up files the project does not compile: stale copies,
+files removed from the project but not from disk (the GeoGame views
+fix_file_paths.py found). This follows the project instead:
+
+    target -> Sources build phase -> PBXBuildFile -> fileRef -> resolved path
+
+plus the Swift files of any file-system-synchronized folder attached to the
+target, minus its exceptions. It writes, into --output-dir:
+
+    <Target>.txt            one path per line, relative to the repository root
+    <Target>.resp           the same paths quoted, as a swiftc response file
+    compile_commands.json   one entry per file; the arguments name the
+                            target's module, Swift version and compilation
+                            conditions from its Debug build settings
+                            (.xcconfig files included) and pass the
+                            module's files with @<Target>.resp
+
+The inputs (project.pbxproj, its .xcconfig files, the listing of
+synchronized folders) are hashed into .inputs.sha256; when the hash has not
+changed and every output is still there nothing is rewritten, so the command
+can run before every lint step. Files whose content did not change are never
+rewritten either, and the lists of targets that no longer exist are removed.
+
+Usage:
+    python3 export_compile_files.py                         # into build/compile-files
+    python3 export_compile_files.py --output-dir /tmp/lists --force
+    swiftlint lint $(cat build/compile-files/Billix.txt)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shlex
+import sys
+
+import pbxproj
+from asset_catalog import write_file_atomic
+from convert_to_synced_groups import built_files, disk_files
+
+DEFAULT_OUTPUT_DIR = "build/compile-files"
+STAMP_FILE = ".inputs.sha256"
+
+# Compiled by the Sources phase but not Swift (not passed to swiftc)
+SWIFT_EXTENSION = ".swift"
+
+
+def input_hash(project, project_path, project_dir):
+    """sha256 over everything the export depends on"""
+    digest = hashlib.sha256()
+    with open(project_path, "rb") as f:
+        digest.update(f.read())
+    digest.update(os.path.abspath(project_dir).encode("utf-8"))
+    # A synchronized folder's members are whatever is on disk
+    paths = project.resolve_paths()
+    for group_id, _group in project.objects_of("PBXFileSystemSynchronizedRootGroup"):
+        folder = paths.get(group_id)
+        if folder and os.path.isdir(os.path.join(project_dir, folder)):
+            digest.update(folder.encode("utf-8"))
+            digest.update("\0".join(disk_files(os.path.join(project_dir, folder))).encode("utf-8"))
+    # Settings hoisted into .xcconfig files feed the compiler arguments
+    for _config_id, config in project.objects_of("XCBuildConfiguration"):
+        xcconfig = paths.get(config.get("baseConfigurationReference"))
+        if xcconfig and os.path.isfile(os.path.join(project_dir, xcconfig)):
+            with open(os.path.join(project_dir, xcconfig), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def module_name(settings, target_name):
+    name = settings.get("PRODUCT_MODULE_NAME") or settings.get("PRODUCT_NAME") or target_name
+    name = name.replace("$(TARGET_NAME)", target_name)
+    # Xcode's c99extidentifier: anything but letters, digits and _ becomes _
+    return re.sub(r"\W", "_", name)
+
+
+def setting_list(value):
+    return value if isinstance(value, list) else (value or "").split()
+
+
+def swiftc_arguments(settings, target_name, response_file):
+    """swiftc arguments for one target: module name, language version, -D conditions, extra flags"""
+    arguments = ["swiftc", "-module-name", module_name(settings, target_name)]
+    version = settings.get("SWIFT_VERSION")
+    if version:
+        arguments += ["-swift-version", version.split(".")[0]]
+    for condition in setting_list(settings.get("SWIFT_ACTIVE_COMPILATION_CONDITIONS")):
+        arguments += ["-D", condition]
+    arguments += setting_list(settings.get("OTHER_SWIFT_FLAGS"))
+    arguments.append(f"@{response_file}")
+    return arguments
+
+
+def compiled_files(project, project_dir):
+    """
+    Files each target's Sources phase compiles
+
+    Returns:
+        dict target ID -> (target name, sorted paths relative to the project directory)
+    """
+    built = built_files(project, project_dir)
+    targets = {}
+    for target_id, target in project.objects_of("PBXNativeTarget"):
+        name = target.get("name", target_id)
+        paths = sorted(path for phase, path in built.get(name, ()) if phase == "PBXSourcesBuildPhase")
+        targets[target_id] = (name, paths)
+    return targets
+
+
+def write_if_changed(path, text):
+    """Atomically write text unless the file already holds it; returns True if written"""
+    data = text.encode("utf-8")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    write_file_atomic(path, data)
+    return True
+
+
+def output_files(target_names):
+    """File names the export writes for these targets"""
+    names = {"compile_commands.json"}
+    for name in target_names:
+        names.update((f"{name}.txt", f"{name}.resp"))
+    return names
+
+
+def prune_outputs(output_dir, expected):
+    """Remove .txt/.resp lists of targets that are gone; returns the removed names"""
+    removed = []
+    for filename in sorted(os.listdir(output_dir)):
+        if filename.endswith((".txt", ".resp")) and filename not in expected:
+            os.remove(os.path.join(output_dir, filename))
+            removed.append(filename)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export per-target compile file lists and compile_commands.json")
+    parser.add_argument("--project", default=pbxproj.PROJECT_PATH, help="project.pbxproj to read")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Where to write the lists")
+    parser.add_argument("--configuration", default="Debug", help="Build configuration for compiler arguments")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the inputs did not change")
+    parser.add_argument("--verbose", action="store_true", help="List Swift files on disk no target compiles")
+    args = parser.parse_args()
+
+    project = pbxproj.load(args.project)
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(args.project)))
+    digest = input_hash(project, args.project, project_dir)
+    stamp_path = os.path.join(args.output_dir, STAMP_FILE)
+    expected = output_files(target.get("name", target_id)
+                            for target_id, target in project.objects_of("PBXNativeTarget"))
+    complete = all(os.path.exists(os.path.join(args.output_dir, name)) for name in expected)
+    if not args.force and complete and os.path.exists(stamp_path):
+        with open(stamp_path, "r") as f:
+            if f.read().strip() == f"{digest} {args.configuration}":
+                print(f"✓ {args.output_dir} is up to date ({digest[:12]})")
+                return 0
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_dir = os.path.abspath(args.output_dir)
+    commands = []
+    written = 0
+    compiled = set()
+    missing = []
+    targets = compiled_files(project, project_dir)
+    for target_id, (name, paths) in targets.items():
+        swift = [path for path in paths if path.endswith(SWIFT_EXTENSION)]
+        compiled.update(swift)
+        missing.extend(path for path in swift if not os.path.isfile(os.path.join(project_dir, path)))
+        response_file = os.path.join(output_dir, f"{name}.resp")
+        written += write_if_changed(os.path.join(output_dir, f"{name}.txt"), "".join(f"{p}\n" for p in swift))
+        written += write_if_changed(response_file, "".join(f"{shlex.quote(p)}\n" for p in swift))
+        arguments = swiftc_arguments(project.build_settings(target_id, args.configuration, project_dir), name, response_file)
+        commands.extend({"directory": project_dir, "file": path, "arguments": arguments} for path in swift)
+        print(f"✓ {name}: {len(swift)} Swift files")
+
+    written += write_if_changed(os.path.join(output_dir, "compile_commands.json"),
+                                json.dumps(commands, indent=2) + "\n")
+    write_if_changed(stamp_path, f"{digest} {args.configuration}\n")
+    print(f"✓ Wrote {written} changed file(s) to {args.output_dir}")
+    for filename in prune_outputs(output_dir, expected):
+        print(f"- {filename} (target no longer exists)")
+
+    for path in missing:
+        print(f"✗ {path} is compiled but not on disk")
+
+    # Swift files sitting in the targets' folders that nothing compiles
+    stray = []
+    for name, _paths in targets.values():
+        folder = os.path.join(project_dir, name)
+        if os.path.isdir(folder):
+            stray.extend(path for path in (os.path.join(name, f) for f in disk_files(folder))
+                         if path.endswith(SWIFT_EXTENSION) and path not in compiled)
+    if stray:
+        print(f"~ {len(stray)} Swift file(s) under the target folders are not compiled by any target"
+              + ("" if args.verbose else " (--verbose lists them)"))
+        if args.verbose:
+            for path in sorted(stray):
+                print(f"    {path}")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
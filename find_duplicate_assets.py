@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Find near-duplicate images across the asset catalog and report the bytes
+shipping them twice costs.
+
+MagnifyGlass / NEWEST_MagnifyGlass, billix_logo / billix_logo_new and the
+NEW_/NEWEST_ placeholders look like the same art added again under a new name.
+Byte comparison misses those once an image was re-exported or resized, so
+every image gets a 64-bit perceptual hash (pHash):
+
+  1. decode a small thumbnail: Image.draft lets JPEG decode at 1/2..1/8
+     resolution, and thumbnail() reduces with a box filter before resampling
+  2. flatten transparency onto white, convert to luminance, 32×32
+  3. 2-D DCT as two matrix products (NumPy), keep the 8×8 lowest
+     frequencies without the DC term, one bit per coefficient: above or below
+     their median
+
+Hashes are computed in a process pool. Two images are near-duplicates when
+their hashes differ in at most --distance bits. Instead of comparing all pairs,
+each hash is split into --distance + 1 bands and indexed by band value: two
+hashes within that distance must agree exactly on at least one band
+(pigeonhole), so only hashes sharing a band are compared. Matching pairs are
+merged into clusters (union-find). Images of one asset set (its @1x/@2x/@3x)
+are never paired.
+
+For each cluster the largest image (by pixels, then bytes) is the one to
+keep; the others' file sizes are the reclaimable bytes.
+
+Usage:
+    python3 find_duplicate_assets.py
+    python3 find_duplicate_assets.py --distance 4       # stricter
+    python3 find_duplicate_assets.py --json duplicates.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from asset_catalog import DEFAULT_CATALOG, format_bytes, iter_catalog_images
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+HASH_SIZE = 32
+LOW_FREQUENCIES = 8
+DEFAULT_DISTANCE = 10
+
+
+def dct_matrix(n):
+    """Orthonormal DCT-II matrix: dct_matrix(n) @ x is the DCT of x"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+DCT = dct_matrix(HASH_SIZE)
+
+
+def thumbnail(path):
+    """A HASH_SIZE×HASH_SIZE luminance array, decoded at reduced resolution where possible"""
+    with Image.open(path) as img:
+        img.draft("RGB", (HASH_SIZE * 4, HASH_SIZE * 4))
+        img.thumbnail((HASH_SIZE * 4, HASH_SIZE * 4), Image.Resampling.BOX, reducing_gap=2.0)
+        rgba = np.asarray(img.convert("RGBA"), dtype=np.float32) / 255.0
+    alpha = rgba[..., 3:]
+    rgb = rgba[..., :3] * alpha + (1.0 - alpha)
+    luma = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    small = Image.fromarray((luma * 255).astype(np.uint8)).resize((HASH_SIZE, HASH_SIZE), Image.Resampling.BOX)
+    return np.asarray(small, dtype=np.float32)
+
+
+def phash(pixels):
+    """64-bit perceptual hash of a HASH_SIZE×HASH_SIZE array"""
+    coefficients = (DCT @ pixels @ DCT.T)[:LOW_FREQUENCIES, :LOW_FREQUENCIES].flatten()[1:]
+    bits = coefficients > np.median(coefficients)
+    # 63 coefficient bits; the 64th (DC) is always 0
+    return int(np.packbits(np.concatenate([[False], bits])).view(">u8")[0])
+
+
+def describe_image(path):
+    """
+    Hash one image
+
+    Returns:
+        dict with path, hash, width, height, bytes, sha256 (or error)
+    """
+    try:
+        with open(path, "rb") as f:
+            sha = hashlib.sha256(f.read()).hexdigest()
+        with Image.open(path) as img:
+            width, height = img.size
+        return {"path": path, "hash": phash(thumbnail(path)), "width": width, "height": height,
+                "bytes": os.path.getsize(path), "sha256": sha}
+    except (OSError, ValueError) as e:
+        return {"path": path, "error": str(e)}
+
+
+def bands(bits, count):
+    """(start, width) of count nearly equal bit ranges covering a bits-bit hash"""
+    result = []
+    start = 0
+    for index in range(count):
+        width = bits // count + (1 if index < bits % count else 0)
+        result.append((start, width))
+        start += width
+    return result
+
+
+def near_pairs(hashes, distance):
+    """
+    Index pairs whose hashes differ in at most distance bits (multi-index hashing)
+
+    Returns:
+        (set of (i, j) with i < j, number of candidate pairs compared)
+    """
+    pairs = set()
+    compared = set()
+    for start, width in bands(64, distance + 1):
+        mask = (1 << width) - 1
+        buckets = {}
+        for index, value in enumerate(hashes):
+            buckets.setdefault((value >> start) & mask, []).append(index)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    pair = (members[a], members[b])
+                    if pair in compared:
+                        continue
+                    compared.add(pair)
+                    if bin(hashes[pair[0]] ^ hashes[pair[1]]).count("1") <= distance:
+                        pairs.add(pair)
+    return pairs, len(compared)
+
+
+def clusters_of(count, pairs):
+    """Connected components of the pair graph with more than one member"""
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in pairs:
+        parent[find(a)] = find(b)
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def asset_set(path):
+    return os.path.dirname(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find perceptually duplicate images in the asset catalog")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Asset catalog to scan")
+    parser.add_argument("--distance", type=int, default=DEFAULT_DISTANCE,
+                        help=f"Max differing hash bits for a near-duplicate (default: {DEFAULT_DISTANCE})")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--json", dest="json_path", help="Also write the clusters as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = list(iter_catalog_images(args.catalog, IMAGE_EXTENSIONS))
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        described = list(pool.map(describe_image, paths))
+    for item in described:
+        if "error" in item:
+            print(f"✗ {item['path']}: {item['error']}")
+    images = [item for item in described if "error" not in item]
+    hashed = time.perf_counter()
+
+    pairs, compared = near_pairs([image["hash"] for image in images], args.distance)
+    pairs = {(a, b) for a, b in pairs if asset_set(images[a]["path"]) != asset_set(images[b]["path"])}
+    clusters = clusters_of(len(images), pairs)
+
+    report = []
+    total = 0
+    for members in clusters:
+        members.sort(key=lambda i: (images[i]["width"] * images[i]["height"], images[i]["bytes"]), reverse=True)
+        keep = images[members[0]]
+        duplicates = [images[i] for i in members[1:]]
+        reclaimable = sum(image["bytes"] for image in duplicates)
+        total += reclaimable
+        report.append({"keep": keep, "duplicates": duplicates, "reclaimable": reclaimable})
+    report.sort(key=lambda cluster: cluster["reclaimable"], reverse=True)
+
+    for cluster in report:
+        keep = cluster["keep"]
+        print(f"\n{format_bytes(cluster['reclaimable']):>10}  keep {os.path.relpath(keep['path'], args.catalog)}"
+              f" ({keep['width']}×{keep['height']}, {format_bytes(keep['bytes'])})")
+        for image in cluster["duplicates"]:
+            distance = bin(keep["hash"] ^ image["hash"]).count("1")
+            same = "identical bytes" if image["sha256"] == keep["sha256"] else f"{distance} bits apart"
+            print(f"            ~ {os.path.relpath(image['path'], args.catalog)}"
+                  f" ({image['width']}×{image['height']}, {format_bytes(image['bytes'])}, {same})")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n✓ Hashed {len(images)} images in {hashed - started:.2f} s; {compared} candidate pair(s) compared"
+          f" instead of {len(images) * (len(images) - 1) // 2}")
+    print(f"✓ {len(report)} cluster(s) of near-duplicates; {format_bytes(total)} reclaimable ({elapsed:.2f} s total)")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"distance": args.distance, "reclaimable_bytes": total, "clusters": report}, f, indent=2)
+            f.write("\n")
+        print(f"✓ Wrote {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Report asset catalog entries that no source file references.
+
+Builds an index of every asset name in Billix/Assets.xcassets, then scans all
+.swift and .plist files under Billix/ in a process pool. Each file is read once
+and every string literal in it is looked up in the name index (one pass per
+file regardless of how many assets exist), so Image("…"), UIImage(named:),
+Color("…") and names passed through helpers like imageName: "…" all count.
+
+Also recognised:
+  - generated asset symbols (Image(.pigLoading), UIImage(resource: .billixLogo))
+    since the project sets ASSETCATALOG_COMPILER_GENERATE_SWIFT_ASSET_SYMBOL_EXTENSIONS
+  - interpolated literals ("icon_\\(name)") whose fixed prefix matches an asset,
+    reported separately as possibly used
+  - the app icon and accent color named in project.pbxproj build settings
+
+Usage:
+    python3 find_unused_assets.py
+    python3 find_unused_assets.py --json unused_assets.json
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from asset_catalog import DEFAULT_CATALOG, format_bytes, iter_asset_sets
+
+DEFAULT_SOURCE_ROOT = "Billix"
+PROJECT_PATH = "Billix.xcodeproj/project.pbxproj"
+SOURCE_EXTENSIONS = (".swift", ".plist")
+
+# Swift string literal (no multi-line literals needed for asset names)
+STRING_LITERAL = re.compile(r'"((?:[^"\\\n]|\\.)*)"')
+PLIST_STRING = re.compile(r"<string>([^<]*)</string>")
+MEMBER_SYMBOL = re.compile(r"(?<![\w.])\.([A-Za-z_][A-Za-z0-9_]*)")
+INTERPOLATION = re.compile(r"\\\(")
+
+# Shorter interpolated prefixes ("Q\(n)") match too many names to be useful
+MIN_DYNAMIC_PREFIX = 3
+
+BUILD_SETTING_ASSETS = re.compile(
+    r"ASSETCATALOG_COMPILER_(?:APPICON_NAME|GLOBAL_ACCENT_COLOR_NAME|ALTERNATE_APPICON_NAMES)\s*=\s*\"?([^\";]+)\"?;"
+)
+
+
+def symbol_names(asset_name):
+    """
+    Swift identifiers Xcode may generate for an asset name
+    (pig_loading -> pigLoading, NEWEST_MagnifyGlass -> newestMagnifyGlass / NEWESTMagnifyGlass)
+    """
+    words = [w for w in re.split(r"[^A-Za-z0-9]+", asset_name) if w]
+    if not words:
+        return set()
+    rest = "".join(w[:1].upper() + w[1:] for w in words[1:])
+    first = words[0]
+    candidates = {
+        first[:1].lower() + first[1:] + rest,
+        first.lower() + rest,
+        first + rest,
+    }
+    return {c for c in candidates if not c[:1].isdigit()}
+
+
+def build_index(catalog):
+    """
+    Map every asset name to its set path and byte size
+
+    Returns:
+        dict name -> {"path", "bytes", "kind"}
+    """
+    index = {}
+    for name, set_path in iter_asset_sets(catalog):
+        size = sum(os.path.getsize(os.path.join(set_path, f)) for f in os.listdir(set_path))
+        index[name] = {"path": set_path, "bytes": size, "kind": os.path.splitext(set_path)[1][1:]}
+    return index
+
+
+def scan_files(paths, names, symbols):
+    """
+    Scan a batch of source files for references
+
+    Returns:
+        (direct, dynamic) where direct maps asset -> referencing files and
+        dynamic maps asset -> files with a matching interpolated prefix
+    """
+    direct = {}
+    dynamic = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+
+        literals = STRING_LITERAL.findall(text)
+        if path.endswith(".plist"):
+            literals += PLIST_STRING.findall(text)
+
+        for literal in literals:
+            if literal in names:
+                direct.setdefault(literal, set()).add(path)
+                continue
+            match = INTERPOLATION.search(literal)
+            if match and match.start() >= MIN_DYNAMIC_PREFIX:
+                prefix = literal[:match.start()]
+                for name in names:
+                    if name.startswith(prefix):
+                        dynamic.setdefault(name, set()).add(path)
+
+        for identifier in set(MEMBER_SYMBOL.findall(text)):
+            for name in symbols.get(identifier, ()):
+                direct.setdefault(name, set()).add(path)
+
+    return direct, dynamic
+
+
+def collect_sources(root):
+    found = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.endswith(".xcassets")]
+        found.extend(os.path.join(dirpath, f) for f in files if f.endswith(SOURCE_EXTENSIONS))
+    return sorted(found)
+
+
+def build_setting_assets(project_path):
+    """Asset names referenced from build settings (app icon, accent color)"""
+    if not os.path.exists(project_path):
+        return set()
+    with open(project_path, "r") as f:
+        text = f.read()
+    names = set()
+    for value in BUILD_SETTING_ASSETS.findall(text):
+        names.update(value.split())
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find unreferenced assets in the asset catalog")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Asset catalog to index")
+    parser.add_argument("--sources", default=DEFAULT_SOURCE_ROOT, help="Folder with Swift sources")
+    parser.add_argument("--project", default=PROJECT_PATH, help="project.pbxproj for build-setting references")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    index = build_index(args.catalog)
+    names = set(index)
+    symbols = {}
+    for name in names:
+        for symbol in symbol_names(name):
+            symbols.setdefault(symbol, set()).add(name)
+
+    sources = collect_sources(args.sources)
+    print(f"Indexed {len(index)} assets, scanning {len(sources)} source files...")
+
+    jobs = max(1, args.jobs)
+    batches = [sources[i::jobs] for i in range(jobs) if sources[i::jobs]]
+    direct = {}
+    dynamic = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for batch_direct, batch_dynamic in pool.map(scan_files, batches, [names] * len(batches),
+                                                    [symbols] * len(batches)):
+            for name, paths in batch_direct.items():
+                direct.setdefault(name, set()).update(paths)
+            for name, paths in batch_dynamic.items():
+                dynamic.setdefault(name, set()).update(paths)
+
+    for name in build_setting_assets(args.project) & names:
+        direct.setdefault(name, set()).add(args.project)
+
+    unused = sorted((n for n in names if n not in direct and n not in dynamic),
+                    key=lambda n: index[n]["bytes"], reverse=True)
+    maybe = sorted((n for n in names if n not in direct and n in dynamic),
+                   key=lambda n: index[n]["bytes"], reverse=True)
+
+    if unused:
+        print("\nUnreferenced assets:")
+        for name in unused:
+            print(f"  {format_bytes(index[name]['bytes']):>10}  {name} ({index[name]['kind']})")
+    if maybe:
+        print("\nOnly matched by interpolated strings (check manually):")
+        for name in maybe:
+            refs = ", ".join(sorted(os.path.relpath(p) for p in dynamic[name]))
+            print(f"  {format_bytes(index[name]['bytes']):>10}  {name}  <- {refs}")
+
+    total = sum(index[n]["bytes"] for n in unused)
+    print(f"\n✓ {len(direct)} referenced, {len(maybe)} possibly referenced, {len(unused)} unreferenced")
+    print(f"✓ Unreferenced assets take {format_bytes(total)}")
+
+    if args.json_path:
+        report = {
+            "unused": [{"name": n, **index[n]} for n in unused],
+            "possibly_used": [{"name": n, **index[n], "referenced_by": sorted(dynamic[n])} for n in maybe],
+            "used": {n: sorted(direct[n]) for n in sorted(direct)},
+            "unused_bytes": total,
+        }
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"✓ Wrote {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
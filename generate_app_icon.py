@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Generate every AppIcon.appiconset image from one high-resolution master.
+
+The slots (idiom, platform, size, scale) come from the set's own
+Contents.json, so adding a macOS or watch slot in Xcode is enough for the next
+run to fill it. Each slot needs size × scale pixels.
+
+The master is decoded once. A reduction pyramid is built from it by repeated
+2× box reductions (Image.reduce, in premultiplied alpha so transparent edges do
+not bleed dark), and each icon is resampled with Lanczos from the smallest
+level that is still at least REDUCING_GAP times its size. A 16 px icon is
+resampled from a 64 px level instead of filtering all of a 1024 px master,
+at the quality of a direct Lanczos resize. Resampling and PNG encoding run in
+a process pool; slots needing the same pixels share one file.
+
+iOS icons (platform ios or an iOS idiom) are flattened onto --background
+because App Store Connect rejects icons with an alpha channel; macOS icons keep
+their transparency. The master must be square and at least as large as the
+largest slot; it is never upscaled.
+
+PNGs are written atomically, then Contents.json is rewritten atomically to
+reference them, and icon files it no longer references are removed.
+
+Usage:
+    python3 generate_app_icon.py AssetSources/AppIcon.png            # show the plan
+    python3 generate_app_icon.py AssetSources/AppIcon.png --write
+    python3 generate_app_icon.py master.png --background '#0B3D2E' --write
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageColor
+
+from asset_catalog import DEFAULT_CATALOG, format_bytes, load_contents, write_contents, write_file_atomic
+from check_asset_catalog import IOS_ICON_IDIOMS, scale_of, slot_label
+
+DEFAULT_ICON_SET = "AppIcon"
+
+# Resample from a pyramid level at least this many times the target size
+REDUCING_GAP = 2.0
+
+
+def slot_pixels(image):
+    """Pixel size of an icon slot ("size" × "scale"), or None if it has no size"""
+    if not image.get("size"):
+        return None
+    width, height = (float(n) for n in image["size"].split("x"))
+    scale = scale_of(image)
+    return round(width * scale), round(height * scale)
+
+
+def is_ios_slot(image):
+    return image.get("platform") == "ios" or image.get("idiom") in IOS_ICON_IDIOMS
+
+
+def icon_filename(set_name, pixels, opaque):
+    """AppIcon-1024.png for transparent icons, AppIcon-1024-opaque.png for flattened ones"""
+    return f"{set_name}-{pixels}{'-opaque' if opaque else ''}.png"
+
+
+def load_master(path):
+    """
+    Decode the master once, into premultiplied RGBa if it has transparency
+
+    Returns:
+        (Pillow image in RGB or RGBa mode, ICC profile bytes or None)
+    """
+    with Image.open(path) as img:
+        img.load()
+        icc_profile = img.info.get("icc_profile")
+        if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+            return img.convert("RGBA").convert("RGBa"), icc_profile
+        return img.convert("RGB"), icc_profile
+
+
+def build_pyramid(master, smallest):
+    """Master plus successive 2× box reductions, down to the first level under REDUCING_GAP × smallest"""
+    levels = [master]
+    while levels[-1].width / 2 >= smallest * REDUCING_GAP:
+        levels.append(levels[-1].reduce(2))
+    return levels
+
+
+def pick_level(levels, pixels):
+    """Index of the smallest pyramid level at least REDUCING_GAP × pixels wide (the master if none is)"""
+    for index in range(len(levels) - 1, -1, -1):
+        if levels[index].width >= pixels * REDUCING_GAP:
+            return index
+    return 0
+
+
+def render_icons(level, outputs, background, icc_profile):
+    """
+    Resample one pyramid level to each requested icon and encode it
+
+    Args:
+        level: Pyramid level (RGB or RGBa)
+        outputs: List of (filename, pixels, opaque)
+        background: RGB tuple opaque icons are flattened onto
+
+    Returns:
+        list of (filename, PNG bytes)
+    """
+    encoded = []
+    for filename, pixels, opaque in outputs:
+        icon = level if level.width == pixels else level.resize((pixels, pixels), Image.Resampling.LANCZOS)
+        if icon.mode == "RGBa":
+            icon = icon.convert("RGBA")
+            if opaque:
+                flat = Image.new("RGB", icon.size, background)
+                flat.paste(icon, mask=icon.getchannel("A"))
+                icon = flat
+        buf = io.BytesIO()
+        icon.save(buf, "PNG", optimize=True, icc_profile=icc_profile)
+        encoded.append((filename, buf.getvalue()))
+    return encoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate every app icon size from one master image")
+    parser.add_argument("master", help="Square master image, at least as large as the largest slot")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Asset catalog holding the icon set")
+    parser.add_argument("--set", dest="set_name", default=DEFAULT_ICON_SET, help="App icon set name")
+    parser.add_argument("--background", default="white", help="Color iOS icons are flattened onto")
+    parser.add_argument("--write", action="store_true", help="Write the icons and Contents.json")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Worker processes")
+    args = parser.parse_args()
+
+    set_path = os.path.join(args.catalog, f"{args.set_name}.appiconset")
+    contents = load_contents(set_path)
+    images = contents.get("images", [])
+    if not images:
+        print(f"✗ {set_path} has no slots in Contents.json")
+        return 1
+    try:
+        background = ImageColor.getrgb(args.background)[:3]
+    except ValueError as e:
+        print(f"✗ --background: {e}")
+        return 1
+
+    started = time.perf_counter()
+    try:
+        master, icc_profile = load_master(args.master)
+    except OSError as e:
+        print(f"✗ {args.master}: {e}")
+        return 1
+    if master.width != master.height:
+        print(f"✗ {args.master} is {master.width}×{master.height}; app icons need a square master")
+        return 1
+
+    # One output per distinct (pixels, opaque); slots needing the same pixels share it
+    slot_files = []
+    wanted = {}
+    for image in images:
+        pixels = slot_pixels(image)
+        if pixels is None:
+            print(f"~ slot {slot_label(image)} has no size; left as is")
+            slot_files.append(image.get("filename"))
+            continue
+        if pixels[0] != pixels[1]:
+            print(f"✗ slot {slot_label(image)} is not square ({pixels[0]}×{pixels[1]})")
+            return 1
+        opaque = is_ios_slot(image) and master.mode == "RGBa"
+        filename = icon_filename(args.set_name, pixels[0], opaque)
+        wanted[filename] = (pixels[0], opaque)
+        slot_files.append(filename)
+
+    largest = max(pixels for pixels, _opaque in wanted.values())
+    if master.width < largest:
+        print(f"✗ {args.master} is {master.width}×{master.height}; the largest slot needs {largest}×{largest}")
+        return 1
+
+    levels = build_pyramid(master, min(pixels for pixels, _opaque in wanted.values()))
+    by_level = {}
+    for filename, (pixels, opaque) in sorted(wanted.items(), key=lambda item: -item[1][0]):
+        by_level.setdefault(pick_level(levels, pixels), []).append((filename, pixels, opaque))
+
+    pyramid = " → ".join(str(level.width) for level in levels)
+    print(f"Master {master.width}×{master.height} ({'alpha' if master.mode == 'RGBa' else 'opaque'}),"
+          f" pyramid {pyramid}")
+    for index, outputs in sorted(by_level.items()):
+        for filename, pixels, opaque in outputs:
+            slots = ", ".join(slot_label(image) for image, name in zip(images, slot_files) if name == filename)
+            note = ", flattened" if opaque else ""
+            print(f"  {filename}: {pixels}×{pixels} from {levels[index].width} px{note} ({slots})")
+
+    if not args.write:
+        print(f"\n~ Dry run; pass --write to generate {len(wanted)} icon(s) for {len(images)} slot(s)")
+        return 0
+
+    jobs = list(by_level.items())
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(jobs)))) as pool:
+        rendered = list(pool.map(render_icons, [levels[index] for index, _outputs in jobs],
+                                 [outputs for _index, outputs in jobs],
+                                 [background] * len(jobs), [icc_profile] * len(jobs)))
+
+    total = 0
+    for encoded in rendered:
+        for filename, data in encoded:
+            write_file_atomic(os.path.join(set_path, filename), data)
+            total += len(data)
+
+    previous = {image.get("filename") for image in images if image.get("filename")}
+    for image, filename in zip(images, slot_files):
+        if filename:
+            image["filename"] = filename
+    write_contents(set_path, contents)
+
+    removed = sorted(previous - set(slot_files))
+    for filename in removed:
+        path = os.path.join(set_path, filename)
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"- {filename}")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n✓ Wrote {len(wanted)} icon(s) ({format_bytes(total)}) for {len(images)} slot(s)"
+          f" in {elapsed:.2f} s")
+    print(f"✓ Updated {os.path.join(set_path, 'Contents.json')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
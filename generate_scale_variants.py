@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Generate @1x/@2x/@3x variants for imagesets that ship a single oversized
+universal PNG, and rewrite their Contents.json to reference the variants.
+
+The full-resolution master is moved out of the catalog into AssetSources/
+(so it is no longer bundled) and every variant is resampled from it with
+Lanczos filtering. The master is treated as @3x art, capped at --max-points
+points wide; per-imageset overrides can be given in a JSON config:
+
+    {"HousingIcon": {"points": 180}, "pig_loading": {"points": 120}}
+
+Imagesets whose master and outputs still match the hashes recorded in
+asset_variants.lock.json are skipped.
+
+Usage:
+    python3 generate_scale_variants.py                 # report what would change
+    python3 generate_scale_variants.py --write         # generate and rewrite
+    python3 generate_scale_variants.py --write HousingIcon PolicyIcon
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from asset_catalog import DEFAULT_CATALOG, format_bytes, iter_asset_sets, load_contents, write_contents, write_file_atomic
+
+DEFAULT_SOURCES_DIR = "AssetSources"
+DEFAULT_LOCK_FILE = "asset_variants.lock.json"
+SCALES = (1, 2, 3)
+
+# Bump when the resampling or naming logic changes so every set is regenerated
+GENERATOR_VERSION = 1
+
+
+def file_sha256(path):
+    """Hash a file in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def variant_filename(name, scale):
+    """HousingIcon.png, HousingIcon@2x.png, HousingIcon@3x.png"""
+    return f"{name}.png" if scale == 1 else f"{name}@{scale}x.png"
+
+
+def find_source(name, set_path, contents, sources_dir, lock_entry):
+    """
+    Locate the master image for an imageset
+
+    Returns:
+        (source_path, in_catalog) or (None, reason) when the set is not eligible
+    """
+    images = contents.get("images", [])
+    if any(image.get("idiom", "universal") != "universal" or "appearances" in image for image in images):
+        return None, "has idiom/appearance specific images"
+
+    external = os.path.join(sources_dir, f"{name}.png")
+    if os.path.exists(external):
+        return external, False
+
+    referenced = [image["filename"] for image in images if image.get("filename")]
+    if not referenced:
+        return None, "no image file"
+    if len(referenced) > 1 and lock_entry is None:
+        return None, "already has hand-made scale variants"
+    if len(referenced) > 1:
+        return None, f"master missing from {sources_dir}/"
+    if not referenced[0].lower().endswith(".png"):
+        return None, "master is not a PNG"
+    source = os.path.join(set_path, referenced[0])
+    if not os.path.exists(source):
+        return None, f"{referenced[0]} is missing"
+    return source, True
+
+
+def plan_sizes(source_size, points):
+    """Pixel size for every scale, never upscaling past the master"""
+    src_w, src_h = source_size
+    pt_w = min(points, src_w / 3.0)
+    pt_h = pt_w * src_h / src_w
+    return {scale: (max(1, round(pt_w * scale)), max(1, round(pt_h * scale))) for scale in SCALES}
+
+
+def build_key(source_hash, points):
+    """Fingerprint of everything that determines the generated files"""
+    return hashlib.sha256(f"{GENERATOR_VERSION}:{source_hash}:{points}".encode()).hexdigest()
+
+
+def is_up_to_date(set_path, lock_entry, key):
+    """True if the lock matches and every recorded output is still on disk unchanged"""
+    if not lock_entry or lock_entry.get("key") != key:
+        return False
+    for output in lock_entry.get("outputs", {}).values():
+        path = os.path.join(set_path, output["filename"])
+        if not os.path.exists(path) or file_sha256(path) != output["sha256"]:
+            return False
+    return True
+
+
+def generate_variants(name, set_path, source_path, in_catalog, sources_dir, points, write):
+    """
+    Resample one imageset's master into @1x/@2x/@3x and rewrite Contents.json
+
+    Returns:
+        dict describing the result (new lock entry on success)
+    """
+    source_hash = file_sha256(source_path)
+    with Image.open(source_path) as img:
+        img.load()
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA")
+        sizes = plan_sizes(img.size, points)
+        before = os.path.getsize(source_path)
+
+        result = {"name": name, "before": before, "sizes": sizes, "source_size": img.size}
+        if not write:
+            return result
+
+        # Move the master out of the bundle before writing a variant that may reuse its name
+        master_path = source_path
+        if in_catalog:
+            os.makedirs(sources_dir, exist_ok=True)
+            master_path = os.path.join(sources_dir, f"{name}.png")
+            shutil.move(source_path, master_path)
+
+        outputs = {}
+        for scale, size in sizes.items():
+            resized = img if size == img.size else img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            filename = variant_filename(name, scale)
+            path = os.path.join(set_path, filename)
+            resized.save(path, "PNG", optimize=True)
+            outputs[f"{scale}x"] = {"filename": filename, "sha256": file_sha256(path), "size": list(size)}
+
+        # App thinning ships one scale per device, so compare against the largest
+        after = os.path.getsize(os.path.join(set_path, outputs[f"{SCALES[-1]}x"]["filename"]))
+
+    contents = load_contents(set_path)
+    contents["images"] = [
+        {"filename": outputs[f"{scale}x"]["filename"], "idiom": "universal", "scale": f"{scale}x"}
+        for scale in SCALES
+    ]
+    write_contents(set_path, contents)
+
+    result["after"] = after
+    result["lock"] = {
+        "key": build_key(source_hash, points),
+        "source": os.path.relpath(master_path),
+        "source_sha256": source_hash,
+        "points": points,
+        "outputs": outputs,
+    }
+    return result
+
+
+def load_json(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate @1x/@2x/@3x imageset variants")
+    parser.add_argument("names", nargs="*", help="Imageset names to process (default: all)")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Asset catalog to scan")
+    parser.add_argument("--sources-dir", default=DEFAULT_SOURCES_DIR, help="Where full-resolution masters are kept")
+    parser.add_argument("--lock", default=DEFAULT_LOCK_FILE, help="Hash lock file")
+    parser.add_argument("--config", help="JSON file with per-imageset point sizes")
+    parser.add_argument("--max-points", type=float, default=430, help="Default maximum width in points")
+    parser.add_argument("--write", action="store_true", help="Generate files and rewrite Contents.json")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Worker processes")
+    args = parser.parse_args()
+
+    lock = load_json(args.lock)
+    config = load_json(args.config)
+
+    jobs = []
+    for name, set_path in iter_asset_sets(args.catalog, extensions=(".imageset",)):
+        if args.names and name not in args.names:
+            continue
+        lock_entry = lock.get(name)
+        source_path, detail = find_source(name, set_path, load_contents(set_path), args.sources_dir, lock_entry)
+        if source_path is None:
+            print(f"  {name}: skipped ({detail})")
+            continue
+
+        points = float(config.get(name, {}).get("points", args.max_points))
+        key = build_key(file_sha256(source_path), points)
+        if is_up_to_date(set_path, lock_entry, key):
+            print(f"✓ {name}: up to date")
+            continue
+        jobs.append((name, set_path, source_path, detail, args.sources_dir, points, args.write))
+
+    if not jobs:
+        print("\nNothing to do")
+        return 0
+
+    print(f"\nGenerating variants for {len(jobs)} imagesets with {args.jobs} workers...")
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(generate_variants, *zip(*jobs)))
+
+    total_before = 0
+    total_after = 0
+    for result in results:
+        sizes = ", ".join(f"@{scale}x {w}x{h}" for scale, (w, h) in result["sizes"].items())
+        src_w, src_h = result["source_size"]
+        if "lock" in result:
+            lock[result["name"]] = result["lock"]
+            total_before += result["before"]
+            total_after += result["after"]
+            print(f"+ {result['name']}: {src_w}x{src_h} -> {sizes}")
+        else:
+            print(f"~ {result['name']}: would generate {src_w}x{src_h} -> {sizes}")
+
+    if not args.write:
+        print("\nRun again with --write to apply")
+        return 0
+
+    write_file_atomic(args.lock, (json.dumps(lock, indent=2, sort_keys=True) + "\n").encode("utf-8"))
+    print(f"\n✓ Per-device size {format_bytes(total_before)} -> {format_bytes(total_after)} (@{SCALES[-1]}x)")
+    print(f"✓ Masters kept in {args.sources_dir}/, hashes in {args.lock}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Static index advisor for the SQL migrations.
+
+Builds the schema declared by the migrations (sql_schema.py) and checks every
+access path the migrations themselves define against the declared indexes:
+
+  foreign keys    the referencing columns need an index, or every delete on the
+                  parent (and every ON DELETE CASCADE / SET NULL) scans the child
+  RLS policies    USING / WITH CHECK expressions run for every row a query
+                  touches, so auth.uid() comparisons must be indexed
+  functions       WHERE clauses of SELECT/UPDATE/DELETE inside function bodies
+
+Each access is reduced to equality columns (compared with a parameter such as
+auth.uid() or NEW.id), constant filters (status = 'active') and range columns
+(created_at < NOW() - ...). An index is usable when its first key column is
+one of them and its partial predicate (if any) is implied by the filters. When
+no index is usable the access is reported as a sequential-scan risk; when the
+best index ignores the range column a better partial/composite index is
+suggested.
+
+Usage:
+    python3 index_advisor.py
+    python3 index_advisor.py --sql suggested_indexes.sql     # write CREATE INDEX CONCURRENTLY statements
+    python3 index_advisor.py --strict                        # exit 1 when anything is missing (CI)
+"""
+
+import argparse
+import json
+import re
+import sys
+
+import sql_migrations
+from sql_schema import build_schema, column_name, matching_paren, normalize_expression, split_top_level
+
+NAME = sql_migrations.NAME
+
+# A table source that starts a query block (alias optional)
+QUERY_SOURCE = re.compile(
+    rf"\b(FROM|UPDATE|DELETE\s+FROM|JOIN)\s+(?:ONLY\s+)?({NAME})(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?",
+    re.IGNORECASE)
+# Where a WHERE clause (or a JOIN condition) stops
+CLAUSE_END = re.compile(
+    r"\b(?:GROUP\s+BY|ORDER\s+BY|LIMIT|OFFSET|RETURNING|UNION|INTERSECT|EXCEPT|FOR\s+UPDATE|FOR\s+SHARE|"
+    r"LOOP|THEN|ON\s+CONFLICT|WINDOW|HAVING|JOIN|LEFT|RIGHT|INNER|CROSS|WHERE|SET)\b", re.IGNORECASE)
+ALIAS_KEYWORDS = {
+    "where", "set", "on", "join", "left", "right", "inner", "outer", "cross", "group", "order", "limit",
+    "returning", "using", "and", "or", "for", "loop", "then", "union", "into", "values", "select", "when",
+    "natural", "full", "lateral", "having", "window", "offset", "except", "intersect", "do",
+}
+
+COMPARISON = re.compile(r"^(.+?)\s*(=|<>|!=|<=|>=|<|>)\s*(.+)$", re.DOTALL)
+IN_LIST = re.compile(r"^(.+?)\s+(NOT\s+)?IN\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+NULL_TEST = re.compile(r"^(.+?)\s+IS\s+(NOT\s+)?NULL$", re.IGNORECASE)
+BOOLEAN_COLUMN = re.compile(r"^(NOT\s+)?([A-Za-z_][\w.]*)$", re.IGNORECASE)
+CONSTANT = re.compile(r"^(?:'(?:[^']|'')*'(?:::\w+)?|-?\d+(?:\.\d+)?|TRUE|FALSE|NULL)$", re.IGNORECASE)
+COLUMN_REF = re.compile(r'^(?:([A-Za-z_]\w*)\.)?("[^"]+"|[A-Za-z_]\w*)$')
+
+# Cap on OR-branch combinations explored per WHERE clause
+MAX_ALTERNATIVES = 16
+
+
+class Access:
+    """One way the migrations read a table: the columns an index could use"""
+
+    def __init__(self, table, source):
+        self.table = table
+        self.source = source
+        self.equality = set()
+        self.filters = {}
+        self.ranges = set()
+
+    def copy(self):
+        clone = Access(self.table, self.source)
+        clone.equality = set(self.equality)
+        clone.filters = dict(self.filters)
+        clone.ranges = set(self.ranges)
+        return clone
+
+    @property
+    def columns(self):
+        return self.equality | set(self.filters) | self.ranges
+
+    def is_empty(self):
+        return not self.columns
+
+
+class Finding:
+    def __init__(self, kind, table, sources, columns, predicate, detail):
+        self.kind = kind
+        self.table = table
+        self.sources = sources
+        self.columns = columns
+        self.predicate = predicate
+        self.detail = detail
+
+    def index_name(self):
+        short = self.table.split(".")[-1]
+        name = f"idx_{short}_{'_'.join(self.columns)}"
+        if self.predicate:
+            words = re.findall(r"'([^']*)'", self.predicate) or re.findall(r"\b(not null)\b", self.predicate)
+            name += "_" + "_".join(re.sub(r"\W+", "_", w) for w in words[:2])
+        return name[:63]
+
+    def create_statement(self):
+        sql = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.index_name()} ON {self.table.split('.', 1)[1]} ({', '.join(self.columns)})"
+        if self.predicate:
+            sql += f" WHERE {self.predicate}"
+        return sql + ";"
+
+
+def resolve_column(expression, table, alias, columns):
+    """Column name if expression refers to a column of this query block's table, else None"""
+    match = COLUMN_REF.match(expression.strip())
+    if not match:
+        return None
+    qualifier, name = match.group(1), column_name(match.group(2))
+    if qualifier:
+        short = table.split(".")[-1]
+        if qualifier.lower() not in {alias, short} - {None}:
+            return None
+    return name if name in columns else None
+
+
+def references_table(expression, table, alias, columns):
+    """True if an expression mentions any column of the block's table (so it is not a fixed value)"""
+    for token in re.findall(r'(?:[A-Za-z_]\w*\.)?(?:"[^"]+"|[A-Za-z_]\w*)', re.sub(r"'(?:[^']|'')*'", "", expression)):
+        if resolve_column(token, table, alias, columns):
+            return True
+    return False
+
+
+def strip_parens(expression):
+    expression = expression.strip()
+    while expression.startswith("(") and matching_paren(expression, 0) == len(expression) - 1:
+        expression = expression[1:-1].strip()
+    return expression
+
+
+def analyze_conjuncts(expression, base, table, alias, columns):
+    """
+    Expand a boolean expression into alternative Accesses
+
+    AND-ed comparisons accumulate into one Access; an OR produces one
+    alternative per branch (each branch needs its own index for a BitmapOr).
+    """
+    alternatives = [base]
+    for conjunct in split_top_level(strip_parens(expression), "AND"):
+        conjunct = strip_parens(conjunct)
+        branches = split_top_level(conjunct, "OR")
+        if len(branches) > 1:
+            expanded = []
+            for alternative in alternatives:
+                for branch in branches:
+                    expanded.extend(analyze_conjuncts(branch, alternative.copy(), table, alias, columns))
+            alternatives = expanded[:MAX_ALTERNATIVES]
+            continue
+        for alternative in alternatives:
+            add_condition(alternative, conjunct, table, alias, columns)
+    return alternatives
+
+
+def add_condition(access, condition, table, alias, columns):
+    """Record what a single comparison contributes to an Access"""
+    if re.match(r"^(?:NOT\s+)?EXISTS\b", condition, re.IGNORECASE):
+        return
+
+    match = NULL_TEST.match(condition)
+    if match:
+        column = resolve_column(match.group(1), table, alias, columns)
+        if column:
+            access.filters[column] = normalize_expression(f"{column} IS {match.group(2) or ''}NULL")
+        return
+
+    match = IN_LIST.match(condition)
+    if match and not match.group(2):
+        column = resolve_column(match.group(1), table, alias, columns)
+        if column:
+            values = split_top_level(match.group(3))
+            if all(CONSTANT.match(v) for v in values):
+                access.filters[column] = normalize_expression(f"{column} IN ({', '.join(values)})")
+            elif not references_table(match.group(3), table, alias, columns) or \
+                    re.match(r"^\s*SELECT\b", match.group(3), re.IGNORECASE):
+                access.equality.add(column)
+        return
+
+    match = COMPARISON.match(condition)
+    if match:
+        left, operator, right = match.group(1).strip(), match.group(2), match.group(3).strip()
+        column = resolve_column(left, table, alias, columns)
+        value = right
+        if column is None:
+            column = resolve_column(right, table, alias, columns)
+            value = left
+            operator = {"<": ">", ">": "<", "<=": ">=", ">=": "<="}.get(operator, operator)
+        if column is None or references_table(value, table, alias, columns):
+            return
+        if operator == "=":
+            if CONSTANT.match(value):
+                access.filters[column] = normalize_expression(f"{column} = {value}")
+            else:
+                access.equality.add(column)
+        elif operator in ("<", ">", "<=", ">="):
+            access.ranges.add(column)
+        return
+
+    match = BOOLEAN_COLUMN.match(condition)
+    if match:
+        column = resolve_column(match.group(2), table, alias, columns)
+        if column:
+            access.filters[column] = normalize_expression(f"{column} = {'false' if match.group(1) else 'true'}")
+
+
+def where_clause(code, start):
+    """
+    Text of the WHERE clause belonging to the query block starting at start,
+    or None. Only looks at the block's own nesting level.
+    """
+    depth = 0
+    i = start
+    where_start = None
+    while i < len(code):
+        ch = code[i]
+        if ch == "'":
+            end = code.find("'", i + 1)
+            i = len(code) if end == -1 else end + 1
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth < 0:
+                break
+        elif ch == ";" and depth == 0:
+            break
+        elif depth == 0 and (i == 0 or not (code[i - 1].isalnum() or code[i - 1] == "_")):
+            match = CLAUSE_END.match(code, i)
+            if match:
+                word = match.group(0).upper()
+                if where_start is None and word == "WHERE":
+                    where_start = match.end()
+                elif where_start is not None:
+                    break
+                elif word not in ("SET", "JOIN", "LEFT", "RIGHT", "INNER", "CROSS"):
+                    return None
+                i = match.end()
+                continue
+        i += 1
+    if where_start is None:
+        return None
+    return code[where_start:i].strip()
+
+
+def join_condition(code, start):
+    """ON condition of a JOIN whose table ends at start, or None"""
+    match = re.match(r"\s+ON\s+", code[start:], re.IGNORECASE)
+    if not match:
+        return None
+    begin = start + match.end()
+    depth = 0
+    i = begin
+    while i < len(code):
+        ch = code[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth < 0:
+                break
+        elif depth == 0 and (ch == ";" or CLAUSE_END.match(code, i) and not code[i - 1].isalnum()):
+            break
+        i += 1
+    return code[begin:i].strip()
+
+
+def query_accesses(code, source, schema):
+    """Accesses for every FROM/UPDATE/DELETE/JOIN block in some SQL text"""
+    accesses = []
+    code = sql_migrations.strip_comments(code)
+    for match in QUERY_SOURCE.finditer(code):
+        keyword, name, alias = match.group(1).upper(), match.group(2), match.group(3)
+        table = sql_migrations.normalize_name(name)
+        if table not in schema.tables or code[match.end(2):].lstrip().startswith("("):
+            continue
+        if alias and alias.lower() in ALIAS_KEYWORDS:
+            alias = None
+        columns = schema.tables[table].columns
+        end = match.end(3) if alias else match.end(2)
+        condition = join_condition(code, end) if keyword == "JOIN" else where_clause(code, end)
+        if not condition:
+            continue
+        base = Access(table, source)
+        for access in analyze_conjuncts(condition, base, table, alias.lower() if alias else None, columns):
+            if not access.is_empty():
+                accesses.append(access)
+    return accesses
+
+
+def policy_accesses(policy, schema):
+    """Accesses from a policy's USING / WITH CHECK expressions, including their subqueries"""
+    accesses = []
+    source = f'policy "{policy.name}"'
+    table = schema.tables.get(policy.table)
+    for expression in (policy.using, policy.check):
+        if not expression or table is None:
+            continue
+        for access in analyze_conjuncts(expression, Access(policy.table, source), policy.table, None, table.columns):
+            # INSERT checks run against the new row only, no lookup involved
+            if not access.is_empty() and policy.command != "INSERT":
+                accesses.append(access)
+        accesses.extend(query_accesses(expression, source, schema))
+    return accesses
+
+
+def predicate_implied(predicate, access):
+    """True if a partial index predicate holds for every row the access reads"""
+    if predicate is None:
+        return True
+    for part in split_top_level(predicate, "AND"):
+        part = normalize_expression(strip_parens(part))
+        if part in access.filters.values():
+            continue
+        match = NULL_TEST.match(part)
+        if match and match.group(2) and match.group(1) in access.equality | access.ranges:
+            continue
+        match = IN_LIST.match(part)
+        if match and not match.group(2):
+            column = match.group(1).strip()
+            values = {normalize_expression(v) for v in split_top_level(match.group(3))}
+            wanted = access.filters.get(column, "")
+            equal = re.match(rf"^{re.escape(column)}=(.+)$", wanted)
+            if equal and equal.group(1) in values:
+                continue
+        return False
+    return True
+
+
+def usable_indexes(access, indexes):
+    return [index for index in indexes
+            if index.method == "btree" and index.key_columns and index.key_columns[0] in access.columns
+            and predicate_implied(index.predicate, access)]
+
+
+def suggestion(access):
+    """(key columns, partial predicate) that serves an access well"""
+    key = sorted(access.equality)
+    ranges = sorted(access.ranges - access.equality)
+    filters = {c: f for c, f in access.filters.items() if c not in access.equality}
+    if key or ranges:
+        key += ranges[:1]
+        predicate = " AND ".join(filters[c] for c in sorted(filters)) or None
+    else:
+        key = sorted(filters)
+        predicate = None
+    return key, predicate
+
+
+def covers(index, key):
+    """True if the index key starts with the suggested columns (equality part in any order)"""
+    columns = index.key_columns[:len(key)]
+    return len(columns) == len(key) and set(columns[:-1]) == set(key[:-1]) and columns[-1] == key[-1]
+
+
+def analyze(schema):
+    """
+    Returns:
+        list of Finding (kind is "missing", "improve" or "fk")
+    """
+    findings = {}
+
+    def add(kind, table, source, key, predicate, detail):
+        identity = (table, tuple(key), predicate)
+        if identity in findings:
+            if source not in findings[identity].sources:
+                findings[identity].sources.append(source)
+            return
+        findings[identity] = Finding(kind, table, [source], key, predicate, detail)
+
+    for table in schema.tables.values():
+        indexes = schema.indexes_on(table.name)
+        for fk in table.foreign_keys:
+            if any(index.predicate is None and set(index.key_columns[:len(fk.columns)]) == set(fk.columns)
+                   for index in indexes):
+                continue
+            add("fk", table.name, f"foreign key -> {fk.ref_table} (ON DELETE {fk.on_delete})", fk.columns, None,
+                "deletes on the referenced table scan this one")
+
+    accesses = []
+    for policy in schema.policies:
+        accesses.extend(policy_accesses(policy, schema))
+    for function in schema.functions.values():
+        if function.language in ("plpgsql", "sql"):
+            accesses.extend(query_accesses(function.body, f"function {function.name.split('.')[-1]}()", schema))
+
+    for access in accesses:
+        indexes = schema.indexes_on(access.table)
+        key, predicate = suggestion(access)
+        if not key:
+            continue
+        usable = usable_indexes(access, indexes)
+        if not usable:
+            add("missing", access.table, access.source, key, predicate, "no usable index, sequential scan")
+        elif access.ranges and not any(covers(index, key) and predicate_implied(index.predicate, access)
+                                        for index in usable):
+            names = ", ".join(index.name.split(".")[-1] for index in usable)
+            add("improve", access.table, access.source, key, predicate,
+                f"only {names} applies; the range on {', '.join(sorted(access.ranges))} is filtered row by row")
+
+    order = {"missing": 0, "fk": 1, "improve": 2}
+    return sorted(findings.values(), key=lambda f: (order[f.kind], f.table, f.columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest indexes for foreign keys, RLS policies and function queries")
+    parser.add_argument("paths", nargs="*", help="Migration files or folders (default: all feature migrations)")
+    parser.add_argument("--sql", dest="sql_path", help="Write the suggested CREATE INDEX statements to this file")
+    parser.add_argument("--json", dest="json_path", help="Also write the findings as JSON")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 if any access has no usable index")
+    args = parser.parse_args()
+
+    try:
+        migrations = sql_migrations.order(sql_migrations.discover(args.paths))
+        schema = build_schema(migrations)
+        findings = analyze(schema)
+    except sql_migrations.MigrationError as e:
+        print(f"✗ {e}")
+        return 1
+
+    titles = {
+        "missing": "Sequential-scan risks (no usable index)",
+        "fk": "Unindexed foreign keys",
+        "improve": "Indexes that could serve the query better",
+    }
+    for kind, title in titles.items():
+        group = [f for f in findings if f.kind == kind]
+        if not group:
+            continue
+        print(f"\n{title}:")
+        for finding in group:
+            mark = "✗" if kind != "improve" else "~"
+            print(f"{mark} {finding.table}({', '.join(finding.columns)})"
+                  f"{' WHERE ' + finding.predicate if finding.predicate else ''}")
+            print(f"    {finding.detail}")
+            for source in finding.sources:
+                print(f"    <- {source}")
+            print(f"    {finding.create_statement()}")
+
+    missing = sum(1 for f in findings if f.kind in ("missing", "fk"))
+    print(f"\n✓ {len(schema.indexes)} indexes declared on {len(schema.tables)} tables")
+    print(f"{'✗' if missing else '✓'} {missing} unindexed access paths, "
+          f"{sum(1 for f in findings if f.kind == 'improve')} improvable")
+
+    if args.sql_path:
+        with open(args.sql_path, "w") as f:
+            f.write("-- Generated by index_advisor.py\n")
+            # CONCURRENTLY cannot run inside a transaction block
+            f.write("-- migrate:no-transaction\n")
+            for finding in findings:
+                f.write(f"\n-- {finding.detail}\n")
+                for source in finding.sources:
+                    f.write(f"--   {source}\n")
+                f.write(finding.create_statement() + "\n")
+        print(f"✓ Wrote {args.sql_path}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump([{
+                "kind": finding.kind,
+                "table": finding.table,
+                "columns": finding.columns,
+                "predicate": finding.predicate,
+                "detail": finding.detail,
+                "sources": finding.sources,
+                "sql": finding.create_statement(),
+            } for finding in findings], f, indent=2)
+            f.write("\n")
+        print(f"✓ Wrote {args.json_path}")
+
+    return 1 if args.strict and missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+"""
+Lint the SQL migrations for locking hazards and slow DDL.
+
+Every top-level statement is checked for operations that block reads or
+writes on a table that already has data, or that rewrite it:
+
+  index-not-concurrent       CREATE INDEX without CONCURRENTLY (SHARE lock, blocks writes)
+  concurrent-in-transaction  CREATE/DROP INDEX CONCURRENTLY without -- migrate:no-transaction (fails)
+  drop-index-not-concurrent  DROP INDEX without CONCURRENTLY (ACCESS EXCLUSIVE, brief)
+  unique-constraint-build    UNIQUE / PRIMARY KEY added by ALTER TABLE (index built under ACCESS EXCLUSIVE)
+  constraint-validation      FOREIGN KEY / CHECK added without NOT VALID (full scan under the lock)
+  set-not-null               ALTER COLUMN ... SET NOT NULL (full scan under ACCESS EXCLUSIVE)
+  not-null-without-default   ADD COLUMN ... NOT NULL with no DEFAULT (fails on a non-empty table)
+  table-rewrite              volatile DEFAULT, identity/serial/stored generated column, column type
+                             change, SET LOGGED/UNLOGGED/TABLESPACE, VACUUM FULL, CLUSTER
+  full-table-update          UPDATE / DELETE without WHERE (locks every row, one huge transaction)
+  explicit-lock              LOCK TABLE in a mode that blocks writes or reads
+  no-lock-timeout            a lock that blocks writes (SHARE or stronger, explicit LOCK TABLE
+                             included) on an existing table, with no SET [LOCAL] lock_timeout before it
+
+A table is "existing" when an earlier migration created it or no migration
+does (Supabase and pre-existing app tables). Tables created earlier in the same
+file are new and skipped; with CREATE TABLE IF NOT EXISTS they might already
+exist, so their findings are downgraded to warnings.
+
+The time a lock is held is estimated from the table's row count and a
+per-operation throughput, both from the config (migration_lint.json):
+
+    {
+      "default_rows": 1000000,           # tables missing from "rows"
+      "max_lock_seconds": 1.0,           # longer estimated locks are errors, shorter ones warnings
+      "rows_per_second": {"scan": 2000000, "index": 500000, "rewrite": 200000, "update": 50000},
+      "rows": {"public.user_profiles": 250000, "auth.users": 260000}
+    }
+
+Row counts can be refreshed from a live database's statistics with
+--dsn ... --save-rows. A statement (or the comment block above it) containing
+"-- lint:ignore <rule>[,<rule>] <reason>" suppresses those rules for it.
+
+Usage:
+    python3 lint_migrations.py                                   # all feature migrations
+    python3 lint_migrations.py Billix/Features/Home/Migrations/homepage_features.sql
+    python3 lint_migrations.py --strict $(git diff --name-only origin/main -- '*.sql')   # CI
+    python3 lint_migrations.py --dsn "$DATABASE_URL" --save-rows
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import sql_migrations
+from sql_migrations import NAME, normalize_name, strip_comments
+from sql_schema import ADD_COLUMN, ALTER_TABLE, split_top_level
+
+DEFAULT_CONFIG_PATH = "migration_lint.json"
+DEFAULT_CONFIG = {
+    "default_rows": 1_000_000,
+    "max_lock_seconds": 1.0,
+    "rows_per_second": {"scan": 2_000_000, "index": 500_000, "rewrite": 200_000, "update": 50_000},
+    "rows": {},
+}
+
+# What other sessions cannot do while a lock mode is held
+BLOCKS = {
+    "ACCESS EXCLUSIVE": "reads and writes",
+    "EXCLUSIVE": "writes",
+    "SHARE ROW EXCLUSIVE": "writes",
+    "SHARE": "writes",
+    "row locks": "writes to every row",
+}
+
+# Table lock modes (SHARE and stronger) that make later writes queue while they wait
+WRITE_BLOCKING_LOCKS = frozenset({"ACCESS EXCLUSIVE", "EXCLUSIVE", "SHARE ROW EXCLUSIVE", "SHARE"})
+
+CREATE_TABLE = re.compile(
+    r"^CREATE\s+(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?TABLE\s+(IF\s+NOT\s+EXISTS\s+)?"
+    rf"({NAME})", re.IGNORECASE)
+CREATE_INDEX = re.compile(
+    r"^CREATE\s+(UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(IF\s+NOT\s+EXISTS\s+)?"
+    rf"({NAME})?\s*ON\s+(?:ONLY\s+)?({NAME})", re.IGNORECASE)
+DROP_INDEX = re.compile(rf"^DROP\s+INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?({NAME})", re.IGNORECASE)
+DATA_CHANGE = re.compile(rf"^(?:UPDATE|DELETE\s+FROM)\s+(?:ONLY\s+)?({NAME})", re.IGNORECASE)
+LOCK_TABLE = re.compile(
+    r"^LOCK\s+(?:TABLE\s+)?(?:ONLY\s+)?(.+?)(?:\s+IN\s+([A-Z ]+?)\s+MODE)?\s*(?:NOWAIT)?$",
+    re.IGNORECASE | re.DOTALL)
+VACUUM_FULL = re.compile(rf"^VACUUM\s*(?:\(\s*[^)]*\bFULL\b[^)]*\)|\s+FULL\b)(?:\s+\w+)*?\s+({NAME})", re.IGNORECASE)
+CLUSTER = re.compile(rf"^CLUSTER\s+(?:VERBOSE\s+)?({NAME})", re.IGNORECASE)
+LOCK_TIMEOUT = re.compile(r"^(?:SET\s+(?:LOCAL\s+|SESSION\s+)?lock_timeout\s*(?:=|TO)\s*(.+)|RESET\s+lock_timeout)$",
+                          re.IGNORECASE | re.DOTALL)
+# lock_timeout values that mean "wait forever"
+NO_TIMEOUT = re.compile(r"^(?:'?0+\s*(?:ms|s|min)?'?|DEFAULT)$", re.IGNORECASE)
+IGNORE = re.compile(r"--\s*lint:ignore\s+([\w,-]+)")
+
+ADD_CONSTRAINT = re.compile(
+    r"^ADD\s+(?:CONSTRAINT\s+(\S+)\s+)?(PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|CHECK|EXCLUDE)\b(.*)$",
+    re.IGNORECASE | re.DOTALL)
+ALTER_TYPE = re.compile(r"^ALTER\s+(?:COLUMN\s+)?(\S+)\s+(?:SET\s+DATA\s+)?TYPE\s+(.+)$", re.IGNORECASE | re.DOTALL)
+SET_NOT_NULL = re.compile(r"^ALTER\s+(?:COLUMN\s+)?(\S+)\s+SET\s+NOT\s+NULL$", re.IGNORECASE)
+REWRITING_ACTION = re.compile(r"^SET\s+(LOGGED|UNLOGGED|TABLESPACE\b.*)$", re.IGNORECASE)
+
+DEFAULT_EXPRESSION = re.compile(
+    r"\bDEFAULT\s+(.+?)(?=\s+(?:NOT\s+NULL|NULL|UNIQUE|PRIMARY|REFERENCES|CHECK|CONSTRAINT|GENERATED|COLLATE)\b|$)",
+    re.IGNORECASE | re.DOTALL)
+FUNCTION_CALL = re.compile(rf"({NAME})\s*\(")
+VOLATILE_BUILTINS = {
+    "random", "gen_random_uuid", "uuid_generate_v1", "uuid_generate_v4", "clock_timestamp", "timeofday",
+    "nextval", "txid_current", "statement_timestamp", "setseed",
+}
+FUNCTION_VOLATILITY = re.compile(r"\b(IMMUTABLE|STABLE)\b", re.IGNORECASE)
+SERIAL_TYPE = re.compile(r"^\S+\s+(?:SMALL|BIG)?SERIAL\b|^\S+\s+SERIAL[248]\b", re.IGNORECASE)
+TEXT_TYPE = re.compile(r"^(?:TEXT|VARCHAR|CHARACTER\s+VARYING)\s*(?:\(\s*\d+\s*\))?\s*$", re.IGNORECASE)
+
+
+class Finding:
+    """One hazardous statement"""
+
+    def __init__(self, migration, line, rule, table, lock, operation, detail, suggestion, statement):
+        self.migration = migration
+        self.line = line
+        self.rule = rule
+        self.table = table
+        self.lock = lock
+        self.operation = operation
+        self.detail = detail
+        self.suggestion = suggestion
+        self.statement = statement
+        self.severity = "error"
+        self.existing = True
+        self.rows = None
+        self.rows_known = False
+        self.seconds = None
+
+    def estimate(self, config):
+        """Fill rows/seconds from the config; operation None means the lock is brief"""
+        if self.table is None:
+            return
+        rows = config["rows"].get(self.table)
+        self.rows_known = rows is not None
+        self.rows = rows if rows is not None else config["default_rows"]
+        if self.operation:
+            self.seconds = self.rows / config["rows_per_second"][self.operation]
+
+    def as_dict(self):
+        return {
+            "migration": self.migration,
+            "line": self.line,
+            "rule": self.rule,
+            "severity": self.severity,
+            "table": self.table,
+            "lock": self.lock,
+            "blocks": BLOCKS.get(self.lock),
+            "rows": self.rows,
+            "rows_from_config": self.rows_known,
+            "estimated_seconds": round(self.seconds, 2) if self.seconds is not None else None,
+            "detail": self.detail,
+            "suggestion": self.suggestion,
+        }
+
+
+def load_config(path):
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    if path and os.path.exists(path):
+        with open(path) as f:
+            loaded = json.load(f)
+        config.update({key: value for key, value in loaded.items() if key != "rows_per_second"})
+        config["rows_per_second"].update(loaded.get("rows_per_second", {}))
+    config["rows"] = {normalize_name(name): rows for name, rows in config["rows"].items()}
+    return config
+
+
+def live_row_counts(dsn):
+    """Estimated row counts (pg_class.reltuples) of every table in a live database"""
+    from pg_harness import import_psycopg2
+
+    psycopg2 = import_psycopg2()
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT n.nspname || '.' || c.relname, c.reltuples::BIGINT
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind IN ('r', 'p') AND c.reltuples >= 0
+            AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        """)
+        counts = dict(cur.fetchall())
+    conn.close()
+    return counts
+
+
+def top_level_keyword(code, keyword):
+    """True if keyword appears outside parentheses (code has its strings blanked)"""
+    depth = 0
+    for match in re.finditer(rf"[()]|\b{keyword}\b", code, re.IGNORECASE):
+        token = match.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            return True
+    return False
+
+
+def volatile_functions(migrations):
+    """Functions the migrations define without IMMUTABLE or STABLE (Postgres defaults to VOLATILE)"""
+    volatile = set()
+    for migration in migrations:
+        for statement, _line in migration.statements:
+            code = strip_comments(statement, strip_strings=True).strip()
+            match = sql_migrations.CREATE_PATTERNS[2][1].match(code)
+            if match:
+                # Volatility is declared after the body
+                tail = code[code.rfind("$"):]
+                name = normalize_name(match.group(1))
+                if FUNCTION_VOLATILITY.search(tail):
+                    volatile.discard(name)
+                else:
+                    volatile.add(name)
+    return volatile
+
+
+def is_volatile(expression, volatile):
+    for name in FUNCTION_CALL.findall(expression):
+        normalized = normalize_name(name)
+        if normalized.split(".")[-1] in VOLATILE_BUILTINS or normalized in volatile:
+            return True
+    return False
+
+
+def first_line(statement):
+    code = strip_comments(statement).strip()
+    line = code.splitlines()[0] if code else ""
+    return line if len(line) <= 100 else line[:97] + "..."
+
+
+def concurrent_index(unique, name, table, rest):
+    """The CONCURRENTLY IF NOT EXISTS form of a CREATE INDEX"""
+    label = f" {name}" if name else ""
+    rest = re.sub(r"\s+", " ", rest)
+    return f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS{label} ON {table}{rest}"
+
+
+def no_transaction_note():
+    return "(in a -- migrate:no-transaction migration)"
+
+
+def alter_table_findings(code, table, volatile):
+    """(rule, lock, operation, detail, suggestion) for each hazardous ALTER TABLE action"""
+    match = ALTER_TABLE.match(code)
+    if not match:
+        return []
+    found = []
+    short = table.split(".")[-1] if table.startswith("public.") else table
+    for action in split_top_level(match.group(2)):
+        blank = strip_comments(action, strip_strings=True)
+        constraint = ADD_CONSTRAINT.match(action)
+        if constraint:
+            name, kind, rest = constraint.group(1), re.sub(r"\s+", " ", constraint.group(2).upper()), constraint.group(3)
+            not_valid = re.search(r"\bNOT\s+VALID\b", strip_comments(rest, strip_strings=True), re.IGNORECASE)
+            if kind in ("PRIMARY KEY", "UNIQUE") and not re.match(r"\s*USING\s+INDEX\b", rest, re.IGNORECASE):
+                index = name or f"{short}_{'pkey' if kind == 'PRIMARY KEY' else 'key'}"
+                found.append(("unique-constraint-build", "ACCESS EXCLUSIVE", "index",
+                              f"ADD {kind} builds its index while holding the table lock", [
+                                  concurrent_index(True, index, short, f" {rest.strip()}") + ";  "
+                                  + no_transaction_note(),
+                                  f"ALTER TABLE {short} ADD CONSTRAINT {index} {kind} USING INDEX {index};",
+                              ]))
+            elif kind in ("FOREIGN KEY", "CHECK") and not not_valid:
+                lock = "SHARE ROW EXCLUSIVE" if kind == "FOREIGN KEY" else "ACCESS EXCLUSIVE"
+                label = name or f"{short}_{'fkey' if kind == 'FOREIGN KEY' else 'check'}"
+                found.append(("constraint-validation", lock, "scan",
+                              f"ADD {kind} checks every existing row while holding the lock", [
+                                  f"ALTER TABLE {short} ADD CONSTRAINT {label} {kind}{rest.rstrip()} NOT VALID;",
+                                  f"ALTER TABLE {short} VALIDATE CONSTRAINT {label};  (SHARE UPDATE EXCLUSIVE, "
+                                  "reads and writes continue)",
+                              ]))
+            continue
+
+        column = ADD_COLUMN.match(action)
+        if column and not re.match(r"^ADD\s+(?:CONSTRAINT|PRIMARY|UNIQUE|FOREIGN|CHECK|EXCLUDE)\b", action,
+                                   re.IGNORECASE):
+            name = column.group(1)
+            definition = column.group(2)
+            blank_definition = strip_comments(definition, strip_strings=True)
+            column_type = re.split(r"\s+(?:NOT|NULL|DEFAULT|UNIQUE|PRIMARY|REFERENCES|CHECK|CONSTRAINT|GENERATED|"
+                                   r"COLLATE)\b", definition, maxsplit=1, flags=re.IGNORECASE)[0].strip()
+            plain = f"ALTER TABLE {short} ADD COLUMN IF NOT EXISTS {name} {column_type};"
+            default = DEFAULT_EXPRESSION.search(blank_definition)
+
+            if re.search(r"\b(?:UNIQUE|PRIMARY\s+KEY)\b", blank_definition, re.IGNORECASE):
+                kind = "PRIMARY KEY" if re.search(r"\bPRIMARY\s+KEY\b", blank_definition, re.IGNORECASE) else "UNIQUE"
+                index = f"{short}_{name}_key" if kind == "UNIQUE" else f"{short}_pkey"
+                found.append(("unique-constraint-build", "ACCESS EXCLUSIVE", "index",
+                              f"ADD COLUMN ... {kind} builds a unique index on the whole table under the lock", [
+                                  plain,
+                                  f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {short} ({name});  "
+                                  + no_transaction_note(),
+                                  f"ALTER TABLE {short} ADD CONSTRAINT {index} {kind} USING INDEX {index};",
+                              ]))
+            references = re.search(rf"\bREFERENCES\s+({NAME}(?:\s*\([^)]*\))?)", definition, re.IGNORECASE)
+            if references:
+                label = f"{short}_{name}_fkey"
+                target = normalize_name(re.split(r"[(\s]", references.group(1))[0])
+                found.append(("constraint-validation", "SHARE ROW EXCLUSIVE", "scan",
+                              f"ADD COLUMN ... REFERENCES validates every row and also locks {target} against writes", [
+                                  plain,
+                                  f"ALTER TABLE {short} ADD CONSTRAINT {label} FOREIGN KEY ({name}) "
+                                  f"REFERENCES {references.group(1)} NOT VALID;",
+                                  f"ALTER TABLE {short} VALIDATE CONSTRAINT {label};",
+                              ]))
+            if re.search(r"\bCHECK\s*\(", blank_definition, re.IGNORECASE):
+                found.append(("constraint-validation", "ACCESS EXCLUSIVE", "scan",
+                              "ADD COLUMN ... CHECK checks every existing row under the lock", [
+                                  plain,
+                                  f"ALTER TABLE {short} ADD CONSTRAINT {short}_{name}_check CHECK (...) NOT VALID;",
+                                  f"ALTER TABLE {short} VALIDATE CONSTRAINT {short}_{name}_check;",
+                              ]))
+            if re.search(r"\bNOT\s+NULL\b", blank_definition, re.IGNORECASE) and not default:
+                found.append(("not-null-without-default", "ACCESS EXCLUSIVE", None,
+                              "existing rows would be NULL, so this fails on any non-empty table", [
+                                  f"ALTER TABLE {short} ADD COLUMN IF NOT EXISTS {name} {column_type} "
+                                  "NOT NULL DEFAULT <constant>;",
+                              ]))
+
+            rewrite = None
+            if default and is_volatile(default.group(1), volatile):
+                rewrite = f"DEFAULT {default.group(1).strip()} is volatile, so every row is rewritten"
+            elif re.search(r"\bGENERATED\b.*\b(?:STORED|IDENTITY)\b", blank_definition, re.IGNORECASE | re.DOTALL):
+                rewrite = "identity and stored generated columns are filled by rewriting the table"
+            elif SERIAL_TYPE.match(f"{name} {column_type}"):
+                rewrite = "serial columns default to nextval(), so every row is rewritten"
+            if rewrite:
+                found.append(("table-rewrite", "ACCESS EXCLUSIVE", "rewrite", rewrite, [
+                    plain,
+                    f"ALTER TABLE {short} ALTER COLUMN {name} SET DEFAULT ...;  (new rows only)",
+                    "backfill existing rows in keyset batches with a commit per batch (see maintenance_jobs.py)",
+                ]))
+            continue
+
+        type_change = ALTER_TYPE.match(blank)
+        if type_change:
+            column_name, new_type = type_change.group(1), type_change.group(2).strip()
+            detail = f"changing the type of {column_name} rewrites the table and its indexes"
+            if TEXT_TYPE.match(new_type):
+                detail += " (unless it only widens a varchar, which Postgres does in place)"
+            found.append(("table-rewrite", "ACCESS EXCLUSIVE", "rewrite", detail, [
+                f"add a new {new_type} column, backfill it in batches, switch readers, then drop {column_name}",
+            ]))
+            continue
+
+        not_null = SET_NOT_NULL.match(blank)
+        if not_null:
+            column_name = not_null.group(1)
+            label = f"{short}_{column_name}_not_null"
+            found.append(("set-not-null", "ACCESS EXCLUSIVE", "scan",
+                          "SET NOT NULL scans the whole table for NULLs under the lock", [
+                              f"ALTER TABLE {short} ADD CONSTRAINT {label} CHECK ({column_name} IS NOT NULL) NOT VALID;",
+                              f"ALTER TABLE {short} VALIDATE CONSTRAINT {label};",
+                              f"ALTER TABLE {short} ALTER COLUMN {column_name} SET NOT NULL;  (uses the validated "
+                              "check, no scan)",
+                              f"ALTER TABLE {short} DROP CONSTRAINT {label};",
+                          ]))
+            continue
+
+        rewriting = REWRITING_ACTION.match(blank.strip())
+        if rewriting:
+            found.append(("table-rewrite", "ACCESS EXCLUSIVE", "rewrite",
+                          f"SET {rewriting.group(1).split()[0].upper()} rewrites the whole table", [
+                              "avoid on a live table, or rebuild it online with pg_repack",
+                          ]))
+    return found
+
+
+def lint_migration(migration, state, volatile):
+    """
+    Findings for one migration
+
+    Args:
+        state: table name -> "existing" for tables from earlier migrations; updated with this one's tables
+    """
+    findings = []
+    new_tables = {}
+    has_lock_timeout = False
+    unguarded = set()
+
+    def add(line, statement, rule, table, lock, operation, detail, suggestion):
+        status = new_tables.get(table, "existing") if table else "existing"
+        if status == "new":
+            return
+        finding = Finding(migration.name, line, rule, table, lock, operation, detail, suggestion, first_line(statement))
+        finding.existing = status == "existing"
+        ignored = set()
+        for group in IGNORE.findall(statement):
+            ignored.update(group.split(","))
+        if rule not in ignored:
+            findings.append(finding)
+
+        # Waiting for the lock queues every later write (or query) on the table behind it
+        guarded = has_lock_timeout or "no-lock-timeout" in ignored or (line, table) in unguarded
+        if lock in WRITE_BLOCKING_LOCKS and table and not guarded:
+            unguarded.add((line, table))
+            timeout = Finding(migration.name, line, "no-lock-timeout", table, lock, None,
+                              f"{lock} is requested with no lock_timeout; while it waits behind running "
+                              f"transactions, every new {'query' if lock == 'ACCESS EXCLUSIVE' else 'write'} "
+                              "on the table queues behind it", [
+                                  "SET LOCAL lock_timeout = '5s';  right before it (migrate.py retries the "
+                                  "migration when the lock times out)",
+                              ], first_line(statement))
+            timeout.existing = status == "existing"
+            findings.append(timeout)
+
+    for statement, line in migration.statements:
+        code = strip_comments(statement).strip()
+        blank = strip_comments(statement, strip_strings=True).strip()
+
+        match = LOCK_TIMEOUT.match(code)
+        if match:
+            has_lock_timeout = bool(match.group(1)) and not NO_TIMEOUT.match(match.group(1).strip())
+            continue
+
+        match = CREATE_TABLE.match(blank)
+        if match:
+            table = normalize_name(match.group(2))
+            if table not in state:
+                new_tables[table] = "maybe" if match.group(1) else "new"
+            continue
+
+        match = CREATE_INDEX.match(code)
+        if match:
+            unique, concurrently, _if_not_exists, name, table_name = match.groups()
+            table = normalize_name(table_name)
+            if concurrently and not migration.no_transaction:
+                add(line, statement, "concurrent-in-transaction", table, None, None,
+                    "CREATE INDEX CONCURRENTLY cannot run inside the migration's transaction", [
+                        "add -- migrate:no-transaction to this migration",
+                    ])
+            elif not concurrently:
+                rest = code[match.end():]
+                add(line, statement, "index-not-concurrent", table, "SHARE", "index",
+                    "CREATE INDEX blocks writes to the table until the build finishes", [
+                        concurrent_index(bool(unique), name, table_name, rest) + ";  " + no_transaction_note(),
+                    ])
+            continue
+
+        match = DROP_INDEX.match(blank)
+        if match:
+            if match.group(1) and not migration.no_transaction:
+                add(line, statement, "concurrent-in-transaction", None, None, None,
+                    "DROP INDEX CONCURRENTLY cannot run inside the migration's transaction", [
+                        "add -- migrate:no-transaction to this migration",
+                    ])
+            elif not match.group(1):
+                add(line, statement, "drop-index-not-concurrent", None, "ACCESS EXCLUSIVE", None,
+                    "DROP INDEX takes ACCESS EXCLUSIVE on the table; brief, but it waits behind running queries "
+                    "and everything queues behind it", [
+                        f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(2)};  " + no_transaction_note(),
+                    ])
+            continue
+
+        match = ALTER_TABLE.match(blank)
+        if match:
+            table = normalize_name(match.group(1))
+            for rule, lock, operation, detail, suggestion in alter_table_findings(code, table, volatile):
+                add(line, statement, rule, table, lock, operation, detail, suggestion)
+            continue
+
+        match = DATA_CHANGE.match(blank)
+        if match:
+            if not top_level_keyword(blank, "WHERE"):
+                table = normalize_name(match.group(1))
+                verb = blank.split()[0].upper()
+                add(line, statement, "full-table-update", table, "row locks", "update",
+                    f"{verb} without WHERE locks every row and writes the whole table in one transaction", [
+                        f"{verb} in keyset batches with a commit per batch (see maintenance_jobs.py)",
+                    ])
+            continue
+
+        match = LOCK_TABLE.match(blank)
+        if match:
+            mode = re.sub(r"\s+", " ", (match.group(2) or "ACCESS EXCLUSIVE").upper())
+            if mode in BLOCKS:
+                for name in split_top_level(match.group(1)):
+                    add(line, statement, "explicit-lock", normalize_name(name), mode, None,
+                        f"blocks {BLOCKS[mode]} until the migration commits", [
+                            "keep the statements that run under it short",
+                        ])
+            continue
+
+        match = VACUUM_FULL.match(blank) or CLUSTER.match(blank)
+        if match:
+            add(line, statement, "table-rewrite", normalize_name(match.group(1)), "ACCESS EXCLUSIVE", "rewrite",
+                f"{'VACUUM FULL' if blank.upper().startswith('VACUUM') else 'CLUSTER'} rewrites the whole table", [
+                    "rebuild the table online with pg_repack",
+                ])
+
+    for table, status in new_tables.items():
+        state.setdefault(table, status)
+    return findings
+
+
+def lint(migrations, targets, config):
+    """
+    Lint the target migrations, using every migration before them for context
+
+    Args:
+        migrations: all migrations, in dependency order
+        targets: names of the migrations to report on
+    """
+    volatile = volatile_functions(migrations)
+    state = {}
+    findings = []
+    for migration in migrations:
+        found = lint_migration(migration, state, volatile)
+        if migration.name not in targets:
+            continue
+        for finding in found:
+            finding.estimate(config)
+            informational = finding.rule in ("explicit-lock", "drop-index-not-concurrent")
+            always = finding.rule in ("concurrent-in-transaction", "not-null-without-default", "no-lock-timeout")
+            slow = finding.seconds is not None and finding.seconds > config["max_lock_seconds"]
+            if informational or not finding.existing or not (always or slow):
+                finding.severity = "warning"
+            findings.append(finding)
+    return findings
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lint SQL migrations for locking hazards and slow DDL")
+    parser.add_argument("paths", nargs="*", help="Migration files or folders to report on (default: all)")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="Row counts and cost model (JSON)")
+    parser.add_argument("--dsn", help="Take row counts from this database's statistics")
+    parser.add_argument("--save-rows", action="store_true", help="Write the --dsn row counts into --config")
+    parser.add_argument("--json", dest="json_path", help="Also write the findings as JSON")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 if any finding is an error")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.dsn:
+        counts = live_row_counts(args.dsn)
+        config["rows"].update(counts)
+        print(f"✓ Row counts for {len(counts)} tables from the database statistics")
+        if args.save_rows:
+            with open(args.config, "w") as f:
+                json.dump({**config, "rows": dict(sorted(config["rows"].items()))}, f, indent=2)
+                f.write("\n")
+            print(f"✓ Wrote {args.config}")
+
+    try:
+        migrations = sql_migrations.discover()
+        known = {m.name for m in migrations}
+        targets = sql_migrations.discover(args.paths) if args.paths else migrations
+        migrations += [m for m in targets if m.name not in known]
+        findings = lint(sql_migrations.order(migrations), {m.name for m in targets}, config)
+    except sql_migrations.MigrationError as e:
+        print(f"✗ {e}")
+        return 1
+
+    current = None
+    for finding in sorted(findings, key=lambda f: (f.migration, f.line)):
+        if finding.migration != current:
+            current = finding.migration
+            print(f"\n{current}")
+        mark = "✗" if finding.severity == "error" else "~"
+        print(f"{mark} line {finding.line}: {finding.rule}" + (f"  {finding.statement}" if finding.statement else ""))
+        print(f"    {finding.detail}")
+        if finding.table and finding.lock:
+            cost = ""
+            if finding.seconds is not None:
+                source = "" if finding.rows_known else " (default)"
+                cost = f", {finding.rows:,} rows{source} -> ~{format_duration(finding.seconds)}"
+            maybe = "" if finding.existing else " if it already exists"
+            print(f"    {finding.lock} on {finding.table}: blocks {BLOCKS[finding.lock]}{maybe}{cost}")
+        for index, line in enumerate(finding.suggestion):
+            print(f"    {'instead: ' if index == 0 else '         '}{line}")
+
+    errors = sum(1 for f in findings if f.severity == "error")
+    warnings = len(findings) - errors
+    print(f"\n✓ {len({m.name for m in targets})} migrations linted")
+    print(f"{'✗' if errors else '✓'} {errors} blocking operations over {config['max_lock_seconds']} s "
+          f"or without a lock_timeout, {warnings} warnings")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump([finding.as_dict() for finding in findings], f, indent=2)
+            f.write("\n")
+        print(f"✓ Wrote {args.json_path}")
+    return 1 if args.strict and errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Run the database maintenance jobs in small committed batches.
+
+The expiry and reset jobs are keyset-paginated SQL functions (see
+assist_expiry_batches.sql and connection_job_batches.sql) that change at most
+--batch-size rows per call and return a cursor for the next call; the
+regional deal backfill (regional_signal_buckets.sql) keeps its cursor in the
+database and reports when it is done. Each batch
+is committed on its own, so no job holds row locks on more than one batch or
+writes one huge transaction to the WAL. The rollup jobs are single calls.
+
+Every run prints rows touched, batches and time; --report appends the runs as
+JSON lines.
+
+Without --dsn (or BILLIX_TEST_DSN) the jobs run against a temporary local
+Postgres with all migrations applied and --seed rows of overdue data per
+table, which is the way to try them out.
+
+Usage:
+    python3 maintenance_jobs.py run                          # every job once, temporary database
+    python3 maintenance_jobs.py run expire_pending_terms --batch-size 200 --seed 50000
+    python3 maintenance_jobs.py run --dsn "$DATABASE_URL"
+    python3 maintenance_jobs.py schedule --dsn "$DATABASE_URL"   # keep running jobs when due
+    python3 maintenance_jobs.py list
+"""
+
+import argparse
+import datetime
+import json
+import sys
+import time
+
+import sql_migrations
+from migrate import apply_migration, ensure_ledger
+from pg_harness import import_psycopg2, install_stubs, open_database
+
+# name: (SQL function, cursor, how often)
+#   cursor "time" = (after_at, after_id), "id" = (after_id,), None = single call,
+#   "stored" = kept by the function, which only takes the batch size
+#   how often: seconds, or "monthly" for the first tick of each calendar month (UTC)
+JOBS = {
+    "expire_active_assist_requests": ("expire_active_assist_requests_batch", "time", 300),
+    "expire_pending_assist_offers": ("expire_pending_assist_offers_batch", "time", 300),
+    "fail_unpaid_assist_matches": ("fail_unpaid_assist_matches_batch", "time", 300),
+    "expire_pending_terms": ("expire_pending_terms_batch", "time", 300),
+    "reset_monthly_connection_counts": ("reset_monthly_connection_counts_batch", "id", "monthly"),
+    "rollup_poll_votes": ("rollup_poll_votes", None, 60),
+    "backfill_regional_deal_months": ("backfill_regional_deal_months_batch", "stored", 300),
+    "refresh_regional_signals": ("refresh_regional_signals", None, 300),
+}
+
+# Overdue rows for every job, for trying them out on a scratch database
+SEED_SQL = """
+INSERT INTO auth.users (id) SELECT gen_random_uuid() FROM generate_series(1, %(count)s);
+INSERT INTO profiles (id, monthly_connection_count)
+    SELECT id, (random() * 3)::INTEGER FROM auth.users ON CONFLICT (id) DO NOTHING;
+INSERT INTO support_bills (user_id, amount) SELECT id, 100 FROM auth.users;
+INSERT INTO connections (initiator_id, bill_id) SELECT user_id, id FROM support_bills;
+INSERT INTO connection_terms (connection_id, proposer_id, bill_amount, deadline, expires_at)
+    SELECT id, initiator_id, 100, NOW() + INTERVAL '7 days', NOW() + (random() * 4 - 2) * INTERVAL '1 day'
+    FROM connections;
+INSERT INTO assist_requests (requester_id, status, bill_category, bill_provider, bill_amount, bill_due_date,
+                             amount_requested, created_at, matched_at)
+    SELECT id, (ARRAY['active', 'matched', 'fee_pending', 'completed'])[1 + (random() * 3)::INTEGER],
+           'energy', 'PSEG', 100, CURRENT_DATE + 14, 50,
+           NOW() - random() * INTERVAL '14 days', NOW() - random() * INTERVAL '6 days'
+    FROM auth.users;
+INSERT INTO assist_offers (assist_request_id, offerer_id, proposed_terms, created_at)
+    SELECT id, requester_id, '{}', NOW() - random() * INTERVAL '4 days' FROM assist_requests;
+ANALYZE;
+"""
+
+
+def run_job(conn, name, batch_size, pause=0.0, max_batches=None):
+    """
+    Run one job to completion (or max_batches), committing after every batch
+
+    Returns:
+        dict with job, rows (None when the function does not report a count),
+        batches, ms and max_batch_ms
+    """
+    function, cursor_kind, _every = JOBS[name]
+    stats = {"job": name, "rows": 0, "batches": 0, "ms": 0.0, "max_batch_ms": 0.0}
+    started = time.perf_counter()
+
+    if cursor_kind is None:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {function}()")
+            result = cur.fetchone()[0]
+        conn.commit()
+        stats["rows"] = result if isinstance(result, int) else None
+        stats["batches"] = 1
+        stats["ms"] = stats["max_batch_ms"] = (time.perf_counter() - started) * 1000
+        return stats
+
+    after = {"time": (None, None), "id": (None,), "stored": ()}[cursor_kind]
+    placeholders = ", ".join(["%s"] * (len(after) + 1))
+    while max_batches is None or stats["batches"] < max_batches:
+        batch_started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT * FROM {function}({placeholders})", (*after, batch_size))
+            touched, *cursor = cur.fetchone()
+        conn.commit()
+        if cursor[-1] is None:
+            break
+        stats["rows"] += touched
+        stats["batches"] += 1
+        stats["max_batch_ms"] = max(stats["max_batch_ms"], (time.perf_counter() - batch_started) * 1000)
+        if cursor_kind != "stored":
+            after = tuple(cursor)
+        if pause:
+            time.sleep(pause)
+    stats["ms"] = (time.perf_counter() - started) * 1000
+    return stats
+
+
+def print_stats(stats):
+    rows = "done" if stats["rows"] is None else f"{stats['rows']:,} rows"
+    batches = f" in {stats['batches']} batches (slowest {stats['max_batch_ms']:.1f} ms)" if stats["batches"] > 1 else ""
+    print(f"✓ {stats['job']}: {rows}{batches}, {stats['ms']:.1f} ms")
+
+
+def is_due(every, last_run, now):
+    if every == "monthly":
+        return (now.year, now.month) != (last_run.year, last_run.month)
+    return (now - last_run).total_seconds() >= every
+
+
+def prepare_scratch_database(conn, seed):
+    install_stubs(conn)
+    ensure_ledger(conn)
+    for migration in sql_migrations.order(sql_migrations.discover()):
+        apply_migration(conn, migration)
+    if seed:
+        with conn.cursor() as cur:
+            cur.execute(SEED_SQL, {"count": seed})
+        conn.commit()
+        print(f"✓ Seeded {seed:,} rows per table")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run maintenance jobs in committed batches")
+    parser.add_argument("command", choices=("run", "schedule", "list"))
+    parser.add_argument("jobs", nargs="*", help="Jobs to run (default: all)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per batch (default: 500)")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--tick", type=float, default=10.0, help="Seconds between schedule checks")
+    parser.add_argument("--dsn", help="Database (default: $BILLIX_TEST_DSN or a temporary cluster)")
+    parser.add_argument("--seed", type=int, default=10000, help="Overdue rows per table on a temporary database")
+    parser.add_argument("--report", help="Append run stats to this file as JSON lines")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name, (function, cursor_kind, every) in JOBS.items():
+            how = f"every {every}s" if every != "monthly" else "monthly"
+            kind = "batched" if cursor_kind else "single call"
+            print(f"  {name:<34} {function}() {kind}, {how}")
+        return 0
+
+    unknown = [name for name in args.jobs if name not in JOBS]
+    if unknown:
+        print(f"✗ Unknown jobs: {', '.join(unknown)} (see: maintenance_jobs.py list)")
+        return 1
+    jobs = args.jobs or list(JOBS)
+
+    psycopg2 = import_psycopg2()
+    database = open_database(args.dsn)
+    with database:
+        conn = database.connect()
+        if database.__class__.__name__ == "TemporaryPostgres":
+            prepare_scratch_database(conn, args.seed)
+
+        def run(name):
+            try:
+                stats = run_job(conn, name, args.batch_size, args.pause)
+            except psycopg2.Error as e:
+                conn.rollback()
+                print(f"✗ {name}: {str(e).strip()}")
+                return False
+            stats["finished_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            print_stats(stats)
+            if args.report:
+                with open(args.report, "a") as f:
+                    f.write(json.dumps(stats) + "\n")
+            return True
+
+        if args.command == "run":
+            failed = [name for name in jobs if not run(name)]
+            conn.close()
+            return 1 if failed else 0
+
+        # schedule: interval jobs start right away, monthly jobs at the next month
+        now = datetime.datetime.now(datetime.timezone.utc)
+        never = now - datetime.timedelta(days=1)
+        last_run = {name: now if JOBS[name][2] == "monthly" else never for name in jobs}
+        print(f"Scheduling {len(jobs)} jobs (Ctrl-C to stop)")
+        try:
+            while True:
+                now = datetime.datetime.now(datetime.timezone.utc)
+                for name in jobs:
+                    if is_due(JOBS[name][2], last_run[name], now):
+                        run(name)
+                        last_run[name] = now
+                time.sleep(args.tick)
+        except KeyboardInterrupt:
+            pass
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Apply the feature SQL migrations in dependency order.
+
+Migrations are discovered under Billix/Features (see sql_migrations.py),
+ordered so each runs after the migrations creating the objects it uses, and
+applied one transaction per file. Applied files are recorded with their sha256
+in billix_meta.schema_migrations, so re-running skips them; a file that
+changed after it was applied is reported and stops the run unless --force.
+
+A migration that sets lock_timeout and fails because a lock was not granted
+in time (SQLSTATE 55P03) was rolled back completely, so it is retried, up to
+--lock-retries times with a growing pause, instead of stopping the run.
+Migrations that run without a transaction are never retried: their earlier
+statements are already committed.
+
+By default everything runs against a throwaway local Postgres with the Supabase
+auth/storage objects stubbed (pg_harness.py), which makes schema changes
+testable and timeable offline. Use --dsn or BILLIX_TEST_DSN for a real server
+(stubs are only installed with --stubs there).
+
+Usage:
+    python3 migrate.py plan                     # show order, dependencies, external objects
+    python3 migrate.py apply                    # apply everything to a temporary database
+    python3 migrate.py apply --dsn "$DATABASE_URL"
+    python3 migrate.py status --dsn "$DATABASE_URL"
+"""
+
+import argparse
+import sys
+import time
+
+import sql_migrations
+from pg_harness import grant_api_roles, install_stubs, open_database
+
+LEDGER_SQL = """
+CREATE SCHEMA IF NOT EXISTS billix_meta;
+CREATE TABLE IF NOT EXISTS billix_meta.schema_migrations (
+    name TEXT PRIMARY KEY,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    duration_ms INTEGER NOT NULL
+);
+"""
+
+
+# SQLSTATE lock_not_available: lock_timeout expired (or NOWAIT)
+LOCK_NOT_AVAILABLE = "55P03"
+DEFAULT_LOCK_RETRIES = 5
+
+
+class MigrationFailed(Exception):
+    def __init__(self, migration, line, error, pgcode=None):
+        super().__init__(f"{migration.name}:{line}: {error}")
+        self.migration = migration
+        self.line = line
+        self.pgcode = pgcode
+
+
+def ensure_ledger(conn):
+    with conn.cursor() as cur:
+        cur.execute(LEDGER_SQL)
+    conn.commit()
+
+
+def applied_migrations(conn):
+    """Map of migration name -> (checksum, applied_at, duration_ms)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT name, checksum, applied_at, duration_ms FROM billix_meta.schema_migrations")
+        return {name: (checksum, applied_at, duration) for name, checksum, applied_at, duration in cur.fetchall()}
+
+
+def missing_external(conn, external):
+    """External objects the database does not have"""
+    missing = []
+    with conn.cursor() as cur:
+        for kind, name in sorted(external):
+            if kind == "table":
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+            elif kind == "function":
+                schema, function = name.split(".", 1)
+                cur.execute("SELECT EXISTS (SELECT 1 FROM pg_proc p JOIN pg_namespace n ON n.oid = p.pronamespace "
+                            "WHERE n.nspname = %s AND p.proname = %s)", (schema, function))
+            else:
+                continue
+            if not cur.fetchone()[0]:
+                missing.append((kind, name))
+    conn.rollback()
+    return missing
+
+
+def apply_migration(conn, migration):
+    """
+    Run one migration and record it in the ledger
+
+    Transactional migrations run inside a single transaction, so a failure
+    leaves nothing behind. no-transaction migrations run in autocommit and are
+    only recorded once every statement succeeded.
+
+    Returns:
+        Duration in milliseconds
+    """
+    conn.autocommit = migration.no_transaction
+    started = time.perf_counter()
+    line = None
+    try:
+        with conn.cursor() as cur:
+            for statement, line in migration.statements:
+                cur.execute(statement)
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            cur.execute(
+                "INSERT INTO billix_meta.schema_migrations (name, checksum, duration_ms) VALUES (%s, %s, %s) "
+                "ON CONFLICT (name) DO UPDATE SET checksum = EXCLUDED.checksum, applied_at = NOW(), "
+                "duration_ms = EXCLUDED.duration_ms",
+                (migration.name, migration.checksum, duration_ms))
+        if not migration.no_transaction:
+            conn.commit()
+    except Exception as e:
+        if not migration.no_transaction:
+            conn.rollback()
+        raise MigrationFailed(migration, line, str(e).strip(), getattr(e, "pgcode", None)) from e
+    finally:
+        conn.autocommit = False
+    return duration_ms
+
+
+def apply_with_retries(conn, migration, retries=DEFAULT_LOCK_RETRIES, pause=1.0):
+    """
+    apply_migration, retrying a transactional migration whose lock_timeout expired
+
+    Returns:
+        Duration in milliseconds of the attempt that succeeded
+    """
+    for attempt in range(retries + 1):
+        try:
+            return apply_migration(conn, migration)
+        except MigrationFailed as e:
+            if e.pgcode != LOCK_NOT_AVAILABLE or migration.no_transaction or attempt == retries:
+                raise
+            wait = pause * 2 ** attempt
+            print(f"~ {migration.name}:{e.line}: lock not granted in time; retrying in {wait:g} s"
+                  f" ({attempt + 1}/{retries})")
+            time.sleep(wait)
+
+
+def print_plan(migrations):
+    edges, external = sql_migrations.resolve(migrations)
+    ordered = sql_migrations.order(migrations)
+    print("Order:")
+    for index, migration in enumerate(ordered, 1):
+        flags = " (no transaction)" if migration.no_transaction else ""
+        print(f"  {index}. {migration.name}{flags} — {len(migration.statements)} statements")
+        for dependency, objects in sorted(edges[migration.name].items()):
+            names = sorted(name for kind, name in objects if kind != "migration")
+            if len(names) < len(objects):
+                names.insert(0, "depends-on")
+            print(f"       after {dependency} ({', '.join(names)})")
+        for statement, line in migration.skipped:
+            print(f"       skips line {line}: {statement} (transactions are managed by the runner)")
+
+    if external:
+        print("\nExternal objects (must already exist):")
+        for (kind, name), users in sorted(external.items()):
+            print(f"  {kind:<9} {name:<28} <- {', '.join(sorted(users))}")
+
+    for (kind, name), first, second in sql_migrations.redefinitions(migrations):
+        print(f"! {kind} {name} is defined by both {first} and {second} with no dependency between them")
+    return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply SQL migrations in dependency order")
+    parser.add_argument("command", choices=("plan", "apply", "status"))
+    parser.add_argument("paths", nargs="*", help="Migration files or folders (default: all feature migrations)")
+    parser.add_argument("--dsn", help="Existing database (default: $BILLIX_TEST_DSN or a temporary cluster)")
+    parser.add_argument("--stubs", action="store_true", help="Install the Supabase stubs on --dsn databases too")
+    parser.add_argument("--force", action="store_true", help="Re-apply migrations whose checksum changed")
+    parser.add_argument("--lock-retries", type=int, default=DEFAULT_LOCK_RETRIES,
+                        help=f"Retries after a lock_timeout (default: {DEFAULT_LOCK_RETRIES})")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary cluster's data folder")
+    args = parser.parse_args()
+
+    try:
+        migrations = sql_migrations.discover(args.paths)
+        if not migrations:
+            print("No migrations found")
+            return 0
+        if args.command == "plan":
+            print_plan(migrations)
+            return 0
+        ordered = sql_migrations.order(migrations)
+        _edges, external = sql_migrations.resolve(migrations)
+    except sql_migrations.MigrationError as e:
+        print(f"✗ {e}")
+        return 1
+
+    database = open_database(args.dsn, keep=args.keep)
+    temporary = database.__class__.__name__ == "TemporaryPostgres"
+    with database:
+        conn = database.connect()
+        if temporary or args.stubs:
+            install_stubs(conn)
+        ensure_ledger(conn)
+        applied = applied_migrations(conn)
+
+        if args.command == "status":
+            for migration in ordered:
+                record = applied.get(migration.name)
+                if record is None:
+                    print(f"  pending  {migration.name}")
+                elif record[0] != migration.checksum:
+                    print(f"✗ changed  {migration.name} (applied {record[1]:%Y-%m-%d %H:%M})")
+                else:
+                    print(f"✓ applied  {migration.name} ({record[1]:%Y-%m-%d %H:%M}, {record[2]} ms)")
+            return 0
+
+        missing = missing_external(conn, external)
+        if missing:
+            for kind, name in missing:
+                print(f"✗ missing {kind} {name}")
+            print("Create these first (or use --stubs on a scratch database)")
+            return 1
+
+        total_ms = 0
+        for migration in ordered:
+            record = applied.get(migration.name)
+            if record is not None and record[0] == migration.checksum:
+                print(f"  {migration.name}: already applied")
+                continue
+            if record is not None and not args.force:
+                print(f"✗ {migration.name} changed since it was applied; use --force to re-apply")
+                return 1
+            try:
+                duration_ms = apply_with_retries(conn, migration, args.lock_retries)
+            except MigrationFailed as e:
+                print(f"✗ {e}")
+                return 1
+            total_ms += duration_ms
+            print(f"✓ {migration.name}: {len(migration.statements)} statements in {duration_ms} ms")
+
+        if temporary:
+            grant_api_roles(conn)
+        conn.close()
+        print(f"\n✓ Applied in {total_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Move or rename files and folders on disk and in project.pbxproj together,
+keeping every object ID.
+
+Moving views used to mean remove_old_analysis_files.py followed by
+add_component_files.py: the references were deleted and re-added with new
+random IDs and SOURCE_ROOT paths, the whole file was rewritten twice, and the
+diff no longer showed a move. This works like mv instead:
+
+  - each file reference and group keeps its ID; a moved group is re-parented
+    whole, with its children
+  - the destination group is found by folder (or created, one group per
+    missing folder level), and children lists are updated on both sides
+  - paths are rewritten <group>-relative; a reference below a moved folder
+    whose path would no longer resolve (SOURCE_ROOT, ../../ paths) is
+    rewritten too
+  - renamed files get their name, comments and file type updated; build
+    settings naming a moved path (INFOPLIST_FILE, DEVELOPMENT_ASSET_PATHS,
+    ...) and exceptions of synchronized folders are updated
+  - disk moves use git mv for tracked files, so history follows the file
+
+All edits are applied to the parsed project and written once, and only the
+objects that changed are rewritten in the file.
+
+Usage:
+    python3 move_project_files.py Billix/Features/Home/Components/AlertCard.swift Billix/Features/Home/Cards/
+    python3 move_project_files.py Billix/Features/Explore/Views/Economy Billix/Features/Economy
+    python3 move_project_files.py A.swift B.swift Billix/Features/Shared --dry-run
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+import pbxproj
+
+GROUP_ISAS = ("PBXGroup", "PBXFileSystemSynchronizedRootGroup")
+
+
+class MoveError(Exception):
+    """A move that cannot be done as asked"""
+
+
+def plan_moves(sources, destination, project_dir):
+    """
+    Work out old path -> new path for each source, like mv
+
+    Returns:
+        List of (old, new) paths relative to the project directory
+    """
+    def relative(path):
+        return os.path.normpath(os.path.relpath(os.path.abspath(path), project_dir))
+
+    into = len(sources) > 1 or destination.endswith("/") or os.path.isdir(os.path.join(project_dir, destination))
+    destination = relative(destination)
+    moves = []
+    for source in sources:
+        old = relative(source)
+        new = os.path.join(destination, os.path.basename(old)) if into else destination
+        if not os.path.exists(os.path.join(project_dir, old)):
+            raise MoveError(f"{old} does not exist")
+        if os.path.exists(os.path.join(project_dir, new)):
+            raise MoveError(f"{new} already exists")
+        if new == old or new.startswith(old + "/"):
+            raise MoveError(f"cannot move {old} into itself")
+        moves.append((old, new))
+    return moves
+
+
+def moved_path(path, moves):
+    """Where a path ends up after the moves, or None if it does not move"""
+    for old, new in moves:
+        if path == old:
+            return new
+        if path.startswith(old + "/"):
+            return new + path[len(old):]
+    return None
+
+
+def rekey(project, object_id, comment):
+    """Replace an object's key so it carries a new comment (the ID stays)"""
+    obj = project.objects.pop(object_id)
+    key = pbxproj.Commented(str(object_id), comment)
+    project.objects[key] = obj
+    return key
+
+
+def annotated(*values):
+    """A value with the comments of its IDs made significant, for comparing objects as written"""
+    def walk(value):
+        if isinstance(value, dict):
+            return {walk(k): walk(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [walk(item) for item in value]
+        return (str(value), getattr(value, "comment", None))
+    return walk(list(values))
+
+
+class Mover:
+    def __init__(self, project, project_dir):
+        self.project = project
+        self.project_dir = project_dir
+        self.paths = project.resolve_paths()
+        self.parents = project.parents()
+        self.created = []
+
+    def folder_group(self, folder):
+        """The group for a folder, creating groups for missing levels under the nearest existing one"""
+        for object_id, obj in self.project.objects_of(*GROUP_ISAS):
+            if self.paths.get(object_id) == folder and (obj.get("path") or folder == "."):
+                return object_id
+        if folder == ".":
+            return self.project.project_object()["mainGroup"]
+        parent = self.folder_group(os.path.dirname(folder) or ".")
+        name = os.path.basename(folder)
+        group_id = pbxproj.Commented(self.project.new_id(f"group:{folder}"), name)
+        self.project.objects[group_id] = {"isa": "PBXGroup", "children": [], "path": name, "sourceTree": "<group>"}
+        self.project.objects[parent]["children"].append(group_id)
+        self.paths[group_id] = folder
+        self.parents[group_id] = parent
+        self.created.append(folder)
+        return group_id
+
+    def move(self, moves):
+        """
+        Apply the moves to the project graph
+
+        Returns:
+            List of (object ID, old path, new path) for every object whose path moved
+        """
+        objects = self.project.objects
+        affected = []
+        for object_id, path in self.paths.items():
+            new_path = moved_path(path, moves) if path else None
+            if new_path is not None:
+                affected.append((object_id, path, new_path))
+
+        # Objects that are exactly a source move to the destination group and
+        # the rest of each subtree comes along with them. A folder no group
+        # stands for has its files moved one by one into groups for their
+        # new folders
+        def is_folder_group(object_id):
+            obj = objects[object_id]
+            return obj.get("isa") in GROUP_ISAS and bool(obj.get("path"))
+
+        moved_groups = {object_id for object_id, _path, _new in affected if is_folder_group(object_id)}
+        grouped = {self.paths[object_id] for object_id in moved_groups}
+        regrouped = set()
+        for object_id, path, new_path in affected:
+            source = next(old for old, _new in moves if path == old or path.startswith(old + "/"))
+            if path == source and (is_folder_group(object_id) or objects[object_id].get("isa") == "PBXFileReference"):
+                if self.reparent(object_id, new_path):
+                    regrouped.add(object_id)
+                self.rename(object_id, os.path.basename(path), os.path.basename(new_path))
+            elif (source not in grouped and objects[object_id].get("isa") == "PBXFileReference"
+                  and self.parents.get(object_id) not in moved_groups):
+                if self.reparent(object_id, new_path):
+                    regrouped.add(object_id)
+
+        # Rewrite every path that no longer resolves where it should, parents
+        # first; anything that changed group becomes <group>-relative
+        for object_id, _path, new_path in sorted(affected, key=lambda item: item[2].count("/")):
+            self.paths = self.project.resolve_paths()
+            if self.paths.get(object_id) == new_path and object_id not in regrouped:
+                continue
+            obj = objects[object_id]
+            if obj.get("sourceTree") == "SOURCE_ROOT" and object_id not in regrouped:
+                obj["path"] = new_path
+            else:
+                obj["sourceTree"] = "<group>"
+                parent = self.parents.get(object_id)
+                base = self.paths.get(parent, ".") if parent else "."
+                obj["path"] = os.path.relpath(new_path, base)
+            if obj.get("name") == obj["path"]:
+                del obj["name"]
+        self.paths = self.project.resolve_paths()
+        self.recomment(object_id for object_id, _path, _new in affected)
+        return affected
+
+    def reparent(self, object_id, new_path):
+        """Move an object from its group to the group of new_path's folder; returns True if it moved"""
+        old_parent = self.parents.get(object_id)
+        if old_parent is None:
+            return False
+        new_parent = self.folder_group(os.path.dirname(new_path) or ".")
+        if old_parent == new_parent:
+            return False
+        siblings = self.project.objects[old_parent]["children"]
+        entry = next(child for child in siblings if child == object_id)
+        siblings.remove(entry)
+        self.project.objects[new_parent]["children"].append(entry)
+        self.parents[object_id] = new_parent
+        return True
+
+    def rename(self, object_id, old_name, new_name):
+        """Update name and file type of a file or group whose last path component changes"""
+        if old_name == new_name:
+            return
+        obj = self.project.objects[object_id]
+        if obj.get("name") == old_name:
+            obj["name"] = new_name
+        extension = os.path.splitext(new_name)[1]
+        if obj.get("isa") == "PBXFileReference" and extension != os.path.splitext(old_name)[1]:
+            if extension in pbxproj.FILE_TYPES:
+                obj["lastKnownFileType"] = pbxproj.FILE_TYPES[extension][0]
+            else:
+                obj.pop("lastKnownFileType", None)
+
+    def recomment(self, object_ids):
+        """Give moved objects the comment Xcode writes (name, else path), and "<comment> in <phase>" to their build files"""
+        objects = self.project.objects
+        renamed = {}
+        for object_id in object_ids:
+            obj = objects[object_id]
+            comment = obj.get("name") or obj.get("path")
+            old = getattr(object_id, "comment", None)
+            if comment and comment != old:
+                renamed[rekey(self.project, object_id, comment)] = (old, comment)
+        for build_file_id, build_file in list(objects.items()):
+            if build_file.get("isa") == "PBXBuildFile" and build_file.get("fileRef") in renamed:
+                old, comment = renamed[build_file["fileRef"]]
+                phase = getattr(build_file_id, "comment", "") or ""
+                suffix = phase[len(old):] if old and phase.startswith(old) else ""
+                rekey(self.project, build_file_id, comment + suffix)
+
+    def update_settings(self, moves):
+        """Rewrite build settings that name a moved path; returns the settings changed"""
+        changed = []
+        patterns = [(re.compile(r"(?<![\w/.])" + re.escape(old) + r"(?=$|[/\s\"])"), new) for old, new in moves]
+
+        def rewrite(value):
+            for pattern, new in patterns:
+                value = pattern.sub(new, value)
+            return value
+
+        for config_id, config in self.project.objects_of("XCBuildConfiguration"):
+            settings = config.get("buildSettings", {})
+            for key, value in settings.items():
+                updated = [rewrite(v) for v in value] if isinstance(value, list) else rewrite(value)
+                if updated != value:
+                    settings[key] = updated
+                    changed.append(f"{config.get('name', config_id)}: {key}")
+        return changed
+
+    def update_exceptions(self, moves):
+        """Keep synchronized-folder exceptions pointing at the moved files; returns warnings"""
+        objects = self.project.objects
+        warnings = []
+        for group_id, group in self.project.objects_of("PBXFileSystemSynchronizedRootGroup"):
+            folder = self.paths.get(group_id)
+            for exception_id in group.get("exceptions", []):
+                exception = objects[exception_id]
+                kept = []
+                original = self.original_folder(folder, moves)
+                for relative in exception.get("membershipExceptions", []):
+                    before = os.path.join(original, relative)
+                    target = moved_path(before, moves) or before
+                    if target.startswith(folder + "/"):
+                        kept.append(os.path.relpath(target, folder))
+                    else:
+                        warnings.append(f"{target} left {folder}; its exception was dropped")
+                exception["membershipExceptions"] = kept
+        return warnings
+
+    @staticmethod
+    def original_folder(folder, moves):
+        """Where a folder was before the moves"""
+        for old, new in moves:
+            if folder == new:
+                return old
+            if folder.startswith(new + "/"):
+                return old + folder[len(new):]
+        return folder
+
+
+def tracked_by_git(path, cwd):
+    result = subprocess.run(["git", "ls-files", "--error-unmatch", path], cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def move_on_disk(moves, project_dir, use_git):
+    for old, new in moves:
+        os.makedirs(os.path.join(project_dir, os.path.dirname(new) or "."), exist_ok=True)
+        if use_git and tracked_by_git(old, project_dir):
+            subprocess.run(["git", "mv", old, new], cwd=project_dir, check=True)
+        else:
+            os.rename(os.path.join(project_dir, old), os.path.join(project_dir, new))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move files and folders on disk and in the project, keeping IDs")
+    parser.add_argument("paths", nargs="+", help="SOURCE... DESTINATION, as with mv")
+    parser.add_argument("--project", default=pbxproj.PROJECT_PATH, help="project.pbxproj to update")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would change; touch nothing")
+    parser.add_argument("--no-git", action="store_true", help="Move with os.rename even for tracked files")
+    args = parser.parse_args()
+    if len(args.paths) < 2:
+        parser.error("need at least one SOURCE and a DESTINATION")
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(args.project)))
+    with open(args.project, "r", encoding="utf-8") as f:
+        original_text = f.read()
+    project = pbxproj.loads(original_text)
+    before = pbxproj.loads(original_text)
+
+    try:
+        moves = plan_moves(args.paths[:-1], args.paths[-1], project_dir)
+    except MoveError as e:
+        print(f"✗ {e}")
+        return 1
+
+    mover = Mover(project, project_dir)
+    affected = mover.move(moves)
+    settings = mover.update_settings(moves)
+    warnings = mover.update_exceptions(moves)
+    project.refresh_comments()
+
+    for old, new in moves:
+        count = sum(1 for _id, path, _new in affected if path == old or path.startswith(old + "/"))
+        mark = "✓" if count else "~"
+        print(f"{mark} {old} -> {new} ({count} project object(s))")
+    for folder in mover.created:
+        print(f"  + group {folder}")
+    for setting in settings:
+        print(f"  ~ build setting {setting}")
+    for warning in warnings:
+        print(f"  ~ {warning}")
+
+    lost = set(before.objects) - set(project.objects)
+    if lost:
+        print(f"✗ {len(lost)} object(s) would lose their ID; nothing was changed")
+        return 1
+    after = {key: annotated(key, obj) for key, obj in project.objects.items()}
+    changed = sum(1 for key, obj in before.objects.items() if annotated(key, obj) != after[key])
+    print(f"  {changed} object(s) rewritten, {len(mover.created)} group(s) created, every existing ID kept")
+
+    if args.dry_run:
+        print("~ Dry run; nothing was moved")
+        return 0
+    move_on_disk(moves, project_dir, use_git=not args.no_git)
+    pbxproj.save(project, args.project)
+    print(f"✓ Moved {len(moves)} path(s) and updated {args.project}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
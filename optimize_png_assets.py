@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Shrink the PNGs in Billix/Assets.xcassets.
+
+Every image is run through several re-encoding strategies in parallel and only
+the smallest result is kept:
+
+  recompress  re-deflate the existing IDAT stream at maximum zlib effort
+  pillow      re-encode with Pillow's optimizer (adaptive scanline filters)
+  reduce      lossless color-type reduction (RGBA -> RGB, <=256 colors -> palette,
+              gray RGB -> L/LA) followed by the Pillow optimizer
+  quantize    256-color palette quantization (only with --lossy)
+
+Each candidate is decoded again and compared against the original pixels.
+Lossless candidates must match exactly, lossy ones must stay above --min-psnr.
+Nothing is written unless --write is given.
+
+Usage:
+    python3 optimize_png_assets.py                    # report only
+    python3 optimize_png_assets.py --write            # apply to the catalog
+    python3 optimize_png_assets.py --lossy --write    # also allow quantization
+"""
+
+import argparse
+import io
+import math
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageChops, ImageStat
+
+from asset_catalog import DEFAULT_CATALOG, format_bytes, iter_catalog_images, write_file_atomic
+from png_utils import COLOR_CHUNKS, METADATA_CHUNKS, PNG_SIGNATURE, PNGError, iter_chunks, make_chunk, parse_ihdr
+
+# Rendering chunks carried over onto Pillow-encoded candidates
+# (PLTE/tRNS are produced by the encoder itself, sBIT depends on the color type)
+CARRIED_COLOR_CHUNKS = COLOR_CHUNKS - {b"PLTE", b"tRNS", b"sBIT"}
+
+# Chunks describing a gray or an RGB color space, never valid on the other kind of image
+PROFILE_CHUNKS = {b"iCCP", b"cHRM"}
+GRAY_COLOR_TYPES = {0, 4}
+
+ZLIB_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)
+
+
+def recompress_idat(data, keep_metadata=False):
+    """
+    Re-deflate the IDAT stream without touching scanline filters or pixels
+
+    Args:
+        data: Original PNG bytes
+        keep_metadata: Keep text/exif/time chunks instead of dropping them
+    """
+    chunks = list(iter_chunks(data))
+    raw = zlib.decompress(b"".join(body for ctype, body in chunks if ctype == b"IDAT"))
+
+    best = None
+    for strategy in ZLIB_STRATEGIES:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+        packed = compressor.compress(raw) + compressor.flush()
+        if best is None or len(packed) < len(best):
+            best = packed
+
+    out = [PNG_SIGNATURE]
+    wrote_idat = False
+    for ctype, body in chunks:
+        if ctype == b"IDAT":
+            if not wrote_idat:
+                out.append(make_chunk(b"IDAT", best))
+                wrote_idat = True
+            continue
+        if ctype in METADATA_CHUNKS and not keep_metadata:
+            continue
+        out.append(make_chunk(ctype, body))
+    return b"".join(out)
+
+
+def splice_color_chunks(candidate, original_chunks):
+    """
+    Copy the original rendering chunks (iCCP, sRGB, gAMA...) onto a Pillow-encoded
+    candidate so it displays the same way as the source image
+
+    iCCP and cHRM are only copied when the candidate is gray exactly when the
+    source is: an RGB profile on a grayscale PNG is rejected or ignored by
+    decoders. optimize_image avoids such candidates for profiled sources.
+    """
+    candidate_chunks = list(iter_chunks(candidate))
+    same_family = (parse_ihdr(candidate_chunks[0][1])["color_type"] in GRAY_COLOR_TYPES) == (
+        parse_ihdr(original_chunks[0][1])["color_type"] in GRAY_COLOR_TYPES)
+    carried = [(ctype, body) for ctype, body in original_chunks
+               if ctype in CARRIED_COLOR_CHUNKS and (same_family or ctype not in PROFILE_CHUNKS)]
+    if not carried:
+        return candidate
+
+    out = [PNG_SIGNATURE]
+    inserted = False
+    for ctype, body in candidate_chunks:
+        if ctype in CARRIED_COLOR_CHUNKS:
+            continue
+        if not inserted and ctype in (b"PLTE", b"IDAT"):
+            out.extend(make_chunk(c, b) for c, b in carried)
+            inserted = True
+        out.append(make_chunk(ctype, body))
+    return b"".join(out)
+
+
+def encode_png(img):
+    """Encode with Pillow's optimizer at maximum compression"""
+    buf = io.BytesIO()
+    params = {"optimize": True, "compress_level": 9}
+    if "transparency" in img.info and img.mode in ("P", "L", "RGB"):
+        params["transparency"] = img.info["transparency"]
+    img.save(buf, "PNG", **params)
+    return buf.getvalue()
+
+
+def reduce_colors(rgba, gray=None):
+    """
+    Losslessly pick the smallest color type able to represent an RGBA image
+
+    Args:
+        rgba: Source pixels
+        gray: True to only allow gray results (L/LA), False to only allow
+            color ones (palette/RGB), None for any
+
+    Returns:
+        A new image, or None if no reduction is possible
+    """
+    alpha_extrema = rgba.getchannel("A").getextrema()
+    opaque = alpha_extrema == (255, 255)
+
+    colors = rgba.getcolors(256) if gray is not True else None
+    if colors is not None:
+        # <=256 distinct RGBA values: exact palette, transparency via tRNS
+        lookup = {bytes(color): index for index, (_count, color) in enumerate(colors)}
+        raw = rgba.tobytes()
+        indices = bytes(lookup[raw[i:i + 4]] for i in range(0, len(raw), 4))
+        palette_img = Image.frombytes("P", rgba.size, indices)
+        palette = []
+        alphas = []
+        for _count, (r, g, b, a) in colors:
+            palette.extend((r, g, b))
+            alphas.append(a)
+        palette_img.putpalette(palette)
+        if not opaque:
+            palette_img.info["transparency"] = bytes(alphas)
+        return palette_img
+
+    r, g, b, _a = rgba.split()
+    is_gray = ImageChops.difference(r, g).getbbox() is None and ImageChops.difference(g, b).getbbox() is None
+    if is_gray and gray is not False:
+        return r if opaque else Image.merge("LA", (r, rgba.getchannel("A")))
+    if opaque and gray is not True:
+        return rgba.convert("RGB")
+    return None
+
+
+def quantize_colors(rgba):
+    """Lossy 256-color palette quantization"""
+    if rgba.getchannel("A").getextrema() == (255, 255):
+        return rgba.convert("RGB").quantize(256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    return rgba.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+
+def psnr(reference, candidate):
+    """Peak signal-to-noise ratio in dB between two RGBA images"""
+    diff = ImageChops.difference(reference, candidate)
+    stat = ImageStat.Stat(diff)
+    pixel_count = reference.size[0] * reference.size[1]
+    mse = sum(stat.sum2) / (pixel_count * len(stat.sum2))
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(255 * 255 / mse)
+
+
+def decode_rgba(data):
+    """Decode PNG bytes into an RGBA image"""
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img.convert("RGBA")
+
+
+def optimize_image(path, write=False, lossy=False, min_psnr=45.0, keep_metadata=False):
+    """
+    Try every strategy on one PNG and keep the smallest verified result
+
+    Returns:
+        dict with path, original, best, strategy and psnr (for lossy results)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    result = {"path": path, "original": len(data), "best": len(data), "strategy": None, "psnr": None}
+
+    try:
+        chunks = list(iter_chunks(data))
+    except PNGError as e:
+        result["error"] = str(e)
+        return result
+
+    chunk_types = {ctype for ctype, _body in chunks}
+    if b"acTL" in chunk_types:
+        result["error"] = "animated PNG, skipped"
+        return result
+
+    ihdr = parse_ihdr(chunks[0][1])
+    reference = decode_rgba(data)
+    # A source with an ICC profile or chromaticities keeps its gray/color kind
+    profiled_gray = ihdr["color_type"] in GRAY_COLOR_TYPES if chunk_types & PROFILE_CHUNKS else None
+
+    candidates = [("recompress", lambda: recompress_idat(data, keep_metadata))]
+
+    # Pillow truncates 16-bit channels, so only the raw re-deflate is safe there
+    if ihdr["bit_depth"] <= 8:
+        source = Image.open(io.BytesIO(data))
+        source.load()
+        candidates.append(("pillow", lambda: splice_color_chunks(encode_png(source), chunks)))
+
+        def reduced():
+            img = reduce_colors(reference, gray=profiled_gray)
+            return None if img is None else splice_color_chunks(encode_png(img), chunks)
+
+        candidates.append(("reduce", reduced))
+        if lossy and profiled_gray is not True:
+            candidates.append(("quantize", lambda: splice_color_chunks(encode_png(quantize_colors(reference)), chunks)))
+
+    best_data = None
+    for name, build in candidates:
+        candidate = build()
+        if candidate is None or len(candidate) >= result["best"]:
+            continue
+
+        decoded = decode_rgba(candidate)
+        if decoded.size != reference.size:
+            continue
+        if name == "quantize":
+            score = psnr(reference, decoded)
+            if score < min_psnr:
+                continue
+            result["psnr"] = score
+        elif decoded.tobytes() != reference.tobytes():
+            continue
+        else:
+            result["psnr"] = None
+
+        best_data = candidate
+        result["best"] = len(candidate)
+        result["strategy"] = name
+
+    if write and best_data is not None:
+        write_file_atomic(path, best_data)
+
+    return result
+
+
+def collect_paths(paths, catalog):
+    """Expand the command line arguments into a list of PNG files"""
+    if not paths:
+        return list(iter_catalog_images(catalog))
+
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                found.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(".png"))
+        else:
+            found.append(path)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Losslessly recompress PNGs in the asset catalog")
+    parser.add_argument("paths", nargs="*", help="PNG files or folders (default: the whole catalog)")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Asset catalog to scan")
+    parser.add_argument("--write", action="store_true", help="Replace files with the optimized result")
+    parser.add_argument("--lossy", action="store_true", help="Allow palette quantization above --min-psnr")
+    parser.add_argument("--min-psnr", type=float, default=45.0, help="PSNR bound in dB for lossy results")
+    parser.add_argument("--keep-metadata", action="store_true", help="Keep text/exif/time chunks")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Worker processes")
+    args = parser.parse_args()
+
+    paths = collect_paths(args.paths, args.catalog)
+    if not paths:
+        print("No PNG files found")
+        return 0
+
+    print(f"Optimizing {len(paths)} PNG files with {args.jobs} workers...")
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [
+            pool.submit(optimize_image, path, args.write, args.lossy, args.min_psnr, args.keep_metadata)
+            for path in paths
+        ]
+        results = [future.result() for future in futures]
+
+    total_before = 0
+    total_after = 0
+    for result in sorted(results, key=lambda r: r["original"] - r["best"], reverse=True):
+        total_before += result["original"]
+        total_after += result["best"]
+        name = os.path.relpath(result["path"])
+        if "error" in result:
+            print(f"! {name}: {result['error']}")
+        elif result["strategy"] is None:
+            print(f"  {name}: already optimal ({format_bytes(result['original'])})")
+        else:
+            saved = result["original"] - result["best"]
+            note = f", PSNR {result['psnr']:.1f} dB" if result["psnr"] is not None else ""
+            print(
+                f"✓ {name}: {format_bytes(result['original'])} -> {format_bytes(result['best'])} "
+                f"(-{format_bytes(saved)}, {result['strategy']}{note})"
+            )
+
+    saved = total_before - total_after
+    percent = 100.0 * saved / total_before if total_before else 0.0
+    verb = "Saved" if args.write else "Would save"
+    print(f"\n{verb} {format_bytes(saved)} of {format_bytes(total_before)} ({percent:.1f}%)")
+    if not args.write and saved:
+        print("Run again with --write to apply")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
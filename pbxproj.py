@@ -0,0 +1,717 @@
+#!/usr/bin/env python3
+"""
+Parse and write Billix.xcodeproj/project.pbxproj as an object graph.
+
+The file is an old-style (OpenStep) property list: dictionaries, arrays and
+strings, with /* comments */ after object IDs that Xcode regenerates on every
+save. Parsing gives plain Python values:
+
+  dict     { key = value; ... }   (insertion ordered)
+  list     ( value, ... )
+  str      bare or "quoted" strings, unquoted and unescaped
+
+A string that was followed by a comment is a Commented (a str subclass that
+keeps .comment), so writing it back reproduces the comment; it compares and
+hashes like the plain string.
+
+dumps() writes the layout Xcode itself produces: objects grouped into
+"/* Begin <isa> section */" blocks in isa order, sorted by ID inside each
+section, isa first and every other key sorted, PBXBuildFile and
+PBXFileReference objects on one line. A file Xcode saved round-trips byte for
+byte; a file edited by hand or by line-based scripts comes back in that
+canonical form.
+
+Usage:
+    import pbxproj
+    project = pbxproj.load()
+    for object_id, obj in project.objects_of("PBXGroup"):
+        ...
+    pbxproj.save(project)
+
+    python3 pbxproj.py                  # check the project file round-trips
+    python3 pbxproj.py --canonicalize   # rewrite it in Xcode's layout
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+from asset_catalog import write_file_atomic
+
+PROJECT_PATH = "Billix.xcodeproj/project.pbxproj"
+
+HEADER = "// !$*UTF8*$!"
+
+# Objects Xcode writes on a single line
+INLINE_ISAS = frozenset({"PBXBuildFile", "PBXFileReference"})
+
+TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<quoted>"(?:[^"\\]|\\.)*")
+  | (?P<punct>[{}()=;,])
+  | (?P<bare>(?:[^\s{}()=;,"/]|/(?![*/]))+)
+""", re.VERBOSE | re.DOTALL)
+
+# Object keys whose value is a list of object IDs
+ID_LISTS = frozenset({
+    "buildConfigurations", "buildPhases", "buildRules", "children", "dependencies", "exceptions",
+    "files", "packageProductDependencies", "packageReferences", "targets",
+})
+
+UNESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+ESCAPE = re.compile(r'[\\"\n\t\r]')
+ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\t": "\\t", "\r": "\\r"}
+UNESCAPE = re.compile(r"\\(.)", re.DOTALL)
+
+# Strings Xcode leaves unquoted
+BARE_STRING = re.compile(r"[A-Za-z0-9_$./]+")
+
+# lastKnownFileType Xcode gives a file by extension, and the build phase a
+# target copies or compiles it in (None: referenced only, never built)
+FILE_TYPES = {
+    ".swift": ("sourcecode.swift", "PBXSourcesBuildPhase"),
+    ".m": ("sourcecode.c.objc", "PBXSourcesBuildPhase"),
+    ".metal": ("sourcecode.metal", "PBXSourcesBuildPhase"),
+    ".h": ("sourcecode.c.h", None),
+    ".xcassets": ("folder.assetcatalog", "PBXResourcesBuildPhase"),
+    ".xcstrings": ("text.json.xcstrings", "PBXResourcesBuildPhase"),
+    ".strings": ("text.plist.strings", "PBXResourcesBuildPhase"),
+    ".json": ("text.json", "PBXResourcesBuildPhase"),
+    ".sql": ("text", "PBXResourcesBuildPhase"),
+    ".plist": ("text.plist.xml", "PBXResourcesBuildPhase"),
+    ".xcprivacy": ("text.xml", "PBXResourcesBuildPhase"),
+    ".png": ("image.png", "PBXResourcesBuildPhase"),
+    ".jpg": ("image.jpeg", "PBXResourcesBuildPhase"),
+    ".ttf": ("file", "PBXResourcesBuildPhase"),
+    ".otf": ("file", "PBXResourcesBuildPhase"),
+    ".mp3": ("audio.mp3", "PBXResourcesBuildPhase"),
+    ".wav": ("audio.wav", "PBXResourcesBuildPhase"),
+    ".mp4": ("video.mp4", "PBXResourcesBuildPhase"),
+    ".storekit": ("text", None),
+    ".entitlements": ("text.plist.entitlements", None),
+    ".xcconfig": ("text.xcconfig", None),
+    ".md": ("net.daringfireball.markdown", None),
+}
+
+# .xcconfig lines: #include "other.xcconfig" (#include? when optional), NAME[condition] = value
+XCCONFIG_INCLUDE = re.compile(r'#include(\??)\s+"([^"]+)"')
+XCCONFIG_SETTING = re.compile(r"([A-Za-z_]\w*(?:\[[^\]]*\])*)\s*=\s*(.*?)\s*;?\s*")
+
+
+class PBXProjError(ValueError):
+    """The project file is not a well-formed property list"""
+
+
+class Commented(str):
+    """A string followed by a /* comment */ in the file"""
+
+    __slots__ = ("comment",)
+
+    def __new__(cls, value, comment):
+        obj = super().__new__(cls, value)
+        obj.comment = comment
+        return obj
+
+    def __repr__(self):
+        return f"Commented({str(self)!r}, {self.comment!r})"
+
+
+def _tokenize(text):
+    """
+    Split the file into (kind, value, comment) tokens
+
+    Comments are attached to the string right before them; all other comments
+    (section markers, the header) are dropped.
+    """
+    tokens = []
+    pos = 0
+    end = len(text)
+    match = TOKEN.match
+    while pos < end:
+        m = match(text, pos)
+        if not m:
+            line = text.count("\n", 0, pos) + 1
+            raise PBXProjError(f"line {line}: unexpected character {text[pos]!r}")
+        kind = m.lastgroup
+        pos = m.end()
+        if kind == "space":
+            continue
+        if kind == "comment":
+            if tokens and tokens[-1][0] == "string" and text[m.start()] == "/" and text[m.start() + 1] == "*":
+                previous = tokens[-1]
+                if previous[2] is None:
+                    tokens[-1] = ("string", previous[1], m.group()[2:-2].strip())
+            continue
+        if kind == "punct":
+            tokens.append((m.group(), None, None))
+        elif kind == "bare":
+            tokens.append(("string", m.group(), None))
+        else:
+            value = m.group()[1:-1]
+            if "\\" in value:
+                value = UNESCAPE.sub(lambda e: UNESCAPES.get(e.group(1), e.group(1)), value)
+            tokens.append(("string", value, None))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def expect(self, kind):
+        token = self.tokens[self.pos] if self.pos < len(self.tokens) else ("end of file", None, None)
+        if token[0] != kind:
+            raise PBXProjError(f"token {self.pos}: expected {kind!r}, found {token[0]!r} {token[1] or ''}".rstrip())
+        self.pos += 1
+        return token
+
+    def value(self):
+        kind, value, comment = self.tokens[self.pos]
+        self.pos += 1
+        if kind == "string":
+            return Commented(value, comment) if comment is not None else value
+        if kind == "{":
+            result = {}
+            while self.tokens[self.pos][0] != "}":
+                key = self.value()
+                if not isinstance(key, str):
+                    raise PBXProjError(f"token {self.pos}: dictionary key must be a string")
+                self.expect("=")
+                result[key] = self.value()
+                self.expect(";")
+            self.pos += 1
+            return result
+        if kind == "(":
+            result = []
+            while self.tokens[self.pos][0] != ")":
+                result.append(self.value())
+                if self.tokens[self.pos][0] != ")":
+                    self.expect(",")
+            self.pos += 1
+            return result
+        raise PBXProjError(f"token {self.pos - 1}: unexpected {kind!r}")
+
+
+class Project:
+    """
+    A parsed project file
+
+    Attributes:
+        root: Top-level dictionary (archiveVersion, objects, rootObject, ...)
+        objects: root["objects"], object ID -> object dictionary
+    """
+
+    def __init__(self, root):
+        self.root = root
+        if not isinstance(root.get("objects"), dict):
+            raise PBXProjError("no objects dictionary")
+        self.objects = root["objects"]
+
+    def objects_of(self, *isas):
+        """Yield (object ID, object) for every object of the given isa(s), in file order"""
+        for object_id, obj in self.objects.items():
+            if obj.get("isa") in isas:
+                yield object_id, obj
+
+    def get(self, object_id):
+        """The object with this ID, or None"""
+        return self.objects.get(object_id)
+
+    def project_object(self):
+        """The PBXProject object (rootObject)"""
+        return self.objects[self.root["rootObject"]]
+
+    def parents(self):
+        """Map every group member (file reference, group, ...) to the group that lists it first"""
+        parents = {}
+        for object_id, obj in self.objects.items():
+            children = obj.get("children")
+            if isinstance(children, list):
+                for child in children:
+                    parents.setdefault(child, object_id)
+        return parents
+
+    def resolve_paths(self):
+        """
+        Resolve every file reference and group to a path relative to the project directory
+
+        <group> paths are relative to the parent group, SOURCE_ROOT paths to the
+        project directory. Objects in other source trees (BUILT_PRODUCTS_DIR,
+        SDKROOT, ...) and objects under them resolve to None.
+
+        Returns:
+            dict object ID -> normalized path ("." for the main group) or None
+        """
+        parents = self.parents()
+        paths = {}
+
+        def resolve(object_id):
+            if object_id in paths:
+                return paths[object_id]
+            obj = self.objects[object_id]
+            tree = obj.get("sourceTree")
+            if tree == "<group>":
+                parent = parents.get(object_id)
+                base = resolve(parent) if parent else "."
+            elif tree == "SOURCE_ROOT":
+                base = "."
+            elif tree == "<absolute>":
+                base = "/"
+            else:
+                base = None
+            paths[object_id] = None if base is None else os.path.normpath(os.path.join(base, obj.get("path", "")))
+            return paths[object_id]
+
+        for object_id, obj in self.objects.items():
+            if "sourceTree" in obj:
+                resolve(object_id)
+        return paths
+
+    def memberships(self):
+        """
+        Map every file reference to the build phases that build it
+
+        Returns:
+            dict file reference ID -> list of (target ID, build phase ID, build file ID)
+        """
+        members = {}
+        for target_id, target in self.objects_of("PBXNativeTarget", "PBXAggregateTarget", "PBXLegacyTarget"):
+            for phase_id in target.get("buildPhases", []):
+                for build_file_id in self.objects.get(phase_id, {}).get("files", []):
+                    file_ref = self.objects.get(build_file_id, {}).get("fileRef")
+                    if file_ref is not None:
+                        members.setdefault(file_ref, []).append((target_id, phase_id, build_file_id))
+        return members
+
+    def refresh_comments(self):
+        """Give every reference to an object the comment its object key has (after a rename or merge)"""
+        comments = {key: key.comment for key in self.objects if isinstance(key, Commented)}
+
+        def fix(value):
+            if isinstance(value, dict):
+                return {fix(k): fix(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [fix(item) for item in value]
+            if isinstance(value, Commented) and value.comment != comments.get(value, value.comment):
+                return Commented(str(value), comments[value])
+            return value
+
+        for object_id, obj in self.objects.items():
+            self.objects[object_id] = fix(obj)
+
+    def configuration(self, owner_id, name):
+        """ID of the XCBuildConfiguration called name in a target's (or the project's) list, or None"""
+        list_id = self.objects[owner_id].get("buildConfigurationList")
+        for config_id in self.objects.get(list_id, {}).get("buildConfigurations", []):
+            if self.objects[config_id].get("name") == name:
+                return config_id
+        return None
+
+    def setting_layers(self, target_id, configuration="Debug", project_dir="."):
+        """
+        The levels a target's build settings come from, lowest first: the
+        project's .xcconfig, the project's settings, the target's .xcconfig,
+        the target's settings
+
+        Returns:
+            List of (label, dict setting -> str or list of str); a level that
+            is not set is left out
+        """
+        layers = []
+        paths = None
+        for owner_id in (self.root["rootObject"], target_id):
+            config_id = self.configuration(owner_id, configuration)
+            if config_id is None:
+                continue
+            config = self.objects[config_id]
+            base_id = config.get("baseConfigurationReference")
+            if base_id:
+                paths = paths or self.resolve_paths()
+                if not paths.get(base_id):
+                    raise PBXProjError(f"{base_id}: baseConfigurationReference does not resolve to a file")
+                layers.append((paths[base_id], read_xcconfig(os.path.join(project_dir, paths[base_id]))))
+            owner = self.objects[owner_id]
+            label = "project" if owner_id == self.root["rootObject"] else owner.get("name", owner_id)
+            layers.append((f"{label} {configuration}", config.get("buildSettings", {})))
+        return layers
+
+    def build_settings(self, target_id, configuration="Debug", project_dir="."):
+        """
+        A target's build settings as Xcode layers them (see setting_layers)
+
+        $(inherited) in a setting is replaced by the value from the level below.
+
+        Returns:
+            dict setting -> str or list of str
+        """
+        settings = {}
+        for _label, layer in self.setting_layers(target_id, configuration, project_dir):
+            for key, value in layer.items():
+                settings[key] = _inherit(value, settings.get(key))
+        return settings
+
+    def new_id(self, seed):
+        """
+        A 24-digit object ID derived from seed that is not in use yet
+
+        Deriving IDs from a seed (e.g. the file path) instead of at random means
+        two people making the same change get the same IDs, which merges cleanly.
+        """
+        digest = hashlib.md5(seed.encode("utf-8")).hexdigest().upper()
+        object_id = digest[:24]
+        counter = 0
+        while object_id in self.objects:
+            counter += 1
+            object_id = hashlib.md5(f"{seed}#{counter}".encode("utf-8")).hexdigest().upper()[:24]
+        return object_id
+
+
+def _inherit(value, inherited):
+    """Expand $(inherited) in a setting value with the value from the level above"""
+    if isinstance(inherited, list):
+        inherited_items = inherited
+    else:
+        inherited_items = inherited.split() if inherited else []
+    if isinstance(value, list):
+        expanded = []
+        for item in value:
+            expanded.extend(inherited_items if item == "$(inherited)" else [item])
+        return expanded
+    if "$(inherited)" in value:
+        return " ".join(value.replace("$(inherited)", " ".join(inherited_items)).split())
+    return value
+
+
+def read_xcconfig(path, settings=None):
+    """
+    Settings assigned in an .xcconfig file, following #include
+
+    A later assignment overrides an earlier one; $(inherited) in it expands to
+    the earlier value (and is left for the level below when there is none).
+    Comments start at // anywhere on a line, as in Xcode.
+
+    Returns:
+        dict setting -> str
+    """
+    settings = {} if settings is None else settings
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError as e:
+        raise PBXProjError(f"cannot read {path}: {e.strerror}") from None
+    for number, line in enumerate(lines, 1):
+        line = line.split("//", 1)[0].strip()
+        if not line:
+            continue
+        include = XCCONFIG_INCLUDE.fullmatch(line)
+        if include:
+            included = os.path.join(os.path.dirname(path), include.group(2))
+            if include.group(1) != "?" or os.path.exists(included):
+                read_xcconfig(included, settings)
+            continue
+        setting = XCCONFIG_SETTING.fullmatch(line)
+        if not setting:
+            raise PBXProjError(f"{path}:{number}: not a setting or #include")
+        key, value = setting.groups()
+        settings[key] = _inherit(value, settings[key]) if key in settings else value
+    return settings
+
+
+def loads(text):
+    """
+    Parse project.pbxproj text
+
+    Returns:
+        Project
+    """
+    try:
+        tokens = _tokenize(text)
+        parser = _Parser(tokens)
+        root = parser.value()
+    except IndexError:
+        raise PBXProjError("unexpected end of file") from None
+    if parser.pos != len(tokens):
+        raise PBXProjError(f"token {parser.pos}: trailing data after the top-level dictionary")
+    if not isinstance(root, dict):
+        raise PBXProjError("top level is not a dictionary")
+    return Project(root)
+
+
+def load(path=PROJECT_PATH):
+    """Parse a project file from disk"""
+    with open(path, "r", encoding="utf-8") as f:
+        return loads(f.read())
+
+
+def quote(value):
+    """Write a string the way Xcode does: bare when it can be, otherwise quoted and escaped"""
+    if BARE_STRING.fullmatch(value) and "___" not in value and "//" not in value:
+        return value
+    return '"' + ESCAPE.sub(lambda m: ESCAPES[m.group()], value) + '"'
+
+
+def _string(value):
+    comment = getattr(value, "comment", None)
+    return f"{quote(value)} /* {comment} */" if comment is not None else quote(value)
+
+
+def _sorted_keys(obj):
+    # isa first, then alphabetical, as Xcode writes object dictionaries
+    return sorted(obj, key=lambda k: (k != "isa", k))
+
+
+def _inline(value):
+    if isinstance(value, dict):
+        return "{" + "".join(f"{_string(k)} = {_inline(value[k])}; " for k in _sorted_keys(value)) + "}"
+    if isinstance(value, list):
+        return "(" + "".join(f"{_inline(item)}, " for item in value) + ")"
+    return _string(value)
+
+
+def _block(value, depth, out):
+    """Append value at this indent depth; the caller already wrote the text before it on the line"""
+    if isinstance(value, dict):
+        out.append("{\n")
+        indent = "\t" * (depth + 1)
+        for key in _sorted_keys(value):
+            out.append(f"{indent}{_string(key)} = ")
+            _block(value[key], depth + 1, out)
+            out.append(";\n")
+        out.append("\t" * depth + "}")
+    elif isinstance(value, list):
+        out.append("(\n")
+        indent = "\t" * (depth + 1)
+        for item in value:
+            out.append(indent)
+            _block(item, depth + 1, out)
+            out.append(",\n")
+        out.append("\t" * depth + ")")
+    else:
+        out.append(_string(value))
+
+
+def _objects(objects, out):
+    out.append("{\n")
+    sections = {}
+    for object_id, obj in objects.items():
+        sections.setdefault(obj.get("isa", ""), []).append(object_id)
+    for isa in sorted(sections):
+        out.append(f"\n/* Begin {isa} section */\n")
+        for object_id in sorted(sections[isa]):
+            out.append(_entry(object_id, objects[object_id]))
+        out.append(f"/* End {isa} section */\n")
+    out.append("\t}")
+
+
+def _entry(object_id, obj):
+    """One object as its line(s) in the objects dictionary"""
+    out = [f"\t\t{_string(object_id)} = "]
+    if obj.get("isa") in INLINE_ISAS:
+        out.append(_inline(obj))
+    else:
+        _block(obj, 2, out)
+    out.append(";\n")
+    return "".join(out)
+
+
+def dumps(project):
+    """Serialize a Project in Xcode's layout"""
+    root = project.root if isinstance(project, Project) else project
+    out = [HEADER, "\n{\n"]
+    for key in sorted(root):
+        out.append(f"\t{_string(key)} = ")
+        if key == "objects":
+            _objects(root[key], out)
+        else:
+            _block(root[key], 1, out)
+        out.append(";\n")
+    out.append("}\n")
+    return "".join(out)
+
+
+def _entry_spans(text):
+    """
+    Locate each object's lines in a file laid out the way Xcode writes it
+
+    Returns:
+        (dict object ID -> (start, end) offsets, dict isa -> [(object ID, start)] in file order,
+         dict isa -> offset of its "/* End ... section */" line), or None if the layout is unfamiliar
+    """
+    begin = text.find("\tobjects = {\n")
+    if begin < 0:
+        return None
+    spans, sections, ends = {}, {}, {}
+    isa = None
+    open_entry = None
+    offset = begin + len("\tobjects = {\n")
+    for line in text[offset:].splitlines(keepends=True):
+        start = offset
+        offset += len(line)
+        if open_entry is not None:
+            if line == "\t\t};\n":
+                spans[open_entry] = (spans[open_entry], offset)
+                open_entry = None
+            continue
+        if line.startswith("/* Begin ") and line.endswith(" section */\n"):
+            isa = line[len("/* Begin "):-len(" section */\n")]
+            sections.setdefault(isa, [])
+        elif line.startswith("/* End ") and line.endswith(" section */\n"):
+            ends[line[len("/* End "):-len(" section */\n")]] = start
+            isa = None
+        elif line == "\t};\n":
+            return spans, sections, ends
+        elif line.startswith("\t\t") and not line.startswith("\t\t\t") and " = {" in line and isa:
+            object_id = line[2:].split(" ", 1)[0]
+            sections[isa].append((object_id, start))
+            if line.endswith("};\n"):
+                spans[object_id] = (start, offset)
+            else:
+                spans[object_id] = start
+                open_entry = object_id
+        elif line.strip():
+            return None
+    return None
+
+
+def dumps_changes(original_text, project):
+    """
+    Serialize a Project by rewriting only the objects that differ from original_text
+
+    Every other line stays exactly as it is in the file, so the diff shows just
+    the objects an edit touched, even in a file Xcode would order differently.
+    New objects are inserted in ID order into their section. Falls back to
+    dumps() when anything outside the objects changed, an object needs a
+    section the file does not have yet, or the file's layout is unfamiliar.
+    """
+    located = _entry_spans(original_text)
+    try:
+        before = loads(original_text)
+    except PBXProjError:
+        return dumps(project)
+    if located is None or {k: v for k, v in project.root.items() if k != "objects"} \
+            != {k: v for k, v in before.root.items() if k != "objects"}:
+        return dumps(project)
+    spans, sections, ends = located
+
+    # Keys carry the comments, so serialize with the project's own key instances
+    keys = {key: key for key in project.objects}
+    edits = []
+    for object_id in set(before.objects) | set(project.objects):
+        new = project.objects.get(object_id)
+        if object_id not in before.objects:
+            isa = new.get("isa", "")
+            if isa not in ends:
+                return dumps(project)
+            position = next((start for other, start in sections[isa] if other > object_id), ends[isa])
+            edits.append((position, position, str(object_id), _entry(keys[object_id], new)))
+            continue
+        start, end = spans[object_id]
+        if new is None:
+            edits.append((start, end, str(object_id), ""))
+            continue
+        entry = _entry(keys[object_id], new)
+        if original_text[start:end] != entry:
+            edits.append((start, end, str(object_id), entry))
+
+    # Insertions sort before a replacement at the same offset, and by ID among themselves
+    pieces = []
+    cursor = 0
+    for start, end, _object_id, replacement in sorted(edits):
+        pieces.append(original_text[cursor:start])
+        pieces.append(replacement)
+        cursor = end
+    pieces.append(original_text[cursor:])
+    text = "".join(pieces)
+    if loads(text).root != project.root:
+        return dumps(project)
+    return text
+
+
+def save(project, path=PROJECT_PATH):
+    """
+    Atomically replace a project file with the project
+
+    An existing file is patched with dumps_changes(), so only the objects that
+    changed are rewritten.
+    """
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            text = dumps_changes(f.read(), project)
+    else:
+        text = dumps(project)
+    write_file_atomic(path, text.encode("utf-8"))
+
+
+def references(value):
+    """Yield every string inside a value (keys included) that may be an object ID"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield key
+            yield from references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from references(item)
+    else:
+        yield value
+
+
+def dangling_references(project):
+    """
+    Find list members that name a missing object
+
+    Only children/files/buildPhases/targets style lists are checked: those
+    hold nothing but object IDs, while scalar fields also hold plain strings.
+
+    Returns:
+        List of (object ID, key, missing ID)
+    """
+    missing = []
+    for object_id, obj in project.objects.items():
+        for key, value in obj.items():
+            if key in ID_LISTS and isinstance(value, list):
+                missing.extend((object_id, key, item) for item in value
+                               if isinstance(item, str) and item not in project.objects)
+    return missing
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that project.pbxproj parses and round-trips")
+    parser.add_argument("path", nargs="?", default=PROJECT_PATH)
+    parser.add_argument("--canonicalize", action="store_true", help="Rewrite the file in Xcode's layout")
+    args = parser.parse_args()
+
+    with open(args.path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        project = loads(text)
+    except PBXProjError as e:
+        print(f"✗ {args.path}: {e}")
+        return 1
+    print(f"✓ Parsed {len(project.objects):,} objects from {args.path}")
+
+    for object_id, key, missing in dangling_references(project):
+        print(f"~ {object_id}.{key} names missing object {missing}")
+
+    canonical = dumps(project)
+    if canonical == text:
+        print("✓ File is in Xcode's layout and round-trips byte for byte")
+        return 0
+    if loads(canonical).root != project.root:
+        print("✗ Serialized project does not parse back to the same objects")
+        return 1
+    if args.canonicalize:
+        write_file_atomic(args.path, canonical.encode("utf-8"))
+        print(f"✓ Rewrote {args.path} in Xcode's layout")
+        return 0
+    changed = sum(1 for a, b in zip(text.splitlines(), canonical.splitlines()) if a != b)
+    print(f"~ File is not in Xcode's layout ({changed:,} lines differ); --canonicalize rewrites it")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Three-way git merge driver for project.pbxproj that merges objects, not lines.
+
+Git's line merge sees two branches that each added a file as two edits to the
+same few lines (the end of a section, the tail of a group's children, the
+Sources phase) and either conflicts or interleaves them into a file Xcode
+cannot open. This driver parses base, ours and theirs into object graphs
+(pbxproj.py) and merges them:
+
+  objects       added on either side are kept, deleted on either side are
+                removed; deleted on one side and changed on the other conflicts
+  dictionaries  merged key by key, recursively (buildSettings included)
+  ID lists      children, files, buildPhases, ... are merged as sets: members
+                either side added are kept (at the position the adding side
+                put them), members either side removed are dropped, ours'
+                order wins
+  other lists   OTHER_LDFLAGS, OTHER_SWIFT_FLAGS, ... repeat members and their
+                order matters ("-framework Foo"), so they merge as a whole,
+                like strings
+  strings       one side changed it: take that side; both changed it to
+                different values: conflict
+
+The result is written in Xcode's layout. Conflicts (only real same-field
+edits) are written as ordinary <<<<<<< / ======= / >>>>>>> hunks around the
+lines that differ, everything else already merged, and the driver exits 1 so
+git marks the file conflicted. If a side does not parse at all, git's own
+line merge is used.
+
+Usage:
+    python3 pbxproj_merge.py --install                # register the driver in .git/config
+    python3 pbxproj_merge.py BASE OURS THEIRS [PATH]  # what git runs; writes the result into OURS
+    python3 pbxproj_merge.py BASE OURS THEIRS -o merged.pbxproj
+"""
+
+import argparse
+import difflib
+import re
+import subprocess
+import sys
+import time
+
+import pbxproj
+
+DRIVER_NAME = "pbxproj"
+DRIVER_COMMAND = "python3 pbxproj_merge.py %O %A %B %P -L %L"
+
+MISSING = object()
+
+# Keys whose values are lists of object IDs, merged as sets
+ID_LIST_KEYS = frozenset({
+    "buildConfigurations", "buildPhases", "buildRules", "children", "dependencies", "files",
+    "fileSystemSynchronizedGroups", "packageProductDependencies", "packageReferences", "targets",
+})
+
+OBJECT_ID = re.compile(r"^[0-9A-F]{24}$")
+
+
+def _same(a, b):
+    if a is MISSING or b is MISSING:
+        return a is b
+    return a == b
+
+
+def merge_value(base, ours, theirs, path, conflicts):
+    """
+    Three-way merge one value; MISSING stands for an absent key
+
+    Args:
+        base, ours, theirs: The value on each side
+        path: Keys leading to the value, for conflict reports
+        conflicts: List to append (path, ours, theirs) to
+
+    Returns:
+        The merged value, with ours' value wherever there is a conflict
+    """
+    if _same(ours, theirs):
+        return ours
+    if _same(ours, base):
+        return theirs
+    if _same(theirs, base):
+        return ours
+    if isinstance(ours, dict) and isinstance(theirs, dict):
+        return merge_dict(base if isinstance(base, dict) else {}, ours, theirs, path, conflicts)
+    if isinstance(ours, list) and isinstance(theirs, list):
+        base = base if isinstance(base, list) else []
+        if is_id_list(path[-1] if path else None, base, ours, theirs):
+            return merge_list(base, ours, theirs)
+    conflicts.append((path, ours, theirs))
+    return ours
+
+
+def merge_dict(base, ours, theirs, path, conflicts):
+    """Merge dictionaries key by key; keys keep ours' order with theirs' new keys after"""
+    merged = {}
+    # Keys carry the object comment; take it from the side whose value won
+    theirs_keys = {key: key for key in theirs}
+    for key in list(ours) + [key for key in theirs if key not in ours]:
+        ours_value = ours.get(key, MISSING)
+        theirs_value = theirs.get(key, MISSING)
+        value = merge_value(base.get(key, MISSING), ours_value, theirs_value, path + (key,), conflicts)
+        if value is MISSING:
+            continue
+        if value is theirs_value and value is not ours_value:
+            key = theirs_keys[key]
+        merged[key] = value
+    return merged
+
+
+def is_id_list(key, *lists):
+    """
+    True if the lists hold object IDs and can be merged as sets
+
+    A known ID list key qualifies, or lists whose members are all distinct
+    24-hex IDs. Flag lists (OTHER_LDFLAGS = (-framework, Foo, ...)) do not.
+    """
+    items = [item for values in lists for item in values]
+    if not all(isinstance(item, str) for item in items):
+        return False
+    if key in ID_LIST_KEYS:
+        return True
+    return (all(OBJECT_ID.match(item) for item in items)
+            and all(len(set(values)) == len(values) for values in lists))
+
+
+def merge_list(base, ours, theirs):
+    """
+    Merge lists of object IDs as sets, keeping ours' order
+
+    Returns:
+        The merged list
+    """
+    base_set, ours_set, theirs_set = set(base), set(ours), set(theirs)
+    removed = base_set - theirs_set
+    merged = [item for item in ours if item not in removed]
+    present = set(merged)
+    for i, item in enumerate(theirs):
+        if item in base_set or item in ours_set or item in present:
+            continue
+        # Put it after the nearest member theirs has before it
+        position = 0
+        for previous in reversed(theirs[:i]):
+            if previous in present:
+                position = merged.index(previous) + 1
+                break
+        merged.insert(position, item)
+        present.add(item)
+    return merged
+
+
+def _replace(container, path, value):
+    """Copy of container with the value at path replaced (MISSING removes it); copies only along the path"""
+    copy = dict(container)
+    key = path[0]
+    if len(path) > 1:
+        copy[key] = _replace(container[key], path[1:], value)
+    elif value is MISSING:
+        copy.pop(key, None)
+    else:
+        copy[key] = value
+    return copy
+
+
+def merge(base_text, ours_text, theirs_text, marker_size=7):
+    """
+    Merge three versions of project.pbxproj
+
+    Args:
+        base_text: Common ancestor (empty when both sides added the file)
+        ours_text, theirs_text: The two versions to merge
+        marker_size: Length of the conflict markers
+
+    Returns:
+        (merged text with conflict hunks if any, list of (path, ours, theirs) conflicts)
+    """
+    base = pbxproj.loads(base_text).root if base_text.strip() else {"objects": {}}
+    ours = pbxproj.loads(ours_text).root
+    theirs = pbxproj.loads(theirs_text).root
+
+    conflicts = []
+    merged = merge_value(base, ours, theirs, (), conflicts)
+    if not isinstance(merged, dict) or not isinstance(merged.get("objects"), dict):
+        raise pbxproj.PBXProjError("top-level structure conflicts")
+    project = pbxproj.Project(merged)
+    project.refresh_comments()
+    if not conflicts:
+        return pbxproj.dumps(project), conflicts
+
+    # The same merge with theirs' value at every conflict; the two differ only there
+    theirs_root = project.root
+    for path, _ours_value, theirs_value in conflicts:
+        theirs_root = _replace(theirs_root, path, theirs_value)
+    text = conflict_hunks(pbxproj.dumps(project), pbxproj.dumps(theirs_root), marker_size=marker_size)
+    return text, conflicts
+
+
+def conflict_hunks(ours_text, theirs_text, ours_label="ours", theirs_label="theirs", marker_size=7):
+    """Write the two resolutions as one file with conflict markers around the lines that differ"""
+    a = ours_text.splitlines(keepends=True)
+    b = theirs_text.splitlines(keepends=True)
+    out = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            out.extend(a[i1:i2])
+            continue
+        out.append(f"{'<' * marker_size} {ours_label}\n")
+        out.extend(a[i1:i2])
+        out.append(f"{'=' * marker_size}\n")
+        out.extend(b[j1:j2])
+        out.append(f"{'>' * marker_size} {theirs_label}\n")
+    return "".join(out)
+
+
+def describe(path):
+    """Readable location of a conflict: the object ID with its comment, then the keys"""
+    if path[:1] == ("objects",) and len(path) > 1:
+        object_id = path[1]
+        if isinstance(object_id, pbxproj.Commented):
+            object_id = f"{object_id} ({object_id.comment})"
+        return ".".join([object_id] + [str(key) for key in path[2:]])
+    return ".".join(str(key) for key in path) or "(top level)"
+
+
+def _describe_value(value):
+    if value is MISSING:
+        return "deleted"
+    if isinstance(value, dict):
+        return f"{value.get('isa', 'dictionary')} with {len(value)} keys"
+    if isinstance(value, list):
+        return f"list of {len(value)}"
+    return repr(str(value))
+
+
+def line_merge(base_path, ours_path, theirs_path):
+    """Fall back to git's line merge (writes into ours_path); returns its exit code"""
+    return subprocess.run(["git", "merge-file", "-L", "ours", "-L", "base", "-L", "theirs",
+                           ours_path, base_path, theirs_path]).returncode
+
+
+def install():
+    """Register the driver in this clone's git config (.gitattributes assigns it to *.pbxproj)"""
+    subprocess.run(["git", "config", f"merge.{DRIVER_NAME}.name",
+                    "project.pbxproj object-level merge"], check=True)
+    subprocess.run(["git", "config", f"merge.{DRIVER_NAME}.driver", DRIVER_COMMAND], check=True)
+    print(f"✓ Registered merge driver '{DRIVER_NAME}': {DRIVER_COMMAND}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Object-level three-way merge of project.pbxproj")
+    parser.add_argument("base", nargs="?", help="Common ancestor (%%O)")
+    parser.add_argument("ours", nargs="?", help="Current version (%%A); the result is written here")
+    parser.add_argument("theirs", nargs="?", help="Other branch's version (%%B)")
+    parser.add_argument("path", nargs="?", default=pbxproj.PROJECT_PATH, help="Path in the repository (%%P)")
+    parser.add_argument("-L", "--marker-size", type=int, default=7, help="Conflict marker length (%%L)")
+    parser.add_argument("-o", "--output", help="Write the result here instead of into OURS")
+    parser.add_argument("--install", action="store_true", help="Register the driver in .git/config")
+    args = parser.parse_args()
+
+    if args.install:
+        return install()
+    if not (args.base and args.ours and args.theirs):
+        parser.error("BASE, OURS and THEIRS are required")
+
+    started = time.perf_counter()
+    texts = []
+    for path in (args.base, args.ours, args.theirs):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+
+    try:
+        text, conflicts = merge(*texts, marker_size=args.marker_size)
+    except pbxproj.PBXProjError as e:
+        print(f"✗ {args.path}: {e}; falling back to a line merge")
+        if args.output:
+            return 1
+        return 1 if line_merge(args.base, args.ours, args.theirs) else 0
+
+    output = args.output or args.ours
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(text)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if not conflicts:
+        merged = pbxproj.loads(text)
+        for object_id, key, missing in pbxproj.dangling_references(merged):
+            print(f"~ {args.path}: {object_id}.{key} names missing object {missing}")
+        print(f"✓ Merged {args.path} at object level ({len(merged.objects):,} objects, {elapsed:.0f} ms)")
+        return 0
+
+    print(f"✗ {args.path}: {len(conflicts)} conflicting edit(s) ({elapsed:.0f} ms)")
+    for path, ours_value, theirs_value in conflicts:
+        print(f"    {describe(path)}: ours {_describe_value(ours_value)}, theirs {_describe_value(theirs_value)}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Throwaway local Postgres for testing and timing the SQL migrations offline.
+
+TemporaryPostgres runs initdb + pg_ctl in a temporary folder and listens on a
+unix socket only, with fsync disabled since the data is thrown away. The
+Supabase objects the migrations expect but do not create (auth.users,
+auth.uid(), storage.buckets, the anon/authenticated roles, and the app tables
+that predate these migrations) are stubbed by install_stubs().
+
+Postgres binaries are taken from PG_BIN, then PATH, then pg_config --bindir.
+Set BILLIX_TEST_DSN (or pass --dsn to the scripts) to use an existing server
+instead.
+
+    with TemporaryPostgres() as pg:
+        conn = pg.connect()
+        install_stubs(conn)
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+DSN_ENV = "BILLIX_TEST_DSN"
+API_ROLES = ("anon", "authenticated", "service_role")
+
+# Supabase platform objects and pre-existing app tables, reduced to the columns
+# the migrations and the Swift models use
+STUB_SQL = """
+DO $$
+BEGIN
+    CREATE ROLE anon NOLOGIN;
+    EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+DO $$
+BEGIN
+    CREATE ROLE authenticated NOLOGIN;
+    EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+DO $$
+BEGIN
+    CREATE ROLE service_role NOLOGIN BYPASSRLS;
+    EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE SCHEMA IF NOT EXISTS storage;
+
+CREATE TABLE IF NOT EXISTS auth.users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    email TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Same claim settings PostgREST sets per request
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID AS $$
+    SELECT NULLIF(current_setting('request.jwt.claim.sub', true), '')::UUID
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION auth.role() RETURNS TEXT AS $$
+    SELECT NULLIF(current_setting('request.jwt.claim.role', true), '')::TEXT
+$$ LANGUAGE sql STABLE;
+
+CREATE TABLE IF NOT EXISTS storage.buckets (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    public BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS storage.objects (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    bucket_id TEXT REFERENCES storage.buckets(id),
+    name TEXT,
+    owner UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+ALTER TABLE storage.objects ENABLE ROW LEVEL SECURITY;
+
+CREATE TABLE IF NOT EXISTS profiles (
+    id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
+    display_name TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
+    display_name TEXT,
+    zip_code TEXT,
+    points_balance INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS user_trust_status (
+    user_id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
+    current_tier INTEGER DEFAULT 1,
+    trust_points INTEGER DEFAULT 0,
+    successful_swaps_current_tier INTEGER DEFAULT 0,
+    total_successful_swaps INTEGER DEFAULT 0,
+    total_failed_swaps INTEGER DEFAULT 0,
+    ghost_count INTEGER DEFAULT 0,
+    is_banned BOOLEAN DEFAULT FALSE,
+    ban_reason TEXT,
+    banned_at TIMESTAMPTZ,
+    device_ids TEXT[],
+    verification_status JSONB DEFAULT '{"email": false, "phone": false}',
+    average_rating NUMERIC(3, 2),
+    total_ratings_received INTEGER DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS marketplace_deals (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    zip_prefix TEXT NOT NULL,
+    category TEXT NOT NULL,
+    monthly_amount NUMERIC(10, 2),
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS user_bills (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+# Supabase grants the API roles access to everything in public; RLS does the filtering
+GRANT_SQL = """
+GRANT USAGE ON SCHEMA public, auth, storage TO anon, authenticated, service_role;
+GRANT ALL ON ALL TABLES IN SCHEMA public, storage TO anon, authenticated, service_role;
+GRANT SELECT ON ALL TABLES IN SCHEMA auth TO authenticated, service_role;
+GRANT ALL ON ALL SEQUENCES IN SCHEMA public TO anon, authenticated, service_role;
+GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA public, auth TO anon, authenticated, service_role;
+"""
+
+
+def import_psycopg2():
+    """Import psycopg2 lazily so the SQL tooling works without it installed"""
+    try:
+        import psycopg2
+    except ImportError:
+        sys.exit("psycopg2 is required to talk to Postgres: pip3 install psycopg2-binary")
+    return psycopg2
+
+
+def find_pg_bin(program):
+    """Locate a Postgres server binary (initdb, pg_ctl, postgres)"""
+    candidates = []
+    if os.environ.get("PG_BIN"):
+        candidates.append(os.path.join(os.environ["PG_BIN"], program))
+    found = shutil.which(program)
+    if found:
+        candidates.append(found)
+    pg_config = shutil.which("pg_config")
+    if pg_config:
+        bindir = subprocess.run([pg_config, "--bindir"], capture_output=True, text=True).stdout.strip()
+        candidates.append(os.path.join(bindir, program))
+    for path in candidates:
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    raise RuntimeError(f"{program} not found; install Postgres or set PG_BIN to its bin folder")
+
+
+class TemporaryPostgres:
+    """
+    Single-use Postgres cluster in a temp folder, removed on stop()
+
+    Args:
+        settings: Extra postgresql.conf settings, e.g. {"shared_buffers": "256MB"}
+        keep: Leave the data folder behind for inspection
+    """
+
+    def __init__(self, settings=None, keep=False):
+        self.settings = {
+            "fsync": "off",
+            "synchronous_commit": "off",
+            "full_page_writes": "off",
+            "listen_addresses": "''",
+        }
+        self.settings.update(settings or {})
+        self.keep = keep
+        self.root = None
+        self.dsn = None
+
+    def start(self):
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            raise RuntimeError("Postgres refuses to run as root; run as a normal user or pass --dsn")
+
+        initdb = find_pg_bin("initdb")
+        pg_ctl = find_pg_bin("pg_ctl")
+        self.root = tempfile.mkdtemp(prefix="billix-pg-")
+        data = os.path.join(self.root, "data")
+        socket_dir = os.path.join(self.root, "socket")
+        os.mkdir(socket_dir)
+
+        subprocess.run([initdb, "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync"],
+                       check=True, capture_output=True)
+        options = " ".join(f"-c {key}={value}" for key, value in self.settings.items())
+        options += f" -k {socket_dir}"
+        started = time.perf_counter()
+        subprocess.run([pg_ctl, "-D", data, "-l", os.path.join(self.root, "postgres.log"), "-o", options,
+                        "-w", "start"], check=True, capture_output=True)
+        self.startup_seconds = time.perf_counter() - started
+        self.dsn = f"host={socket_dir} dbname=postgres user=postgres"
+        return self
+
+    def stop(self):
+        if self.root is None:
+            return
+        subprocess.run([find_pg_bin("pg_ctl"), "-D", os.path.join(self.root, "data"), "-m", "immediate", "stop"],
+                       capture_output=True)
+        if not self.keep:
+            shutil.rmtree(self.root, ignore_errors=True)
+        self.root = None
+
+    def connect(self, **kwargs):
+        return import_psycopg2().connect(self.dsn, **kwargs)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class ExistingPostgres:
+    """Same interface as TemporaryPostgres for a server given by DSN (nothing is started or removed)"""
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def connect(self, **kwargs):
+        return import_psycopg2().connect(self.dsn, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def open_database(dsn=None, settings=None, keep=False):
+    """An ExistingPostgres for dsn / $BILLIX_TEST_DSN, otherwise a TemporaryPostgres"""
+    dsn = dsn or os.environ.get(DSN_ENV)
+    if dsn:
+        return ExistingPostgres(dsn)
+    return TemporaryPostgres(settings, keep)
+
+
+def install_stubs(conn):
+    """Create the Supabase auth/storage stubs and the pre-existing app tables"""
+    with conn.cursor() as cur:
+        cur.execute(STUB_SQL)
+    conn.commit()
+
+
+def grant_api_roles(conn):
+    """Give anon/authenticated/service_role the access Supabase grants by default"""
+    with conn.cursor() as cur:
+        cur.execute(GRANT_SQL)
+    conn.commit()
+
+
+def set_request_user(cur, user_id, role="authenticated"):
+    """
+    Act as an API request from user_id for the rest of the transaction:
+    switches to the API role so RLS applies and sets the JWT claims auth.uid() reads
+    """
+    if role not in API_ROLES:
+        raise ValueError(f"unknown API role {role!r}")
+    cur.execute("SELECT set_config('request.jwt.claim.sub', %s, true), "
+                "set_config('request.jwt.claim.role', %s, true)", (str(user_id) if user_id else "", role))
+    cur.execute(f"SET LOCAL ROLE {role}")
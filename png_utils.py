@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Low-level PNG chunk helpers shared by the asset scripts.
+
+These work directly on the PNG byte stream so callers can inspect or rewrite
+an image without decoding its pixels, or stream it band by band. Pillow is
+only imported by the band reader/writer.
+"""
+
+import io
+import struct
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Chunks that change how pixels are rendered and must survive a re-encode
+COLOR_CHUNKS = {b"PLTE", b"tRNS", b"cHRM", b"gAMA", b"iCCP", b"sBIT", b"sRGB", b"cICP"}
+
+# Chunks that are safe to drop when optimizing (metadata only)
+METADATA_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"tIME", b"eXIf", b"pHYs", b"bKGD", b"hIST", b"sPLT"}
+
+
+class PNGError(ValueError):
+    """Raised when a file is not a well-formed PNG"""
+
+
+def iter_chunks(data):
+    """
+    Yield (chunk_type, chunk_data) pairs from a PNG byte string
+
+    Args:
+        data: Complete PNG file contents
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise PNGError("missing PNG signature")
+
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        if pos + 8 > len(data):
+            raise PNGError("truncated chunk header")
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        start = pos + 8
+        end = start + length
+        if end + 4 > len(data):
+            raise PNGError(f"truncated {chunk_type!r} chunk")
+        yield chunk_type, data[start:end]
+        pos = end + 4
+        if chunk_type == b"IEND":
+            break
+
+
+def make_chunk(chunk_type, chunk_data):
+    """Serialize a single chunk with its length and CRC"""
+    crc = zlib.crc32(chunk_type)
+    crc = zlib.crc32(chunk_data, crc)
+    return struct.pack(">I", len(chunk_data)) + chunk_type + chunk_data + struct.pack(">I", crc & 0xFFFFFFFF)
+
+
+def parse_ihdr(chunk_data):
+    """
+    Decode an IHDR payload
+
+    Returns:
+        dict with width, height, bit_depth, color_type, interlace
+    """
+    if len(chunk_data) != 13:
+        raise PNGError("IHDR chunk must be 13 bytes")
+    width, height, bit_depth, color_type, compression, filter_method, interlace = struct.unpack(
+        ">IIBBBBB", chunk_data
+    )
+    return {
+        "width": width,
+        "height": height,
+        "bit_depth": bit_depth,
+        "color_type": color_type,
+        "interlace": interlace,
+    }
+
+
+def read_png_header(path):
+    """
+    Read a PNG's IHDR without reading the rest of the file
+
+    IHDR must be the first chunk, so the signature, chunk header, payload and
+    CRC are the first 33 bytes.
+
+    Returns:
+        dict as returned by parse_ihdr
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(PNG_SIGNATURE) + 8 + 13 + 4)
+    if not head.startswith(PNG_SIGNATURE):
+        raise PNGError("missing PNG signature")
+    if len(head) < 33:
+        raise PNGError("truncated IHDR chunk")
+    length, chunk_type = struct.unpack(">I4s", head[8:16])
+    if chunk_type != b"IHDR" or length != 13:
+        raise PNGError("first chunk is not IHDR")
+    (crc,) = struct.unpack(">I", head[29:33])
+    if zlib.crc32(head[12:29]) & 0xFFFFFFFF != crc:
+        raise PNGError("IHDR CRC mismatch")
+    return parse_ihdr(head[16:29])
+
+
+# Bytes per pixel for 8-bit PNG color types
+_COLOR_TYPE_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+_COLOR_TYPE_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+
+
+def _filtered_rows(png_bytes, skip_rows):
+    """Decompress a PNG's IDAT stream and drop its first skip_rows filtered scanlines"""
+    chunks = list(iter_chunks(png_bytes))
+    ihdr = parse_ihdr(chunks[0][1])
+    row_bytes = 1 + ihdr["width"] * _COLOR_TYPE_CHANNELS[ihdr["color_type"]]
+    raw = zlib.decompress(b"".join(body for ctype, body in chunks if ctype == b"IDAT"))
+    return raw[skip_rows * row_bytes:]
+
+
+class PNGBandReader:
+    """
+    Decode a non-interlaced 8-bit PNG in horizontal bands without ever holding
+    the whole image in memory.
+
+    IDAT data is inflated incrementally. Each band's filtered scanlines are
+    wrapped in a tiny in-memory PNG, preceded by the previous band's last
+    reconstructed row (stored unfiltered) so Up/Average/Paeth filters resolve
+    exactly, and decoded by Pillow at C speed.
+    """
+
+    def __init__(self, path, band_height=256):
+        self.path = path
+        self.band_height = max(1, band_height)
+        self._file = open(path, "rb")
+        if self._file.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+            self._file.close()
+            raise PNGError(f"{path} is not a PNG file")
+
+        self.ancillary = []
+        self._palette = None
+        self._transparency = None
+        self._pending_idat = None
+        while True:
+            ctype, body = self._read_chunk()
+            if ctype == b"IHDR":
+                self.header = parse_ihdr(body)
+            elif ctype == b"IDAT":
+                self._pending_idat = body
+                break
+            elif ctype == b"PLTE":
+                self._palette = body
+            elif ctype == b"tRNS":
+                self._transparency = body
+            elif ctype == b"IEND":
+                raise PNGError(f"{path} has no image data")
+            else:
+                self.ancillary.append((ctype, body))
+
+        header = self.header
+        if header["bit_depth"] != 8 or header["interlace"] or header["color_type"] not in _COLOR_TYPE_CHANNELS:
+            self._file.close()
+            raise PNGError("band decoding needs a non-interlaced 8-bit PNG")
+        if self._transparency is not None and header["color_type"] != 3:
+            self._file.close()
+            raise PNGError("band decoding does not support color-key transparency")
+
+        self.width = header["width"]
+        self.height = header["height"]
+        self.mode = _COLOR_TYPE_MODES[header["color_type"]]
+        self.row_bytes = self.width * _COLOR_TYPE_CHANNELS[header["color_type"]]
+
+    def _read_chunk(self):
+        head = self._file.read(8)
+        if len(head) < 8:
+            raise PNGError(f"{self.path} is truncated")
+        length, ctype = struct.unpack(">I4s", head)
+        body = self._file.read(length)
+        self._file.read(4)  # CRC
+        return ctype, body
+
+    def _iter_idat(self):
+        if self._pending_idat is not None:
+            yield self._pending_idat
+            self._pending_idat = None
+        while True:
+            ctype, body = self._read_chunk()
+            if ctype == b"IDAT":
+                yield body
+            else:
+                return
+
+    def _band_png(self, previous_row, filtered):
+        """Build an in-memory PNG holding the previous row (unfiltered) plus this band"""
+        rows = len(filtered) // (self.row_bytes + 1)
+        height = rows + (1 if previous_row is not None else 0)
+        ihdr = struct.pack(">IIBBBBB", self.width, height, 8, self.header["color_type"], 0, 0, 0)
+        raw = (b"\x00" + previous_row if previous_row is not None else b"") + filtered
+        parts = [PNG_SIGNATURE, make_chunk(b"IHDR", ihdr)]
+        if self._palette is not None:
+            parts.append(make_chunk(b"PLTE", self._palette))
+        if self._transparency is not None:
+            parts.append(make_chunk(b"tRNS", self._transparency))
+        parts.append(make_chunk(b"IDAT", zlib.compress(raw, 0)))
+        parts.append(make_chunk(b"IEND", b""))
+        return b"".join(parts)
+
+    def iter_bands(self):
+        """Yield Pillow images of at most band_height rows, top to bottom"""
+        stride = self.row_bytes + 1
+        band_size = stride * self.band_height
+        inflater = zlib.decompressobj()
+        buffered = b""
+        previous_row = None
+        rows_left = self.height
+
+        for idat in self._iter_idat():
+            data = idat
+            while data and rows_left:
+                # Bound the inflated buffer to one band
+                buffered += inflater.decompress(data, band_size - len(buffered) + stride)
+                data = inflater.unconsumed_tail
+                while len(buffered) >= min(band_size, rows_left * stride):
+                    take = min(band_size, rows_left * stride)
+                    band, previous_row = self._decode_band(previous_row, buffered[:take])
+                    buffered = buffered[take:]
+                    rows_left -= take // stride
+                    yield band
+                    if not rows_left:
+                        break
+            if not rows_left:
+                break
+
+        if rows_left:
+            buffered += inflater.flush()
+            if len(buffered) < rows_left * stride:
+                raise PNGError(f"{self.path} has truncated image data")
+            band, _previous_row = self._decode_band(previous_row, buffered[:rows_left * stride])
+            yield band
+
+    def _decode_band(self, previous_row, filtered):
+        from PIL import Image
+
+        img = Image.open(io.BytesIO(self._band_png(previous_row, filtered)))
+        img.load()
+        if previous_row is not None:
+            img = img.crop((0, 1, img.width, img.height))
+        last_row = img.crop((0, img.height - 1, img.width, img.height)).tobytes()
+        return img, last_row
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PNGStreamWriter:
+    """
+    Write an 8-bit PNG band by band, deflating as it goes.
+
+    Scanline filters are chosen by Pillow's adaptive filter: each band is
+    encoded together with the previous band's last row, and the filtered rows
+    after that first row are streamed into a single zlib compressor.
+    """
+
+    IDAT_SIZE = 65536
+
+    def __init__(self, path, width, height, mode="RGBA", ancillary=(), compress_level=6):
+        color_types = {mode: ctype for ctype, mode in _COLOR_TYPE_MODES.items() if ctype != 3}
+        if mode not in color_types:
+            raise PNGError(f"cannot stream-write mode {mode}")
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.rows_written = 0
+        self._previous = None
+        self._pending = b""
+        self._deflater = zlib.compressobj(compress_level)
+        self._file = open(path, "wb")
+        self._file.write(PNG_SIGNATURE)
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, color_types[mode], 0, 0, 0)
+        self._file.write(make_chunk(b"IHDR", ihdr))
+        for ctype, body in ancillary:
+            self._file.write(make_chunk(ctype, body))
+
+    def write_band(self, band):
+        """Append a Pillow image band (same width and mode) below the rows written so far"""
+        from PIL import Image
+
+        if band.mode != self.mode or band.width != self.width:
+            raise PNGError("band does not match the output image")
+        skip = 0
+        if self._previous is not None:
+            stacked = Image.new(self.mode, (self.width, band.height + 1))
+            stacked.paste(self._previous, (0, 0))
+            stacked.paste(band, (0, 1))
+            skip = 1
+        else:
+            stacked = band
+        buf = io.BytesIO()
+        stacked.save(buf, "PNG", compress_level=0)
+
+        self._pending += self._deflater.compress(_filtered_rows(buf.getvalue(), skip))
+        self._flush_idat(final=False)
+        self._previous = band.crop((0, band.height - 1, self.width, band.height))
+        self.rows_written += band.height
+
+    def _flush_idat(self, final):
+        while len(self._pending) >= self.IDAT_SIZE or (final and self._pending):
+            self._file.write(make_chunk(b"IDAT", self._pending[:self.IDAT_SIZE]))
+            self._pending = self._pending[self.IDAT_SIZE:]
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.rows_written != self.height:
+            self._file.close()
+            raise PNGError(f"wrote {self.rows_written} of {self.height} rows")
+        self._pending += self._deflater.flush()
+        self._flush_idat(final=True)
+        self._file.write(make_chunk(b"IEND", b""))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Local daemon that keeps project.pbxproj parsed and indexed and answers
+questions about it over a Unix domain socket.
+
+Editor integrations and pre-commit hooks keep asking which target compiles
+a file, which group holds it and whether it is orphaned. Each of those used
+to read and parse the whole project file, the way remove_duplicate_files.py
+does. The daemon parses it once, builds the indexes, and answers from memory.
+Before every request it stats the project file (a few microseconds), and a
+background task checks it twice a second. Either one rebuilds the indexes
+when the file changed.
+
+Protocol: one JSON object per line in each direction, any number of requests
+per connection, any number of concurrent connections (asyncio).
+
+    {"op": "file", "path": "Billix/App/ContentView.swift"}
+      -> {"ok": true, "result": {"references": [...], "groups": [...],
+                                 "targets": [...], "orphaned": false}}
+    {"op": "targets", "path": ...}   targets and phases that build the file
+    {"op": "group", "path": ...}     group chains that list the file
+    {"op": "orphans"}                file references no group under the main group lists
+    {"op": "stats"}                  object counts, index age, rebuilds
+    {"op": "ping"}
+
+Paths are relative to the project directory (absolute paths inside it work
+too). Files inside a file-system-synchronized folder are answered from the
+folder and its exceptions.
+
+Usage:
+    python3 project_index.py serve &                  # socket at build/project-index.sock
+    python3 project_index.py query file Billix/App/ContentView.swift
+    python3 project_index.py query orphans
+    python3 project_index.py bench --requests 5000    # round-trip latency
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+import pbxproj
+from convert_to_synced_groups import expected_phase
+
+DEFAULT_SOCKET = "build/project-index.sock"
+POLL_SECONDS = 0.5
+
+
+def phase_name(isa):
+    """PBXSourcesBuildPhase -> Sources"""
+    return isa[3:-len("BuildPhase")] if isa.startswith("PBX") and isa.endswith("BuildPhase") else isa
+
+
+class ProjectIndex:
+    """Every lookup the queries need, built once per version of the project file"""
+
+    def __init__(self, project_path):
+        started = time.perf_counter()
+        self.project_path = project_path
+        self.project_dir = os.path.dirname(os.path.dirname(os.path.abspath(project_path)))
+        self.signature = file_signature(project_path)
+        project = pbxproj.load(project_path)
+        objects = project.objects
+        self.object_count = len(objects)
+
+        paths = project.resolve_paths()
+        parents = project.parents()
+        main_group = project.project_object()["mainGroup"]
+
+        self.references = {}
+        for object_id, obj in project.objects_of("PBXFileReference"):
+            if paths.get(object_id) is not None:
+                self.references.setdefault(paths[object_id], []).append(object_id)
+
+        # Group chain as shown in the navigator, for every group member
+        def chain(object_id):
+            names = []
+            while object_id in parents and object_id != main_group:
+                object_id = parents[object_id]
+                if object_id == main_group:
+                    break
+                group = objects[object_id]
+                names.append(group.get("name") or group.get("path") or object_id)
+            return "/".join(reversed(names)) if object_id == main_group else None
+
+        self.groups = {object_id: chain(object_id) for object_id in parents}
+
+        self.targets = {}
+        target_names = {t: obj.get("name", t) for t, obj in project.objects_of("PBXNativeTarget")}
+        for file_ref, builds in project.memberships().items():
+            self.targets[file_ref] = [{"target": target_names.get(target_id, target_id),
+                                       "phase": phase_name(objects[phase_id]["isa"])}
+                                      for target_id, phase_id, _build_file in builds]
+
+        # Synchronized folders: folder -> (group chain, [(target name, excluded paths)])
+        self.synchronized = {}
+        for group_id, group in project.objects_of("PBXFileSystemSynchronizedRootGroup"):
+            attached = []
+            for target_id, target in project.objects_of("PBXNativeTarget"):
+                if group_id in target.get("fileSystemSynchronizedGroups", []):
+                    excluded = set()
+                    for exception_id in group.get("exceptions", []):
+                        if objects[exception_id].get("target") == target_id:
+                            excluded.update(objects[exception_id].get("membershipExceptions", []))
+                    attached.append((target_names[target_id], excluded))
+            if paths.get(group_id) is not None:
+                self.synchronized[paths[group_id]] = (self.groups.get(group_id), attached)
+
+        reachable = set()
+        pending = [main_group]
+        while pending:
+            object_id = pending.pop()
+            if object_id in reachable:
+                continue
+            reachable.add(object_id)
+            pending.extend(objects.get(object_id, {}).get("children", []))
+        # Xcode's navigator only shows what hangs off the main group
+        self.orphans = [
+            {"id": str(object_id), "path": paths.get(object_id), "targets": self.targets.get(object_id, [])}
+            for object_id, obj in project.objects_of("PBXFileReference")
+            if object_id not in reachable and obj.get("sourceTree") != "BUILT_PRODUCTS_DIR"
+        ]
+        self.orphan_ids = {entry["id"] for entry in self.orphans}
+        self.built_at = time.time()
+        self.build_ms = (time.perf_counter() - started) * 1000
+
+    def normalize(self, path):
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.project_dir)
+        return os.path.normpath(path)
+
+    def lookup(self, path):
+        """Everything known about one path"""
+        path = self.normalize(path)
+        references = self.references.get(path, [])
+        groups = sorted({self.groups[r] for r in references if self.groups.get(r) is not None})
+        targets = [t for r in references for t in self.targets.get(r, [])]
+        synchronized = None
+        for folder, (chain, attached) in self.synchronized.items():
+            if path.startswith(folder + "/"):
+                relative = path[len(folder) + 1:]
+                synchronized = folder
+                if chain is not None:
+                    groups.append("/".join(filter(None, (chain, os.path.basename(folder), os.path.dirname(relative)))))
+                targets += [{"target": name, "phase": phase_name(expected_phase(path))}
+                            for name, excluded in attached if relative not in excluded]
+        return {
+            "path": path,
+            "references": [str(r) for r in references],
+            "groups": groups,
+            "targets": targets,
+            "synchronized_folder": synchronized,
+            "in_project": bool(references) or synchronized is not None,
+            "orphaned": bool(references) and all(str(r) in self.orphan_ids for r in references),
+        }
+
+
+def file_signature(path):
+    """What changes when the file is rewritten: inode, size, mtime"""
+    st = os.stat(path)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class Daemon:
+    def __init__(self, project_path):
+        self.project_path = project_path
+        self.index = ProjectIndex(project_path)
+        self.rebuilds = 0
+        self.requests = 0
+        self.clients = 0
+
+    def current(self):
+        """The index, rebuilt first if the project file changed since it was built"""
+        try:
+            signature = file_signature(self.project_path)
+        except FileNotFoundError:
+            return self.index
+        if signature != self.index.signature:
+            try:
+                self.index = ProjectIndex(self.project_path)
+                self.rebuilds += 1
+            except pbxproj.PBXProjError as e:
+                # Mid-merge or half-written: keep answering from the last good index
+                print(f"~ {self.project_path} does not parse ({e}); keeping the previous index")
+                self.index.signature = signature
+        return self.index
+
+    def answer(self, request):
+        op = request.get("op")
+        index = self.current()
+        if op == "ping":
+            return "pong"
+        if op in ("file", "targets", "group"):
+            if not isinstance(request.get("path"), str):
+                raise ValueError(f"{op} needs a path")
+            found = index.lookup(request["path"])
+            if op == "targets":
+                return found["targets"]
+            if op == "group":
+                return found["groups"]
+            return found
+        if op == "orphans":
+            return index.orphans
+        if op == "stats":
+            return {
+                "objects": index.object_count,
+                "files": sum(len(ids) for ids in index.references.values()),
+                "orphans": len(index.orphans),
+                "synchronized_folders": len(index.synchronized),
+                "index_build_ms": round(index.build_ms, 1),
+                "index_age_seconds": round(time.time() - index.built_at, 1),
+                "rebuilds": self.rebuilds,
+                "requests": self.requests,
+                "clients": self.clients,
+            }
+        raise ValueError(f"unknown op {op!r}")
+
+    async def handle(self, reader, writer):
+        self.clients += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                try:
+                    response = {"ok": True, "result": self.answer(json.loads(line))}
+                except (ValueError, AttributeError) as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            self.current()
+
+    async def serve(self, socket_path):
+        server = await asyncio.start_unix_server(self.handle, path=socket_path)
+        watcher = asyncio.create_task(self.watch())
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        print(f"✓ Serving {self.project_path} on {socket_path} "
+              f"({self.index.object_count:,} objects indexed in {self.index.build_ms:.0f} ms)")
+        async with server:
+            await stop.wait()
+        watcher.cancel()
+
+
+def claim_socket(socket_path):
+    """Remove a stale socket file; False if a live daemon is already listening on it"""
+    if not os.path.exists(socket_path):
+        return True
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return False
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(socket_path)
+        return True
+    finally:
+        probe.close()
+
+
+class Client:
+    """Blocking client for hooks and scripts: one connection, many requests"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.stream = self.sock.makefile("rwb")
+
+    def request(self, op, **fields):
+        self.stream.write(json.dumps({"op": op, **fields}).encode("utf-8") + b"\n")
+        self.stream.flush()
+        response = json.loads(self.stream.readline())
+        if not response["ok"]:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve project.pbxproj queries over a Unix socket")
+    parser.add_argument("command", choices=("serve", "query", "bench"))
+    parser.add_argument("op", nargs="?", default="stats", help="Query: file, targets, group, orphans, stats, ping")
+    parser.add_argument("path", nargs="?", help="File path for file / targets / group")
+    parser.add_argument("--project", default=pbxproj.PROJECT_PATH, help="project.pbxproj to index")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per client for bench")
+    parser.add_argument("--clients", type=int, default=1, help="Concurrent clients for bench")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        os.makedirs(os.path.dirname(os.path.abspath(args.socket)), exist_ok=True)
+        if not claim_socket(args.socket):
+            print(f"✗ A daemon is already listening on {args.socket}")
+            return 1
+        try:
+            asyncio.run(Daemon(args.project).serve(args.socket))
+        finally:
+            if os.path.exists(args.socket):
+                os.unlink(args.socket)
+        return 0
+
+    try:
+        client = Client(args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"✗ No daemon on {args.socket}; start one with: python3 project_index.py serve &")
+        return 1
+
+    if args.command == "query":
+        fields = {"path": args.path} if args.path else {}
+        try:
+            print(json.dumps(client.request(args.op, **fields), indent=2))
+        except ValueError as e:
+            print(f"✗ {e}")
+            return 1
+        return 0
+
+    # bench: sequential round trips per client, clients in threads
+    path = args.path or "Billix/App/ContentView.swift"
+    latencies = []
+
+    def run():
+        own = Client(args.socket)
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            own.request("file", path=path)
+            latencies.append(time.perf_counter() - started)
+        own.close()
+
+    threads = [threading.Thread(target=run) for _ in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    mark = "✓" if percentile(0.50) < 1 else "✗"
+    print(f"{mark} {len(latencies):,} 'file' queries from {args.clients} client(s): {len(latencies) / elapsed:,.0f}/s, "
+          f"p50 {percentile(0.50):.3f} ms, p99 {percentile(0.99):.3f} ms")
+    client.close()
+    return 0 if mark == "✓" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
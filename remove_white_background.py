@@ -1,10 +1,23 @@
 #!/usr/bin/env python3
 """
 Remove white background from PNG images and make them transparent
+
+Large images can be processed with --tiled, which decodes, processes and
+encodes horizontal bands one at a time so peak memory is bounded by the band
+height instead of the image size. The output pixels are identical to the
+whole-image path.
 """
-from PIL import Image
+from PIL import Image, ImageChops
+import argparse
+import os
 import sys
 
+from png_utils import PNGBandReader, PNGError, PNGStreamWriter
+
+# Rendering chunks copied from the source when streaming (matches Pillow keeping iCCP)
+TILED_CARRIED_CHUNKS = {b"iCCP"}
+
+
 def remove_white_background(input_path, output_path, threshold=240):
     """
     Remove white background from an image
@@ -39,7 +52,74 @@ def remove_white_background(input_path, output_path, threshold=240):
     img.save(output_path, "PNG")
     print(f"Saved transparent image to: {output_path}")
 
+
+def clear_white_pixels(band, threshold=240):
+    """
+    Set alpha to 0 wherever R, G and B are all >= threshold (same rule as
+    remove_white_background, done with Pillow band operations)
+
+    Args:
+        band: RGBA image (a band or a whole image)
+        threshold: RGB value threshold for considering a pixel as white (0-255)
+    """
+    r, g, b, a = band.split()
+    lut = [255 if value >= threshold else 0 for value in range(256)]
+    white = ImageChops.multiply(ImageChops.multiply(r.point(lut), g.point(lut)), b.point(lut))
+    a = ImageChops.subtract(a, white)
+    return Image.merge("RGBA", (r, g, b, a))
+
+
+def remove_white_background_tiled(input_path, output_path, threshold=240, band_height=256):
+    """
+    Remove white background band by band with bounded memory
+
+    Falls back to the whole-image path for PNGs the band reader cannot stream
+    (16-bit, interlaced, color-key transparency) and for non-PNG inputs.
+
+    Args:
+        input_path: Path to input image
+        output_path: Path to save output image (must differ from input_path)
+        threshold: RGB value threshold for considering a pixel as white (0-255)
+        band_height: Rows decoded and processed at a time
+    """
+    try:
+        reader = PNGBandReader(input_path, band_height)
+    except PNGError as e:
+        print(f"Cannot stream {input_path} ({e}), using whole-image path")
+        remove_white_background(input_path, output_path, threshold)
+        return
+
+    with reader:
+        carried = [(ctype, body) for ctype, body in reader.ancillary if ctype in TILED_CARRIED_CHUNKS]
+        with PNGStreamWriter(output_path, reader.width, reader.height, "RGBA", carried) as writer:
+            for band in reader.iter_bands():
+                writer.write_band(clear_white_pixels(band.convert("RGBA"), threshold))
+
+    print(f"Saved transparent image to: {output_path}")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Make near-white pixels transparent")
+    parser.add_argument("input", nargs="?", help="Input image (default: the pig and money stack assets)")
+    parser.add_argument("output", nargs="?", help="Output image (default: overwrite input)")
+    parser.add_argument("--threshold", type=int, default=240, help="RGB threshold for white (0-255)")
+    parser.add_argument("--tiled", action="store_true", help="Process in horizontal bands with bounded memory")
+    parser.add_argument("--band-height", type=int, default=256, help="Rows per band in --tiled mode")
+    args = parser.parse_args()
+
+    if args.input:
+        output = args.output or args.input
+        if args.tiled and output == args.input:
+            # The streaming writer cannot overwrite the file it is reading
+            tmp_output = output + ".tmp"
+            remove_white_background_tiled(args.input, tmp_output, args.threshold, args.band_height)
+            os.replace(tmp_output, output)
+        elif args.tiled:
+            remove_white_background_tiled(args.input, output, args.threshold, args.band_height)
+        else:
+            remove_white_background(args.input, output, args.threshold)
+        sys.exit(0)
+
     # Process pig image
     pig_input = "/Users/jg_2030/Billix/Billix/Assets.xcassets/pig_loading.imageset/pig_loading.png"
     pig_output = "/Users/jg_2030/Billix/Billix/Assets.xcassets/pig_loading.imageset/pig_loading.png"
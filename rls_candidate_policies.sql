@@ -0,0 +1,95 @@
+-- Candidate RLS Policy Rewrites
+-- Created: 2026-10-18
+--
+-- Index-friendly forms of the SELECT policies on the assist and connection
+-- tables, for rls_profiler.py --candidate. Not a migration: once a rewrite
+-- has been profiled and returns the same rows, move it into one.
+--
+--   * (SELECT auth.uid()) is evaluated once per statement as an InitPlan
+--     instead of once per row.
+--   * The "which requests / connections am I part of" subqueries go through
+--     SECURITY DEFINER helpers, so they are not filtered again by the
+--     assist_requests and connections policies, and the result is compared
+--     with = ANY (ARRAY(...)), which the planner can use as an index condition.
+
+-- ============================================
+-- PART 1: HELPERS
+-- ============================================
+
+-- Requests the current user asked for, or (p_include_helping) is helping with
+CREATE OR REPLACE FUNCTION user_assist_request_ids(p_include_helping BOOLEAN)
+RETURNS SETOF UUID AS $$
+    SELECT id FROM assist_requests WHERE requester_id = (SELECT auth.uid())
+    UNION ALL
+    SELECT id FROM assist_requests WHERE p_include_helping AND helper_id = (SELECT auth.uid())
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION user_helped_assist_request_ids()
+RETURNS SETOF UUID AS $$
+    SELECT id FROM assist_requests WHERE helper_id = (SELECT auth.uid())
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION user_connection_ids()
+RETURNS SETOF UUID AS $$
+    SELECT id FROM connections WHERE initiator_id = (SELECT auth.uid())
+    UNION ALL
+    SELECT id FROM connections WHERE supporter_id = (SELECT auth.uid())
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- ============================================
+-- PART 2: ASSIST POLICIES
+-- ============================================
+
+DROP POLICY IF EXISTS "Users can view active requests" ON assist_requests;
+CREATE POLICY "Users can view active requests" ON assist_requests
+    FOR SELECT USING (
+        status = 'active' OR
+        requester_id = (SELECT auth.uid()) OR
+        helper_id = (SELECT auth.uid())
+    );
+
+DROP POLICY IF EXISTS "Users can view offers on their requests or their own offers" ON assist_offers;
+CREATE POLICY "Users can view offers on their requests or their own offers" ON assist_offers
+    FOR SELECT USING (
+        offerer_id = (SELECT auth.uid()) OR
+        assist_request_id = ANY (ARRAY(SELECT user_assist_request_ids(false)))
+    );
+
+DROP POLICY IF EXISTS "Participants can view messages" ON assist_messages;
+CREATE POLICY "Participants can view messages" ON assist_messages
+    FOR SELECT USING (
+        assist_request_id = ANY (ARRAY(SELECT user_assist_request_ids(true)))
+    );
+
+DROP POLICY IF EXISTS "Participants can view repayments" ON assist_repayments;
+CREATE POLICY "Participants can view repayments" ON assist_repayments
+    FOR SELECT USING (
+        payer_id = (SELECT auth.uid()) OR
+        assist_request_id = ANY (ARRAY(SELECT user_helped_assist_request_ids()))
+    );
+
+DROP POLICY IF EXISTS "Users can view their disputes" ON assist_disputes;
+CREATE POLICY "Users can view their disputes" ON assist_disputes
+    FOR SELECT USING (
+        reported_by = (SELECT auth.uid()) OR
+        assist_request_id = ANY (ARRAY(SELECT user_assist_request_ids(true)))
+    );
+
+-- ============================================
+-- PART 3: CONNECTION POLICIES
+-- ============================================
+
+DROP POLICY IF EXISTS "Users can view own connections" ON connections;
+CREATE POLICY "Users can view own connections"
+    ON connections FOR SELECT
+    USING (initiator_id = (SELECT auth.uid()) OR supporter_id = (SELECT auth.uid()));
+
+DROP POLICY IF EXISTS "Connection participants can view terms" ON connection_terms;
+CREATE POLICY "Connection participants can view terms"
+    ON connection_terms FOR SELECT
+    USING (connection_id = ANY (ARRAY(SELECT user_connection_ids())));
+
+DROP POLICY IF EXISTS "Connection participants can view events" ON connection_events;
+CREATE POLICY "Connection participants can view events"
+    ON connection_events FOR SELECT
+    USING (connection_id = ANY (ARRAY(SELECT user_connection_ids())));
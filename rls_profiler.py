@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Profile what the row level security policies cost the assist and connection queries.
+
+Seeds a local Postgres (a temporary cluster by default) with all migrations
+and synthetic users, assist requests, offers, messages and connections, then
+runs the queries the app makes (see AssistRequestService, AssistMessagingService,
+TermsService) twice:
+
+  no RLS   as the connecting (owner) role, so policies are bypassed
+  RLS      as the authenticated role for one seeded user, like PostgREST does
+
+Each query is run under EXPLAIN (ANALYZE, BUFFERS) --runs times; the median
+time, buffers touched and any subplans the policies added (with how many times
+they ran) are reported side by side. A subplan that runs once per row is the
+per-row nested loop a policy like "assist_request_id IN (SELECT ...)" can turn
+into.
+
+--candidate applies a SQL file of rewritten policies (DROP POLICY / CREATE
+POLICY, helper functions, indexes) after the baseline and profiles again,
+checking that every query still returns exactly the same rows for the user.
+rls_candidate_policies.sql is a starting point.
+
+Usage:
+    python3 rls_profiler.py
+    python3 rls_profiler.py --users 20000 --messages 30 --runs 9
+    python3 rls_profiler.py --candidate rls_candidate_policies.sql
+    python3 rls_profiler.py --plans --only "messages on a request"
+    python3 rls_profiler.py --report rls_profile.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+
+import sql_migrations
+from migrate import apply_migration, ensure_ledger
+from pg_harness import grant_api_roles, import_psycopg2, install_stubs, open_database, set_request_user
+
+SEED_SQL = """
+CREATE TEMP TABLE seed_users AS
+SELECT gen_random_uuid() AS id, n FROM generate_series(0, %(users)s - 1) n;
+INSERT INTO auth.users (id) SELECT id FROM seed_users;
+
+-- Half of the requests are still open; the rest have a helper
+CREATE TEMP TABLE seed_requests AS
+SELECT
+    gen_random_uuid() AS id, u.id AS requester_id, u.n,
+    CASE WHEN (u.n + g) %% 2 = 0 THEN 'active' WHEN (u.n + g) %% 4 = 1 THEN 'matched' ELSE 'completed' END AS status,
+    h.id AS helper_id
+FROM seed_users u
+CROSS JOIN generate_series(1, %(requests)s) g
+JOIN seed_users h ON h.n = (u.n + g * 7 + 1) %% %(users)s;
+
+INSERT INTO assist_requests (id, requester_id, helper_id, status, bill_category, bill_provider, bill_amount,
+                             bill_due_date, amount_requested, created_at, matched_at)
+SELECT
+    id, requester_id, CASE WHEN status = 'active' THEN NULL ELSE helper_id END, status,
+    'energy', 'PSEG', 120, CURRENT_DATE + 10, 60,
+    NOW() - random() * INTERVAL '30 days',
+    CASE WHEN status = 'active' THEN NULL ELSE NOW() - random() * INTERVAL '2 days' END
+FROM seed_requests;
+
+INSERT INTO assist_offers (assist_request_id, offerer_id, proposed_terms, created_at)
+SELECT r.id, o.id, '{}', NOW() - random() * INTERVAL '5 days'
+FROM seed_requests r
+CROSS JOIN generate_series(1, %(offers)s) k
+JOIN seed_users o ON o.n = (r.n + k * 13 + 3) %% %(users)s;
+
+INSERT INTO assist_messages (assist_request_id, sender_id, content, created_at)
+SELECT
+    r.id, CASE WHEN k %% 2 = 0 THEN r.requester_id ELSE r.helper_id END,
+    'message ' || k, NOW() - (%(messages)s - k) * INTERVAL '1 minute'
+FROM seed_requests r
+CROSS JOIN generate_series(1, %(messages)s) k
+WHERE r.status <> 'active';
+
+CREATE TEMP TABLE seed_connections AS
+SELECT gen_random_uuid() AS id, gen_random_uuid() AS bill_id, u.id AS initiator_id, s.id AS supporter_id, g
+FROM seed_users u
+CROSS JOIN generate_series(1, %(connections)s) g
+JOIN seed_users s ON s.n = (u.n + g * 11 + 5) %% %(users)s;
+
+INSERT INTO support_bills (id, user_id, amount, status)
+SELECT bill_id, initiator_id, 80, 'posted' FROM seed_connections;
+INSERT INTO connections (id, initiator_id, supporter_id, bill_id, status)
+SELECT id, initiator_id, supporter_id, bill_id, CASE WHEN g %% 3 = 0 THEN 'requested' ELSE 'active' END
+FROM seed_connections;
+INSERT INTO connection_terms (connection_id, proposer_id, bill_amount, deadline, expires_at)
+SELECT id, initiator_id, 80, NOW() + INTERVAL '3 days', NOW() + INTERVAL '1 day' FROM seed_connections;
+INSERT INTO connection_events (connection_id, actor_id, event_type)
+SELECT c.id, c.initiator_id, e
+FROM seed_connections c
+CROSS JOIN unnest(ARRAY['created', 'matched', 'terms_proposed']) e;
+
+DROP TABLE seed_users, seed_requests, seed_connections;
+ANALYZE;
+"""
+
+# The seeded user with the most matched requests, one of those requests and one of their connections
+SUBJECT_SQL = """
+SELECT r.requester_id, r.id, (SELECT c.id FROM connections c WHERE c.initiator_id = r.requester_id LIMIT 1)
+FROM assist_requests r
+WHERE r.status <> 'active'
+ORDER BY (SELECT COUNT(*) FROM assist_requests x WHERE x.requester_id = r.requester_id) DESC, r.requester_id, r.id
+LIMIT 1
+"""
+
+# (name, SQL) with %(user)s, %(request)s and %(connection)s filled in from SUBJECT_SQL
+QUERIES = [
+    ("request feed", "SELECT * FROM assist_requests WHERE status = 'active' AND requester_id <> %(user)s "
+                     "ORDER BY created_at DESC LIMIT 20"),
+    ("my requests", "SELECT * FROM assist_requests WHERE requester_id = %(user)s ORDER BY created_at DESC"),
+    ("requests I help", "SELECT * FROM assist_requests WHERE helper_id = %(user)s "
+                        "AND status IN ('matched', 'fee_pending', 'fee_paid') ORDER BY matched_at DESC"),
+    ("offers on a request", "SELECT * FROM assist_offers WHERE assist_request_id = %(request)s "
+                            "ORDER BY created_at DESC"),
+    ("messages on a request", "SELECT * FROM assist_messages WHERE assist_request_id = %(request)s "
+                              "ORDER BY created_at"),
+    ("all visible offers", "SELECT COUNT(*) FROM assist_offers"),
+    ("all visible messages", "SELECT COUNT(*) FROM assist_messages"),
+    ("my connections", "SELECT * FROM connections WHERE initiator_id = %(user)s OR supporter_id = %(user)s"),
+    ("latest terms", "SELECT * FROM connection_terms WHERE connection_id = %(connection)s "
+                     "ORDER BY created_at DESC LIMIT 1"),
+    ("connection events", "SELECT * FROM connection_events WHERE connection_id = %(connection)s "
+                          "ORDER BY created_at"),
+    ("all visible terms", "SELECT COUNT(*) FROM connection_terms"),
+]
+
+FINGERPRINT_SQL = "SELECT COUNT(*), md5(string_agg(md5(q::TEXT), '' ORDER BY md5(q::TEXT))) FROM ({query}) q"
+
+
+def seed(conn, args):
+    install_stubs(conn)
+    ensure_ledger(conn)
+    for migration in sql_migrations.order(sql_migrations.discover()):
+        apply_migration(conn, migration)
+    grant_api_roles(conn)
+    with conn.cursor() as cur:
+        cur.execute(SEED_SQL, {"users": args.users, "requests": args.requests, "offers": args.offers,
+                               "messages": args.messages, "connections": args.connections})
+    conn.commit()
+
+
+def table_sizes(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT relname, reltuples::BIGINT FROM pg_class WHERE relkind = 'r' "
+                    "AND relname IN ('assist_requests', 'assist_offers', 'assist_messages', 'connections', "
+                    "'connection_terms', 'connection_events') ORDER BY relname")
+        return dict(cur.fetchall())
+
+
+def subplans(node, found=None):
+    """SubPlans and InitPlans in a JSON plan: list of (name, loops, relation)"""
+    if found is None:
+        found = []
+    if node.get("Parent Relationship") in ("SubPlan", "InitPlan"):
+        found.append((node.get("Subplan Name", node["Parent Relationship"]), node.get("Actual Loops", 0),
+                      node.get("Relation Name")))
+    for child in node.get("Plans", ()):
+        subplans(child, found)
+    return found
+
+
+def explain(conn, sql, params, user_id, runs):
+    """
+    EXPLAIN ANALYZE sql runs times, as user_id through RLS or (user_id None) as the owner
+
+    Returns:
+        dict with ms (median execution + planning), rows, buffers, subplans and
+        the text plan of the last run
+    """
+    timings = []
+    with conn.cursor() as cur:
+        for _ in range(runs):
+            if user_id:
+                set_request_user(cur, user_id)
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+            result = cur.fetchone()[0][0]
+            conn.rollback()
+            timings.append(result["Execution Time"] + result["Planning Time"])
+        if user_id:
+            set_request_user(cur, user_id)
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+        text = "\n".join(row[0] for row in cur.fetchall())
+        conn.rollback()
+    plan = result["Plan"]
+    return {
+        "ms": round(statistics.median(timings), 3),
+        "rows": plan.get("Actual Rows"),
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "subplans": [{"name": name, "loops": loops, "relation": relation}
+                     for name, loops, relation in subplans(plan)],
+        "plan": text,
+    }
+
+
+def fingerprint(conn, sql, params, user_id):
+    """Row count and hash of what the user sees"""
+    with conn.cursor() as cur:
+        set_request_user(cur, user_id)
+        cur.execute(FINGERPRINT_SQL.format(query=sql), params)
+        result = cur.fetchone()
+    conn.rollback()
+    return result
+
+
+def describe(label, measured, baseline=None):
+    ratio = f"  {measured['ms'] / baseline['ms']:.2f}x" if baseline and baseline["ms"] else ""
+    loops = ", ".join(f"{s['name'].split(' (')[0]}{' on ' + s['relation'] if s['relation'] else ''} x{s['loops']}"
+                      for s in measured["subplans"])
+    return (f"    {label:<10} {measured['ms']:>9.3f} ms  rows {measured['rows']:<6} "
+            f"buffers {measured['buffers']:<6}{ratio}{'  ' + loops if loops else ''}")
+
+
+def profile(conn, queries, params, user_id, runs):
+    results = {}
+    for name, sql in queries:
+        results[name] = {
+            "owner": explain(conn, sql, params, None, runs),
+            "rls": explain(conn, sql, params, user_id, runs),
+            "fingerprint": fingerprint(conn, sql, params, user_id),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile RLS policy overhead on the assist and connection tables")
+    parser.add_argument("--users", type=int, default=2000, help="Synthetic users")
+    parser.add_argument("--requests", type=int, default=5, help="Assist requests per user")
+    parser.add_argument("--offers", type=int, default=4, help="Offers per request")
+    parser.add_argument("--messages", type=int, default=10, help="Messages per matched request")
+    parser.add_argument("--connections", type=int, default=3, help="Connections per user")
+    parser.add_argument("--runs", type=int, default=5, help="EXPLAIN ANALYZE runs per query (median)")
+    parser.add_argument("--candidate", help="SQL file with rewritten policies to compare against")
+    parser.add_argument("--only", action="append", help="Profile only this query (repeatable)")
+    parser.add_argument("--plans", action="store_true", help="Print the RLS plans")
+    parser.add_argument("--dsn", help="Scratch database (default: $BILLIX_TEST_DSN or a temporary cluster)")
+    parser.add_argument("--report", help="Write results as JSON")
+    args = parser.parse_args()
+
+    queries = [(name, sql) for name, sql in QUERIES if not args.only or name in args.only]
+    if not queries:
+        print(f"✗ No such query; choose from: {', '.join(name for name, _sql in QUERIES)}")
+        return 1
+    candidate_sql = None
+    if args.candidate:
+        with open(args.candidate) as f:
+            candidate_sql = f.read()
+
+    import_psycopg2()
+    with open_database(args.dsn) as database:
+        conn = database.connect()
+        seed(conn, args)
+        sizes = table_sizes(conn)
+        print("Seeded " + ", ".join(f"{table} {count:,}" for table, count in sizes.items()))
+        with conn.cursor() as cur:
+            cur.execute(SUBJECT_SQL)
+            user_id, request_id, connection_id = cur.fetchone()
+        conn.rollback()
+        params = {"user": user_id, "request": request_id, "connection": connection_id}
+        print(f"Profiling as authenticated user {user_id}\n")
+
+        baseline = profile(conn, queries, params, user_id, args.runs)
+        candidate = None
+        if candidate_sql:
+            with conn.cursor() as cur:
+                cur.execute(candidate_sql)
+            conn.commit()
+            candidate = profile(conn, queries, params, user_id, args.runs)
+        conn.close()
+
+    changed = []
+    for name, _sql in queries:
+        result = baseline[name]
+        print(name)
+        print(describe("no RLS", result["owner"]))
+        print(describe("RLS", result["rls"], result["owner"]))
+        if candidate:
+            rewritten = candidate[name]
+            print(describe("candidate", rewritten["rls"], result["owner"]))
+            if rewritten["fingerprint"] != result["fingerprint"]:
+                changed.append(name)
+                print(f"    ✗ candidate returns different rows ({rewritten['fingerprint'][0]} vs "
+                      f"{result['fingerprint'][0]})")
+        if args.plans:
+            print("\n".join("      " + line for line in result["rls"]["plan"].splitlines()))
+            if candidate:
+                print("    candidate plan:")
+                print("\n".join("      " + line for line in candidate[name]["rls"]["plan"].splitlines()))
+
+    total_owner = sum(baseline[name]["owner"]["ms"] for name, _sql in queries)
+    total_rls = sum(baseline[name]["rls"]["ms"] for name, _sql in queries)
+    print(f"\n✓ RLS total {total_rls:.2f} ms vs {total_owner:.2f} ms without ({total_rls / total_owner:.1f}x)")
+    if candidate:
+        total_candidate = sum(candidate[name]["rls"]["ms"] for name, _sql in queries)
+        print(f"{'✗' if changed else '✓'} Candidate total {total_candidate:.2f} ms "
+              f"({total_rls / total_candidate:.1f}x faster than the current policies)")
+        if changed:
+            print(f"✗ Candidate changes what the user sees in: {', '.join(changed)}")
+
+    if args.report:
+        report = {"sizes": sizes, "user": str(user_id), "baseline": baseline, "candidate": candidate}
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+            f.write("\n")
+        print(f"✓ Wrote {args.report}")
+    return 1 if changed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,519 @@
+"""
+Parsing and dependency analysis for the SQL migration files.
+
+The feature folders ship hand-written migrations (BillSwap/Database,
+Home/Migrations, TrustLadder/Migrations, ...). This module splits them into
+statements, works out which tables, functions, triggers and policies each one
+creates and references, and orders them so every migration runs after the
+migrations that create what it uses. Objects no migration creates (profiles,
+auth.users, storage.buckets...) are reported as external: they must already
+exist in the target database.
+
+Directives are read from "-- migrate:" comment lines anywhere in a file:
+
+    -- migrate:no-transaction              run statement by statement in autocommit
+                                           (needed for CREATE INDEX CONCURRENTLY)
+    -- migrate:depends-on Home/Migrations/homepage_features.sql
+                                           explicit edge the analysis cannot see
+
+Migrations under supabase/migrations are applied by the Supabase CLI and are not
+part of this set.
+"""
+
+import glob
+import hashlib
+import os
+import re
+
+DEFAULT_MIGRATION_GLOB = "Billix/Features/**/*.sql"
+
+# Transaction control is owned by the runner, so these are skipped (homepage_features.sql ends with COMMIT;)
+TRANSACTION_CONTROL = re.compile(r"^(?:BEGIN|COMMIT|END|ROLLBACK|START\s+TRANSACTION)\b\s*(?:WORK|TRANSACTION)?\s*;?$",
+                                 re.IGNORECASE)
+
+DOLLAR_TAG = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$")
+
+DIRECTIVE = re.compile(r"^[ \t]*--[ \t]*migrate:([a-z-]+)[ \t]*(.*?)[ \t]*$", re.MULTILINE)
+
+# Object name: optionally schema-qualified, each part bare or double-quoted
+NAME = r'(?:"[^"]+"|[A-Za-z_][\w$]*)(?:\s*\.\s*(?:"[^"]+"|[A-Za-z_][\w$]*))?'
+
+CREATE_PATTERNS = [
+    ("table", re.compile(
+        r"^CREATE\s+(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+        rf"({NAME})", re.IGNORECASE)),
+    ("view", re.compile(
+        rf"^CREATE\s+(?:OR\s+REPLACE\s+)?(?:MATERIALIZED\s+)?VIEW\s+(?:IF\s+NOT\s+EXISTS\s+)?({NAME})", re.IGNORECASE)),
+    ("function", re.compile(
+        rf"^CREATE\s+(?:OR\s+REPLACE\s+)?(?:FUNCTION|PROCEDURE)\s+({NAME})\s*\(", re.IGNORECASE)),
+    ("type", re.compile(rf"^CREATE\s+TYPE\s+({NAME})", re.IGNORECASE)),
+    ("sequence", re.compile(rf"^CREATE\s+SEQUENCE\s+(?:IF\s+NOT\s+EXISTS\s+)?({NAME})", re.IGNORECASE)),
+    ("schema", re.compile(rf"^CREATE\s+SCHEMA\s+(?:IF\s+NOT\s+EXISTS\s+)?({NAME})", re.IGNORECASE)),
+    ("extension", re.compile(rf"^CREATE\s+EXTENSION\s+(?:IF\s+NOT\s+EXISTS\s+)?({NAME})", re.IGNORECASE)),
+]
+
+# Objects that live on a table: name ON table
+CREATE_INDEX = re.compile(
+    rf"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?({NAME})?\s*ON\s+(?:ONLY\s+)?({NAME})",
+    re.IGNORECASE)
+CREATE_TRIGGER = re.compile(
+    rf"^CREATE\s+(?:OR\s+REPLACE\s+)?(?:CONSTRAINT\s+)?TRIGGER\s+({NAME})\s.*?\bON\s+({NAME})", re.IGNORECASE | re.DOTALL)
+CREATE_POLICY = re.compile(rf"^CREATE\s+POLICY\s+({NAME})\s+ON\s+({NAME})", re.IGNORECASE)
+# REFERENCING NEW TABLE AS new_rows: names the trigger function reads like tables
+TRANSITION_TABLE = re.compile(r"\b(?:NEW|OLD)\s+TABLE\s+(?:AS\s+)?(\w+)", re.IGNORECASE)
+
+# Table references: keyword followed by a name that is not a function call
+TABLE_REFERENCE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|TABLE(?:\s+IF\s+EXISTS)?(?:\s+ONLY)?|SETOF|TRUNCATE(?:\s+TABLE)?)\s+"
+    rf"({NAME})(?![\w$.])(?!\s*\()",
+    re.IGNORECASE)
+# Keyword followed by a table name that may be followed by a column list
+COLUMN_LIST_REFERENCE = re.compile(rf"\b(?:REFERENCES|INSERT\s+INTO)\s+({NAME})", re.IGNORECASE)
+# SELECT ... FOR UPDATE [OF alias, ...] [SKIP LOCKED | NOWAIT]: not an UPDATE of a table
+ROW_LOCKING = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|KEY\s+SHARE|UPDATE|SHARE)"
+    rf"(?:\s+OF\s+{NAME}(?:\s*,\s*{NAME})*)?(?:\s+(?:SKIP\s+LOCKED|NOWAIT))?\b",
+    re.IGNORECASE)
+# FROM inside expressions, not a table source
+EXPRESSION_FROM = re.compile(r"\b(?:EXTRACT\s*\(\s*\w+|DISTINCT)\s+FROM\b", re.IGNORECASE)
+# WITH name AS (...), name AS (...): CTEs read like tables in the main query
+CTE_NAME = re.compile(r"(?:\bWITH(?:\s+RECURSIVE)?|,)\s*(\w+)\s+AS\s+(?:NOT\s+)?(?:MATERIALIZED\s+)?\(", re.IGNORECASE)
+QUOTED_IDENTIFIER = re.compile(r'"[^"]*"')
+FUNCTION_CALL = re.compile(rf"({NAME})\s*\(")
+TRIGGER_FUNCTION = re.compile(rf"\bEXECUTE\s+(?:FUNCTION|PROCEDURE)\s+({NAME})\s*\(", re.IGNORECASE)
+
+# Words that can follow FROM/ON/UPDATE/... without being an object name
+KEYWORDS = {
+    "all", "and", "any", "as", "by", "cascade", "check", "conflict", "constraint", "current_date", "current_time",
+    "current_timestamp", "default", "delete", "distinct", "do", "each", "else", "end", "exists", "false", "for",
+    "from", "function", "if", "in", "insert", "into", "is", "join", "lateral", "like", "not", "nothing", "null",
+    "of", "on", "only", "or", "procedure", "restrict", "returning", "row", "select", "set", "statement", "table",
+    "then", "to", "true", "truncate", "update", "using", "values", "when", "where", "with", "new", "old",
+}
+
+
+class MigrationError(Exception):
+    """Raised for unparseable migrations and unsatisfiable orderings"""
+
+
+def split_statements(sql):
+    """
+    Split SQL text into top-level statements
+
+    Handles -- and nested /* */ comments, '' and E'' strings, double-quoted
+    identifiers and $tag$ dollar quoting, so semicolons inside function bodies
+    and literals do not end a statement.
+
+    Returns:
+        list of (statement, line_number) with the trailing semicolon removed
+    """
+    statements = []
+    start = 0
+    i = 0
+    length = len(sql)
+    while i < length:
+        ch = sql[i]
+        if ch == "-" and sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = length if end == -1 else end + 1
+        elif ch == "/" and sql.startswith("/*", i):
+            depth = 1
+            i += 2
+            while i < length and depth:
+                if sql.startswith("/*", i):
+                    depth += 1
+                    i += 2
+                elif sql.startswith("*/", i):
+                    depth -= 1
+                    i += 2
+                else:
+                    i += 1
+            if depth:
+                raise MigrationError(f"unterminated comment at line {sql.count(chr(10), 0, start) + 1}")
+        elif ch == "'":
+            escapes = i > 0 and sql[i - 1] in "eE" and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == "_"))
+            i += 1
+            while True:
+                if i >= length:
+                    raise MigrationError(f"unterminated string at line {sql.count(chr(10), 0, start) + 1}")
+                if escapes and sql[i] == "\\":
+                    i += 2
+                elif sql[i] == "'":
+                    if sql.startswith("''", i):
+                        i += 2
+                    else:
+                        i += 1
+                        break
+                else:
+                    i += 1
+        elif ch == '"':
+            end = sql.find('"', i + 1)
+            while end != -1 and sql.startswith('""', end):
+                end = sql.find('"', end + 2)
+            if end == -1:
+                raise MigrationError(f"unterminated identifier at line {sql.count(chr(10), 0, start) + 1}")
+            i = end + 1
+        elif ch == "$":
+            match = DOLLAR_TAG.match(sql, i)
+            if match and not (i > 0 and (sql[i - 1].isalnum() or sql[i - 1] == "_")):
+                tag = match.group(0)
+                end = sql.find(tag, i + len(tag))
+                if end == -1:
+                    raise MigrationError(f"unterminated {tag} block at line {sql.count(chr(10), 0, start) + 1}")
+                i = end + len(tag)
+            else:
+                i += 1
+        elif ch == ";":
+            _append_statement(statements, sql, start, i)
+            i += 1
+            start = i
+        else:
+            i += 1
+    _append_statement(statements, sql, start, length)
+    return statements
+
+
+def _append_statement(statements, sql, start, end):
+    text = sql[start:end]
+    body = strip_comments(text).strip()
+    if body:
+        # Report the line of the first real token, not of the comments before it
+        offset = start + len(text) - len(text.lstrip())
+        while sql.startswith("--", offset) or sql.startswith("/*", offset):
+            if sql.startswith("--", offset):
+                offset = sql.find("\n", offset, end) + 1 or end
+            else:
+                offset = sql.find("*/", offset, end) + 2
+            while offset < end and sql[offset].isspace():
+                offset += 1
+        statements.append((text.strip(), sql.count("\n", 0, offset) + 1))
+
+
+def strip_comments(sql, strip_strings=False):
+    """
+    Remove comments from SQL, keeping quoted text intact
+
+    Args:
+        sql: SQL text
+        strip_strings: Also blank out single-quoted literals (dollar-quoted bodies are kept,
+            since function bodies are code)
+    """
+    out = []
+    i = 0
+    length = len(sql)
+    while i < length:
+        ch = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = length if end == -1 else end
+            out.append(" ")
+        elif sql.startswith("/*", i):
+            depth = 1
+            i += 2
+            while i < length and depth:
+                if sql.startswith("/*", i):
+                    depth += 1
+                    i += 2
+                elif sql.startswith("*/", i):
+                    depth -= 1
+                    i += 2
+                else:
+                    i += 1
+            out.append(" ")
+        elif ch == "'":
+            escapes = i > 0 and sql[i - 1] in "eE" and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == "_"))
+            j = i + 1
+            while j < length:
+                if escapes and sql[j] == "\\":
+                    j += 2
+                elif sql.startswith("''", j):
+                    j += 2
+                elif sql[j] == "'":
+                    break
+                else:
+                    j += 1
+            out.append("''" if strip_strings else sql[i:j + 1])
+            i = j + 1
+        elif ch == '"':
+            end = sql.find('"', i + 1)
+            end = length - 1 if end == -1 else end
+            out.append(sql[i:end + 1])
+            i = end + 1
+        elif ch == "$":
+            match = DOLLAR_TAG.match(sql, i)
+            if match and not (i > 0 and (sql[i - 1].isalnum() or sql[i - 1] == "_")):
+                tag = match.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = length if end == -1 else end
+                # Recurse so comments and literals inside function bodies are handled too
+                out.append(tag + strip_comments(sql[i + len(tag):end], strip_strings) + tag)
+                i = end + len(tag)
+            else:
+                out.append(ch)
+                i += 1
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def normalize_name(name, default_schema="public"):
+    """
+    Canonical object name: lower-case unless quoted, schema-qualified
+
+    normalize_name('Profiles') -> 'public.profiles'
+    normalize_name('auth.users') -> 'auth.users'
+    """
+    parts = []
+    for part in re.findall(r'"[^"]+"|[^.\s]+', name):
+        parts.append(part[1:-1] if part.startswith('"') else part.lower())
+    if len(parts) == 1:
+        parts.insert(0, default_schema)
+    return ".".join(parts)
+
+
+def is_transaction_control(statement):
+    return bool(TRANSACTION_CONTROL.match(strip_comments(statement).strip()))
+
+
+def analyze_statement(statement):
+    """
+    Objects a single statement creates and references
+
+    Returns:
+        (creates, references, function_calls) where creates and references are
+        sets of (kind, name) and function_calls is a set of candidate function
+        names (resolved against known functions later)
+    """
+    code = strip_comments(statement, strip_strings=True).strip()
+    creates = set()
+    references = set()
+
+    for kind, pattern in CREATE_PATTERNS:
+        match = pattern.match(code)
+        if match:
+            creates.add((kind, normalize_name(match.group(1))))
+            break
+
+    match = CREATE_INDEX.match(code)
+    if match:
+        table = normalize_name(match.group(2))
+        references.add(("table", table))
+        if match.group(1):
+            creates.add(("index", normalize_name(match.group(1), table.split(".")[0])))
+    match = CREATE_TRIGGER.match(code)
+    if match:
+        table = normalize_name(match.group(2))
+        references.add(("table", table))
+        creates.add(("trigger", f"{table}.{normalize_name(match.group(1), '').lstrip('.')}"))
+        for name in TRANSITION_TABLE.findall(code):
+            creates.add(("transition", normalize_name(name)))
+    match = CREATE_POLICY.match(code)
+    if match:
+        table = normalize_name(match.group(2))
+        references.add(("table", table))
+        creates.add(("policy", f"{table}.{normalize_name(match.group(1), '').lstrip('.')}"))
+
+    # Policy and trigger names are free text ("Users can update own bills")
+    code = QUOTED_IDENTIFIER.sub('"_"', code)
+    for name in COLUMN_LIST_REFERENCE.findall(code):
+        references.add(("table", normalize_name(name)))
+    for name in TABLE_REFERENCE.findall(ROW_LOCKING.sub(" ", EXPRESSION_FROM.sub(" ", code))):
+        if name.lower() not in KEYWORDS:
+            references.add(("table", normalize_name(name)))
+
+    function_calls = set()
+    for name in TRIGGER_FUNCTION.findall(code):
+        references.add(("function", normalize_name(name)))
+    for name in FUNCTION_CALL.findall(code):
+        if name.lower() not in KEYWORDS:
+            function_calls.add(normalize_name(name))
+
+    # A created table or function is not also a reference of its own statement,
+    # and "users(id)" after REFERENCES is a table, not a call
+    references -= creates
+    references -= {("table", normalize_name(name)) for name in CTE_NAME.findall(code)}
+    function_calls -= {name for kind, name in creates | references if kind in ("function", "table")}
+    return creates, references, function_calls
+
+
+class Migration:
+    """One migration file: its statements, directives and the objects it creates and uses"""
+
+    def __init__(self, path, root="."):
+        self.path = path
+        self.name = os.path.relpath(path, root).replace(os.sep, "/")
+        with open(path, "rb") as f:
+            data = f.read()
+        self.checksum = hashlib.sha256(data).hexdigest()
+        self.sql = data.decode("utf-8")
+
+        self.no_transaction = False
+        self.depends_on = set()
+        for directive, value in DIRECTIVE.findall(self.sql):
+            if directive == "no-transaction":
+                self.no_transaction = True
+            elif directive == "depends-on":
+                self.depends_on.update(value.split())
+            else:
+                raise MigrationError(f"{self.name}: unknown directive migrate:{directive}")
+
+        self.statements = []
+        self.skipped = []
+        self.creates = set()
+        self.references = set()
+        self.function_calls = set()
+        for statement, line in split_statements(self.sql):
+            if is_transaction_control(statement):
+                self.skipped.append((statement, line))
+                continue
+            self.statements.append((statement, line))
+            creates, references, calls = analyze_statement(statement)
+            self.creates |= creates
+            self.references |= references
+            self.function_calls |= calls
+        self.references -= self.creates
+        # Transition tables are declared by the trigger but used in its function's body
+        self.references -= {("table", name) for kind, name in self.creates if kind == "transition"}
+        self.function_calls -= {name for kind, name in self.creates if kind == "function"}
+
+    def __repr__(self):
+        return f"Migration({self.name!r})"
+
+
+def discover(paths=None, pattern=DEFAULT_MIGRATION_GLOB, root="."):
+    """
+    Load migrations from explicit paths (files or folders) or the default glob
+
+    Returns:
+        list of Migration sorted by name
+    """
+    files = []
+    if paths:
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(glob.glob(os.path.join(path, "**", "*.sql"), recursive=True))
+            else:
+                files.append(path)
+    else:
+        files = glob.glob(os.path.join(root, pattern), recursive=True)
+    return sorted((Migration(path, root) for path in set(files)), key=lambda m: m.name)
+
+
+def resolve(migrations):
+    """
+    Work out the dependency graph
+
+    Returns:
+        (edges, external) where edges maps migration name -> set of names it
+        must run after (with the objects that caused each edge) and external
+        maps (kind, name) -> names of the migrations that need it
+    """
+    creators = {}
+    for migration in migrations:
+        for obj in migration.creates:
+            creators.setdefault(obj, []).append(migration.name)
+    functions = {name for kind, name in creators if kind == "function"}
+    by_name = {m.name: m for m in migrations}
+
+    edges = {m.name: {} for m in migrations}
+    external = {}
+    for migration in migrations:
+        needed = set(migration.references)
+        for name in migration.function_calls:
+            # Unqualified calls that no migration defines are assumed to be built-ins (now(), COALESCE...)
+            if name in functions or not name.startswith("public."):
+                needed.add(("function", name))
+        for obj in needed:
+            owners = [owner for owner in creators.get(obj, ()) if owner != migration.name]
+            if obj in migration.creates:
+                continue
+            if not owners:
+                kind, name = obj
+                # Views, types and sequences share the relation namespace with tables
+                if kind == "table" and any(creators.get((k, name)) for k in ("view", "type", "sequence")):
+                    continue
+                external.setdefault(obj, set()).add(migration.name)
+                continue
+            for owner in owners:
+                edges[migration.name].setdefault(owner, set()).add(obj)
+        for dependency in migration.depends_on:
+            if dependency not in by_name:
+                raise MigrationError(f"{migration.name}: depends-on {dependency} which is not a known migration")
+            edges[migration.name].setdefault(dependency, set()).add(("migration", dependency))
+    return edges, external
+
+
+def order(migrations):
+    """
+    Topologically sort migrations, breaking ties by name so the order is stable
+
+    Raises:
+        MigrationError: if the dependencies form a cycle
+    """
+    edges, _external = resolve(migrations)
+    by_name = {m.name: m for m in migrations}
+    remaining = {name: set(deps) for name, deps in edges.items()}
+    ordered = []
+    while remaining:
+        ready = sorted(name for name, deps in remaining.items() if not deps)
+        if not ready:
+            cycle = ", ".join(sorted(remaining))
+            raise MigrationError(f"dependency cycle between: {cycle}")
+        name = ready[0]
+        ordered.append(by_name[name])
+        del remaining[name]
+        for deps in remaining.values():
+            deps.discard(name)
+    return ordered
+
+
+def without(migrations, names):
+    """
+    Ordered migrations minus the named ones and everything that depends on them
+
+    Useful for building the schema as it was before a change, e.g. to compare
+    against it in a benchmark.
+    """
+    ordered = order(migrations)
+    edges, _external = resolve(migrations)
+    excluded = set(names)
+    for migration in ordered:
+        if excluded & set(edges[migration.name]):
+            excluded.add(migration.name)
+    return [m for m in ordered if m.name not in excluded]
+
+
+def redefinitions(migrations):
+    """
+    Objects created by more than one migration with no ordering between them
+
+    Such pairs run in name order, which is rarely what the later file intended;
+    add a depends-on directive to make it explicit.
+    """
+    edges, _external = resolve(migrations)
+
+    def reaches(start, target):
+        stack = [start]
+        seen = set()
+        while stack:
+            name = stack.pop()
+            if name == target:
+                return True
+            if name not in seen:
+                seen.add(name)
+                stack.extend(edges[name])
+        return False
+
+    creators = {}
+    for migration in migrations:
+        for kind, name in migration.creates:
+            if kind in ("table", "function", "view", "trigger", "policy", "index", "type"):
+                creators.setdefault((kind, name), []).append(migration.name)
+    found = []
+    for obj, names in sorted(creators.items()):
+        for i, first in enumerate(names):
+            for second in names[i + 1:]:
+                if not reaches(first, second) and not reaches(second, first):
+                    found.append((obj, first, second))
+    return found
@@ -0,0 +1,389 @@
+"""
+Static schema model built from the SQL migrations.
+
+Replays the CREATE/ALTER statements of every migration (in dependency order)
+into plain Python objects: tables with their columns and foreign keys,
+indexes (including the implicit ones behind PRIMARY KEY and UNIQUE), RLS
+policies and functions. Nothing here talks to a database; tools use it to
+reason about what the migrations declare.
+
+    schema = build_schema(sql_migrations.order(sql_migrations.discover()))
+    schema.tables["public.connections"].columns
+"""
+
+import re
+
+import sql_migrations
+from sql_migrations import NAME, normalize_name, strip_comments
+
+CREATE_TABLE = re.compile(
+    r"^CREATE\s+(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+    rf"({NAME})\s*\(", re.IGNORECASE)
+ALTER_TABLE = re.compile(rf"^ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({NAME})\s+(.*)$", re.IGNORECASE | re.DOTALL)
+ADD_COLUMN = re.compile(rf"^ADD\s+(?:COLUMN\s+)?(?:IF\s+NOT\s+EXISTS\s+)?({NAME})\s+(.*)$", re.IGNORECASE | re.DOTALL)
+ADD_CONSTRAINT = re.compile(r"^ADD\s+(CONSTRAINT\s+.*|PRIMARY\s+KEY.*|UNIQUE.*|FOREIGN\s+KEY.*)$", re.IGNORECASE | re.DOTALL)
+CREATE_INDEX = re.compile(
+    r"^CREATE\s+(UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?"
+    rf"({NAME})?\s*ON\s+(?:ONLY\s+)?({NAME})\s*(?:USING\s+(\w+)\s*)?\(", re.IGNORECASE)
+CREATE_POLICY = re.compile(
+    rf"^CREATE\s+POLICY\s+({NAME})\s+ON\s+({NAME})(?:\s+AS\s+(PERMISSIVE|RESTRICTIVE))?"
+    r"(?:\s+FOR\s+(ALL|SELECT|INSERT|UPDATE|DELETE))?(?:\s+TO\s+([\w\s,]+?))?(?=\s+USING\b|\s+WITH\b|\s*$)",
+    re.IGNORECASE)
+CREATE_FUNCTION = re.compile(
+    rf"^CREATE\s+(?:OR\s+REPLACE\s+)?(?:FUNCTION|PROCEDURE)\s+({NAME})\s*\(", re.IGNORECASE)
+DOLLAR_BODY = re.compile(r"(\$[A-Za-z_]*\$)(.*?)\1", re.DOTALL)
+LANGUAGE = re.compile(r"\bLANGUAGE\s+'?(\w+)'?", re.IGNORECASE)
+CREATE_TRIGGER = re.compile(
+    rf"^CREATE\s+(?:OR\s+REPLACE\s+)?(?:CONSTRAINT\s+)?TRIGGER\s+({NAME})\s+(.*?)\bON\s+({NAME})\s+(.*?)"
+    rf"\bEXECUTE\s+(?:FUNCTION|PROCEDURE)\s+({NAME})\s*\(", re.IGNORECASE | re.DOTALL)
+REFERENCES = re.compile(
+    rf"\bREFERENCES\s+({NAME})\s*(?:\(([^)]*)\))?(?:.*?\bON\s+DELETE\s+(CASCADE|SET\s+NULL|SET\s+DEFAULT|RESTRICT|NO\s+ACTION))?",
+    re.IGNORECASE | re.DOTALL)
+DROP_INDEX = re.compile(rf"^DROP\s+INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?({NAME})", re.IGNORECASE)
+DROP_TRIGGER = re.compile(rf"^DROP\s+TRIGGER\s+(?:IF\s+EXISTS\s+)?({NAME})\s+ON\s+({NAME})", re.IGNORECASE)
+DROP_POLICY = re.compile(rf"^DROP\s+POLICY\s+(?:IF\s+EXISTS\s+)?({NAME})\s+ON\s+({NAME})", re.IGNORECASE)
+
+CONSTRAINT_START = re.compile(r"^(?:CONSTRAINT\s+\S+\s+)?(PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|CHECK|EXCLUDE)\b",
+                              re.IGNORECASE)
+
+
+def split_top_level(text, separator=","):
+    """
+    Split on a separator (a character, or a keyword like "AND") outside
+    parentheses and quotes
+
+    Returns:
+        list of stripped parts
+    """
+    keyword = len(separator) > 1
+    pattern = re.compile(rf"\b{separator}\b", re.IGNORECASE) if keyword else None
+    parts = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in "'\"":
+            end = text.find(ch, i + 1)
+            while end != -1 and text.startswith(ch * 2, end):
+                end = text.find(ch, end + 2)
+            i = len(text) if end == -1 else end + 1
+            continue
+        if ch == "$":
+            match = sql_migrations.DOLLAR_TAG.match(text, i)
+            if match:
+                end = text.find(match.group(0), match.end())
+                i = len(text) if end == -1 else end + len(match.group(0))
+                continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth == 0:
+            if keyword:
+                match = pattern.match(text, i)
+                if match and (i == 0 or not (text[i - 1].isalnum() or text[i - 1] == "_")):
+                    parts.append(text[start:i].strip())
+                    i = match.end()
+                    start = i
+                    continue
+            elif ch == separator:
+                parts.append(text[start:i].strip())
+                start = i + 1
+        i += 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def matching_paren(text, open_index):
+    """Index of the parenthesis closing the one at open_index (quotes aware)"""
+    depth = 0
+    i = open_index
+    while i < len(text):
+        ch = text[i]
+        if ch in "'\"":
+            end = text.find(ch, i + 1)
+            i = len(text) if end == -1 else end + 1
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise sql_migrations.MigrationError(f"unbalanced parenthesis in: {text[open_index:open_index + 60]}")
+
+
+def normalize_expression(text):
+    """Whitespace- and case-normalized SQL expression (string literals keep their case)"""
+    parts = re.split(r"('(?:[^']|'')*')", text.strip())
+    out = []
+    for index, part in enumerate(parts):
+        out.append(part if index % 2 else re.sub(r"\s+", " ", part.lower()))
+    text = "".join(out)
+    text = re.sub(r"\s*([(),])\s*", r"\1", text)
+    text = re.sub(r"\s*(<>|!=|<=|>=|=|<|>)\s*", r" \1 ", text)
+    text = re.sub(r",", ", ", text)
+    text = re.sub(r"\b(in|and|or|not|exists|any|all)\(", r"\1 (", text)
+    return text.strip()
+
+
+def _clause(text, keyword):
+    """Parenthesized expression after a keyword at the top level of text, e.g. USING (...)"""
+    match = re.search(rf"\b{keyword}\s*\(", text, re.IGNORECASE)
+    if not match:
+        return None
+    open_index = match.end() - 1
+    return text[open_index + 1:matching_paren(text, open_index)].strip()
+
+
+def column_name(name):
+    return name[1:-1] if name.startswith('"') else name.lower()
+
+
+class Table:
+    def __init__(self, name, migration=None):
+        self.name = name
+        self.migration = migration
+        self.columns = {}
+        self.foreign_keys = []
+        self.rls = False
+
+    @property
+    def external(self):
+        """Created outside the migrations (Supabase or older app tables); columns are only partly known"""
+        return self.migration is None
+
+
+class ForeignKey:
+    def __init__(self, table, columns, ref_table, ref_columns, on_delete):
+        self.table = table
+        self.columns = columns
+        self.ref_table = ref_table
+        self.ref_columns = ref_columns
+        self.on_delete = on_delete
+
+
+class Index:
+    def __init__(self, name, table, columns, predicate=None, unique=False, method="btree", implicit=False,
+                 migration=None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.predicate = predicate
+        self.unique = unique
+        self.method = method
+        self.implicit = implicit
+        self.migration = migration
+
+    @property
+    def key_columns(self):
+        """Plain column names of the key (expressions and sort options dropped)"""
+        keys = []
+        for column in self.columns:
+            match = re.match(r'^("[^"]+"|[A-Za-z_]\w*)(?:\s|$)', column)
+            keys.append(column_name(match.group(1)) if match else None)
+        return keys
+
+
+class Policy:
+    def __init__(self, name, table, command, roles, using, check, permissive=True, migration=None):
+        self.name = name
+        self.table = table
+        self.command = command
+        self.roles = roles
+        self.using = using
+        self.check = check
+        self.permissive = permissive
+        self.migration = migration
+
+
+class Function:
+    def __init__(self, name, body, language, definition, migration=None):
+        self.name = name
+        self.body = body
+        self.language = language
+        self.definition = definition
+        self.migration = migration
+
+
+class Trigger:
+    def __init__(self, name, table, timing, level, function, definition, migration=None):
+        self.name = name
+        self.table = table
+        self.timing = timing
+        self.level = level
+        self.function = function
+        self.definition = definition
+        self.migration = migration
+
+
+class Schema:
+    """Tables, indexes, policies, functions and triggers declared by the migrations"""
+
+    def __init__(self):
+        self.tables = {}
+        self.indexes = {}
+        self.policies = []
+        self.functions = {}
+        self.triggers = {}
+
+    def table(self, name, migration=None):
+        """Get or register a table; tables first seen in ALTER TABLE are external"""
+        if name not in self.tables:
+            self.tables[name] = Table(name, migration)
+        return self.tables[name]
+
+    def indexes_on(self, table):
+        return [index for index in self.indexes.values() if index.table == table]
+
+    def add_index(self, index):
+        if index.name in self.indexes:
+            return
+        self.indexes[index.name] = index
+
+    def apply(self, statement, migration=None):
+        """Replay one statement into the model (statements it does not model are ignored)"""
+        code = strip_comments(statement).strip()
+
+        match = CREATE_TABLE.match(code)
+        if match:
+            name = normalize_name(match.group(1))
+            table = self.table(name, migration)
+            table.migration = migration
+            open_index = match.end() - 1
+            body = code[open_index + 1:matching_paren(code, open_index)]
+            for item in split_top_level(body):
+                self._add_table_item(table, item)
+            return
+
+        match = ALTER_TABLE.match(code)
+        if match:
+            table = self.table(normalize_name(match.group(1)))
+            for action in split_top_level(match.group(2)):
+                add = ADD_COLUMN.match(action)
+                constraint = ADD_CONSTRAINT.match(action)
+                if constraint:
+                    self._add_table_item(table, constraint.group(1))
+                elif add and add.group(1).upper() not in ("CONSTRAINT", "PRIMARY", "UNIQUE", "FOREIGN", "CHECK"):
+                    self._add_column(table, add.group(1), add.group(2))
+                elif re.match(r"^ENABLE\s+ROW\s+LEVEL\s+SECURITY", action, re.IGNORECASE):
+                    table.rls = True
+            return
+
+        match = CREATE_INDEX.match(code)
+        if match:
+            unique, name, table_name, method = match.group(1), match.group(2), match.group(3), match.group(4)
+            table_name = normalize_name(table_name)
+            open_index = match.end() - 1
+            close = matching_paren(code, open_index)
+            columns = [normalize_expression(c) for c in split_top_level(code[open_index + 1:close])]
+            rest = code[close + 1:]
+            where = re.search(r"\bWHERE\b(.*)$", rest, re.IGNORECASE | re.DOTALL)
+            predicate = normalize_expression(where.group(1)) if where else None
+            if name is None:
+                name = f"{table_name.split('.')[-1]}_{'_'.join(c.split()[0] for c in columns)}_idx"
+            self.add_index(Index(normalize_name(name, table_name.split(".")[0]), table_name, columns, predicate,
+                                 bool(unique), (method or "btree").lower(), migration=migration))
+            return
+
+        match = CREATE_POLICY.match(code)
+        if match:
+            name, table_name, kind, command, roles = match.groups()
+            rest = code[match.end():]
+            self.policies.append(Policy(
+                name.strip('"'), normalize_name(table_name), (command or "ALL").upper(),
+                [r.strip().lower() for r in roles.split(",")] if roles else ["public"],
+                _clause(rest, r"USING"), _clause(rest, r"WITH\s+CHECK"),
+                (kind or "PERMISSIVE").upper() == "PERMISSIVE", migration))
+            return
+
+        match = CREATE_FUNCTION.match(code)
+        if match:
+            body = DOLLAR_BODY.search(code)
+            language = LANGUAGE.search(code[body.end():] if body else code)
+            self.functions[normalize_name(match.group(1))] = Function(
+                normalize_name(match.group(1)), body.group(2) if body else "",
+                language.group(1).lower() if language else "sql", code, migration)
+            return
+
+        match = CREATE_TRIGGER.match(code)
+        if match:
+            name, timing, table_name, level, function = match.groups()
+            table_name = normalize_name(table_name)
+            level = "STATEMENT" if re.search(r"\bFOR\s+EACH\s+STATEMENT\b", level, re.IGNORECASE) else "ROW"
+            key = f"{table_name}.{column_name(name)}"
+            self.triggers[key] = Trigger(column_name(name), table_name, " ".join(timing.split()).upper(), level,
+                                         normalize_name(function), code, migration)
+            return
+
+        match = DROP_INDEX.match(code)
+        if match:
+            self.indexes.pop(normalize_name(match.group(1)), None)
+            return
+        match = DROP_TRIGGER.match(code)
+        if match:
+            self.triggers.pop(f"{normalize_name(match.group(2))}.{column_name(match.group(1))}", None)
+            return
+        match = DROP_POLICY.match(code)
+        if match:
+            table_name = normalize_name(match.group(2))
+            name = match.group(1).strip('"')
+            self.policies = [p for p in self.policies if not (p.table == table_name and p.name == name)]
+
+    def _add_table_item(self, table, item):
+        constraint = CONSTRAINT_START.match(item)
+        if not constraint:
+            name, _, definition = item.partition(" ")
+            self._add_column(table, name, definition)
+            return
+
+        kind = " ".join(constraint.group(1).upper().split())
+        columns_match = re.search(r"\(([^)]*)\)", item[constraint.end():])
+        columns = [column_name(c.strip()) for c in columns_match.group(1).split(",")] if columns_match else []
+        if kind in ("PRIMARY KEY", "UNIQUE"):
+            suffix = "pkey" if kind == "PRIMARY KEY" else "key"
+            short = table.name.split(".")[-1]
+            name = f"{table.name.split('.')[0]}.{short}_{'_'.join(columns)}_{suffix}"
+            self.add_index(Index(name, table.name, columns, unique=True, implicit=True, migration=table.migration))
+        elif kind == "FOREIGN KEY":
+            ref = REFERENCES.search(item)
+            if ref:
+                self._add_foreign_key(table, columns, ref)
+
+    def _add_column(self, table, name, definition):
+        column = column_name(name)
+        type_match = re.match(r"([\w ]+?(?:\([^)]*\))?(?:\[\])?)(?=\s+(?:NOT|NULL|DEFAULT|PRIMARY|UNIQUE|REFERENCES|"
+                              r"CHECK|CONSTRAINT|GENERATED|COLLATE)\b|\s*$)", definition.strip(), re.IGNORECASE)
+        table.columns[column] = (type_match.group(1) if type_match else definition.split(" ")[0]).strip().upper()
+        short = table.name.split(".")[-1]
+        schema = table.name.split(".")[0]
+        if re.search(r"\bPRIMARY\s+KEY\b", definition, re.IGNORECASE):
+            self.add_index(Index(f"{schema}.{short}_pkey", table.name, [column], unique=True, implicit=True,
+                                 migration=table.migration))
+        elif re.search(r"\bUNIQUE\b", definition, re.IGNORECASE):
+            self.add_index(Index(f"{schema}.{short}_{column}_key", table.name, [column], unique=True, implicit=True,
+                                 migration=table.migration))
+        ref = REFERENCES.search(definition)
+        if ref:
+            self._add_foreign_key(table, [column], ref)
+
+    def _add_foreign_key(self, table, columns, ref):
+        ref_columns = [column_name(c.strip()) for c in ref.group(2).split(",")] if ref.group(2) else ["id"]
+        on_delete = " ".join(ref.group(3).upper().split()) if ref.group(3) else "NO ACTION"
+        table.foreign_keys.append(ForeignKey(table.name, columns, normalize_name(ref.group(1)), ref_columns, on_delete))
+
+
+def build_schema(migrations):
+    """
+    Replay migrations (already in dependency order) into a Schema
+
+    Args:
+        migrations: list of sql_migrations.Migration
+    """
+    schema = Schema()
+    for migration in migrations:
+        for statement, _line in migration.statements:
+            schema.apply(statement, migration)
+    return schema
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Sync each target's Resources (and, with --sources, Sources) build phase with
+the files on disk.
+
+The add_*.py scripts only know sourcecode.swift and the Sources phase; the
+Resources phase has been kept by hand. That is how CircularProgressRing.swift,
+StarDisplay.swift and SeasonCardLarge.swift ended up in Copy Bundle Resources
+of all three targets. This walks each target's folder (Billix/ for Billix,
+...) once and decides per file, by extension (pbxproj.FILE_TYPES), what it is:
+
+  - asset catalogs, string catalogs, JSON, SQL, plists, fonts, media: copied
+    by the Resources phase
+  - Swift, Objective-C and Metal files: compiled by the Sources phase
+  - StoreKit configurations, entitlements, .xcconfig: referenced only, never
+    copied (Xcode reads them through the scheme and build settings)
+
+Then, for every target:
+
+  + a file that belongs in a phase but is not in it gets a PBXBuildFile there,
+    and a file reference with the right lastKnownFileType if it had none
+  - a build file whose file is gone from disk, or that sits in a phase its type
+    does not belong to (Swift in Resources), is removed
+  ~ an existing reference with a wrong lastKnownFileType is corrected
+
+Left out: the target's INFOPLIST_FILE and CODE_SIGN_ENTITLEMENTS, the SQL
+migrations sql_migrations.py applies (DEFAULT_MIGRATION_GLOB), .lproj folders,
+anything --exclude matches, and files under synchronized folders (Xcode
+builds those itself).
+
+All changes, sources and resources alike, go into the project in one save,
+which rewrites only the objects that changed.
+
+Usage:
+    python3 sync_project_files.py                     # show what would change
+    python3 sync_project_files.py --write
+    python3 sync_project_files.py --sources --write   # Swift files too
+    python3 sync_project_files.py --exclude 'Billix/Fixtures/*' --write
+"""
+
+import argparse
+import fnmatch
+import os
+import sys
+
+import pbxproj
+from move_project_files import Mover
+from sql_migrations import DEFAULT_MIGRATION_GLOB
+
+SOURCES = "PBXSourcesBuildPhase"
+RESOURCES = "PBXResourcesBuildPhase"
+
+# Localized folders are variant groups; not handled here
+SKIPPED_FOLDER_EXTENSIONS = frozenset({".lproj"})
+
+NEW_PHASE = {"buildActionMask": "2147483647", "runOnlyForDeploymentPostprocessing": "0"}
+
+
+def phase_label(isa):
+    """PBXResourcesBuildPhase -> Resources"""
+    return isa[3:-len("BuildPhase")]
+
+
+def walk_target_folder(project_dir, folder, skipped):
+    """
+    Every file below a target folder, in one walk; bundles (.xcassets, ...)
+    count as one file
+
+    Returns:
+        dict path relative to the project directory -> (lastKnownFileType, phase isa or None)
+    """
+    found = {}
+    for directory, folders, files in os.walk(os.path.join(project_dir, folder)):
+        relative_dir = os.path.relpath(directory, project_dir)
+        kept = []
+        for name in sorted(folders):
+            extension = os.path.splitext(name)[1].lower()
+            path = os.path.join(relative_dir, name)
+            if name.startswith(".") or extension in SKIPPED_FOLDER_EXTENSIONS or path in skipped:
+                continue
+            if extension:
+                files.append(name)
+            else:
+                kept.append(name)
+        folders[:] = kept
+        for name in sorted(files):
+            path = os.path.join(relative_dir, name)
+            file_type = pbxproj.FILE_TYPES.get(os.path.splitext(name)[1].lower())
+            if not name.startswith(".") and file_type and path not in skipped:
+                found[path] = file_type
+    return found
+
+
+class Sync:
+    def __init__(self, project, project_dir, phases, excludes):
+        self.project = project
+        self.project_dir = project_dir
+        self.phases = phases
+        self.excludes = [DEFAULT_MIGRATION_GLOB] + list(excludes)
+        self.paths = project.resolve_paths()
+        self.mover = Mover(project, project_dir)
+        self.refs_by_path = {}
+        for ref_id, _ref in project.objects_of("PBXFileReference"):
+            if self.paths.get(ref_id):
+                self.refs_by_path.setdefault(self.paths[ref_id], ref_id)
+        self.synchronized = [self.paths[group_id] for group_id, _group
+                             in project.objects_of("PBXFileSystemSynchronizedRootGroup") if self.paths.get(group_id)]
+        self.changes = []
+
+    def excluded(self, path):
+        if any(fnmatch.fnmatchcase(path, pattern) for pattern in self.excludes):
+            return True
+        return any(path == folder or path.startswith(folder + "/") for folder in self.synchronized)
+
+    def target_phase(self, target, isa):
+        """The target's build phase of this isa, created if it has none"""
+        objects = self.project.objects
+        for phase_id in target.get("buildPhases", []):
+            if objects[phase_id].get("isa") == isa:
+                return phase_id
+        label = phase_label(isa)
+        phase_id = pbxproj.Commented(self.project.new_id(f"{target.get('name')}:{label}"), label)
+        objects[phase_id] = {"isa": isa, **NEW_PHASE, "files": []}
+        target.setdefault("buildPhases", []).append(phase_id)
+        return phase_id
+
+    def file_ref(self, path, file_type):
+        """The reference for a path, created in the group for its folder if there is none"""
+        objects = self.project.objects
+        ref_id = self.refs_by_path.get(path)
+        if ref_id is None:
+            name = os.path.basename(path)
+            ref_id = pbxproj.Commented(self.project.new_id(path), name)
+            objects[ref_id] = {"isa": "PBXFileReference", "lastKnownFileType": file_type,
+                               "path": name, "sourceTree": "<group>"}
+            group_id = self.mover.folder_group(os.path.dirname(path) or ".")
+            objects[group_id]["children"].append(ref_id)
+            self.refs_by_path[path] = ref_id
+            self.changes.append(("+", "reference", path))
+        elif "explicitFileType" not in objects[ref_id] and objects[ref_id].get("lastKnownFileType") != file_type:
+            old = objects[ref_id].get("lastKnownFileType")
+            objects[ref_id]["lastKnownFileType"] = file_type
+            self.changes.append(("~", f"type {old} -> {file_type}", path))
+        return ref_id
+
+    def unbuilt(self, target_id, target):
+        """Paths a target must not copy or compile: its Info.plist and entitlements"""
+        skipped = set()
+        list_id = target.get("buildConfigurationList")
+        for config_id in self.project.objects.get(list_id, {}).get("buildConfigurations", []):
+            configuration = self.project.objects[config_id].get("name")
+            settings = self.project.build_settings(target_id, configuration, self.project_dir)
+            for key in ("INFOPLIST_FILE", "CODE_SIGN_ENTITLEMENTS"):
+                if settings.get(key):
+                    skipped.add(os.path.normpath(settings[key]))
+        return skipped
+
+    def sync_target(self, target_id, target):
+        objects = self.project.objects
+        name = target.get("name", target_id)
+        folder = name
+        if not os.path.isdir(os.path.join(self.project_dir, folder)):
+            return
+        skipped = self.unbuilt(target_id, target)
+        on_disk = {path: file_type for path, file_type in walk_target_folder(self.project_dir, folder, skipped).items()
+                   if not self.excluded(path)}
+
+        # Removals: missing files, and files in a phase their type does not belong to
+        present = set()
+        for phase_id in target.get("buildPhases", []):
+            phase = objects[phase_id]
+            if phase.get("isa") not in self.phases:
+                continue
+            for build_file_id in list(phase.get("files", [])):
+                path = self.paths.get(objects[build_file_id].get("fileRef"))
+                if path is None:
+                    continue
+                file_type = pbxproj.FILE_TYPES.get(os.path.splitext(path)[1].lower())
+                exists = os.path.exists(os.path.join(self.project_dir, path))
+                if exists and (file_type is None or file_type[1] == phase["isa"]) and path not in skipped:
+                    present.add((phase["isa"], path))
+                    continue
+                phase["files"].remove(build_file_id)
+                del objects[build_file_id]
+                reason = "missing on disk" if not exists else "wrong phase"
+                self.changes.append(("-", f"{name} {phase_label(phase['isa'])} ({reason})", path))
+
+        # Additions, and reference types for everything that was walked
+        for path, (file_type, phase_isa) in sorted(on_disk.items()):
+            if phase_isa is None:
+                self.file_ref(path, file_type)
+                continue
+            if phase_isa not in self.phases:
+                continue
+            ref_id = self.file_ref(path, file_type)
+            if (phase_isa, path) in present:
+                continue
+            phase_id = self.target_phase(target, phase_isa)
+            label = phase_label(phase_isa)
+            comment = f"{getattr(ref_id, 'comment', None) or os.path.basename(path)} in {label}"
+            build_file_id = pbxproj.Commented(self.project.new_id(f"{name}:{label}:{path}"), comment)
+            objects[build_file_id] = {"isa": "PBXBuildFile", "fileRef": ref_id}
+            objects[phase_id]["files"].append(build_file_id)
+            self.changes.append(("+", f"{name} {label}", path))
+
+    def run(self):
+        for target_id, target in list(self.project.objects_of("PBXNativeTarget")):
+            self.sync_target(target_id, target)
+        return self.changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Resources (and Sources) build phases with the files on disk")
+    parser.add_argument("--project", default=pbxproj.PROJECT_PATH, help="project.pbxproj to update")
+    parser.add_argument("--sources", action="store_true", help="Sync the Sources phase too")
+    parser.add_argument("--exclude", action="append", default=[], help="Glob of paths to leave alone (repeatable)")
+    parser.add_argument("--write", action="store_true", help="Write the changes (default: only show them)")
+    args = parser.parse_args()
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(args.project)))
+    project = pbxproj.load(args.project)
+    phases = {RESOURCES, SOURCES} if args.sources else {RESOURCES}
+    changes = Sync(project, project_dir, phases, args.exclude).run()
+    if not changes:
+        print("✓ Build phases match the files on disk")
+        return 0
+    for mark, what, path in changes:
+        print(f"{mark} {what}: {path}")
+    added = sum(1 for mark, what, _path in changes if mark == "+" and what != "reference")
+    removed = sum(1 for mark, _what, _path in changes if mark == "-")
+    print(f"  {added} build file(s) to add, {removed} to remove, {len(changes) - added - removed} reference change(s)")
+    if not args.write:
+        print("~ Dry run; pass --write to update the project")
+        return 0
+    project.refresh_comments()
+    pbxproj.save(project, args.project)
+    print(f"✓ Updated {args.project}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
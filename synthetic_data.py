@@ -0,0 +1,797 @@
+#!/usr/bin/env python3
+"""
+Load referentially consistent synthetic data for the BillSwap, TrustLadder and Home tables.
+
+The tables come from the CREATE TABLE / ALTER TABLE statements in
+bill_connection_schema.sql, assist_tables.sql and homepage_features.sql, plus
+every table they reference (auth.users, user_bills). Column types, NOT NULL,
+foreign keys, UNIQUE and CHECK constraints (IN lists, numeric bounds,
+column <= column) and enum labels are read back from the catalog once the
+migrations are applied, so later ALTERs are honored too.
+
+Row counts scale with --users (see ROWS_PER_USER). Every row is a pure
+function of (--seed, table, row number): primary keys are derived UUIDs, so a
+foreign key is filled by picking a parent row number and deriving its key, and
+UNIQUE column sets walk a permutation of every allowed combination. Workers
+therefore need no shared state: each table is split into chunks that
+--workers processes generate and stream into Postgres with COPY, parents
+before children.
+
+By default the workers load with session_replication_role = replica, which
+skips foreign key checks and triggers (CHECK, NOT NULL and UNIQUE are still
+enforced); every foreign key is verified with one anti-join afterwards and the
+counters the triggers would have kept (total_repaid, poll votes, referral
+counts) are recomputed. --triggers loads through the triggers instead.
+
+Without --dsn (or BILLIX_TEST_DSN) the data goes into a temporary local
+Postgres with all migrations applied; --keep leaves its data folder behind.
+
+Usage:
+    python3 synthetic_data.py --users 100000                  # ~2.3M rows
+    python3 synthetic_data.py --users 450000 --workers 8      # ~10M rows
+    python3 synthetic_data.py --users 1000 --ratio assist_messages=40 --only assist_messages
+    python3 synthetic_data.py --dsn "$BILLIX_TEST_DSN" --users 200000 --triggers
+"""
+
+import argparse
+import datetime
+import hashlib
+import io
+import math
+import multiprocessing
+import random
+import re
+import sys
+import time
+
+import sql_migrations
+from migrate import apply_migration, ensure_ledger
+from pg_harness import import_psycopg2, install_stubs, open_database
+
+SOURCE_MIGRATIONS = [
+    "Billix/Features/BillSwap/Database/bill_connection_schema.sql",
+    "Billix/Features/TrustLadder/Migrations/assist_tables.sql",
+    "Billix/Features/Home/Migrations/homepage_features.sql",
+]
+
+# Rows per synthetic user; tables not listed get one row per user
+ROWS_PER_USER = {
+    "auth.users": 1,
+    "public.user_bills": 2,
+    "public.support_bills": 1,
+    "public.connections": 0.8,
+    "public.connection_terms": 1.5,
+    "public.connection_events": 3,
+    "public.reputation_sanctions": 0.05,
+    "public.assist_requests": 0.5,
+    "public.assist_offers": 1.5,
+    "public.assist_messages": 5,
+    "public.assist_repayments": 0.5,
+    "public.assist_disputes": 0.02,
+    "public.assist_fee_transactions": 0.5,
+    "public.referrals": 0.3,
+    "public.poll_responses": 2,
+}
+
+# Tables that do not grow with the user base
+FIXED_ROWS = {
+    "public.community_polls": 365,
+    "public.regional_utility_signals": 4500,
+}
+
+# Same alphabet as generate_referral_code(), so unique short codes look like real ones
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+# (column name pattern, low, high) for numbers without a CHECK bound
+NUMBER_HINTS = [
+    (re.compile(r"rating"), 1, 5),
+    (re.compile(r"tier"), 1, 4),
+    (re.compile(r"score|confidence"), 0, 100),
+    (re.compile(r"amount|total|fee|price|repaid|balance"), 5, 500),
+    (re.compile(r"count|swaps|connections|repayments|assists|points|size"), 0, 20),
+    (re.compile(r"percent"), -20, 20),
+]
+
+# Timestamps and dates fall within this many days before now
+TIME_SPAN_DAYS = 365
+
+# Share of NULLs in nullable columns that are not part of a UNIQUE set
+NULL_SHARE = {"fk": 0.25, "other": 0.1}
+
+COLUMNS_SQL = """
+SELECT
+    a.attname, t.typname, t.typtype, a.atttypmod, a.attnotnull,
+    COALESCE(pg_get_expr(d.adbin, d.adrelid), ''), a.attidentity, a.attgenerated,
+    ARRAY(SELECT enumlabel::TEXT FROM pg_enum WHERE enumtypid = t.oid ORDER BY enumsortorder)
+FROM pg_attribute a
+JOIN pg_type t ON t.oid = a.atttypid
+LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY a.attnum
+"""
+
+CONSTRAINTS_SQL = """
+SELECT
+    c.contype,
+    ARRAY(SELECT attname::TEXT FROM unnest(c.conkey) WITH ORDINALITY k(n, i)
+          JOIN pg_attribute ON attrelid = c.conrelid AND attnum = k.n ORDER BY k.i),
+    CASE WHEN c.contype = 'f' THEN n.nspname || '.' || r.relname END,
+    ARRAY(SELECT attname::TEXT FROM unnest(c.confkey) WITH ORDINALITY k(n, i)
+          JOIN pg_attribute ON attrelid = c.confrelid AND attnum = k.n ORDER BY k.i),
+    pg_get_constraintdef(c.oid)
+FROM pg_constraint c
+LEFT JOIN pg_class r ON r.oid = c.confrelid
+LEFT JOIN pg_namespace n ON n.oid = r.relnamespace
+WHERE c.conrelid = %s::regclass AND c.contype IN ('p', 'u', 'f', 'c')
+ORDER BY c.contype, c.conname
+"""
+
+# What the triggers maintain, recomputed in one pass after a load without them
+DERIVED_SQL = """
+-- assist_repayment_totals_insert / _update / _delete
+UPDATE assist_requests r
+SET total_repaid = COALESCE(s.total, 0), last_repayment_at = s.last_at
+FROM assist_requests x
+LEFT JOIN (
+    SELECT assist_request_id, SUM(amount) FILTER (WHERE verified) AS total, MAX(created_at) AS last_at
+    FROM assist_repayments
+    GROUP BY assist_request_id
+) s ON s.assist_request_id = x.id
+WHERE r.id = x.id;
+
+-- trigger_poll_vote_count (recounted into shard 0, then rolled up)
+DELETE FROM poll_vote_shards;
+INSERT INTO poll_vote_shards (poll_id, shard, votes_a, votes_b, views)
+SELECT p.id, 0,
+       COUNT(r.id) FILTER (WHERE r.selected_option = 'a'),
+       COUNT(r.id) FILTER (WHERE r.selected_option = 'b'),
+       COALESCE(p.view_count, 0)
+FROM community_polls p
+LEFT JOIN poll_responses r ON r.poll_id = p.id
+GROUP BY p.id, p.view_count;
+SELECT rollup_poll_votes();
+
+-- process_referral
+UPDATE user_profiles p
+SET referred_by_id = r.referrer_id,
+    referral_count = COALESCE(c.referrals, 0),
+    referral_bonus_claimed = COALESCE(c.referrals, 0) >= 5
+FROM user_profiles x
+LEFT JOIN referrals r ON r.referee_id = x.user_id
+LEFT JOIN (SELECT referrer_id, COUNT(*)::INTEGER AS referrals FROM referrals GROUP BY referrer_id) c
+    ON c.referrer_id = x.user_id
+WHERE p.user_id = x.user_id;
+"""
+
+CHOICES_CHECK = re.compile(r"\(?([a-z_]\w*)\)?(?:::[\w ]+)? = ANY \(\(?ARRAY\[(.*?)\]")
+BOUND_CHECK = re.compile(r"\(?([a-z_]\w*)\)?(?:::[\w ]+)? (>=|<=|>|<) \(?(-?\d+(?:\.\d+)?)\)?(?:::[\w ]+)?")
+RELATION_CHECK = re.compile(r"\(([a-z_]\w*) (>=|<=|>|<) ([a-z_]\w*)\)")
+CHECK_LEFTOVERS = re.compile(r"CHECK|AND|::[\w ]+(?:\[\])?|[()\s]")
+QUOTED_VALUE = re.compile(r"'((?:[^']|'')*)'")
+
+
+class SchemaError(Exception):
+    """A table or constraint the generator cannot fill"""
+
+
+# ============================================
+# SCHEMA
+# ============================================
+
+def source_tables(migrations, sources=SOURCE_MIGRATIONS):
+    """Tables created or altered by the source migrations"""
+    tables = set()
+    by_name = {m.name: m for m in migrations}
+    for name in sources:
+        migration = by_name[name]
+        tables.update(target for kind, target in migration.creates if kind == "table")
+        for statement, _line in migration.statements:
+            match = re.match(rf"^ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({sql_migrations.NAME})\s+ADD\b",
+                             sql_migrations.strip_comments(statement).strip(), re.IGNORECASE)
+            if match:
+                tables.add(sql_migrations.normalize_name(match.group(1)))
+    return tables
+
+
+def parse_check(definition):
+    """
+    Split a CHECK constraint into what the generator understands
+
+    Returns:
+        (choices {column: [values]}, bounds [(column, op, number)],
+         relations [(column, op, column)], understood)
+    """
+    choices, bounds, relations = {}, [], []
+    rest = definition
+    for match in CHOICES_CHECK.finditer(definition):
+        choices[match.group(1)] = [value.replace("''", "'") for value in QUOTED_VALUE.findall(match.group(2))]
+    rest = CHOICES_CHECK.sub("", rest)
+    for match in RELATION_CHECK.finditer(rest):
+        relations.append(match.groups())
+    rest = RELATION_CHECK.sub("", rest)
+    for match in BOUND_CHECK.finditer(rest):
+        bounds.append((match.group(1), match.group(2), float(match.group(3))))
+    rest = BOUND_CHECK.sub("", rest)
+    understood = " OR " not in definition and not CHECK_LEFTOVERS.sub("", rest)
+    return choices, bounds, relations, understood
+
+
+def read_table(cur, table):
+    cur.execute(COLUMNS_SQL, (table,))
+    columns = []
+    for name, typname, typtype, typmod, notnull, default, identity, generated, labels in cur.fetchall():
+        if generated or identity == "a" or (default.startswith("nextval(") and not notnull):
+            continue
+        columns.append({
+            "name": name, "type": typname, "notnull": notnull, "default": default,
+            "enum": list(labels) if typtype == "e" else None,
+            "length": typmod - 4 if typname in ("varchar", "bpchar") and typmod > 0 else None,
+            "precision": ((typmod - 4) >> 16) & 0xFFFF if typname == "numeric" and typmod > 0 else None,
+            "scale": (typmod - 4) & 0xFFFF if typname == "numeric" and typmod > 0 else None,
+        })
+    cur.execute(CONSTRAINTS_SQL, (table,))
+    constraints = cur.fetchall()
+    return columns, constraints
+
+
+def build_specs(conn, tables, users, ratios):
+    """
+    Generation spec for every table, parents first
+
+    Returns:
+        (list of (level, spec) in load order, warnings)
+    """
+    warnings = []
+    raw = {}
+    pending = set(tables)
+    with conn.cursor() as cur:
+        while pending:
+            table = pending.pop()
+            raw[table] = read_table(cur, table)
+            for contype, _cols, parent, _pcols, _definition in raw[table][1]:
+                if contype == "f" and parent not in raw and parent != table:
+                    pending.add(parent)
+    conn.rollback()
+
+    specs = {}
+    for table, (columns, constraints) in raw.items():
+        rows = FIXED_ROWS.get(table) or max(1, round(users * ratios.get(table, ROWS_PER_USER.get(table, 1))))
+        by_name = {column["name"]: column for column in columns}
+        spec = {"table": table, "rows": rows, "columns": columns, "unique": [], "relations": [], "parents": set()}
+        for column in columns:
+            column["kind"] = None
+        for contype, cols, parent, pcols, definition in constraints:
+            if contype == "f":
+                if parent == table:
+                    for col in cols:
+                        by_name[col]["kind"] = "null"
+                    continue
+                spec["parents"].add(parent)
+                for col, pcol in zip(cols, pcols):
+                    by_name[col].update(kind="fk", parent=parent, parent_column=pcol)
+            elif contype == "c":
+                choices, bounds, relations, understood = parse_check(definition)
+                for col, values in choices.items():
+                    by_name[col]["choices"] = values
+                for col, op, value in bounds:
+                    column = by_name[col]
+                    if op in (">", ">="):
+                        column["lo"] = max(column.get("lo", -math.inf), value + (1 if op == ">" else 0) * step(column))
+                    else:
+                        column["hi"] = min(column.get("hi", math.inf), value - (1 if op == "<" else 0) * step(column))
+                spec["relations"].extend(relations)
+                if not understood:
+                    warnings.append(f"{table}: {definition} not understood; rows may be rejected")
+        for contype, cols, _parent, _pcols, _definition in constraints:
+            if contype in ("p", "u"):
+                spec["unique"].append(list(cols))
+        specs[table] = spec
+
+    for spec in specs.values():
+        for column in spec["columns"]:
+            if column["kind"] is None:
+                column["kind"] = plain_kind(column)
+        plan_unique_sets(spec, specs, warnings)
+
+    levels = {}
+
+    def level(table, seen=()):
+        if table in seen:
+            raise SchemaError(f"Foreign key cycle through {table}")
+        if table not in levels:
+            levels[table] = 1 + max((level(p, seen + (table,)) for p in specs[table]["parents"]), default=-1)
+        return levels[table]
+
+    ordered = sorted(specs, key=lambda t: (level(t), t))
+    return [(levels[t], specs[t]) for t in ordered], warnings
+
+
+def step(column):
+    if column["type"] == "numeric":
+        return 10 ** -(column["scale"] or 2)
+    return 1 if column["type"].startswith("int") else 0
+
+
+def plain_kind(column):
+    if column.get("choices") or column["enum"]:
+        return "choice"
+    kind = {
+        "uuid": "uuid", "text": "text", "varchar": "text", "bpchar": "text",
+        "int2": "int", "int4": "int", "int8": "int", "numeric": "number", "float4": "number", "float8": "number",
+        "bool": "bool", "date": "date", "timestamptz": "timestamp", "timestamp": "timestamp",
+        "jsonb": "json", "json": "json",
+    }.get(column["type"])
+    if kind:
+        return kind
+    if column["type"].startswith("_"):
+        return "array"
+    if column["notnull"] and not column["default"]:
+        raise SchemaError(f"No generator for NOT NULL column {column['name']} of type {column['type']}")
+    return "default"
+
+
+def domain_size(column, specs):
+    """How many distinct values a column can take (None = unbounded)"""
+    if column["kind"] == "fk":
+        return specs[column["parent"]]["rows"]
+    if column["kind"] == "choice":
+        return len(column.get("choices") or column["enum"])
+    if column["kind"] == "bool":
+        return 2
+    return None
+
+
+def plan_unique_sets(spec, specs, warnings):
+    """
+    Decide how each UNIQUE / PRIMARY KEY column set gets distinct values
+
+    A lone uuid key with a default becomes a derived key. A set with an
+    unbounded column spreads the row number over it; a set of bounded columns
+    (foreign keys, choices) walks a permutation of all combinations, which
+    caps the table at that many rows.
+    """
+    by_name = {column["name"]: column for column in spec["columns"]}
+    plans = []
+    for cols in spec["unique"]:
+        columns = [by_name[c] for c in cols if c in by_name]
+        if any(column.get("unique") for column in columns):
+            continue
+        if len(columns) == 1 and columns[0]["kind"] == "uuid":
+            columns[0]["kind"] = "key"
+            columns[0]["unique"] = True
+            continue
+        bounded = [(column, domain_size(column, specs)) for column in columns]
+        finite = [(column, size) for column, size in bounded if size is not None]
+        free = [column for column, size in bounded if size is None]
+        capacity = math.prod(size for _column, size in finite) if finite else 1
+        if not free and spec["rows"] > capacity:
+            warnings.append(f"{spec['table']}: capped at {capacity:,} rows by UNIQUE ({', '.join(cols)})")
+            spec["rows"] = capacity
+        multiplier = max(1, int(capacity * 0.6180339887)) | 1
+        while math.gcd(multiplier, capacity) != 1:
+            multiplier += 2
+        for column in columns:
+            column["unique"] = True
+        plans.append({
+            "finite": [(column["name"], size) for column, size in finite],
+            "free": [column["name"] for column in free],
+            "capacity": capacity,
+            "multiplier": multiplier,
+        })
+    spec["unique_plans"] = plans
+
+
+# ============================================
+# ROWS
+# ============================================
+
+def derived_uuid(seed, table, column, n):
+    """Version 4 shaped UUID that is a pure function of its arguments"""
+    h = hashlib.blake2b(f"{seed}:{table}:{column}:{n}".encode(), digest_size=16).hexdigest()
+    return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
+
+
+def encode_code(n, length):
+    chars = []
+    for _ in range(length):
+        n, digit = divmod(n, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+class RowGenerator:
+    """
+    Rows of one table. Keys and UNIQUE values depend only on the row number;
+    the other values come from a random stream seeded per chunk, so the same
+    chunks always produce the same rows.
+    """
+
+    def __init__(self, spec, specs, seed, skew, now):
+        self.spec = spec
+        self.specs = specs
+        self.seed = seed
+        self.skew = skew
+        self.now = now
+        self.today = now.date()
+        self.targets = {}
+        self.columns = [column for column in spec["columns"] if column["kind"] != "default"]
+        self.position = {column["name"]: i for i, column in enumerate(self.columns)}
+        unique = {name for plan in spec["unique_plans"] for name in plan["finite"] + plan["free"]}
+        self.makers = []
+        for column in self.columns:
+            if column["name"] in unique:
+                self.makers.append(None)
+            elif column["kind"] == "null":
+                self.makers.append((1.0, None))
+            else:
+                share = 0.0 if column["notnull"] else NULL_SHARE["fk" if column["kind"] == "fk" else "other"]
+                self.makers.append((share, self.maker(column)))
+
+    def key(self, table, column, n):
+        """Value of table.column in row n (a derived key or a unique-set foreign key)"""
+        if (table, column) not in self.targets:
+            self.targets[table, column] = next(c for c in self.specs[table]["columns"] if c["name"] == column)
+        target = self.targets[table, column]
+        if target["kind"] == "key":
+            return derived_uuid(self.seed, table, column, n)
+        for plan in self.specs[table]["unique_plans"]:
+            values = self.decode(plan, n)
+            if column in values:
+                return self.key(target["parent"], target["parent_column"], values[column])
+        raise SchemaError(f"{table}.{column} is referenced but has no derived values")
+
+    def decode(self, plan, n):
+        """Positions of row n in a unique set: an index into each bounded domain, the rest for the free columns"""
+        if plan["free"]:
+            p, rest = n % plan["capacity"], n // plan["capacity"]
+        else:
+            p, rest = (n * plan["multiplier"] + self.seed) % plan["capacity"], None
+        values = {}
+        for name, size in plan["finite"]:
+            p, values[name] = divmod(p, size)
+        for name in plan["free"]:
+            values[name] = rest
+        return values
+
+    def maker(self, column):
+        """fn(rng, n) -> COPY text (or a number) for a column outside any UNIQUE set"""
+        kind = column["kind"]
+        name = column["name"]
+        table = self.spec["table"]
+        if kind in ("key", "uuid"):
+            seed = self.seed
+            return lambda rng, n: derived_uuid(seed, table, name, n)
+        if kind == "fk":
+            parent, parent_column = column["parent"], column["parent_column"]
+            rows, skew = self.specs[parent]["rows"], self.skew
+            return lambda rng, n: self.key(parent, parent_column, min(rows - 1, int(rows * rng.random() ** skew)))
+        if kind == "choice":
+            choices = [escape(value) for value in column.get("choices") or column["enum"]]
+            return lambda rng, n: choices[int(rng.random() * len(choices))]
+        if kind == "bool":
+            return lambda rng, n: "t" if rng.random() < 0.5 else "f"
+        if kind == "int":
+            lo, hi = self.number_range(column)
+            lo, span = math.ceil(lo), math.floor(hi) - math.ceil(lo) + 1
+            return lambda rng, n: lo + int(rng.random() * span)
+        if kind == "number":
+            lo, hi = self.number_range(column)
+            digits = column["scale"] if column["scale"] is not None else 2
+            return lambda rng, n: round(lo + rng.random() * (hi - lo), digits)
+        if kind == "timestamp":
+            now, span = self.now, TIME_SPAN_DAYS * 86400
+            return lambda rng, n: str(now - datetime.timedelta(seconds=int(rng.random() * span)))
+        if kind == "date":
+            today = self.today
+            return lambda rng, n: str(today + datetime.timedelta(days=int(rng.random() * (TIME_SPAN_DAYS + 30)) -
+                                                                  TIME_SPAN_DAYS))
+        if kind in ("json", "array"):
+            return lambda rng, n: "{}"
+        return self.text_maker(column)
+
+    def number_range(self, column):
+        lo, hi = 0, 100
+        for pattern, hint_lo, hint_hi in NUMBER_HINTS:
+            if pattern.search(column["name"]):
+                lo, hi = hint_lo, hint_hi
+                break
+        if column["precision"]:
+            limit = 10 ** (column["precision"] - column["scale"]) - step(column)
+            lo, hi = max(lo, -limit), min(hi, limit)
+        lo, hi = max(lo, column.get("lo", -math.inf)), min(hi, column.get("hi", math.inf))
+        return lo, max(lo, hi)
+
+    def text_maker(self, column):
+        name, length = column["name"], column["length"]
+        if name == "email":
+            make = lambda rng, n: f"user{n}@example.com"
+        elif name == "zip_code":
+            make = lambda rng, n: f"{int(rng.random() * 90000) + 10000}"
+        elif name == "zip_prefix":
+            make = lambda rng, n: f"{int(rng.random() * 900) + 100}"
+        elif name.endswith("_url"):
+            make = lambda rng, n: f"https://example.com/{name}/{n}"
+        elif name.endswith("_code"):
+            make = lambda rng, n: encode_code(int(rng.random() * len(CODE_ALPHABET) ** 8), 8)
+        else:
+            label = name.replace("_", " ")
+            make = lambda rng, n: f"{label} {n}"
+        if length:
+            return lambda rng, n: make(rng, n)[:length]
+        return make
+
+    def unique_value(self, column, position):
+        kind = column["kind"]
+        if kind == "fk":
+            return self.key(column["parent"], column["parent_column"], position)
+        if kind == "choice":
+            return escape((column.get("choices") or column["enum"])[position])
+        if kind == "bool":
+            return "t" if position else "f"
+        if kind == "date":
+            return str(self.today - datetime.timedelta(days=self.spec["rows"] - 8) + datetime.timedelta(days=position))
+        if kind == "timestamp":
+            return str(self.now - datetime.timedelta(seconds=position))
+        if kind == "int":
+            return position + 1
+        if kind == "uuid":
+            return derived_uuid(self.seed, self.spec["table"], column["name"], position)
+        if column["name"] == "zip_prefix":
+            return f"{100 + position:03d}"
+        text = f"{column['name']}-{position}"
+        if column["length"] and len(text) > column["length"]:
+            return encode_code(position, column["length"])
+        return text
+
+    def row(self, rng, n):
+        values = []
+        for maker in self.makers:
+            if maker is None:
+                values.append(None)
+            elif maker[0] and rng.random() < maker[0]:
+                values.append(None)
+            else:
+                values.append(maker[1](rng, n))
+        for plan in self.spec["unique_plans"]:
+            for name, position in self.decode(plan, n).items():
+                i = self.position[name]
+                values[i] = self.unique_value(self.columns[i], position)
+        for left, op, right in self.spec["relations"]:
+            i, j = self.position[left], self.position[right]
+            a, b = values[i], values[j]
+            if a is None or b is None:
+                continue
+            if not {"<=": a <= b, "<": a < b, ">=": a >= b, ">": a > b}[op]:
+                if a == b:
+                    raise SchemaError(f"{self.spec['table']}: cannot satisfy {left} {op} {right}")
+                values[i], values[j] = b, a
+        return values
+
+    def copy_text(self, start, end):
+        """Rows start..end-1 in COPY text format"""
+        rng = random.Random(f"{self.seed}:{self.spec['table']}:{start}")
+        lines = []
+        for n in range(start, end):
+            lines.append("\t".join([value if value.__class__ is str else "\\N" if value is None else str(value)
+                                    for value in self.row(rng, n)]))
+        return "\n".join(lines) + "\n"
+
+
+def escape(text):
+    """Text for COPY's text format (generated values never need it; CHECK and enum labels might)"""
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+# ============================================
+# LOADING
+# ============================================
+
+_worker = {}
+
+
+def start_worker(dsn, triggers):
+    conn = import_psycopg2().connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute("SET synchronous_commit = off")
+        if not triggers:
+            cur.execute("SET session_replication_role = replica")
+    conn.commit()
+    _worker["conn"] = conn
+
+
+def load_chunk(task):
+    """COPY one chunk of rows in its own transaction; retried on deadlock (--triggers)"""
+    spec, specs, seed, skew, now, start, end = task
+    psycopg2 = import_psycopg2()
+    conn = _worker["conn"]
+    generator = RowGenerator(spec, specs, seed, skew, now)
+    columns = ", ".join(f'"{column["name"]}"' for column in generator.columns)
+    schema, name = spec["table"].split(".")
+    statement = f'COPY "{schema}"."{name}" ({columns}) FROM STDIN'
+    data = generator.copy_text(start, end)
+    for attempt in range(5):
+        try:
+            with conn.cursor() as cur:
+                cur.copy_expert(statement, io.StringIO(data))
+            conn.commit()
+            return spec["table"], end - start
+        except psycopg2.errors.DeadlockDetected:
+            conn.rollback()
+            time.sleep(0.05 * (attempt + 1))
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+    raise RuntimeError(f"{spec['table']} rows {start}-{end}: deadlocked 5 times")
+
+
+def load(database, users, ratios=None, only=None, workers=4, chunk_rows=50_000, seed=1, skew=1.3,
+         triggers=False, truncate=False, verbose=True):
+    """
+    Generate and COPY the data into an already-migrated database
+
+    Args:
+        database: open TemporaryPostgres / ExistingPostgres
+        users: Scale; most tables get ROWS_PER_USER rows per user
+        ratios: Overrides for ROWS_PER_USER
+        only: Load just these tables (and the tables they reference)
+        workers: Processes generating and copying chunks
+        chunk_rows: Rows per COPY / transaction
+        seed: Same seed, same rows
+        skew: Exponent for picking parent rows; 1 is uniform, higher favors
+            low row numbers (a few very active users)
+        triggers: Load through foreign key checks and row triggers
+        truncate: Empty the tables first (TRUNCATE ... CASCADE); otherwise
+            they must be empty
+
+    Returns:
+        dict with per-table rows and seconds, total rows, seconds, failed
+        foreign keys and warnings
+    """
+    conn = database.connect()
+    migrations = sql_migrations.discover()
+    tables = set(only) if only else source_tables(migrations)
+    ratios = {qualified(table): ratio for table, ratio in (ratios or {}).items()}
+    plan, warnings = build_specs(conn, {qualified(table) for table in tables}, users, ratios)
+    specs = {spec["table"]: spec for _level, spec in plan}
+
+    names = [".".join(f'"{part}"' for part in spec["table"].split(".")) for _level, spec in plan]
+    with conn.cursor() as cur:
+        if truncate:
+            cur.execute(f"TRUNCATE {', '.join(names)} CASCADE")
+            conn.commit()
+        for (_level, spec), name in zip(plan, names):
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM {name})")
+            if cur.fetchone()[0]:
+                raise SchemaError(f"{spec['table']} already has rows; load into a fresh database or pass --truncate")
+    conn.rollback()
+
+    if verbose:
+        for warning in warnings:
+            print(f"~ {warning}")
+        total = sum(spec["rows"] for spec in specs.values())
+        print(f"Loading {total:,} rows into {len(specs)} tables with {workers} workers")
+
+    stats = {"tables": {}, "warnings": warnings}
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers, start_worker, (database.dsn, triggers)) as pool:
+        for level in sorted({level for level, _spec in plan}):
+            tasks = []
+            for table_level, spec in plan:
+                if table_level == level:
+                    for start in range(0, spec["rows"], chunk_rows):
+                        tasks.append((spec, specs, seed, skew, now, start, min(spec["rows"], start + chunk_rows)))
+            level_started = time.perf_counter()
+            loaded = {}
+            for table, count in pool.imap_unordered(load_chunk, tasks):
+                loaded[table] = loaded.get(table, 0) + count
+                if loaded[table] == specs[table]["rows"]:
+                    seconds = time.perf_counter() - level_started
+                    stats["tables"][table] = {"rows": loaded[table], "seconds": round(seconds, 2)}
+                    if verbose:
+                        print(f"✓ {table:<36} {loaded[table]:>12,} rows  {seconds:6.1f}s")
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    stats["rows"] = sum(table["rows"] for table in stats["tables"].values())
+
+    with conn.cursor() as cur:
+        if not only:
+            cur.execute(DERIVED_SQL)
+        conn.commit()
+        conn.autocommit = True
+        cur.execute("ANALYZE")
+        conn.autocommit = False
+    stats["broken_foreign_keys"] = verify_foreign_keys(conn, plan)
+    conn.close()
+    return stats
+
+
+def qualified(table):
+    return table if "." in table else f"public.{table}"
+
+
+def verify_foreign_keys(conn, plan):
+    """Anti-join every foreign key; returns ["child.col -> parent.col: n rows", ...]"""
+    broken = []
+    with conn.cursor() as cur:
+        for _level, spec in plan:
+            for column in spec["columns"]:
+                if column["kind"] != "fk":
+                    continue
+                child_schema, child = spec["table"].split(".")
+                parent_schema, parent = column["parent"].split(".")
+                cur.execute(
+                    f'SELECT COUNT(*) FROM "{child_schema}"."{child}" c WHERE c."{column["name"]}" IS NOT NULL '
+                    f'AND NOT EXISTS (SELECT 1 FROM "{parent_schema}"."{parent}" p '
+                    f'WHERE p."{column["parent_column"]}" = c."{column["name"]}")')
+                missing = cur.fetchone()[0]
+                if missing:
+                    broken.append(f"{spec['table']}.{column['name']} -> {column['parent']}: {missing:,} rows")
+    conn.rollback()
+    return broken
+
+
+def prepare_scratch_database(conn):
+    install_stubs(conn)
+    ensure_ledger(conn)
+    for migration in sql_migrations.order(sql_migrations.discover()):
+        apply_migration(conn, migration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load synthetic BillSwap / TrustLadder / Home data with COPY")
+    parser.add_argument("--users", type=int, default=100_000, help="Synthetic users (scales every table)")
+    parser.add_argument("--ratio", action="append", default=[], metavar="TABLE=ROWS_PER_USER",
+                        help="Override a table's rows per user (repeatable)")
+    parser.add_argument("--only", action="append", help="Load only this table and its parents (repeatable)")
+    parser.add_argument("--workers", type=int, default=max(1, multiprocessing.cpu_count() - 1),
+                        help="Worker processes (default: CPUs - 1)")
+    parser.add_argument("--chunk", type=int, default=50_000, help="Rows per COPY transaction")
+    parser.add_argument("--seed", type=int, default=1, help="Same seed, same data")
+    parser.add_argument("--skew", type=float, default=1.3, help="Parent row skew, 1 = uniform")
+    parser.add_argument("--triggers", action="store_true", help="Load through foreign key checks and triggers")
+    parser.add_argument("--truncate", action="store_true",
+                        help="Empty the tables (and anything referencing them) before loading")
+    parser.add_argument("--dsn", help="Migrated database (default: $BILLIX_TEST_DSN or a temporary cluster)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary cluster's data folder")
+    args = parser.parse_args()
+
+    ratios = {}
+    for item in args.ratio:
+        table, _, value = item.partition("=")
+        try:
+            ratios[table] = float(value)
+        except ValueError:
+            print(f"✗ --ratio expects TABLE=ROWS_PER_USER, got {item!r}")
+            return 1
+
+    import_psycopg2()
+    with open_database(args.dsn, settings={"max_wal_size": "4GB"}, keep=args.keep) as database:
+        scratch = database.__class__.__name__ == "TemporaryPostgres"
+        if scratch:
+            conn = database.connect()
+            prepare_scratch_database(conn)
+            conn.close()
+        try:
+            # The migrations seed a few polls and signals; on a scratch database they can go
+            stats = load(database, args.users, ratios, args.only, args.workers, args.chunk, args.seed, args.skew,
+                         args.triggers, truncate=args.truncate or scratch)
+        except SchemaError as e:
+            print(f"✗ {e}")
+            return 1
+        if args.keep and getattr(database, "root", None):
+            conn = database.connect()
+            conn.autocommit = True
+            conn.cursor().execute("CHECKPOINT")
+            conn.close()
+            print(f"Data folder kept at {database.root}/data (start it with pg_ctl -D ... start)")
+
+    print(f"\n✓ {stats['rows']:,} rows in {stats['seconds']:.1f}s ({stats['rows'] / stats['seconds']:,.0f} rows/s)")
+    for broken in stats["broken_foreign_keys"]:
+        print(f"✗ Dangling foreign key {broken}")
+    if not stats["broken_foreign_keys"]:
+        print("✓ Every foreign key resolves")
+    return 1 if stats["broken_foreign_keys"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())